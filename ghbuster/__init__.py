@@ -21,6 +21,20 @@ class TargetSpec:
             return f"{self.username}/{self.repo_name}"
         raise ValueError("Target is not a repository or missing username/repo_name")
 
+    def __eq__(self, other):
+        if not isinstance(other, TargetSpec):
+            return False
+        return self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def _key(self) -> tuple:
+        # GitHub user and repository names are case-insensitive
+        return (self.target_type,
+                self.username.lower() if self.username else None,
+                self.repo_name.lower() if self.repo_name else None)
+
     def __repr__(self):
         if self.target_type == TargetType.REPOSITORY:
             return f"GitHub repository {self.repo_full_name()}"
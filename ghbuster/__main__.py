@@ -1,14 +1,31 @@
+import json
 import logging
 import sys
 
 import github.Auth
-import requests_cache
 
-from ghbuster.heuristics import MetadataHeuristic, ALL_HEURISTICS, TargetType
-from ghbuster.heuristics import UserLooksLegit
-from .cli import CliArguments, parse_and_validate_args
-from .github_repo_scanner import GitHubScanner
+from ghbuster.heuristics import MetadataHeuristic, ALL_HEURISTICS
+from .batch_scanner import BatchScanner
+from .cli import CliArguments, BatchCliArguments, CommonCliArguments, GitHubCliArguments, WatchCliArguments, \
+    ServeCliArguments, CrawlCliArguments, ClustersCliArguments, ExportCliArguments, ArchiveIngestCliArguments, \
+    parse_and_validate_args, parse_and_validate_batch_args, parse_and_validate_watch_args, \
+    parse_and_validate_serve_args, parse_and_validate_crawl_args, parse_and_validate_clusters_args, \
+    parse_and_validate_export_args, parse_and_validate_archive_ingest_args
+from .github_repo_scanner import GitHubScanner, ensure_authenticated
+from .graph.clusters import StarMatrix, find_star_clusters
+from .graph.crawler import GraphCrawler
+from .graph.export import export
+from .graph.store import GraphStore
 from .output_formatter import OutputFormatter
+from .scan_service import ScanServer, ScanService
+from .service import http_cache, instrumentation, rate_limit_scheduler
+from .service.archive_index import ArchiveIndex
+from .service.commit_history import CommitHistory, GitCloneCommitHistory, GraphQLCommitHistory
+from .service.commit_index import CommitIndex, IndexedCommitHistory
+from .service.github_entity_store import GitHubEntityStore
+from .service.verdict_store import VerdictStore
+from .service.watch_state import WatchStateStore
+from .watcher import Watcher, read_targets
 
 
 def setup_logging(log_level: int):
@@ -17,13 +34,14 @@ def setup_logging(log_level: int):
     logging.getLogger("requests_cache").setLevel(logging.INFO)
 
 
-def setup_caching():
-    requests_cache.install_cache('github_cache', expire_after=3600)
+def setup_caching(config: http_cache.HttpCacheConfig):
+    http_cache.install_cache(config)
 
 
 def resolve_heuristics(included_heuristics: set[str], excluded_heuristics: set[str]) -> list[MetadataHeuristic]:
     heuristics = []
-    for heuristic in ALL_HEURISTICS:
+    # Sort heuristics so that results are reported in a deterministic order
+    for heuristic in sorted(ALL_HEURISTICS, key=lambda h: h.id()):
         if included_heuristics:
             if heuristic.id() in included_heuristics:
                 heuristics.append(heuristic)
@@ -35,31 +53,197 @@ def resolve_heuristics(included_heuristics: set[str], excluded_heuristics: set[s
     return heuristics
 
 
+def create_rate_limited_client(args: GitHubCliArguments) -> tuple[github.Github, rate_limit_scheduler.RateLimitScheduler]:
+    # Size the connection pool so that heuristics running in parallel don't wait for a connection
+    # The scheduler paces requests instead of PyGithub, whose fixed waits would add up to a second per GraphQL query
+    github_client = github.Github(auth=github.Auth.Token(args.github_token), pool_size=max(args.concurrency, 10),
+                                  retry=rate_limit_scheduler.CONNECTION_RETRY, seconds_between_requests=None,
+                                  seconds_between_writes=None)
+    # Requests are paced according to the rate limits of each token, and spread across tokens when several are given
+    scheduler = rate_limit_scheduler.RateLimitScheduler(args.github_tokens)
+    scheduler.install(github_client)
+    # Requests are attributed to the heuristic that sent them
+    instrumentation.install(github_client)
+    if len(args.github_tokens) > 1:
+        logging.info("Spreading requests across %d GitHub tokens", len(args.github_tokens))
+    return github_client, scheduler
+
+
+def create_github_client(args: CommonCliArguments) -> GitHubEntityStore:
+    github_client, scheduler = create_rate_limited_client(args)
+    verdict_store = VerdictStore(args.verdict_cache_path) if args.verdict_cache_path else None
+    return GitHubEntityStore(github_client, verdict_store=verdict_store, rate_limit_scheduler=scheduler,
+                             commit_history=create_commit_history(github_client, args))
+
+
+def create_commit_history(github_client: github.Github, args: CommonCliArguments) -> CommitHistory:
+    if args.git_cache_dir:
+        commit_history = GitCloneCommitHistory(github_client, args.git_cache_dir)
+    else:
+        commit_history = GraphQLCommitHistory(github_client)
+    if args.commit_index_path:
+        # Only commits pushed since the previous scan of a repository are retrieved
+        commit_history = IndexedCommitHistory(commit_history, CommitIndex(args.commit_index_path))
+    return commit_history
+
+
 def main(args: CliArguments):
     setup_logging(args.log_level)
-    setup_caching()
-    github_client = github.Github(auth=github.Auth.Token(args.github_token))
+    setup_caching(args.http_cache_config)
+    github_client = create_github_client(args)
     heuristics_to_run = resolve_heuristics(args.included_heuristics, args.excluded_heuristics)
-
-    if args.target_spec.target_type == TargetType.USER:
-        smoke_test = UserLooksLegit().run(github_client, args.target_spec)
-        if smoke_test.triggered:
-            logging.info("An initial analysis indicates that the GitHub user %s is likely legitimate: %s",
-                         args.target_spec.username, smoke_test.additional_details)
-            if not args.force:
-                logging.info("Exiting early without running all heuristics. Use --force to bypass")
+    scanner = GitHubScanner(args.target_spec, github_client, heuristics=heuristics_to_run,
+                            concurrency=args.concurrency, stop_policy=args.stop_policy)
+
+    smoke_test = scanner.check_looks_legit()
+    if smoke_test is not None and smoke_test.triggered:
+        logging.info("An initial analysis indicates that the GitHub user %s is likely legitimate: %s",
+                     args.target_spec.username, smoke_test.additional_details)
+        if not args.force:
+            logging.info("Exiting early without running all heuristics. Use --force to bypass")
             return
 
-    scanner = GitHubScanner(args.target_spec, github_client, heuristics=heuristics_to_run)
-    scanner.ensure_authenticated()
+    print(f"Authenticated as {scanner.ensure_authenticated()}")
     scanner.validate_target_spec()
     results = scanner.scan()
-    output = OutputFormatter().format_results(args.target_spec, results)
+    stats = scanner.request_stats if args.show_stats else None
+    output = OutputFormatter().format_results(args.target_spec, results, stats=stats)
     print(output)
 
 
+def batch_main(args: BatchCliArguments):
+    setup_logging(args.log_level)
+    setup_caching(args.http_cache_config)
+    github_client = create_github_client(args)
+    heuristics_to_run = resolve_heuristics(args.included_heuristics, args.excluded_heuristics)
+    # Standard output only contains results, one JSON line per target
+    logging.info("Authenticated as %s", ensure_authenticated(github_client))
+
+    scanner = BatchScanner(github_client, heuristics_to_run, concurrency=args.concurrency, force=args.force,
+                           stop_policy=args.stop_policy, include_stats=args.show_stats)
+    if args.input_file == '-':
+        scanner.scan(sys.stdin, sys.stdout)
+    else:
+        with open(args.input_file) as f:
+            scanner.scan(f, sys.stdout)
+
+
+def watch_main(args: WatchCliArguments):
+    setup_logging(args.log_level)
+    setup_caching(args.http_cache_config)
+    github_client, scheduler = create_rate_limited_client(args)
+    heuristics_to_run = resolve_heuristics(args.included_heuristics, args.excluded_heuristics)
+    logging.info("Authenticated as %s", ensure_authenticated(github_client))
+
+    # Verdicts are tracked per target by the watch state, rather than reused from the verdict store
+    commit_history = create_commit_history(github_client, args)
+    state = WatchStateStore(args.state_path)
+    watcher = Watcher(github_client, heuristics_to_run, state, concurrency=args.concurrency,
+                      full_rescan_interval=args.full_rescan_interval,
+                      create_entity_store=lambda: GitHubEntityStore(github_client, rate_limit_scheduler=scheduler,
+                                                                    commit_history=commit_history))
+    try:
+        watcher.watch(lambda: read_targets(args.input_file), sys.stdout, interval=args.interval,
+                      max_polls=1 if args.once else None)
+    except KeyboardInterrupt:
+        logging.info("Stopped watching")
+    finally:
+        state.close()
+
+
+def serve_main(args: ServeCliArguments):
+    setup_logging(args.log_level)
+    setup_caching(args.http_cache_config)
+    github_client, scheduler = create_rate_limited_client(args)
+    heuristics_to_run = resolve_heuristics(args.included_heuristics, args.excluded_heuristics)
+    logging.info("Authenticated as %s", ensure_authenticated(github_client))
+
+    # The client, HTTP cache, rate limit budget, verdict store and commit history are shared by all requests
+    verdict_store = VerdictStore(args.verdict_cache_path) if args.verdict_cache_path else None
+    commit_history = create_commit_history(github_client, args)
+    service = ScanService(github_client, heuristics_to_run, concurrency=args.concurrency, max_queue=args.max_queue,
+                          result_ttl=args.result_ttl, force=args.force, stop_policy=args.stop_policy,
+                          include_stats=args.show_stats,
+                          create_entity_store=lambda: GitHubEntityStore(github_client, verdict_store=verdict_store,
+                                                                        rate_limit_scheduler=scheduler,
+                                                                        commit_history=commit_history))
+    server = ScanServer(service, args.host, args.port, scan_timeout=args.scan_timeout)
+    logging.info("Serving scans on http://%s:%d/scan?target=owner/repo", *server.server_address[:2])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logging.info("Stopped serving")
+    finally:
+        server.server_close()
+        service.close()
+
+
+def crawl_main(args: CrawlCliArguments):
+    setup_logging(args.log_level)
+    setup_caching(args.http_cache_config)
+    github_client, _ = create_rate_limited_client(args)
+    logging.info("Authenticated as %s", ensure_authenticated(github_client))
+
+    store = GraphStore(args.graph_path)
+    try:
+        crawler = GraphCrawler(github_client, store, max_depth=args.max_depth, max_nodes=args.max_nodes,
+                               concurrency=args.concurrency, max_stargazers_per_repo=args.max_stargazers,
+                               max_forks_per_repo=args.max_forks, max_repos_per_user=args.max_repos_per_user)
+        crawler.crawl(args.targets)
+    finally:
+        store.close()
+
+
+def clusters_main(args: ClustersCliArguments):
+    setup_logging(args.log_level)
+    store = GraphStore(args.graph_path)
+    try:
+        star_matrix = StarMatrix.from_store(store)
+    finally:
+        store.close()
+    clusters = find_star_clusters(star_matrix, min_shared_stars=args.min_shared_stars,
+                                  min_similarity=args.min_similarity, min_cluster_size=args.min_cluster_size)
+    for cluster in clusters:
+        print(json.dumps(cluster.to_json()))
+
+
+def export_main(args: ExportCliArguments):
+    setup_logging(args.log_level)
+    store = GraphStore(args.graph_path)
+    try:
+        export(store, args.output_format, args.output, sampling_method=args.sampling_method,
+               max_nodes=args.max_nodes, open_browser=args.open_browser)
+    finally:
+        store.close()
+
+
+def archive_ingest_main(args: ArchiveIngestCliArguments):
+    setup_logging(args.log_level)
+    index = ArchiveIndex(args.index_path)
+    try:
+        count = index.ingest(args.input_files, event_types=args.event_types)
+    finally:
+        index.close()
+    logging.info("Ingested %d new events from %d dumps into %s", count, len(args.input_files), args.index_path)
+
+
 def cli_entrypoint():
-    main(parse_and_validate_args(sys.argv[1:]))
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        batch_main(parse_and_validate_batch_args(sys.argv[2:]))
+    elif len(sys.argv) > 1 and sys.argv[1] == 'watch':
+        watch_main(parse_and_validate_watch_args(sys.argv[2:]))
+    elif len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        serve_main(parse_and_validate_serve_args(sys.argv[2:]))
+    elif len(sys.argv) > 1 and sys.argv[1] == 'crawl':
+        crawl_main(parse_and_validate_crawl_args(sys.argv[2:]))
+    elif len(sys.argv) > 1 and sys.argv[1] == 'clusters':
+        clusters_main(parse_and_validate_clusters_args(sys.argv[2:]))
+    elif len(sys.argv) > 1 and sys.argv[1] == 'export':
+        export_main(parse_and_validate_export_args(sys.argv[2:]))
+    elif len(sys.argv) > 1 and sys.argv[1] == 'archive-ingest':
+        archive_ingest_main(parse_and_validate_archive_ingest_args(sys.argv[2:]))
+    else:
+        main(parse_and_validate_args(sys.argv[1:]))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,122 @@
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Iterable, TextIO
+
+import github
+
+from . import TargetSpec
+from .cli import parse_target
+from .github_repo_scanner import GitHubScanner, StopPolicy
+from .heuristics import MetadataHeuristic
+from .output_formatter import OutputFormatter
+from .service.github_entity_store import GitHubEntityStore
+
+logger = logging.getLogger(__name__)
+
+# Users and repositories retrieved while scanning are shared by the next targets, up to a number of targets and for a
+# limited time, so that never-ending batches neither grow unbounded nor keep using stale entities
+DEFAULT_TARGETS_PER_ENTITY_STORE = 1000
+DEFAULT_ENTITY_STORE_TTL = 3600
+
+
+class BatchScanner:
+    """
+    Scans many targets with a single GitHub client and entity store, so that users and repositories shared between
+    targets (e.g. the same stargazers) are only fetched once. The entity store is renewed every targets_per_entity_store
+    targets or entity_store_ttl seconds. Results are written as one JSON line per target, as soon as the target has
+    been scanned.
+    """
+
+    def __init__(self, github_client: github.Github | GitHubEntityStore, heuristics: list[MetadataHeuristic],
+                 concurrency: int = 4, force: bool = False, stop_policy: StopPolicy = None,
+                 include_stats: bool = False, targets_per_entity_store: int = DEFAULT_TARGETS_PER_ENTITY_STORE,
+                 entity_store_ttl: float = DEFAULT_ENTITY_STORE_TTL):
+        if not isinstance(github_client, GitHubEntityStore):
+            github_client = GitHubEntityStore(github_client)
+        self.github_client = github_client
+        self.heuristics = heuristics
+        self.concurrency = concurrency
+        self.force = force
+        self.stop_policy = stop_policy
+        self.include_stats = include_stats
+        self.targets_per_entity_store = targets_per_entity_store
+        self.entity_store_ttl = entity_store_ttl
+        self._entity_store_targets = 0
+        self._entity_store_created_at = time.monotonic()
+        self._entity_store_lock = threading.Lock()
+        self._output_lock = threading.Lock()
+
+    def scan(self, lines: Iterable[str], output: TextIO) -> int:
+        """
+        Scan the targets read from the input lines, skipping duplicates. Returns the number of distinct targets.
+        """
+        seen_targets = set[TargetSpec]()
+        in_flight = set()
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='target') as executor:
+            for line in lines:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+
+                try:
+                    target_spec = parse_target(line)
+                except ValueError as e:
+                    self._write(output, {"target": line, "status": "error", "error": str(e)})
+                    continue
+
+                if target_spec in seen_targets:
+                    logger.debug("Skipping duplicate target %s", target_spec)
+                    continue
+                seen_targets.add(target_spec)
+
+                # Don't read the whole input upfront, it can be a never-ending stream
+                if len(in_flight) >= 2 * self.concurrency:
+                    _, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                in_flight.add(executor.submit(self._scan_and_write, target_spec, output))
+
+        logger.info("Scanned %d targets: %s", len(seen_targets), self.github_client.stats)
+        return len(seen_targets)
+
+    def scan_target(self, target_spec: TargetSpec) -> dict[str, Any]:
+        formatter = OutputFormatter()
+        scanner = GitHubScanner(target_spec, self._get_entity_store(), heuristics=self.heuristics,
+                                stop_policy=self.stop_policy)
+        try:
+            scanner.validate_target_spec()
+            if not self.force:
+                smoke_test = scanner.check_looks_legit()
+                if smoke_test is not None and smoke_test.triggered:
+                    return {**formatter.format_target_json(target_spec), "status": "likely_legitimate",
+                            "details": smoke_test.additional_details}
+            results = scanner.scan()
+        except Exception as e:
+            logger.error("Unable to scan %s: %s", target_spec, e, exc_info=logger.isEnabledFor(logging.DEBUG))
+            return {**formatter.format_target_json(target_spec), "status": "error", "error": str(e)}
+
+        stats = scanner.request_stats if self.include_stats else None
+        return {**formatter.format_results_json(target_spec, results, stats=stats), "status": "scanned"}
+
+    def _get_entity_store(self) -> GitHubEntityStore:
+        with self._entity_store_lock:
+            if self._entity_store_targets >= self.targets_per_entity_store or \
+                    time.monotonic() - self._entity_store_created_at >= self.entity_store_ttl:
+                logger.debug("Renewing the entity store after %d targets: %s", self._entity_store_targets,
+                             self.github_client.stats)
+                # Targets being scanned keep using the previous store until they complete
+                self.github_client = self.github_client.renewed()
+                self._entity_store_targets = 0
+                self._entity_store_created_at = time.monotonic()
+            self._entity_store_targets += 1
+            return self.github_client
+
+    def _scan_and_write(self, target_spec: TargetSpec, output: TextIO):
+        self._write(output, self.scan_target(target_spec))
+
+    def _write(self, output: TextIO, result: dict[str, Any]):
+        line = json.dumps(result)
+        with self._output_lock:
+            output.write(line + "\n")
+            output.flush()
@@ -4,43 +4,316 @@ import re
 from argparse import ArgumentParser
 
 from . import TargetType, TargetSpec
+from .github_repo_scanner import StopPolicy
+from .graph import clusters as graph_clusters, crawler as graph_crawler, export as graph_export, \
+    store as graph_store
+from .service import archive_index, commit_history, commit_index, http_cache, watch_state
+
+
+def _add_github_arguments(parser: ArgumentParser):
+    parser.add_argument("--github-token", type=str, action="append", dest="github_tokens",
+                        help="GitHub token for authentication. If not provided, the GITHUB_TOKEN environment variable is used. Can be specified multiple times to spread requests across several tokens",
+                        required=False, default=None)
+    parser.add_argument("--github-token-file", type=str,
+                        help="File containing one GitHub token per line, used in addition to --github-token",
+                        required=False, default=None)
+    parser.add_argument("--debug", action="store_true", help="Enable debug logging", dest="enable_debug", default=False)
+    parser.add_argument("--no-cache", action="store_true", default=False, dest="disable_http_cache",
+                        help="Don't cache GitHub API responses")
+    parser.add_argument("--cache-backend", type=str, default=http_cache.DEFAULT_BACKEND,
+                        choices=["sqlite", "filesystem", "memory", "redis", "mongodb", "gridfs", "dynamodb"],
+                        help=f"Storage backend of the GitHub API response cache (default: {http_cache.DEFAULT_BACKEND})")
+    parser.add_argument("--cache-path", type=str, default=http_cache.DEFAULT_PATH,
+                        help=f"Path or name of the GitHub API response cache (default: {http_cache.DEFAULT_PATH})")
+    parser.add_argument("--cache-ttl", type=str, default=str(http_cache.DEFAULT_EXPIRE_AFTER),
+                        help=f"Default time to live of cached responses in seconds, or 'never' (default: {http_cache.DEFAULT_EXPIRE_AFTER}). Expired responses are revalidated with conditional requests")
+    parser.add_argument("--cache-ttl-rule", type=str, action="append", default=[], dest="cache_ttl_rules",
+                        help="Time to live of cached responses for URLs matching a pattern, e.g. 'api.github.com/users/*=86400'. Can be specified multiple times")
+
+
+def _add_heuristic_selection_arguments(parser: ArgumentParser):
+    parser.add_argument("--include", nargs="+", help="Heuristics to include (any other heuristic will not be ran)",
+                        default=[])
+    parser.add_argument("--exclude", nargs="+", help="Heuristics to exclude", default=[])
+
+
+def _add_common_arguments(parser: ArgumentParser):
+    _add_github_arguments(parser)
+    _add_heuristic_selection_arguments(parser)
+    parser.add_argument("--force", action="store_true", default=False)
+    parser.add_argument("--stop-after-triggered", type=int, default=None, metavar="N",
+                        help="Skip the remaining heuristics of a target once N of them triggered. Heuristics run cheapest first")
+    parser.add_argument("--skip-expensive", action="store_true", default=False, dest="skip_expensive_if_cheap_pass",
+                        help="Skip expensive heuristics of a target if all cheaper ones passed")
+    parser.add_argument("--expensive-cost", type=int, default=StopPolicy.DEFAULT_EXPENSIVE_COST, metavar="REQUESTS",
+                        help=f"Estimated number of GitHub API requests from which a heuristic is considered expensive (default: {StopPolicy.DEFAULT_EXPENSIVE_COST})")
+    parser.add_argument("--stats", action="store_true", default=False, dest="show_stats",
+                        help="Report the GitHub API requests, cache hits, latencies and rate limit cost of each heuristic")
+    parser.add_argument("--no-verdict-cache", action="store_true", default=False, dest="disable_verdict_cache",
+                        help="Don't reuse the verdicts of user heuristics from previous scans")
+    parser.add_argument("--verdict-cache-path", type=str, default="ghbuster_verdicts.sqlite",
+                        help="SQLite file storing the verdicts of user heuristics across scans (default: ghbuster_verdicts.sqlite)")
+    parser.add_argument("--no-commit-index", action="store_true", default=False, dest="disable_commit_index",
+                        help="Don't reuse the commits retrieved by previous scans")
+    parser.add_argument("--commit-index-path", type=str, default=commit_index.DEFAULT_PATH,
+                        help=f"SQLite file indexing the commits of scanned repositories, so that later scans only retrieve new commits (default: {commit_index.DEFAULT_PATH})")
+    parser.add_argument("--git-clones", action="store_true", default=False, dest="use_git_clones",
+                        help="Read commit history from local partial clones of repositories instead of the GitHub API, lifting the limit on the number of commits analyzed")
+    parser.add_argument("--git-cache-dir", type=str, default=commit_history.DEFAULT_GIT_CACHE_DIR,
+                        help=f"Directory storing the partial clones used by --git-clones (default: {commit_history.DEFAULT_GIT_CACHE_DIR})")
 
 
 def _cli() -> ArgumentParser:
     parser = ArgumentParser(
         prog="ghbuster",
         exit_on_error=False,
-        description="Identify inauthentic GitHub accounts and repositories",
+        description="Identify inauthentic GitHub accounts and repositories. Use 'ghbuster batch' to scan many targets.",
     )
 
     parser.add_argument("target", type=str,
                         help="Target GitHub repository or user to scan, e.g., 'owner/repo', `username`, or 'https://github.com/owner/repo'.")
-    parser.add_argument("--github-token", type=str,
-                        help="GitHub token for authentication. If not provided, the GITHUB_TOKEN environment variable is used",
-                        required=False, default=os.environ.get("GITHUB_TOKEN"))
+    _add_common_arguments(parser)
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="Number of heuristics, and of stargazers of a repository, to evaluate in parallel (default: 1, i.e. sequentially)")
+    return parser
+
+
+def _batch_cli() -> ArgumentParser:
+    parser = ArgumentParser(
+        prog="ghbuster batch",
+        exit_on_error=False,
+        description="Scan many GitHub repositories and users, writing one JSON line per target as soon as it is scanned",
+    )
+
+    parser.add_argument("input", type=str, nargs="?", default="-",
+                        help="File containing one target per line (default: '-', i.e. standard input). Empty lines and lines starting with '#' are ignored.")
+    _add_common_arguments(parser)
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="Number of targets to scan in parallel (default: 4)")
+    return parser
+
+
+def _watch_cli() -> ArgumentParser:
+    parser = ArgumentParser(
+        prog="ghbuster watch",
+        exit_on_error=False,
+        description="Watch GitHub repositories and users, running again the heuristics whose inputs changed since the previous poll, and writing one JSON line event per verdict change",
+    )
+
+    parser.add_argument("input", type=str,
+                        help="File containing one target per line, read again before each poll. Empty lines and lines starting with '#' are ignored.")
+    _add_github_arguments(parser)
+    _add_heuristic_selection_arguments(parser)
+    parser.add_argument("--interval", type=int, default=3600, metavar="SECONDS",
+                        help="Time between the start of two polls (default: 3600)")
+    parser.add_argument("--full-rescan-interval", type=int, default=24 * 3600, metavar="SECONDS",
+                        help="Time after which all heuristics run again on a target, whether their inputs changed or not (default: 86400)")
+    parser.add_argument("--once", action="store_true", default=False,
+                        help="Poll the targets once and exit, e.g. to run from a scheduler")
+    parser.add_argument("--state-path", type=str, default=watch_state.DEFAULT_PATH,
+                        help=f"SQLite file storing the cursors and verdicts of watched targets (default: {watch_state.DEFAULT_PATH})")
+    parser.add_argument("--no-commit-index", action="store_true", default=False, dest="disable_commit_index",
+                        help="Don't reuse the commits retrieved by previous polls")
+    parser.add_argument("--commit-index-path", type=str, default=commit_index.DEFAULT_PATH,
+                        help=f"SQLite file indexing the commits of watched repositories, so that polls only retrieve new commits (default: {commit_index.DEFAULT_PATH})")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="Number of targets to poll in parallel (default: 4)")
+    return parser
+
+
+def _serve_cli() -> ArgumentParser:
+    parser = ArgumentParser(
+        prog="ghbuster serve",
+        exit_on_error=False,
+        description="Serve scans over HTTP as JSON, sharing the GitHub client, cache and rate limits across requests. Identical scans requested at the same time run once",
+    )
+
+    _add_common_arguments(parser)
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on (default: 8080)")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="Number of targets to scan in parallel (default: 4)")
+    parser.add_argument("--max-queue", type=int, default=100,
+                        help="Number of scans waiting for a worker above which requests are rejected with 503 (default: 100)")
+    parser.add_argument("--result-ttl", type=int, default=300, metavar="SECONDS",
+                        help="Time during which the result of a scan is returned again to identical requests, unless they pass refresh=true (default: 300)")
+    parser.add_argument("--scan-timeout", type=int, default=600, metavar="SECONDS",
+                        help="Time a request waits for its scan before answering 504. The scan goes on, and retrying the request picks it up (default: 600)")
+    return parser
+
+
+def _crawl_cli() -> ArgumentParser:
+    parser = ArgumentParser(
+        prog="ghbuster crawl",
+        exit_on_error=False,
+        description="Crawl the graph of repositories and users around targets (stargazers, forks, owned repositories), storing it on disk. Run it again on the same graph to resume an interrupted crawl",
+    )
+
+    parser.add_argument("targets", type=str, nargs="+",
+                        help="GitHub repositories or users to start from, e.g., 'owner/repo' or 'username'")
+    _add_github_arguments(parser)
+    parser.add_argument("--graph-path", type=str, default=graph_store.DEFAULT_PATH,
+                        help=f"SQLite file storing the crawled graph and the crawl frontier (default: {graph_store.DEFAULT_PATH})")
+    parser.add_argument("--max-depth", type=int, default=graph_crawler.DEFAULT_MAX_DEPTH,
+                        help=f"Maximum distance from the targets of the nodes to expand (default: {graph_crawler.DEFAULT_MAX_DEPTH})")
+    parser.add_argument("--max-nodes", type=int, default=graph_crawler.DEFAULT_MAX_NODES,
+                        help=f"Maximum number of users and repositories in the graph (default: {graph_crawler.DEFAULT_MAX_NODES})")
+    parser.add_argument("--max-stargazers", type=int, default=graph_crawler.DEFAULT_MAX_STARGAZERS_PER_REPO,
+                        help=f"Maximum number of stargazers retrieved per repository (default: {graph_crawler.DEFAULT_MAX_STARGAZERS_PER_REPO})")
+    parser.add_argument("--max-forks", type=int, default=graph_crawler.DEFAULT_MAX_FORKS_PER_REPO,
+                        help=f"Maximum number of forks retrieved per repository (default: {graph_crawler.DEFAULT_MAX_FORKS_PER_REPO})")
+    parser.add_argument("--max-repos-per-user", type=int, default=graph_crawler.DEFAULT_MAX_REPOS_PER_USER,
+                        help=f"Maximum number of repositories retrieved per user (default: {graph_crawler.DEFAULT_MAX_REPOS_PER_USER})")
+    parser.add_argument("--concurrency", type=int, default=graph_crawler.DEFAULT_CONCURRENCY,
+                        help=f"Number of nodes expanded in parallel (default: {graph_crawler.DEFAULT_CONCURRENCY})")
+    return parser
+
+
+def _clusters_cli() -> ArgumentParser:
+    parser = ArgumentParser(
+        prog="ghbuster clusters",
+        exit_on_error=False,
+        description="Find groups of users who starred the same repositories in a crawled graph (see 'ghbuster crawl'), writing one JSON line per cluster, best scored first",
+    )
+
+    parser.add_argument("--graph-path", type=str, default=graph_store.DEFAULT_PATH,
+                        help=f"SQLite file storing the crawled graph (default: {graph_store.DEFAULT_PATH})")
+    parser.add_argument("--min-shared-stars", type=int, default=graph_clusters.DEFAULT_MIN_SHARED_STARS,
+                        help=f"Minimum number of repositories two users must have both starred to be linked (default: {graph_clusters.DEFAULT_MIN_SHARED_STARS})")
+    parser.add_argument("--min-similarity", type=float, default=graph_clusters.DEFAULT_MIN_SIMILARITY,
+                        help=f"Minimum Jaccard similarity of the repositories starred by two users to be linked (default: {graph_clusters.DEFAULT_MIN_SIMILARITY})")
+    parser.add_argument("--min-cluster-size", type=int, default=graph_clusters.DEFAULT_MIN_CLUSTER_SIZE,
+                        help=f"Minimum number of users in a cluster (default: {graph_clusters.DEFAULT_MIN_CLUSTER_SIZE})")
     parser.add_argument("--debug", action="store_true", help="Enable debug logging", dest="enable_debug", default=False)
-    parser.add_argument("--include", nargs="+", help="Heuristics to include (any other heuristic will not be ran)",
-                        default=[])
-    parser.add_argument("--exclude", nargs="+", help="Heuristics to exclude", default=[])
-    parser.add_argument("--force", action="store_true", default=False)
     return parser
 
 
-class CliArguments:
-    target_spec: TargetSpec
+def _export_cli() -> ArgumentParser:
+    parser = ArgumentParser(
+        prog="ghbuster export",
+        exit_on_error=False,
+        description="Export a crawled graph (see 'ghbuster crawl'). GraphML, GEXF and edge lists are streamed from the graph as a whole, the interactive HTML view is rendered from a sample of it",
+    )
+
+    parser.add_argument("output", type=str, help="File to write the graph to")
+    parser.add_argument("--graph-path", type=str, default=graph_store.DEFAULT_PATH,
+                        help=f"SQLite file storing the crawled graph (default: {graph_store.DEFAULT_PATH})")
+    parser.add_argument("--format", type=str, choices=graph_export.FORMATS, default=None, dest="output_format",
+                        help="Output format (default: inferred from the extension of the output file)")
+    parser.add_argument("--sample", type=str, choices=graph_export.SAMPLING_METHODS,
+                        default=graph_export.DEFAULT_SAMPLING_METHOD, dest="sampling_method",
+                        help=f"How to reduce the graph for the HTML view: its densest k-core, its most connected nodes, or representatives of co-starring clusters (default: {graph_export.DEFAULT_SAMPLING_METHOD})")
+    parser.add_argument("--max-nodes", type=int, default=graph_export.DEFAULT_MAX_HTML_NODES,
+                        help=f"Maximum number of nodes in the HTML view (default: {graph_export.DEFAULT_MAX_HTML_NODES})")
+    parser.add_argument("--open", action="store_true", dest="open_browser", default=False,
+                        help="Open the HTML view in a browser, unless running headless")
+    parser.add_argument("--debug", action="store_true", help="Enable debug logging", dest="enable_debug", default=False)
+    return parser
+
+
+def _archive_ingest_cli() -> ArgumentParser:
+    parser = ArgumentParser(
+        prog="ghbuster archive-ingest",
+        exit_on_error=False,
+        description="Ingest hourly GH Archive dumps (.json.gz) from disk into a local event index, for offline analysis",
+    )
+
+    parser.add_argument("inputs", type=str, nargs="+",
+                        help="GH Archive dumps, or directories containing them. Dumps that were already ingested are skipped")
+    parser.add_argument("--index-path", type=str, default=archive_index.DEFAULT_PATH,
+                        help=f"SQLite file of the event index (default: {archive_index.DEFAULT_PATH})")
+    parser.add_argument("--event-type", type=str, action="append", dest="event_types", default=None,
+                        help="Only ingest events of this type, e.g. WatchEvent. Can be specified multiple times (default: all types)")
+    parser.add_argument("--debug", action="store_true", help="Enable debug logging", dest="enable_debug", default=False)
+    return parser
+
+
+class GitHubCliArguments:
     github_token: str
+    github_tokens: list[str]
     log_level: int
+    concurrency: int
+    http_cache_config: http_cache.HttpCacheConfig
+
+
+class CommonCliArguments(GitHubCliArguments):
     excluded_heuristics: set[str]
     included_heuristics: set[str]
     force: bool
+    concurrency: int
+    verdict_cache_path: str | None
+    commit_index_path: str | None
+    git_cache_dir: str | None
+    stop_policy: StopPolicy
+    show_stats: bool
 
 
-def parse_and_validate_args(args) -> CliArguments:
-    args = _cli().parse_args(args)
-    cli_args = CliArguments()
+class CliArguments(CommonCliArguments):
+    target_spec: TargetSpec
+
+
+class BatchCliArguments(CommonCliArguments):
+    input_file: str
+
+
+class WatchCliArguments(GitHubCliArguments):
+    input_file: str
+    excluded_heuristics: set[str]
+    included_heuristics: set[str]
+    interval: int
+    full_rescan_interval: int
+    once: bool
+    state_path: str
+    commit_index_path: str | None
+    git_cache_dir: str | None
+
+
+class ServeCliArguments(CommonCliArguments):
+    host: str
+    port: int
+    max_queue: int
+    result_ttl: int
+    scan_timeout: int
+
+
+class CrawlCliArguments(GitHubCliArguments):
+    targets: list[TargetSpec]
+    graph_path: str
+    max_depth: int
+    max_nodes: int
+    max_stargazers: int
+    max_forks: int
+    max_repos_per_user: int
 
+
+class ClustersCliArguments:
+    graph_path: str
+    min_shared_stars: int
+    min_similarity: float
+    min_cluster_size: int
+    log_level: int
+
+
+class ExportCliArguments:
+    graph_path: str
+    output: str
+    output_format: str
+    sampling_method: str
+    max_nodes: int
+    open_browser: bool
+    log_level: int
+
+
+class ArchiveIngestCliArguments:
+    input_files: list[str]
+    index_path: str
+    event_types: set[str] | None
+    log_level: int
+
+
+def parse_target(target: str) -> TargetSpec:
     # Determine target type and parse repository or user
-    normalized_target = args.target.strip().lower()
+    normalized_target = target.strip().lower()
     github_url_prefix = "https://github.com/"
     if normalized_target.startswith(github_url_prefix):
         normalized_target = normalized_target[len(github_url_prefix):]
@@ -50,28 +323,204 @@ def parse_and_validate_args(args) -> CliArguments:
         parts = normalized_target.split('/')
         if len(parts) != 2:
             raise ValueError("Invalid repository format. Expected 'owner/repo'.")
-        cli_args.target_spec = TargetSpec(target_type=TargetType.REPOSITORY, username=parts[0], repo_name=parts[1])
+        return TargetSpec(target_type=TargetType.REPOSITORY, username=parts[0], repo_name=parts[1])
     else:
         # It's a user
         if not re.match(r'^[a-zA-Z0-9-]+$', normalized_target):
             # "Username may only contain alphanumeric characters or single hyphens, and cannot begin or end with a hyphen." (from the GitHub homepage)
             raise ValueError("Invalid GitHub username format")
-        cli_args.target_spec = TargetSpec(target_type=TargetType.USER, username=normalized_target)
+        return TargetSpec(target_type=TargetType.USER, username=normalized_target)
 
-    # Github token
-    cli_args.github_token = args.github_token
-    if cli_args.github_token is None or len(cli_args.github_token) == 0:
+
+def _parse_github_args(args, cli_args: GitHubCliArguments):
+    # Github tokens
+    tokens = list(args.github_tokens or [])
+    if args.github_token_file:
+        with open(args.github_token_file) as f:
+            tokens.extend(line.strip() for line in f if line.strip() and not line.startswith('#'))
+    if not tokens and os.environ.get("GITHUB_TOKEN"):
+        tokens.append(os.environ["GITHUB_TOKEN"])
+    cli_args.github_tokens = list(dict.fromkeys(token for token in tokens if token))
+    if len(cli_args.github_tokens) == 0:
         raise ValueError(
             "GitHub token is required. Please provide it via the --github-token argument or set the GITHUB_TOKEN environment variable.")
+    cli_args.github_token = cli_args.github_tokens[0]
 
     # Log level
     cli_args.log_level = logging.DEBUG if args.enable_debug else logging.INFO
 
-    # Heuristics selection
+    # HTTP cache
+    urls_expire_after = {}
+    for rule in args.cache_ttl_rules:
+        pattern, separator, ttl = rule.rpartition('=')
+        if not separator or not pattern:
+            raise ValueError(f"Invalid cache TTL rule '{rule}'. Expected 'URL_PATTERN=SECONDS'.")
+        urls_expire_after[pattern] = http_cache.parse_expire_after(ttl)
+    cli_args.http_cache_config = http_cache.HttpCacheConfig(
+        enabled=not args.disable_http_cache,
+        backend=args.cache_backend,
+        path=args.cache_path,
+        expire_after=http_cache.parse_expire_after(args.cache_ttl),
+        urls_expire_after=urls_expire_after,
+    )
+
+    if args.concurrency < 1:
+        raise ValueError("--concurrency must be at least 1.")
+    cli_args.concurrency = args.concurrency
+
+
+def _parse_heuristic_selection_args(args, cli_args: CommonCliArguments | WatchCliArguments):
     if args.include and args.exclude:
         raise ValueError("--include and --exclude are mutually exclusive.")
     cli_args.included_heuristics = set(args.include)
     cli_args.excluded_heuristics = set(args.exclude)
 
+
+def _parse_common_args(args, cli_args: CommonCliArguments):
+    _parse_github_args(args, cli_args)
+
+    _parse_heuristic_selection_args(args, cli_args)
+
     cli_args.force = args.force
+    cli_args.show_stats = args.show_stats
+
+    # Stop policy
+    if args.stop_after_triggered is not None and args.stop_after_triggered < 1:
+        raise ValueError("--stop-after-triggered must be at least 1.")
+    cli_args.stop_policy = StopPolicy(max_triggered=args.stop_after_triggered,
+                                      skip_expensive_if_cheap_pass=args.skip_expensive_if_cheap_pass,
+                                      expensive_cost=args.expensive_cost)
+    cli_args.verdict_cache_path = None if args.disable_verdict_cache else args.verdict_cache_path
+    cli_args.commit_index_path = None if args.disable_commit_index else args.commit_index_path
+    cli_args.git_cache_dir = args.git_cache_dir if args.use_git_clones else None
+
+
+def parse_and_validate_args(args) -> CliArguments:
+    args = _cli().parse_args(args)
+    cli_args = CliArguments()
+    cli_args.target_spec = parse_target(args.target)
+    _parse_common_args(args, cli_args)
+    return cli_args
+
+
+def parse_and_validate_batch_args(args) -> BatchCliArguments:
+    args = _batch_cli().parse_args(args)
+    cli_args = BatchCliArguments()
+    cli_args.input_file = args.input
+    _parse_common_args(args, cli_args)
+    return cli_args
+
+
+def parse_and_validate_watch_args(args) -> WatchCliArguments:
+    args = _watch_cli().parse_args(args)
+    cli_args = WatchCliArguments()
+    if not os.path.isfile(args.input):
+        raise ValueError(f"No such file: {args.input}")
+    cli_args.input_file = args.input
+    _parse_github_args(args, cli_args)
+    _parse_heuristic_selection_args(args, cli_args)
+    if args.interval < 1:
+        raise ValueError("--interval must be at least 1.")
+    if args.full_rescan_interval < 0:
+        raise ValueError("--full-rescan-interval can't be negative.")
+    cli_args.interval = args.interval
+    cli_args.full_rescan_interval = args.full_rescan_interval
+    cli_args.once = args.once
+    cli_args.state_path = args.state_path
+    cli_args.commit_index_path = None if args.disable_commit_index else args.commit_index_path
+    cli_args.git_cache_dir = None
+    return cli_args
+
+
+def parse_and_validate_serve_args(args) -> ServeCliArguments:
+    args = _serve_cli().parse_args(args)
+    cli_args = ServeCliArguments()
+    _parse_common_args(args, cli_args)
+    if not 0 <= args.port <= 65535:
+        raise ValueError("--port must be between 0 and 65535.")
+    if args.max_queue < 0:
+        raise ValueError("--max-queue can't be negative.")
+    if args.result_ttl < 0:
+        raise ValueError("--result-ttl can't be negative.")
+    if args.scan_timeout < 1:
+        raise ValueError("--scan-timeout must be at least 1.")
+    cli_args.host = args.host
+    cli_args.port = args.port
+    cli_args.max_queue = args.max_queue
+    cli_args.result_ttl = args.result_ttl
+    cli_args.scan_timeout = args.scan_timeout
+    return cli_args
+
+
+def parse_and_validate_crawl_args(args) -> CrawlCliArguments:
+    args = _crawl_cli().parse_args(args)
+    cli_args = CrawlCliArguments()
+    cli_args.targets = list(dict.fromkeys(parse_target(target) for target in args.targets))
+    _parse_github_args(args, cli_args)
+    for name in ['max_depth', 'max_nodes', 'max_stargazers', 'max_forks', 'max_repos_per_user']:
+        if getattr(args, name) < 0:
+            raise ValueError(f"--{name.replace('_', '-')} can't be negative.")
+        setattr(cli_args, name, getattr(args, name))
+    cli_args.graph_path = args.graph_path
+    return cli_args
+
+
+def parse_and_validate_clusters_args(args) -> ClustersCliArguments:
+    args = _clusters_cli().parse_args(args)
+    cli_args = ClustersCliArguments()
+    if not os.path.isfile(args.graph_path):
+        raise ValueError(f"No crawled graph at {args.graph_path}. Use 'ghbuster crawl' first.")
+    if args.min_shared_stars < 1:
+        raise ValueError("--min-shared-stars must be at least 1.")
+    if not 0 <= args.min_similarity <= 1:
+        raise ValueError("--min-similarity must be between 0 and 1.")
+    if args.min_cluster_size < 2:
+        raise ValueError("--min-cluster-size must be at least 2.")
+    cli_args.graph_path = args.graph_path
+    cli_args.min_shared_stars = args.min_shared_stars
+    cli_args.min_similarity = args.min_similarity
+    cli_args.min_cluster_size = args.min_cluster_size
+    cli_args.log_level = logging.DEBUG if args.enable_debug else logging.INFO
+    return cli_args
+
+
+def parse_and_validate_export_args(args) -> ExportCliArguments:
+    args = _export_cli().parse_args(args)
+    cli_args = ExportCliArguments()
+    if not os.path.isfile(args.graph_path):
+        raise ValueError(f"No crawled graph at {args.graph_path}. Use 'ghbuster crawl' first.")
+    output_format = args.output_format
+    if output_format is None:
+        extension = os.path.splitext(args.output)[1].lstrip('.').lower()
+        output_format = {'tsv': 'edgelist', 'txt': 'edgelist'}.get(extension, extension)
+        if output_format not in graph_export.FORMATS:
+            raise ValueError(f"Can't infer the format of {args.output}, use --format.")
+    if args.max_nodes < 1:
+        raise ValueError("--max-nodes must be at least 1.")
+    cli_args.graph_path = args.graph_path
+    cli_args.output = args.output
+    cli_args.output_format = output_format
+    cli_args.sampling_method = args.sampling_method
+    cli_args.max_nodes = args.max_nodes
+    cli_args.open_browser = args.open_browser
+    cli_args.log_level = logging.DEBUG if args.enable_debug else logging.INFO
+    return cli_args
+
+
+def parse_and_validate_archive_ingest_args(args) -> ArchiveIngestCliArguments:
+    args = _archive_ingest_cli().parse_args(args)
+    cli_args = ArchiveIngestCliArguments()
+    cli_args.input_files = []
+    for path in args.inputs:
+        if os.path.isdir(path):
+            # Hourly dumps are named after their date and hour, e.g. 2024-05-01-15.json.gz
+            cli_args.input_files.extend(sorted(os.path.join(path, name) for name in os.listdir(path)
+                                               if name.endswith('.json.gz')))
+        elif os.path.isfile(path):
+            cli_args.input_files.append(path)
+        else:
+            raise ValueError(f"No such file or directory: {path}")
+    cli_args.index_path = args.index_path
+    cli_args.event_types = set(args.event_types) if args.event_types else None
+    cli_args.log_level = logging.DEBUG if args.enable_debug else logging.INFO
     return cli_args
@@ -1,25 +1,81 @@
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 import github
 
 from . import TargetType, TargetSpec
-from .heuristics import HeuristicRunResult, MetadataHeuristic
+from .heuristics import HeuristicRunResult, MetadataHeuristic, UserLooksLegit
+from .heuristics.base import fan_out_concurrency, has_async_variant
+from .service import instrumentation
+from .service.async_github import AsyncGitHubClient
+from .service.github_entity_store import GitHubEntityStore
 
 logger = logging.getLogger(__name__)
 
 
+def ensure_authenticated(github_client: github.Github | GitHubEntityStore) -> str:
+    """
+    Check that the GitHub token is valid, and return the login of the authenticated user.
+    """
+    try:
+        current_user = github_client.get_user()
+        return current_user.login
+    except github.GithubException as e:
+        raise ValueError(f"Authentication failed. Please check your GitHub token (status code {e.status})")
+
+
+class StopPolicy:
+    """
+    Decides which heuristics of a scan can be skipped given the results of the ones that already ran, to keep triage
+    scans bounded. Heuristics run cheapest first, so the expensive ones are the ones being skipped.
+    """
+    DEFAULT_EXPENSIVE_COST = 20
+
+    def __init__(self, max_triggered: int | None = None, skip_expensive_if_cheap_pass: bool = False,
+                 expensive_cost: int = DEFAULT_EXPENSIVE_COST):
+        self.max_triggered = max_triggered
+        self.skip_expensive_if_cheap_pass = skip_expensive_if_cheap_pass
+        self.expensive_cost = expensive_cost
+
+    def is_active(self) -> bool:
+        return self.max_triggered is not None or self.skip_expensive_if_cheap_pass
+
+    def is_expensive(self, heuristic: MetadataHeuristic) -> bool:
+        return heuristic.estimated_cost() >= self.expensive_cost
+
+    def reason_to_skip(self, heuristic: MetadataHeuristic, results: list[HeuristicRunResult]) -> str | None:
+        """
+        Return why the heuristic should be skipped, or None if it should run.
+        """
+        num_triggered = sum(1 for r in results if r.triggered)
+        if self.max_triggered is not None and num_triggered >= self.max_triggered:
+            return f"Skipped after {num_triggered} heuristics triggered."
+        if self.skip_expensive_if_cheap_pass and self.is_expensive(heuristic):
+            completed = [r for r in results if not r.skipped]
+            # A cheap heuristic that errored doesn't tell us anything, so it doesn't count as passed
+            if completed and all(not r.triggered and not r.errored for r in completed):
+                return "Skipped as all cheaper heuristics passed."
+        return None
+
+
 class GitHubScanner:
-    def __init__(self, target_spec: TargetSpec, github_client: github.Github, heuristics: list[MetadataHeuristic]):
+    def __init__(self, target_spec: TargetSpec, github_client: github.Github | GitHubEntityStore,
+                 heuristics: list[MetadataHeuristic], concurrency: int = 1, stop_policy: StopPolicy = None):
         self.target_spec = target_spec
+        # All heuristics of a scan share the same entity store, so that each user, repository and listing is only
+        # fetched once
+        if not isinstance(github_client, GitHubEntityStore):
+            github_client = GitHubEntityStore(github_client)
         self.github_client = github_client
         self.heuristics = heuristics
+        self.concurrency = concurrency
+        self.stop_policy = stop_policy or StopPolicy()
+        # Requests sent by the scan, attributed to the heuristic that caused them
+        self.request_stats = instrumentation.ScanStats()
 
-    def ensure_authenticated(self):
-        try:
-            current_user = self.github_client.get_user()
-            print(f"Authenticated as {current_user.login}")
-        except github.GithubException as e:
-            raise ValueError(f"Authentication failed. Please check your GitHub token (status code {e.status})")
+    def ensure_authenticated(self) -> str:
+        return ensure_authenticated(self.github_client)
 
     def validate_target_spec(self):
         if self.target_spec.target_type == TargetType.REPOSITORY:
@@ -38,14 +94,125 @@ class GitHubScanner:
         else:
             raise ValueError("Unsupported target type")
 
+    def check_looks_legit(self) -> HeuristicRunResult | None:
+        """
+        Run a quick smoke test indicating whether a user target is likely legitimate, in which case running all
+        heuristics is unnecessary. Returns None for other target types.
+        """
+        if self.target_spec.target_type != TargetType.USER:
+            return None
+        with instrumentation.collect(self.request_stats):
+            return UserLooksLegit().evaluate(self.github_client, self.target_spec)
+
+    def plan(self) -> list[MetadataHeuristic]:
+        """
+        Return the heuristics applying to the target, in the order they run: cheapest first.
+        """
+        heuristics = [h for h in self.heuristics if h.target_type() == self.target_spec.target_type]
+        # The sort is stable, heuristics with the same cost keep the order they were given in
+        return sorted(heuristics, key=lambda h: h.estimated_cost())
+
     def scan(self) -> list[HeuristicRunResult]:
+        heuristics = self.plan()
+        token = fan_out_concurrency.set(self.concurrency)
+        try:
+            with instrumentation.collect(self.request_stats):
+                if any(has_async_variant(h) for h in heuristics):
+                    results = asyncio.run(self._scan_async(heuristics))
+                else:
+                    results = []
+                    for wave in self._waves(heuristics):
+                        results.extend(self._run_wave(wave, results))
+        finally:
+            fan_out_concurrency.reset(token)
+        logger.info("Scan of %s completed: %s", self.target_spec, self.github_client.stats)
+        if self.github_client.verdict_store is not None:
+            logger.info("Reused %d user heuristic verdicts from previous scans so far",
+                        self.github_client.verdict_store.hits)
+        return results
+
+    async def _scan_async(self, heuristics: list[MetadataHeuristic]) -> list[HeuristicRunResult]:
+        # Heuristics with an asynchronous variant share a single pooled HTTP session, the other ones run in threads
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(heuristic: MetadataHeuristic) -> HeuristicRunResult:
+            async with semaphore:
+                return await self._run_heuristic_async(heuristic, async_client)
+
         results = []
-        for heuristic in self.heuristics:
-            if heuristic.target_type() != self.target_spec.target_type:
-                continue
-
-            logger.debug("Running heuristic %s on %s", heuristic.id(), self.target_spec)
-            result = heuristic.run(self.github_client, self.target_spec)
-            result.heuristic = heuristic
-            results.append(result)
+        async with AsyncGitHubClient.for_client(self.github_client) as async_client:
+            for wave in self._waves(heuristics):
+                to_run, skipped = self._apply_stop_policy(wave, results)
+                ran = dict(zip(to_run, await asyncio.gather(*(run(heuristic) for heuristic in to_run))))
+                results.extend(ran[h] if h in ran else skipped[h] for h in wave)
         return results
+
+    def _waves(self, heuristics: list[MetadataHeuristic]) -> list[list[MetadataHeuristic]]:
+        """
+        Split the heuristics into groups that run in parallel, the stop policy being applied between groups.
+        """
+        if not self.stop_policy.is_active():
+            return [heuristics] if heuristics else []
+
+        waves = []
+        for heuristic in heuristics:
+            # Cheap and expensive heuristics never run in the same group, so that expensive ones can be skipped based
+            # on the outcome of all the cheap ones
+            crosses_threshold = waves and self.stop_policy.is_expensive(heuristic) and \
+                not self.stop_policy.is_expensive(waves[-1][-1])
+            if not waves or len(waves[-1]) >= self.concurrency or crosses_threshold:
+                waves.append([])
+            waves[-1].append(heuristic)
+        return waves
+
+    def _apply_stop_policy(self, wave: list[MetadataHeuristic], results: list[HeuristicRunResult]) \
+            -> tuple[list[MetadataHeuristic], dict[MetadataHeuristic, HeuristicRunResult]]:
+        to_run = []
+        skipped = {}
+        for heuristic in wave:
+            reason = self.stop_policy.reason_to_skip(heuristic, results)
+            if reason is None:
+                to_run.append(heuristic)
+            else:
+                logger.info("Skipping heuristic %s on %s: %s", heuristic.id(), self.target_spec, reason)
+                skipped[heuristic] = HeuristicRunResult.SKIPPED(additional_details=reason)
+                skipped[heuristic].heuristic = heuristic
+        return to_run, skipped
+
+    def _run_wave(self, wave: list[MetadataHeuristic], results: list[HeuristicRunResult]) -> list[HeuristicRunResult]:
+        to_run, skipped = self._apply_stop_policy(wave, results)
+        if self.concurrency > 1 and len(to_run) > 1:
+            # Heuristics are I/O-bound and independent, so they can run in parallel.
+            with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='heuristic') as executor:
+                # Each heuristic runs with a copy of the current context, so that its requests are attributed to it
+                futures = [executor.submit(instrumentation.in_current_context(self._run_heuristic), heuristic)
+                           for heuristic in to_run]
+                ran = {heuristic: future.result() for heuristic, future in zip(to_run, futures)}
+        else:
+            ran = {heuristic: self._run_heuristic(heuristic) for heuristic in to_run}
+        return [ran[h] if h in ran else skipped[h] for h in wave]
+
+    def _run_heuristic(self, heuristic: MetadataHeuristic) -> HeuristicRunResult:
+        logger.debug("Running heuristic %s on %s", heuristic.id(), self.target_spec)
+        try:
+            result = heuristic.evaluate(self.github_client, self.target_spec)
+        except Exception as e:
+            result = self._errored(heuristic, e)
+        result.heuristic = heuristic
+        return result
+
+    async def _run_heuristic_async(self, heuristic: MetadataHeuristic,
+                                   async_client: AsyncGitHubClient) -> HeuristicRunResult:
+        logger.debug("Running heuristic %s on %s", heuristic.id(), self.target_spec)
+        try:
+            result = await heuristic.evaluate_async(self.github_client, self.target_spec, async_client)
+        except Exception as e:
+            result = self._errored(heuristic, e)
+        result.heuristic = heuristic
+        return result
+
+    def _errored(self, heuristic: MetadataHeuristic, e: Exception) -> HeuristicRunResult:
+        # A single failing heuristic should not prevent us from reporting the results of the other ones
+        logger.error("Heuristic %s failed on %s: %s", heuristic.id(), self.target_spec, e,
+                     exc_info=logger.isEnabledFor(logging.DEBUG))
+        return HeuristicRunResult.ERRORED(additional_details=f"{type(e).__name__}: {e}")
@@ -0,0 +1,117 @@
+import dataclasses
+import logging
+from typing import Iterable
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+
+from .store import Edge, GraphStore, STARS
+
+logger = logging.getLogger(__name__)
+
+# Two users are linked when they starred at least MIN_SHARED_STARS of the same repositories, and their sets of starred
+# repositories are similar enough (Jaccard similarity)
+DEFAULT_MIN_SHARED_STARS = 3
+DEFAULT_MIN_SIMILARITY = 0.5
+DEFAULT_MIN_CLUSTER_SIZE = 5
+# Repositories starred by most users of a cluster are reported along with it
+CLUSTER_REPO_SHARE = 0.5
+
+
+@dataclasses.dataclass
+class StarCluster:
+    users: list[str]
+    # Repositories starred by most users of the cluster, most starred first
+    repos: list[str]
+    # Share of the pairs of users of the cluster who are linked
+    density: float
+    # Average Jaccard similarity of the linked pairs
+    mean_similarity: float
+
+    @property
+    def score(self) -> float:
+        return self.density * self.mean_similarity
+
+    def to_json(self) -> dict:
+        return {'score': round(self.score, 3), 'density': round(self.density, 3),
+                'mean_similarity': round(self.mean_similarity, 3), 'users': self.users, 'repos': self.repos}
+
+
+class StarMatrix:
+    """
+    Sparse user x repository matrix of stars, built from crawled stargazer edges.
+    """
+
+    def __init__(self, edges: Iterable[Edge]):
+        user_index: dict[str, int] = {}
+        repo_index: dict[str, int] = {}
+        rows, columns = [], []
+        for edge in edges:
+            rows.append(user_index.setdefault(edge.source, len(user_index)))
+            columns.append(repo_index.setdefault(edge.target, len(repo_index)))
+        self.users = np.array(list(user_index), dtype=object)
+        self.repos = np.array(list(repo_index), dtype=object)
+        matrix = sp.csr_matrix((np.ones(len(rows), dtype=np.int32), (rows, columns)),
+                               shape=(len(user_index), len(repo_index)))
+        # Duplicate edges are summed, a user stars a repository at most once
+        matrix.data[:] = 1
+        self.matrix = matrix
+
+    @staticmethod
+    def from_store(store: GraphStore) -> 'StarMatrix':
+        return StarMatrix(store.iter_edges(STARS))
+
+
+def find_star_clusters(star_matrix: StarMatrix, min_shared_stars: int = DEFAULT_MIN_SHARED_STARS,
+                       min_similarity: float = DEFAULT_MIN_SIMILARITY,
+                       min_cluster_size: int = DEFAULT_MIN_CLUSTER_SIZE) -> list[StarCluster]:
+    """
+    Find groups of users who starred the same sets of repositories, best scored first. The user x user co-starring
+    counts are computed with a sparse matrix product, and clusters are the connected components of the users linked by
+    similar stars.
+    """
+    # Users who starred fewer repositories than required to be linked can't be part of a cluster
+    matrix = star_matrix.matrix
+    stars_per_user = np.asarray(matrix.sum(axis=1)).ravel()
+    candidates = np.flatnonzero(stars_per_user >= min_shared_stars)
+    if len(candidates) == 0:
+        return []
+    matrix = matrix[candidates]
+    stars_per_user = stars_per_user[candidates]
+
+    co_stars = sp.triu(matrix @ matrix.T, k=1).tocoo()
+    shared = co_stars.data
+    similarity = shared / (stars_per_user[co_stars.row] + stars_per_user[co_stars.col] - shared)
+    linked = (shared >= min_shared_stars) & (similarity >= min_similarity)
+    rows, columns, similarity = co_stars.row[linked], co_stars.col[linked], similarity[linked]
+    logger.debug("%d users starred %d repositories, %d pairs of users are linked", matrix.shape[0], matrix.shape[1],
+                 len(rows))
+
+    links = sp.coo_matrix((similarity, (rows, columns)), shape=(matrix.shape[0], matrix.shape[0])).tocsr()
+    component_count, labels = connected_components(links, directed=False)
+    sizes = np.bincount(labels, minlength=component_count)
+    # Links grouped by the component they belong to, to score each cluster without looping over them
+    link_components = labels[rows]
+    link_counts = np.bincount(link_components, minlength=component_count)
+    similarity_sums = np.bincount(link_components, weights=similarity, minlength=component_count)
+
+    # Users sorted by component, so that the members of each cluster are a slice
+    users_by_component = np.argsort(labels, kind='stable')
+    offsets = np.concatenate(([0], np.cumsum(sizes)))
+    clusters = []
+    for component in np.flatnonzero(sizes >= min_cluster_size):
+        members = users_by_component[offsets[component]:offsets[component + 1]]
+        size = len(members)
+        repo_counts = np.asarray(matrix[members].sum(axis=0)).ravel()
+        shared_repos = np.flatnonzero(repo_counts >= CLUSTER_REPO_SHARE * size)
+        shared_repos = shared_repos[np.argsort(-repo_counts[shared_repos], kind='stable')]
+        clusters.append(StarCluster(
+            users=sorted(star_matrix.users[candidates[members]].tolist()),
+            repos=star_matrix.repos[shared_repos].tolist(),
+            density=float(link_counts[component] / (size * (size - 1) / 2)),
+            mean_similarity=float(similarity_sums[component] / link_counts[component]),
+        ))
+    clusters.sort(key=lambda cluster: (-cluster.score, -len(cluster.users)))
+    logger.info("Found %d clusters of users starring the same repositories", len(clusters))
+    return clusters
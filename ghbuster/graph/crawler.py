@@ -0,0 +1,209 @@
+import dataclasses
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any
+
+import github
+
+from .store import GraphStore, Node, Edge, USER, REPOSITORY, OWNS, STARS, FORKS, FORK_OF
+from .. import TargetSpec, TargetType
+from ..service.github_entity_store import GitHubEntityStore
+from ..service.graphql_profiles import PAGE_SIZE, execute_graphql_with_errors
+from ..service.repository_status import BLOCKED_MESSAGE, RepositoryStatus
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_DEPTH = 4
+DEFAULT_MAX_NODES = 10_000
+DEFAULT_CONCURRENCY = 4
+DEFAULT_MAX_STARGAZERS_PER_REPO = 1000
+DEFAULT_MAX_FORKS_PER_REPO = 1000
+DEFAULT_MAX_REPOS_PER_USER = 100
+
+REPOSITORY_QUERY = """
+query($owner: String!, $name: String!, $first: Int!, $after: String) {
+  repository(owner: $owner, name: $name) {
+    owner { login }
+    parent { nameWithOwner }
+    forks(first: $first, after: $after) {
+      pageInfo { hasNextPage endCursor }
+      nodes { nameWithOwner owner { login } }
+    }
+  }
+}
+"""
+
+STARGAZERS_QUERY = """
+query($owner: String!, $name: String!, $first: Int!, $after: String) {
+  repository(owner: $owner, name: $name) {
+    stargazers(first: $first, after: $after) {
+      pageInfo { hasNextPage endCursor }
+      edges { starredAt node { login } }
+    }
+  }
+}
+"""
+
+USER_REPOSITORIES_QUERY = """
+query($login: String!, $first: Int!, $after: String) {
+  repositoryOwner(login: $login) {
+    repositories(first: $first, after: $after, ownerAffiliations: OWNER) {
+      pageInfo { hasNextPage endCursor }
+      nodes { nameWithOwner }
+    }
+  }
+}
+"""
+
+
+@dataclasses.dataclass
+class Expansion:
+    status: str
+    nodes: list[Node] = dataclasses.field(default_factory=list)
+    edges: list[Edge] = dataclasses.field(default_factory=list)
+
+
+@dataclasses.dataclass
+class CrawlStats:
+    expanded: int = 0
+    failed: int = 0
+    discovered: int = 0
+
+    def __str__(self):
+        return f"{self.expanded} nodes expanded, {self.discovered} discovered, {self.failed} failed"
+
+
+class GraphCrawler:
+    """
+    Breadth-first crawl of the repositories and users around seed targets: the stargazers and forks of repositories,
+    the repositories of users, and the parents of forks. The frontier and the crawled graph are kept in a GraphStore,
+    so that memory stays bounded and an interrupted crawl resumes where it stopped when run again on the same store.
+    Nodes are expanded concurrently, within depth and node budgets.
+    """
+
+    def __init__(self, github_client: github.Github | GitHubEntityStore, store: GraphStore,
+                 max_depth: int = DEFAULT_MAX_DEPTH, max_nodes: int = DEFAULT_MAX_NODES,
+                 concurrency: int = DEFAULT_CONCURRENCY, max_stargazers_per_repo: int = DEFAULT_MAX_STARGAZERS_PER_REPO,
+                 max_forks_per_repo: int = DEFAULT_MAX_FORKS_PER_REPO,
+                 max_repos_per_user: int = DEFAULT_MAX_REPOS_PER_USER):
+        self.github_client = github_client
+        self.store = store
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        self.concurrency = concurrency
+        self.max_stargazers_per_repo = max_stargazers_per_repo
+        self.max_forks_per_repo = max_forks_per_repo
+        self.max_repos_per_user = max_repos_per_user
+
+    def crawl(self, targets: list[TargetSpec]) -> CrawlStats:
+        resumed = self.store.reset_unfinished()
+        if resumed:
+            logger.info("Resuming crawl, %d nodes were interrupted", resumed)
+        self.store.add_nodes([_target_node(target) for target in targets])
+
+        stats = CrawlStats()
+        in_flight = {}
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='crawl') as executor:
+            while True:
+                # Only a few nodes of the frontier are held in memory at a time
+                if len(in_flight) < 2 * self.concurrency:
+                    for node in self.store.claim_pending(2 * self.concurrency - len(in_flight), self.max_depth):
+                        in_flight[executor.submit(self._expand, node)] = node
+                if not in_flight:
+                    break
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self._record(in_flight.pop(future), future, stats)
+
+        logger.info("Crawl finished: %s. The graph has %d nodes and %d edges", stats, self.store.count_nodes(),
+                    self.store.count_edges())
+        return stats
+
+    def _record(self, node: Node, future, stats: CrawlStats):
+        try:
+            expansion = future.result()
+        except github.GithubException as e:
+            logger.warning("Failed to expand %s %s, it will be retried when resuming the crawl: %s", node.kind,
+                           node.name, e)
+            self.store.fail(node)
+            stats.failed += 1
+            return
+        stats.expanded += 1
+        stats.discovered += self.store.complete(node, expansion.status, expansion.nodes, expansion.edges,
+                                                max_nodes=self.max_nodes)
+        logger.debug("Expanded %s %s at depth %d: %d nodes, %d edges", node.kind, node.name, node.depth,
+                     len(expansion.nodes), len(expansion.edges))
+
+    def _expand(self, node: Node) -> Expansion:
+        if node.kind == REPOSITORY:
+            return self._expand_repository(node)
+        return self._expand_user(node)
+
+    def _expand_repository(self, node: Node) -> Expansion:
+        owner, name = node.name.split('/', 1)
+        depth = node.depth + 1
+        variables = {'owner': owner, 'name': name}
+        repository, forks, status = self._paginate(REPOSITORY_QUERY, variables, 'repository', 'forks',
+                                                   self.max_forks_per_repo)
+        if repository is None:
+            return Expansion(status)
+        _, stargazers, status = self._paginate(STARGAZERS_QUERY, variables, 'repository', 'stargazers',
+                                               self.max_stargazers_per_repo)
+
+        expansion = Expansion(status)
+        owner_login = repository['owner']['login']
+        expansion.nodes.append(Node(USER, owner_login, depth))
+        expansion.edges.append(Edge(USER, owner_login, OWNS, REPOSITORY, node.name))
+        if repository['parent']:
+            parent = repository['parent']['nameWithOwner']
+            expansion.nodes.append(Node(REPOSITORY, parent, depth))
+            expansion.edges.append(Edge(REPOSITORY, node.name, FORK_OF, REPOSITORY, parent))
+        for stargazer in stargazers:
+            login = stargazer['node']['login']
+            expansion.nodes.append(Node(USER, login, depth))
+            expansion.edges.append(Edge(USER, login, STARS, REPOSITORY, node.name, created_at=stargazer['starredAt']))
+        for fork in forks:
+            login = fork['owner']['login']
+            expansion.nodes.append(Node(USER, login, depth))
+            expansion.edges.append(Edge(USER, login, FORKS, REPOSITORY, node.name))
+        return expansion
+
+    def _expand_user(self, node: Node) -> Expansion:
+        _, repositories, status = self._paginate(USER_REPOSITORIES_QUERY, {'login': node.name}, 'repositoryOwner',
+                                                 'repositories', self.max_repos_per_user)
+        expansion = Expansion(status)
+        for repository in repositories:
+            full_name = repository['nameWithOwner']
+            expansion.nodes.append(Node(REPOSITORY, full_name, node.depth + 1))
+            expansion.edges.append(Edge(USER, node.name, OWNS, REPOSITORY, full_name))
+        return expansion
+
+    def _paginate(self, query: str, variables: dict[str, Any], entity_name: str, connection_name: str,
+                  max_count: int) -> tuple[dict[str, Any] | None, list[dict[str, Any]], str]:
+        """
+        Retrieve up to max_count items of a connection. Returns the entity holding the connection as of the first
+        page (None if it isn't available), the items, and the status of the entity.
+        """
+        entity, items, after = None, [], None
+        while True:
+            data, errors = execute_graphql_with_errors(
+                self.github_client, query, {**variables, 'first': min(PAGE_SIZE, max_count - len(items)),
+                                            'after': after}, tolerated_error_types=('NOT_FOUND', 'FORBIDDEN'))
+            page = data[entity_name]
+            if page is None:
+                # e.g. a repository taken down since it was discovered, or blocked for ToS violations
+                blocked = any(e.get('type') == 'FORBIDDEN' or e.get('message') == BLOCKED_MESSAGE for e in errors)
+                status = RepositoryStatus.BLOCKED if blocked else RepositoryStatus.TAKEN_DOWN
+                return None, [], status.value
+            entity = entity or page
+            connection = page[connection_name]
+            items.extend(connection['edges'] if 'edges' in connection else connection['nodes'])
+            if not connection['pageInfo']['hasNextPage'] or len(items) >= max_count:
+                return entity, items, RepositoryStatus.AVAILABLE.value
+            after = connection['pageInfo']['endCursor']
+
+
+def _target_node(target: TargetSpec) -> Node:
+    if target.target_type == TargetType.REPOSITORY:
+        return Node(REPOSITORY, target.repo_full_name())
+    return Node(USER, target.username)
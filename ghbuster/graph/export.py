@@ -0,0 +1,221 @@
+import logging
+import os
+import sys
+from typing import TextIO
+from xml.sax.saxutils import escape, quoteattr
+
+import networkx as nx
+import numpy as np
+import scipy.sparse as sp
+
+from .clusters import StarMatrix, find_star_clusters
+from .store import GraphStore, REPOSITORY, USER
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ['graphml', 'gexf', 'edgelist', 'html']
+SAMPLING_METHODS = ['k-core', 'top-degree', 'clusters']
+DEFAULT_SAMPLING_METHOD = 'k-core'
+# Interactive views become unusable beyond a few thousand nodes
+DEFAULT_MAX_HTML_NODES = 1000
+# Users kept per cluster when sampling cluster representatives
+USERS_PER_CLUSTER = 10
+
+
+def node_id(kind: str, name: str) -> str:
+    return f"{kind}:{name}"
+
+
+def write_edge_list(store: GraphStore, output: TextIO) -> int:
+    """
+    Write the edges of the graph as tab-separated values: source, edge type, target and date (e.g. of a star).
+    """
+    count = 0
+    output.write("source\ttype\ttarget\tcreated_at\n")
+    for edge in store.iter_edges():
+        output.write(f"{node_id(edge.source_kind, edge.source)}\t{edge.type}\t"
+                     f"{node_id(edge.target_kind, edge.target)}\t{edge.created_at or ''}\n")
+        count += 1
+    return count
+
+
+def write_graphml(store: GraphStore, output: TextIO) -> int:
+    """
+    Write the graph in the GraphML format, streaming nodes and edges from the store.
+    """
+    output.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                 '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+                 '  <key id="kind" for="node" attr.name="kind" attr.type="string"/>\n'
+                 '  <key id="name" for="node" attr.name="name" attr.type="string"/>\n'
+                 '  <key id="depth" for="node" attr.name="depth" attr.type="int"/>\n'
+                 '  <key id="status" for="node" attr.name="status" attr.type="string"/>\n'
+                 '  <key id="type" for="edge" attr.name="type" attr.type="string"/>\n'
+                 '  <key id="created_at" for="edge" attr.name="created_at" attr.type="string"/>\n'
+                 '  <graph edgedefault="directed">\n')
+    for node in store.iter_nodes():
+        output.write(f'    <node id={quoteattr(node_id(node.kind, node.name))}>'
+                     f'<data key="kind">{node.kind}</data><data key="name">{escape(node.name)}</data>'
+                     f'<data key="depth">{node.depth}</data><data key="status">{escape(node.status or "")}</data>'
+                     f'</node>\n')
+    count = 0
+    for edge in store.iter_edges():
+        output.write(f'    <edge source={quoteattr(node_id(edge.source_kind, edge.source))} '
+                     f'target={quoteattr(node_id(edge.target_kind, edge.target))}>'
+                     f'<data key="type">{edge.type}</data>'
+                     f'<data key="created_at">{escape(edge.created_at or "")}</data></edge>\n')
+        count += 1
+    output.write('  </graph>\n</graphml>\n')
+    return count
+
+
+def write_gexf(store: GraphStore, output: TextIO) -> int:
+    """
+    Write the graph in the GEXF format (e.g. for Gephi), streaming nodes and edges from the store.
+    """
+    output.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                 '<gexf xmlns="http://gexf.net/1.3" version="1.3">\n'
+                 '  <graph defaultedgetype="directed">\n'
+                 '    <attributes class="node">\n'
+                 '      <attribute id="kind" title="kind" type="string"/>\n'
+                 '      <attribute id="depth" title="depth" type="integer"/>\n'
+                 '      <attribute id="status" title="status" type="string"/>\n'
+                 '    </attributes>\n'
+                 '    <attributes class="edge">\n'
+                 '      <attribute id="created_at" title="created_at" type="string"/>\n'
+                 '    </attributes>\n'
+                 '    <nodes>\n')
+    for node in store.iter_nodes():
+        output.write(f'      <node id={quoteattr(node_id(node.kind, node.name))} label={quoteattr(node.name)}>'
+                     f'<attvalues><attvalue for="kind" value="{node.kind}"/>'
+                     f'<attvalue for="depth" value="{node.depth}"/>'
+                     f'<attvalue for="status" value={quoteattr(node.status or "")}/></attvalues></node>\n')
+    output.write('    </nodes>\n    <edges>\n')
+    count = 0
+    for edge in store.iter_edges():
+        output.write(f'      <edge id="{count}" source={quoteattr(node_id(edge.source_kind, edge.source))} '
+                     f'target={quoteattr(node_id(edge.target_kind, edge.target))} label="{edge.type}">'
+                     f'<attvalues><attvalue for="created_at" value={quoteattr(edge.created_at or "")}/></attvalues>'
+                     f'</edge>\n')
+        count += 1
+    output.write('    </edges>\n  </graph>\n</gexf>\n')
+    return count
+
+
+def sample_graph(store: GraphStore, max_nodes: int, method: str = DEFAULT_SAMPLING_METHOD) -> nx.Graph:
+    """
+    Reduce the graph to at most max_nodes nodes, keeping the crawl targets:
+    - k-core: the densest core of the graph, i.e. the largest k such that the k-core fits
+    - top-degree: the most connected nodes
+    - clusters: a few users of each co-starring cluster along with the repositories they starred, completed with the
+      most connected nodes
+    """
+    nodes = {node_id(node.kind, node.name): node for node in store.iter_nodes()}
+    ids = list(nodes)
+    index = {identifier: i for i, identifier in enumerate(ids)}
+    sources, targets = [], []
+    for edge in store.iter_edges():
+        sources.append(index[node_id(edge.source_kind, edge.source)])
+        targets.append(index[node_id(edge.target_kind, edge.target)])
+    adjacency = sp.coo_matrix((np.ones(len(sources), dtype=np.int32), (sources, targets)),
+                              shape=(len(ids), len(ids))).tocsr()
+    adjacency = ((adjacency + adjacency.T) > 0).astype(np.int32)
+    degrees = np.asarray(adjacency.sum(axis=1)).ravel()
+
+    targets_mask = np.array([node.depth == 0 for node in nodes.values()], dtype=bool)
+    if method == 'k-core':
+        # Crawl targets are always kept, they may use up the whole budget
+        keep = _densest_core(adjacency, max(max_nodes - int(targets_mask.sum()), 0))
+    elif method == 'clusters':
+        keep = np.zeros(len(ids), dtype=bool)
+        for cluster in find_star_clusters(StarMatrix.from_store(store)):
+            for user in cluster.users[:USERS_PER_CLUSTER]:
+                keep[index[node_id(USER, user)]] = True
+            for repo in cluster.repos:
+                keep[index[node_id(REPOSITORY, repo)]] = True
+    elif method == 'top-degree':
+        keep = np.zeros(len(ids), dtype=bool)
+    else:
+        raise ValueError(f"Unknown sampling method {method}, expected one of {', '.join(SAMPLING_METHODS)}")
+
+    keep |= targets_mask
+    # Fill the remaining budget with the most connected nodes, or trim the sample down to the budget
+    by_degree = np.argsort(-degrees, kind='stable')
+    kept = [i for i in by_degree if keep[i]][:max_nodes]
+    remaining = max_nodes - len(kept)
+    if remaining > 0 and method != 'k-core':
+        kept += [i for i in by_degree if not keep[i]][:remaining]
+    kept_mask = np.zeros(len(ids), dtype=bool)
+    kept_mask[kept] = True
+
+    graph = nx.Graph()
+    for i in kept:
+        node = nodes[ids[i]]
+        graph.add_node(ids[i], label=node.name, type=node.kind, depth=node.depth, status=node.status or '')
+    for edge in store.iter_edges():
+        source, target = node_id(edge.source_kind, edge.source), node_id(edge.target_kind, edge.target)
+        if kept_mask[index[source]] and kept_mask[index[target]]:
+            graph.add_edge(source, target, type=edge.type)
+    logger.info("Sampled %d nodes and %d edges out of %d nodes (%s)", graph.number_of_nodes(),
+                graph.number_of_edges(), len(ids), method)
+    return graph
+
+
+def is_headless() -> bool:
+    """
+    Whether no browser can be opened, e.g. on a server or in CI.
+    """
+    if os.environ.get('CI'):
+        return True
+    if sys.platform.startswith('linux'):
+        return not (os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'))
+    return False
+
+
+def write_html(graph: nx.Graph, path: str, open_browser: bool = False):
+    """
+    Render a (sampled) graph as an interactive HTML page. The browser is only opened when requested, and never in
+    headless environments.
+    """
+    from pyvis.network import Network
+
+    # Inline the JavaScript dependencies rather than copying them next to the current directory
+    nt = Network('1000px', '100%', cdn_resources='in_line')
+    nt.from_nx(graph)
+    for edge in nt.edges:
+        if 'type' in edge:
+            edge['label'] = edge['type']
+    nt.show_buttons()
+    open_browser = open_browser and not is_headless()
+    nt.write_html(path, open_browser=open_browser)
+    logger.info("Wrote the graph to %s", path)
+
+
+def export(store: GraphStore, output_format: str, path: str, sampling_method: str = DEFAULT_SAMPLING_METHOD,
+           max_nodes: int = DEFAULT_MAX_HTML_NODES, open_browser: bool = False):
+    if output_format == 'html':
+        write_html(sample_graph(store, max_nodes, sampling_method), path, open_browser=open_browser)
+        return
+
+    writers = {'graphml': write_graphml, 'gexf': write_gexf, 'edgelist': write_edge_list}
+    with open(path, 'w', encoding='utf-8') as f:
+        count = writers[output_format](store, f)
+    logger.info("Wrote %d edges to %s", count, path)
+
+
+def _densest_core(adjacency: sp.csr_matrix, max_nodes: int) -> np.ndarray:
+    """
+    Return the mask of the nodes of the k-core with the smallest k such that it holds at most max_nodes nodes.
+    """
+    alive = np.ones(adjacency.shape[0], dtype=bool)
+    k = 1
+    while alive.any() and alive.sum() > max_nodes:
+        k += 1
+        # Peel nodes with fewer than k neighbors in the core, until none is left
+        while True:
+            degrees = adjacency @ alive.astype(np.int32)
+            peeled = alive & (degrees < k)
+            if not peeled.any():
+                break
+            alive &= ~peeled
+    logger.debug("Keeping the %d-core of the graph, %d nodes", k, alive.sum())
+    return alive
@@ -0,0 +1,188 @@
+import dataclasses
+import sqlite3
+import threading
+import time
+from typing import Iterator
+
+DEFAULT_PATH = 'ghbuster_graph.sqlite'
+
+USER = 'user'
+REPOSITORY = 'repo'
+
+# Edge types, from a user or repository to a repository
+OWNS = 'owns'
+STARS = 'stars'
+FORKS = 'forks'
+FORK_OF = 'fork_of'
+
+# Crawl state of a node. Nodes stay pending when they are deeper than the crawl allows, so that a later crawl with a
+# higher depth budget expands them
+PENDING = 'pending'
+IN_PROGRESS = 'in_progress'
+DONE = 'done'
+FAILED = 'failed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS nodes (
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    depth INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    status TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (kind, name)
+);
+CREATE INDEX IF NOT EXISTS nodes_frontier ON nodes (state, depth);
+CREATE TABLE IF NOT EXISTS edges (
+    source_kind TEXT NOT NULL,
+    source TEXT NOT NULL,
+    type TEXT NOT NULL,
+    target_kind TEXT NOT NULL,
+    target TEXT NOT NULL,
+    created_at TEXT,
+    PRIMARY KEY (source_kind, source, type, target_kind, target)
+);
+CREATE INDEX IF NOT EXISTS edges_target ON edges (target_kind, target, type);
+"""
+
+
+@dataclasses.dataclass(frozen=True)
+class Node:
+    kind: str
+    name: str
+    depth: int = 0
+    state: str = PENDING
+    # Whether the user or repository is still available, once crawled, e.g. 'available', 'taken_down' or 'blocked'
+    status: str | None = None
+
+
+@dataclasses.dataclass(frozen=True)
+class Edge:
+    source_kind: str
+    source: str
+    type: str
+    target_kind: str
+    target: str
+    # e.g. when a repository was starred
+    created_at: str | None = None
+
+
+class GraphStore:
+    """
+    Persistent store of the users and repositories discovered by a crawl and of the edges between them. Nodes that
+    weren't expanded yet make up the crawl frontier: it lives on disk, de-duplicated by node, so that it can grow
+    beyond memory and an interrupted crawl resumes where it stopped. Names are stored lowercase.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def add_nodes(self, nodes: list[Node], max_nodes: int | None = None) -> int:
+        """
+        Add new nodes to the frontier, up to a total of max_nodes. Returns the number of nodes added.
+        """
+        with self._lock, self._connection:
+            return self._add_nodes(nodes, max_nodes)
+
+    def claim_pending(self, limit: int, max_depth: int | None = None) -> list[Node]:
+        """
+        Take up to limit nodes from the frontier, shallowest first, marking them as in progress.
+        """
+        query = "SELECT kind, name, depth, state, status FROM nodes WHERE state = ?"
+        params: list = [PENDING]
+        if max_depth is not None:
+            query += " AND depth <= ?"
+            params.append(max_depth)
+        with self._lock, self._connection:
+            nodes = [Node(*row) for row in
+                     self._connection.execute(query + " ORDER BY depth LIMIT ?", (*params, limit)).fetchall()]
+            self._connection.executemany("UPDATE nodes SET state = ?, updated_at = ? WHERE kind = ? AND name = ?",
+                                         [(IN_PROGRESS, time.time(), node.kind, node.name) for node in nodes])
+        return [dataclasses.replace(node, state=IN_PROGRESS) for node in nodes]
+
+    def complete(self, node: Node, status: str | None, discovered: list[Node], edges: list[Edge],
+                 max_nodes: int | None = None) -> int:
+        """
+        Record the expansion of a node: its status, the nodes it led to (up to a total of max_nodes) and its edges.
+        Edges to nodes left out by the budget are dropped. Everything is committed at once, which checkpoints the
+        crawl. Returns the number of new nodes.
+        """
+        with self._lock, self._connection:
+            added = self._add_nodes(discovered, max_nodes)
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO edges (source_kind, source, type, target_kind, target, created_at) "
+                "SELECT ?, ?, ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM nodes WHERE kind = ? AND name = ?) "
+                "AND EXISTS (SELECT 1 FROM nodes WHERE kind = ? AND name = ?)",
+                [(edge.source_kind, edge.source.lower(), edge.type, edge.target_kind, edge.target.lower(),
+                  edge.created_at, edge.source_kind, edge.source.lower(), edge.target_kind, edge.target.lower())
+                 for edge in edges])
+            self._connection.execute(
+                "UPDATE nodes SET state = ?, status = ?, updated_at = ? WHERE kind = ? AND name = ?",
+                (DONE, status, time.time(), node.kind, node.name))
+        return added
+
+    def fail(self, node: Node):
+        with self._lock, self._connection:
+            self._connection.execute("UPDATE nodes SET state = ?, updated_at = ? WHERE kind = ? AND name = ?",
+                                     (FAILED, time.time(), node.kind, node.name))
+
+    def reset_unfinished(self) -> int:
+        """
+        Put nodes whose expansion was interrupted or failed back in the frontier, e.g. when resuming a crawl.
+        """
+        with self._lock, self._connection:
+            return self._connection.execute("UPDATE nodes SET state = ? WHERE state IN (?, ?)",
+                                            (PENDING, IN_PROGRESS, FAILED)).rowcount
+
+    def count_nodes(self, state: str | None = None) -> int:
+        with self._lock:
+            if state is None:
+                return self._connection.execute("SELECT COUNT(*) FROM nodes").fetchone()[0]
+            return self._connection.execute("SELECT COUNT(*) FROM nodes WHERE state = ?", (state,)).fetchone()[0]
+
+    def count_edges(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM edges").fetchone()[0]
+
+    def iter_nodes(self, kind: str | None = None) -> Iterator[Node]:
+        query = "SELECT kind, name, depth, state, status FROM nodes"
+        yield from (Node(*row) for row in self._iter_rows(query, kind))
+
+    def iter_edges(self, edge_type: str | None = None) -> Iterator[Edge]:
+        query = "SELECT source_kind, source, type, target_kind, target, created_at FROM edges"
+        yield from (Edge(*row) for row in self._iter_rows(query, edge_type, column='type'))
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def _add_nodes(self, nodes: list[Node], max_nodes: int | None) -> int:
+        count = self._connection.execute("SELECT COUNT(*) FROM nodes").fetchone()[0]
+        added = 0
+        now = time.time()
+        for node in nodes:
+            if max_nodes is not None and count >= max_nodes:
+                break
+            inserted = self._connection.execute(
+                "INSERT OR IGNORE INTO nodes (kind, name, depth, state, status, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (node.kind, node.name.lower(), node.depth, PENDING, None, now)).rowcount
+            count += inserted
+            added += inserted
+        return added
+
+    def _iter_rows(self, query: str, value: str | None, column: str = 'kind', batch_size: int = 10_000) -> Iterator:
+        # Rows are read in batches, so that large graphs are streamed rather than loaded at once
+        params = ()
+        if value is not None:
+            query += f" WHERE {column} = ?"
+            params = (value,)
+        with self._lock:
+            cursor = self._connection.execute(query, params)
+            rows = cursor.fetchmany(batch_size)
+        while rows:
+            yield from rows
+            with self._lock:
+                rows = cursor.fetchmany(batch_size)
@@ -1,4 +1,5 @@
 from .repo_commits_only_from_suspicious_unlinked_emails import *
+from .repo_has_star_burst import *
 from .repo_has_stargazzers_who_joined_the_same_day import *
 from .repo_starred_by_suspicious_users import *
 from .user_has_only_commits_from_unlinked_emails import *
@@ -14,5 +15,6 @@ ALL_HEURISTICS = {
     RepoCommitsOnlyFromSuspiciousUnlinkedEmails(),
     UserHasForksFromTakenDownRepos(),
     UserHasOnlyForkedRepos(),
-    RepoHasStargazersWhoJoinedOnTheSameDay()
+    RepoHasStargazersWhoJoinedOnTheSameDay(),
+    RepoHasStarBurst()
 }
@@ -1,17 +1,42 @@
+import asyncio
+import contextvars
+import enum
+import inspect
 from abc import ABC, abstractmethod
 
 import github
 
 from .. import TargetType, TargetSpec
+from ..service import instrumentation
+from ..service.async_github import AsyncGitHubClient
+from ..service.github_entity_store import GitHubEntityStore
+
+
+# Number of requests a heuristic fanning out (e.g. over the stargazers of a repository) keeps in flight. Set by
+# GitHubScanner from its concurrency, so that --concurrency bounds these fan-outs as well
+fan_out_concurrency: contextvars.ContextVar[int | None] = contextvars.ContextVar('ghbuster_fan_out_concurrency',
+                                                                                default=None)
+
+
+class HeuristicInput(enum.Enum):
+    """
+    Data of a target a heuristic depends on, so that watch mode only runs it again when they changed.
+    """
+    PROFILE = "profile"
+    STARGAZERS = "stargazers"
+    FORKS = "forks"
+    COMMITS = "commits"
+    REPOSITORIES = "repositories"
 
 
 class HeuristicRunResult:
     def __init__(self, triggered: bool, additional_details: str = "", heuristic: 'MetadataHeuristic' = None,
-                 skipped: bool = False):
+                 skipped: bool = False, errored: bool = False):
         self.triggered = triggered
         self.additional_details = additional_details
         self.heuristic = heuristic
         self.skipped = skipped
+        self.errored = errored
 
     @staticmethod
     def TRIGGERED(additional_details: str = "") -> 'HeuristicRunResult':
@@ -22,11 +47,49 @@ class HeuristicRunResult:
         return HeuristicRunResult(triggered=False)
 
     @staticmethod
-    def SKIPPED() -> 'HeuristicRunResult':
-        return HeuristicRunResult(triggered=False, skipped=True)
+    def SKIPPED(additional_details: str = "") -> 'HeuristicRunResult':
+        return HeuristicRunResult(triggered=False, additional_details=additional_details, skipped=True)
+
+    @staticmethod
+    def ERRORED(additional_details: str = "") -> 'HeuristicRunResult':
+        return HeuristicRunResult(triggered=False, additional_details=additional_details, errored=True)
+
+
+def has_async_variant(heuristic: 'MetadataHeuristic') -> bool:
+    return inspect.iscoroutinefunction(getattr(type(heuristic), 'run_async', None))
 
 
 class MetadataHeuristic(ABC):
+    """
+    Heuristics with a high fan-out can additionally implement an asynchronous variant of run:
+
+        async def run_async(self, github_client, target_spec, async_client: AsyncGitHubClient) -> HeuristicRunResult
+
+    which GitHubScanner awaits instead of running run() in a thread.
+    """
+
+    def evaluate(self, github_client: github.Github, target_spec: TargetSpec) -> HeuristicRunResult:
+        """
+        Run the heuristic, reusing a previous verdict for this target when the client has a verdict store.
+        """
+        with instrumentation.heuristic_scope(self.id()):
+            if isinstance(github_client, GitHubEntityStore) and github_client.verdict_store is not None:
+                return github_client.verdict_store.run(self, github_client, target_spec)
+            return self.run(github_client, target_spec)
+
+    async def evaluate_async(self, github_client: github.Github, target_spec: TargetSpec,
+                             async_client: AsyncGitHubClient) -> HeuristicRunResult:
+        """
+        Same as evaluate, awaiting the asynchronous variant of the heuristic if it has one, and running it in a thread
+        otherwise.
+        """
+        if not has_async_variant(self):
+            return await asyncio.to_thread(self.evaluate, github_client, target_spec)
+        with instrumentation.heuristic_scope(self.id()):
+            if isinstance(github_client, GitHubEntityStore) and github_client.verdict_store is not None:
+                return await github_client.verdict_store.run_async(self, github_client, target_spec, async_client)
+            return await self.run_async(github_client, target_spec, async_client)
+
     @abstractmethod
     def run(self, github_client: github.Github, target_spec: TargetSpec) -> HeuristicRunResult:
         """
@@ -37,6 +100,21 @@ class MetadataHeuristic(ABC):
         """
         pass
 
+    def estimated_cost(self) -> int:
+        """
+        Return the estimated number of GitHub API requests needed to run the heuristic against a single target, used
+        to run cheap heuristics first.
+        """
+        return 1
+
+    def inputs(self) -> set[HeuristicInput]:
+        """
+        Return the data of the target the heuristic depends on, used by watch mode to only run it again when they
+        changed. Heuristics depending on anything else (e.g. the profiles of stargazers) are rerun by the periodic full
+        scans.
+        """
+        return set(HeuristicInput)
+
     @abstractmethod
     def target_type(self) -> TargetType:
         """
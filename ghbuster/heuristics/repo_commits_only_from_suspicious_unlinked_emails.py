@@ -1,7 +1,14 @@
+import asyncio
+from typing import Callable
+
 from github.NamedUser import NamedUser
 
+from .base import HeuristicInput
 from .user_has_forks_from_taken_down_repos import *
 from .user_has_low_community_activity import *
+from ..service.account_existence import AccountExistenceService
+from ..service.async_github import AsyncGitHubClient
+from ..service.commit_history import CommitHistory, CommitRecord
 
 logger = logging.getLogger(__name__)
 
@@ -20,51 +27,68 @@ class RepoCommitsOnlyFromSuspiciousUnlinkedEmails(MetadataHeuristic):
     def description(self) -> str:
         return "Detects when a repository has commits with unlinked emails that also don't match the owner's username or full name."
 
+    def estimated_cost(self) -> int:
+        # The repository owner, a page of commits and a batched check of the accounts of commit authors
+        return 4
+
     def target_type(self) -> TargetType:
         return TargetType.REPOSITORY
 
+    def inputs(self) -> set[HeuristicInput]:
+        return {HeuristicInput.COMMITS}
+
     def run(self, github_client: github.Github, target_spec: TargetSpec) -> HeuristicRunResult:
-        repo = github_client.get_repo(full_name_or_id=target_spec.repo_full_name())
+        user, commits = self._get_commits(github_client, target_spec)
+        # Commits can be linked to GitHub users that have been taken down since, all commit authors are checked at once
+        existing_authors = AccountExistenceService.for_client(github_client).users_exist(
+            commit.author_id for commit in commits if commit.author_id is not None)
+        return self._evaluate_commits(user, commits, lambda author_id: not existing_authors[author_id])
+
+    async def run_async(self, github_client: github.Github, target_spec: TargetSpec,
+                        async_client: AsyncGitHubClient) -> HeuristicRunResult:
+        # Commits may come from a local clone, only the check of their authors goes through the asynchronous client
+        user, commits = await asyncio.to_thread(self._get_commits, github_client, target_spec)
+        existing_authors = await AccountExistenceService.for_client(github_client).users_exist_async(
+            (commit.author_id for commit in commits if commit.author_id is not None), async_client)
+        return self._evaluate_commits(user, commits, lambda author_id: not existing_authors[author_id])
+
+    def _get_commits(self, github_client: github.Github,
+                     target_spec: TargetSpec) -> tuple[NamedUser, list[CommitRecord]]:
         user = github_client.get_user(login=target_spec.username)
+        commit_history = CommitHistory.for_client(github_client)
+        max_commits = commit_history.max_commits(self.MAX_COMMITS)
+        commits = list(commit_history.iter_commits(target_spec.repo_full_name(), all_branches=False,
+                                                   max_commits=max_commits))
+        logger.debug("Analyzing %d commits for repository %s", len(commits), target_spec.repo_full_name())
+        if len(commits) == max_commits:
+            logger.debug("Reached max commit limit of %d, stopping the processing", max_commits)
+        return user, commits
+
+    def _evaluate_commits(self, user: NamedUser, commits: list[CommitRecord],
+                          is_taken_down: Callable[[int], bool]) -> HeuristicRunResult:
+        if not commits:
+            # Empty repository, there is no commit to attribute
+            return HeuristicRunResult.PASSED()
+
         normalized_username = user.login.lower()
         normalized_user_full_name = user.name.lower() if user.name else None
-        commits = repo.get_commits()
-        logger.debug("Analyzing %d commits for repository %s", commits.totalCount, target_spec.repo_full_name())
         num_suspicious = 0
-        num_processed = 0
         unlinked_emails = set()
         for commit in commits:
-            if num_processed == self.MAX_COMMITS:
-                logger.debug("Reached max commit limit of %d, stopping the processing", self.MAX_COMMITS)
-                break
-            num_processed += 1
-            normalized_committer_name = commit.commit.author.name.lower()
+            normalized_committer_name = commit.author_name.lower()
             name_matches = (normalized_committer_name in [normalized_username, normalized_user_full_name])
-            if commit.author is None and not name_matches:
+            if commit.author_id is None and not name_matches:
                 # Case 1: the commit is not linked to any GitHub user based on the email
                 # As it's a common misconfiguration, we only flag it if the author name in the git metadata doesn't match the user's username/name
                 num_suspicious += 1
-                unlinked_emails.add(commit.commit.author.email)
-            elif commit.author is not None and self.commit_linked_to_taken_down_user(github_client, commit.author):
+                unlinked_emails.add(commit.author_email)
+            elif commit.author_id is not None and is_taken_down(commit.author_id):
                 # Case 2: the commit is linked to a GitHub user that has previously been taken down, we consider it "suspiciously-unlinked" too
                 num_suspicious += 1
-                unlinked_emails.add(commit.commit.author.email)
+                unlinked_emails.add(commit.author_email)
 
-        if num_suspicious == num_processed:
+        if num_suspicious == len(commits):
             additional_details = f"The repository only has commits from unlinked emails ({', '.join(unlinked_emails)})."
             return HeuristicRunResult.TRIGGERED(additional_details=additional_details)
 
         return HeuristicRunResult.PASSED()
-
-    @functools.cache
-    def commit_linked_to_taken_down_user(self, github_client: github.Github, author: NamedUser) -> bool:
-        # We know the commit is linked to a specific GitHub user, i.e. the git metadata email was linked to a specific user at the time of the commit
-        # In some cases, the associated user doesn't exist anymore (e.g. taken down), so we consider the email as "currently unlinked" in this case
-        # (like we'd see in the GitHub UI that the username is not clickable)
-        try:
-            github_client.get_user_by_id(author.id)
-            return False  # no exception, the user exists
-        except github.GithubException as e:
-            if e.status == 404:
-                return True
-            raise e
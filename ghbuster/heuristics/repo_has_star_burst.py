@@ -0,0 +1,88 @@
+import datetime
+import logging
+import time
+
+import github
+import numpy as np
+
+from .base import MetadataHeuristic, HeuristicRunResult, HeuristicInput
+from .. import TargetType, TargetSpec
+from ..service.graphql_profiles import GitHubProfileFetcher
+
+logger = logging.getLogger(__name__)
+
+
+def find_densest_window(timestamps: np.ndarray, window_seconds: int) -> tuple[int, int]:
+    """
+    Find the time window holding the most events, given sorted timestamps in seconds. Return the number of events in
+    that window, and the index of the first one.
+    """
+    if len(timestamps) == 0:
+        return 0, 0
+    # For each event, the number of events within the window starting at it
+    window_ends = np.searchsorted(timestamps, timestamps + window_seconds, side='left')
+    counts = window_ends - np.arange(len(timestamps))
+    start = int(np.argmax(counts))
+    return int(counts[start]), start
+
+
+class RepoHasStarBurst(MetadataHeuristic):
+    WINDOW_SECONDS = 3600
+    # The burst must hold enough stars, account for a large share of them, and be much faster than the usual pace
+    MIN_BURST_STARS = 30
+    MIN_BURST_PERCENT = 25
+    MIN_RATE_RATIO = 10
+    MAX_STARGAZERS = 40_000
+
+    def id(self) -> str:
+        return 'repo.star_burst'
+
+    def friendly_name(self) -> str:
+        return "Repository received a burst of stars"
+
+    def description(self) -> str:
+        return "Detects when a large proportion of a repository's stars were given within an hour, much faster than the repository's usual pace, which is typical of fake-star campaigns."
+
+    def estimated_cost(self) -> int:
+        # Star dates are retrieved in pages of 100 through the GraphQL API. Most repositories fit in a few pages, only
+        # the most starred ones take up to MAX_STARGAZERS / 100 pages
+        return 5
+
+    def target_type(self) -> TargetType:
+        return TargetType.REPOSITORY
+
+    def inputs(self) -> set[HeuristicInput]:
+        return {HeuristicInput.STARGAZERS}
+
+    def run(self, github_client: github.Github, target_spec: TargetSpec) -> HeuristicRunResult:
+        total_count, star_dates = GitHubProfileFetcher.for_client(github_client).get_star_dates(
+            target_spec.repo_full_name(), max_count=self.MAX_STARGAZERS)
+        if total_count > self.MAX_STARGAZERS:
+            logger.debug("Repository %s has too many stargazers (%d), limiting to the %d most recent",
+                         target_spec.repo_full_name(), total_count, self.MAX_STARGAZERS)
+
+        timestamps = np.sort(np.array([date.timestamp() for date in star_dates if date is not None], dtype=np.int64))
+        if len(timestamps) < self.MIN_BURST_STARS:
+            return HeuristicRunResult.PASSED()
+
+        burst_count, start = find_densest_window(timestamps, self.WINDOW_SECONDS)
+        burst_percent = 100 * burst_count / len(timestamps)
+        # Number of stars a window would hold if stars were spread evenly from the first one until now. The pace isn't
+        # measured up to the last star, as it would be the pace of the burst itself when the burst holds all stars
+        span = max(int(time.time()) - int(timestamps[0]), self.WINDOW_SECONDS)
+        expected_count = len(timestamps) * self.WINDOW_SECONDS / span
+        logger.debug("Densest hour of %s holds %d stars (%.1f %%), %.1f times the average pace",
+                     target_spec.repo_full_name(), burst_count, burst_percent, burst_count / expected_count)
+        # A burst holding all stars, e.g. given within the last hour, leaves no usual pace to compare it to
+        all_stars_in_burst = burst_count == len(timestamps)
+
+        if (burst_count >= self.MIN_BURST_STARS and burst_percent >= self.MIN_BURST_PERCENT
+                and (all_stars_in_burst or burst_count >= self.MIN_RATE_RATIO * expected_count)):
+            burst_start = datetime.datetime.fromtimestamp(int(timestamps[start]), tz=datetime.timezone.utc)
+            additional_details = (
+                f"Repository {target_spec.repo_full_name()} received {burst_count} stars ({burst_percent:.0f} % of "
+                f"them) within an hour, starting at {burst_start.strftime('%Y-%m-%d %H:%M')} UTC."
+            )
+            return HeuristicRunResult.TRIGGERED(additional_details=additional_details)
+
+        return HeuristicRunResult.PASSED()
@@ -1,4 +1,8 @@
+import math
+
+from .base import HeuristicInput
 from .user_has_low_community_activity import *
+from ..service.graphql_profiles import GitHubProfileFetcher, PAGE_SIZE
 
 logger = logging.getLogger(__name__)
 
@@ -18,24 +22,31 @@ class RepoHasStargazersWhoJoinedOnTheSameDay(MetadataHeuristic):
     def description(self) -> str:
         return "Detects when a repository has a large proportion of its stargazers who joined GitHub on the same day, which may indicate a coordinated effort to boost the repository's popularity."
 
+    def estimated_cost(self) -> int:
+        # Stargazer profiles are retrieved in pages of 100 through the GraphQL API
+        return math.ceil(self.MAX_STARGAZERS / PAGE_SIZE)
+
     def target_type(self) -> TargetType:
         return TargetType.REPOSITORY
 
+    def inputs(self) -> set[HeuristicInput]:
+        return {HeuristicInput.STARGAZERS}
+
     def run(self, github_client: github.Github, target_spec: TargetSpec) -> HeuristicRunResult:
-        repo = github_client.get_repo(full_name_or_id=target_spec.repo_full_name())
-        all_stargazers = repo.get_stargazers()
+        # Creation dates are retrieved in bulk along with the stargazers, instead of one user at a time
+        all_stargazers = GitHubProfileFetcher.for_client(github_client).get_stargazers(
+            target_spec.repo_full_name(), max_count=self.MAX_STARGAZERS)
 
-        if all_stargazers.totalCount < self.MIN_STARGAZERS:
+        if all_stargazers.total_count < self.MIN_STARGAZERS:
             logger.debug("Repository %s has too few stargazers (%d) to analyze.", target_spec.repo_full_name(),
-                         all_stargazers.totalCount)
+                         all_stargazers.total_count)
             return HeuristicRunResult.PASSED()
 
-        if all_stargazers.totalCount > self.MAX_STARGAZERS:
+        if all_stargazers.total_count > self.MAX_STARGAZERS:
             logger.debug("Repository %s has too many stargazers (%d) to analyze, limiting to %d.",
-                         target_spec.repo_full_name(), all_stargazers.totalCount, self.MAX_STARGAZERS)
-            all_stargazers = all_stargazers[:self.MAX_STARGAZERS]
+                         target_spec.repo_full_name(), all_stargazers.total_count, self.MAX_STARGAZERS)
 
-        logger.info("Analyzing the creation date of %d stargazers", all_stargazers.totalCount)
+        logger.info("Analyzing the creation date of %d stargazers", len(all_stargazers))
         stargazers_by_join_day = {}
         for stargazer in all_stargazers:
             user_joined_day = stargazer.created_at.strftime("%Y-%m-%d")
@@ -45,7 +56,7 @@ class RepoHasStargazersWhoJoinedOnTheSameDay(MetadataHeuristic):
 
         # Now compute the count for each join day
         for join_day in stargazers_by_join_day:
-            pct_joined_on_that_day = 100 * stargazers_by_join_day[join_day] / all_stargazers.totalCount
+            pct_joined_on_that_day = 100 * stargazers_by_join_day[join_day] / len(all_stargazers)
             if pct_joined_on_that_day >= self.THRESHOLD_PERCENT:
                 additional_details = (
                     f"Repository {target_spec.repo_full_name()} has {stargazers_by_join_day[join_day]} stargazers "
@@ -1,10 +1,19 @@
+import asyncio
+import itertools
+import math
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+
 from github.NamedUser import NamedUser
 
+from .base import HeuristicInput, fan_out_concurrency
 from .user_has_forks_from_taken_down_repos import *
 from .user_has_low_community_activity import *
 from .user_has_only_forks import *
 from .user_looks_legit import UserLooksLegit
 from .user_metadata_basic import *
+from ..service import instrumentation
+from ..service.async_github import AsyncGitHubClient
+from ..service.graphql_profiles import GitHubProfileFetcher, UserProfileSnapshot
 
 logger = logging.getLogger(__name__)
 
@@ -12,6 +21,12 @@ logger = logging.getLogger(__name__)
 class RepoStarredBySuspiciousUsers(MetadataHeuristic):
     PERCENT_THRESHOLD = 80
     MAX_STARGAZERS = 101
+    # Used when running outside of a GitHubScanner, which otherwise sets the number of stargazers evaluated in parallel
+    MAX_WORKERS = 8
+
+    def __init__(self, max_workers: int = None):
+        super().__init__()
+        self.max_workers = max_workers
 
     def id(self) -> str:
         return 'repo.starred_by_suspicious_users'
@@ -22,52 +37,208 @@ class RepoStarredBySuspiciousUsers(MetadataHeuristic):
     def description(self) -> str:
         return f"Detects when a repository has over {round(self.PERCENT_THRESHOLD)} % of stars from suspicious users matching heuristics they may be inauthentic."
 
+    def estimated_cost(self) -> int:
+        # Stargazer profiles are retrieved in bulk, but user heuristics then run against each stargazer
+        return self.MAX_STARGAZERS * 10
+
     def target_type(self) -> TargetType:
         return TargetType.REPOSITORY
 
+    def inputs(self) -> set[HeuristicInput]:
+        return {HeuristicInput.STARGAZERS}
+
     def run(self, github_client: github.Github, target_spec: TargetSpec) -> HeuristicRunResult:
-        # Here we want heuristics that are quick to run
-        repo = github_client.get_repo(full_name_or_id=target_spec.repo_full_name())
-        all_stargazers = repo.get_stargazers()
-        stargazer_count = all_stargazers.totalCount
+        stargazer_logins = self._get_stargazer_logins(github_client, target_spec)
+        if not stargazer_logins:
+            return HeuristicRunResult.PASSED()
+
+        stargazer_count = len(stargazer_logins)
+        suspicious_stargazers = {}  # mapping from username to the list of triggered heuristics for this user
+        num_evaluated = 0
+        stopped_early = False
+
+        # Stargazers are evaluated in parallel, sharing the connection pool of the GitHub client. We only keep up to
+        # max_workers evaluations in flight, so that no work is wasted once the outcome is known
+        max_workers = self._max_workers()
+        pending_logins = iter(stargazer_logins)
+        in_flight = {}
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='stargazer') as executor:
+            for login in itertools.islice(pending_logins, max_workers):
+                in_flight[self._submit_evaluation(executor, github_client, login)] = login
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    login = in_flight.pop(future)
+                    num_evaluated += 1
+                    triggered_heuristics = future.result()
+                    if triggered_heuristics:
+                        suspicious_stargazers[login] = triggered_heuristics
+
+                if self._is_outcome_known(len(suspicious_stargazers), num_evaluated, stargazer_count):
+                    stopped_early = num_evaluated < stargazer_count
+                    for future in in_flight:
+                        future.cancel()
+                    break
+
+                for login in itertools.islice(pending_logins, len(done)):
+                    in_flight[self._submit_evaluation(executor, github_client, login)] = login
+
+        return self._result(target_spec, stargazer_logins, suspicious_stargazers, num_evaluated, stopped_early)
+
+    def _submit_evaluation(self, executor: ThreadPoolExecutor, github_client: github.Github, login: str) -> Future:
+        # Requests sent while evaluating the stargazer are attributed to this heuristic
+        return executor.submit(instrumentation.in_current_context(self.evaluate_stargazer), github_client, login)
+
+    async def run_async(self, github_client: github.Github, target_spec: TargetSpec,
+                        async_client: AsyncGitHubClient) -> HeuristicRunResult:
+        stargazers = await self._get_stargazers_async(github_client, target_spec, async_client)
+        if not stargazers:
+            return HeuristicRunResult.PASSED()
 
+        stargazer_logins = [stargazer.login for stargazer in stargazers]
+        stargazer_count = len(stargazers)
+        suspicious_stargazers = {}
+        num_evaluated = 0
+        stopped_early = False
+        # Same bound as the threaded variant, evaluations still in flight are cancelled once the outcome is known
+        semaphore = asyncio.Semaphore(self._max_workers())
+
+        async def evaluate(stargazer: UserProfileSnapshot) -> tuple[str, list[str]]:
+            async with semaphore:
+                return stargazer.login, await self.evaluate_stargazer_async(github_client, stargazer, async_client)
+
+        tasks = [asyncio.create_task(evaluate(stargazer)) for stargazer in stargazers]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                login, triggered_heuristics = await next_done
+                num_evaluated += 1
+                if triggered_heuristics:
+                    suspicious_stargazers[login] = triggered_heuristics
+                if self._is_outcome_known(len(suspicious_stargazers), num_evaluated, stargazer_count):
+                    stopped_early = num_evaluated < stargazer_count
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        return self._result(target_spec, stargazer_logins, suspicious_stargazers, num_evaluated, stopped_early)
+
+    def _get_stargazer_logins(self, github_client: github.Github, target_spec: TargetSpec) -> list[str]:
+        """
+        Return the logins of the stargazers to analyze, in the order GitHub returns them, or an empty list if the
+        repository shouldn't be analyzed.
+        """
+        # Here we want heuristics that are quick to run
+        # Stargazer profiles are retrieved in bulk, and made available to the user heuristics through the entity store.
+        # The first page tells how many stargazers there are, so that the next ones are only retrieved when the
+        # repository is analyzed
+        fetcher = GitHubProfileFetcher.for_client(github_client)
+        stargazer_count = fetcher.get_stargazers(target_spec.repo_full_name(), max_count=1).total_count
+        if not self._should_analyze(target_spec, stargazer_count):
+            return []
+        all_stargazers = fetcher.get_stargazers(target_spec.repo_full_name(), max_count=self.MAX_STARGAZERS)
+        return [stargazer.login for stargazer in all_stargazers]
+
+    async def _get_stargazers_async(self, github_client: github.Github, target_spec: TargetSpec,
+                                    async_client: AsyncGitHubClient) -> list[UserProfileSnapshot]:
+        """
+        Same as _get_stargazer_logins, returning the profiles of the stargazers.
+        """
+        fetcher = GitHubProfileFetcher.for_client(github_client)
+        first_page = await fetcher.get_stargazers_async(target_spec.repo_full_name(), 1, async_client)
+        if not self._should_analyze(target_spec, first_page.total_count):
+            return []
+        return list(await fetcher.get_stargazers_async(target_spec.repo_full_name(), self.MAX_STARGAZERS,
+                                                       async_client))
+
+    def _should_analyze(self, target_spec: TargetSpec, stargazer_count: int) -> bool:
         if stargazer_count == 0:
             logger.debug("Repository %s has no stargazers.", target_spec.repo_full_name())
-            return HeuristicRunResult.PASSED()
+            return False
         elif stargazer_count > self.MAX_STARGAZERS:
             logger.info("Repository %s has too many stargazers (%d) to analyze, ignoring it.",
-                        target_spec.repo_full_name(), all_stargazers.totalCount)
-            return HeuristicRunResult.PASSED()
+                        target_spec.repo_full_name(), stargazer_count)
+            return False
 
         logger.info("Analyzing %d stargazers for repository %s", stargazer_count,
                     target_spec.repo_full_name())
-        suspicious_stargazers = {}  # mapping from username to the list of triggered heuristics for this user
-        for stargazer in all_stargazers:
-            user = github_client.get_user(login=stargazer.login)
-            if UserLooksLegit().run(github_client, target_spec).triggered:
-                logger.info("The user %s exhibits strong characteristics of a legitimate user, skipping", user.login)
-                continue
-
-            user_heuristics = self.get_heuristics_to_run_for_user(user)
-            logger.info("Analyzing if stargazer %s looks suspicious by running %d heuristics", user.login,
-                        len(user_heuristics))
-            for heuristic in user_heuristics:
-                result = heuristic.run(github_client, TargetSpec(TargetType.USER, username=user.login))
-                if result.triggered:
-                    logger.debug("Stargazer %s triggered heuristic %s", user.login, heuristic.id())
-                    if user.login not in suspicious_stargazers:
-                        suspicious_stargazers[user.login] = []
-                    suspicious_stargazers[user.login].append(heuristic.id())
+        return True
+
+    def _max_workers(self) -> int:
+        return self.max_workers or fan_out_concurrency.get() or self.MAX_WORKERS
+
+    def _is_outcome_known(self, num_suspicious: int, num_evaluated: int, stargazer_count: int) -> bool:
+        # The outcome is known as soon as enough stargazers are suspicious, or if even if all the remaining ones were,
+        # we wouldn't reach the threshold
+        num_suspicious_needed = math.ceil(self.PERCENT_THRESHOLD * stargazer_count / 100)
+        num_remaining = stargazer_count - num_evaluated
+        return num_suspicious >= num_suspicious_needed or num_suspicious + num_remaining < num_suspicious_needed
+
+    def _result(self, target_spec: TargetSpec, stargazer_logins: list[str], suspicious_stargazers: dict[str, list[str]],
+                num_evaluated: int, stopped_early: bool) -> HeuristicRunResult:
+        stargazer_count = len(stargazer_logins)
+        if stopped_early:
+            logger.info("Stopped analyzing stargazers of %s after %d out of %d, outcome is known",
+                        target_spec.repo_full_name(), num_evaluated, stargazer_count)
 
         ratio = 100 * len(suspicious_stargazers) / stargazer_count if stargazer_count > 0 else 0
         if ratio >= self.PERCENT_THRESHOLD:
-            additional_details = f"The repository has {len(suspicious_stargazers)} stargazers ({round(ratio)} %) that triggered suspicious user heuristics: {', '.join(suspicious_stargazers.keys())}."
+            # Report stargazers in the order GitHub returned them, regardless of the order they were evaluated in
+            suspicious_logins = [login for login in stargazer_logins if login in suspicious_stargazers]
+            at_least = "at least " if stopped_early else ""
+            additional_details = f"The repository has {at_least}{len(suspicious_stargazers)} stargazers ({round(ratio)} %) that triggered suspicious user heuristics: {', '.join(suspicious_logins)}."
             return HeuristicRunResult.TRIGGERED(additional_details=additional_details)
 
         return HeuristicRunResult.PASSED()
 
+    def evaluate_stargazer(self, github_client: github.Github, login: str) -> list[str]:
+        """
+        Run the user heuristics against a stargazer, and return the IDs of the ones that triggered.
+        """
+        user = github_client.get_user(login=login)
+        user_target_spec = TargetSpec(TargetType.USER, username=user.login)
+        if UserLooksLegit().evaluate(github_client, user_target_spec).triggered:
+            logger.info("The user %s exhibits strong characteristics of a legitimate user, skipping", user.login)
+            return []
+
+        user_heuristics = self.get_heuristics_to_run_for_user(user)
+        logger.info("Analyzing if stargazer %s looks suspicious by running %d heuristics", user.login,
+                    len(user_heuristics))
+        triggered_heuristics = []
+        for heuristic in user_heuristics:
+            # Verdicts are reused across scans when possible, as the same accounts often star many repositories
+            result = heuristic.evaluate(github_client, user_target_spec)
+            if result.triggered:
+                logger.debug("Stargazer %s triggered heuristic %s", user.login, heuristic.id())
+                triggered_heuristics.append(heuristic.id())
+        return triggered_heuristics
+
+    async def evaluate_stargazer_async(self, github_client: github.Github, stargazer: UserProfileSnapshot,
+                                       async_client: AsyncGitHubClient) -> list[str]:
+        """
+        Same as evaluate_stargazer, given the profile retrieved along with the stargazers. User heuristics with an
+        asynchronous variant are awaited, the other ones run in threads.
+        """
+        user_target_spec = TargetSpec(TargetType.USER, username=stargazer.login)
+        if (await UserLooksLegit().evaluate_async(github_client, user_target_spec, async_client)).triggered:
+            logger.info("The user %s exhibits strong characteristics of a legitimate user, skipping", stargazer.login)
+            return []
+
+        user_heuristics = list(self.get_heuristics_to_run_for_user(stargazer))
+        logger.info("Analyzing if stargazer %s looks suspicious by running %d heuristics", stargazer.login,
+                    len(user_heuristics))
+        results = await asyncio.gather(*(heuristic.evaluate_async(github_client, user_target_spec, async_client)
+                                         for heuristic in user_heuristics))
+        triggered_heuristics = []
+        for heuristic, result in zip(user_heuristics, results):
+            if result.triggered:
+                logger.debug("Stargazer %s triggered heuristic %s", stargazer.login, heuristic.id())
+                triggered_heuristics.append(heuristic.id())
+        return triggered_heuristics
+
     @staticmethod
-    def get_heuristics_to_run_for_user(user: NamedUser) -> set[MetadataHeuristic]:
+    def get_heuristics_to_run_for_user(user: NamedUser | UserProfileSnapshot) -> set[MetadataHeuristic]:
         heuristics: set[MetadataHeuristic] = {
             UserJustJoinedHeuristic(),
             UserMissingCommonFields(),
@@ -77,6 +248,6 @@ class RepoStarredBySuspiciousUsers(MetadataHeuristic):
 
         if user.followers <= 100:
             # since this heuristic can take time, we only run it for users that have a higher chance of being inauthentic
-            heuristics.add(UserHasForksFromTakenDownRepos(max_forks_to_analyze=20))
+            heuristics.add(UserHasForksFromTakenDownRepos())
 
         return heuristics
@@ -1,10 +1,11 @@
-import functools
 import logging
 
 import github
 
-from .base import MetadataHeuristic, HeuristicRunResult
+from .base import MetadataHeuristic, HeuristicRunResult, HeuristicInput
 from .. import TargetType, TargetSpec
+from ..service.async_github import AsyncGitHubClient
+from ..service.repository_status import RepositoryStatus, RepositoryStatusService
 
 logger = logging.getLogger(__name__)
 
@@ -12,10 +13,6 @@ logger = logging.getLogger(__name__)
 # e.g. https://github.com/mrrebrik3765
 class UserHasForksFromTakenDownRepos(MetadataHeuristic):
 
-    def __init__(self, max_forks_to_analyze: int = 10):
-        super().__init__()
-        self.max_forks_to_analyze = max_forks_to_analyze
-
     def id(self) -> str:
         return 'user.forks_from_taken_down_repos'
 
@@ -25,50 +22,44 @@ class UserHasForksFromTakenDownRepos(MetadataHeuristic):
     def description(self) -> str:
         return "Detects when a user has forks from repositories that have been taken down. This may indicate that the user is being leveraged as part of a campaign to make inauthentic repositories appear legitimate."
 
+    def estimated_cost(self) -> int:
+        # The user's forks along with their parent, then the status of the parents, 100 of each per query
+        return 2
+
     def target_type(self) -> TargetType:
         return TargetType.USER
 
+    def inputs(self) -> set[HeuristicInput]:
+        return {HeuristicInput.REPOSITORIES}
+
     def run(self, github_client: github.Github, target_spec: TargetSpec) -> HeuristicRunResult:
-        user = github_client.get_user(login=target_spec.username)
-        user_repos = user.get_repos(type='owner')
-        taken_down_repos = set()
-        num_forks_analyzed = 0
-        for repo in user_repos:
-            if repo.fork:
-                if num_forks_analyzed >= self.max_forks_to_analyze:
-                    logger.debug("Reached maximum number of forks to analyze (%d), stopping further checks",
-                                 self.max_forks_to_analyze)
-                    break
-                num_forks_analyzed += 1
-                logger.debug("Analyzing forked repository %s owned by user %s", repo.full_name, target_spec.username)
-                try:
-                    original_name = repo.parent.full_name
-                    if not self.repo_exists(github_client, original_name):
-                        taken_down_repos.add(original_name)
-                except github.GithubException as e:
-                    if e.status in [403, 451] and e.message == 'Repository access blocked':
-                        # tos violation, i.e. soft takedown
-                        # TODO should probably be taken into account by the heuristic
-                        logger.warning("Repository %s owned by user %s is blocked, ignoring", repo.full_name,
-                                       target_spec.username)
-                    else:
-                        raise e
+        repository_status = RepositoryStatusService.for_client(github_client)
+        parents = repository_status.get_fork_parents(target_spec.username)
+        logger.debug("Analyzing %d forked repositories owned by user %s", len(parents), target_spec.username)
+        statuses = repository_status.get_statuses(parent for parent in parents.values() if parent is not None)
+        return self._result(target_spec, statuses)
 
+    async def run_async(self, github_client: github.Github, target_spec: TargetSpec,
+                        async_client: AsyncGitHubClient) -> HeuristicRunResult:
+        repository_status = RepositoryStatusService.for_client(github_client)
+        parents = await repository_status.get_fork_parents_async(target_spec.username, async_client)
+        logger.debug("Analyzing %d forked repositories owned by user %s", len(parents), target_spec.username)
+        statuses = await repository_status.get_statuses_async(
+            (parent for parent in parents.values() if parent is not None), async_client)
+        return self._result(target_spec, statuses)
+
+    @staticmethod
+    def _result(target_spec: TargetSpec, statuses: dict[str, RepositoryStatus]) -> HeuristicRunResult:
+        taken_down_repos = sorted(name for name, status in statuses.items() if status == RepositoryStatus.TAKEN_DOWN)
+        blocked_repos = sorted(name for name, status in statuses.items() if status == RepositoryStatus.BLOCKED)
+        origins = []
         if len(taken_down_repos) > 0:
-            additional_details = f"The user {target_spec.username} has forks from taken down repositories: {', '.join(taken_down_repos)}."
+            origins.append(f"taken down repositories: {', '.join(taken_down_repos)}")
+        if len(blocked_repos) > 0:
+            # tos violation, i.e. soft takedown
+            origins.append(f"repositories blocked for Terms of Service violations: {', '.join(blocked_repos)}")
+        if len(origins) > 0:
+            additional_details = f"The user {target_spec.username} has forks from {' and from '.join(origins)}."
             return HeuristicRunResult.TRIGGERED(additional_details=additional_details)
 
         return HeuristicRunResult.PASSED()
-
-    @functools.cache
-    def repo_exists(self, github_client: github.Github, full_name: str) -> bool:
-        try:
-            github_client.get_repo(full_name)
-            return True
-        except github.GithubException as e:
-            if e.status == 404:
-                return False
-            elif e.status in [403, 451] and e.message == 'Repository access blocked':
-                # tos violation or other access issues
-                return False
-            raise
@@ -3,7 +3,7 @@ from datetime import datetime, timedelta, timezone
 
 import github
 
-from .base import MetadataHeuristic, HeuristicRunResult
+from .base import MetadataHeuristic, HeuristicRunResult, HeuristicInput
 from .. import TargetType, TargetSpec
 
 logger = logging.getLogger(__name__)
@@ -25,9 +25,16 @@ class UserHasLowCommunityActivity(MetadataHeuristic):
     def description(self) -> str:
         return "Detects when a user has very low community activity. This may indicate that the user is inauthentic."
 
+    def estimated_cost(self) -> int:
+        # The user, their stars, followers and following, and two searches
+        return 6
+
     def target_type(self) -> TargetType:
         return TargetType.USER
 
+    def inputs(self) -> set[HeuristicInput]:
+        return {HeuristicInput.PROFILE}
+
     def run(self, github_client: github.Github, target_spec: TargetSpec) -> HeuristicRunResult:
         user = github_client.get_user(login=target_spec.username)
         start_date = datetime.now(timezone.utc) - timedelta(days=self.ISSUES_OR_PR_TIME_PERIOD_DAYS)
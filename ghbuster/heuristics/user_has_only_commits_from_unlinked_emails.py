@@ -2,7 +2,7 @@ import logging
 
 import github
 
-from .base import MetadataHeuristic, HeuristicRunResult
+from .base import MetadataHeuristic, HeuristicRunResult, HeuristicInput
 from .. import TargetType, TargetSpec
 from ..service.emails_extractor import GitHubCommitEmailExtractor
 
@@ -19,9 +19,16 @@ class UserHasOnlyCommitsFromUnlinkedEmails(MetadataHeuristic):
     def description(self) -> str:
         return "Detects when all of a user's commits are from emails not linked to their GitHub profiles. This may indicate a threat actor leveraging distinct inauthentic accounts."
 
+    def estimated_cost(self) -> int:
+        # Branches and commits of all the user's repositories, it depends on how many they have
+        return 100
+
     def target_type(self) -> TargetType:
         return TargetType.USER
 
+    def inputs(self) -> set[HeuristicInput]:
+        return {HeuristicInput.REPOSITORIES, HeuristicInput.COMMITS}
+
     def run(self, github_client: github.Github, target_spec: TargetSpec) -> HeuristicRunResult:
         extractor = GitHubCommitEmailExtractor(github_client, target_spec, include_forks=False,
                                                include_unlinked_emails=True,
@@ -2,7 +2,7 @@ import logging
 
 import github
 
-from .base import MetadataHeuristic, HeuristicRunResult
+from .base import MetadataHeuristic, HeuristicRunResult, HeuristicInput
 from .. import TargetType, TargetSpec
 
 logger = logging.getLogger(__name__)
@@ -19,9 +19,16 @@ class UserHasOnlyForkedRepos(MetadataHeuristic):
     def description(self) -> str:
         return "Detects all of a user's repositories are forks. This may be an indication that the user is used solely to make other repositories appear legitimate."
 
+    def estimated_cost(self) -> int:
+        # The user and the first page of their repositories
+        return 2
+
     def target_type(self) -> TargetType:
         return TargetType.USER
 
+    def inputs(self) -> set[HeuristicInput]:
+        return {HeuristicInput.REPOSITORIES}
+
     def run(self, github_client: github.Github, target_spec: TargetSpec) -> HeuristicRunResult:
         user = github_client.get_user(login=target_spec.username)
         user_repos = user.get_repos(type='owner')
@@ -3,7 +3,7 @@ from datetime import datetime, timezone
 
 import github
 
-from .base import MetadataHeuristic, HeuristicRunResult
+from .base import MetadataHeuristic, HeuristicRunResult, HeuristicInput
 from .. import TargetType, TargetSpec
 
 
@@ -26,6 +26,9 @@ class UserJustJoinedHeuristic(MetadataHeuristic):
     def target_type(self) -> TargetType:
         return TargetType.USER
 
+    def inputs(self) -> set[HeuristicInput]:
+        return {HeuristicInput.PROFILE}
+
     def run(self, github_client: github.Github, target_spec: TargetSpec) -> HeuristicRunResult:
         user = github_client.get_user(login=target_spec.username)
         if user.created_at is None:
@@ -59,6 +62,9 @@ class UserMissingCommonFields(MetadataHeuristic):
     def target_type(self) -> TargetType:
         return TargetType.USER
 
+    def inputs(self) -> set[HeuristicInput]:
+        return {HeuristicInput.PROFILE}
+
     def run(self, github_client: github.Github, target_spec: TargetSpec) -> HeuristicRunResult:
         user = github_client.get_user(login=target_spec.username)
         if all(getattr(user, field) is None for field in self.FIELDS):
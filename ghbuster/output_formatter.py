@@ -1,8 +1,9 @@
 import sys
-from typing import List
+from typing import Any, List
 
-from . import TargetSpec
+from . import TargetSpec, TargetType
 from .heuristics.base import HeuristicRunResult
+from .service.instrumentation import PERCENTILES, RequestStats, ScanStats
 
 
 class Color:
@@ -34,7 +35,8 @@ class OutputFormatter:
         if disable_colors:
             Color.disable_if_not_tty()
 
-    def format_results(self, target_spec: TargetSpec, results: List[HeuristicRunResult]) -> str:
+    def format_results(self, target_spec: TargetSpec, results: List[HeuristicRunResult],
+                       stats: ScanStats = None) -> str:
         """Format all heuristic results into a nice report"""
         Color.disable_if_not_tty()
 
@@ -46,23 +48,74 @@ class OutputFormatter:
 
         # Separate passed and failed results
         failed_results = [r for r in results if r.triggered]
-        passed_results = [r for r in results if not r.triggered]
+        errored_results = [r for r in results if r.errored]
+        skipped_results = [r for r in results if r.skipped and not r.triggered]
+        passed_results = [r for r in results if not r.triggered and not r.errored and not r.skipped]
 
         # Failed heuristics section (show first if any)
         if failed_results:
             output.append(self._create_failed_section(failed_results))
             output.append("")
 
+        # Errored heuristics section
+        if errored_results:
+            output.append(self._create_errored_section(errored_results))
+            output.append("")
+
         # Passed heuristics section
         if passed_results:
             output.append(self._create_passed_section(passed_results))
             output.append("")
 
+        # Skipped heuristics section
+        if skipped_results:
+            output.append(self._create_skipped_section(skipped_results))
+            output.append("")
+
         # Summary
-        output.append(self._create_summary(len(failed_results), len(passed_results)))
+        output.append(self._create_summary(len(failed_results), len(passed_results), len(errored_results),
+                                           len(skipped_results)))
+
+        # API usage
+        if stats is not None:
+            output.append("")
+            output.append(self._create_stats_section(stats))
 
         return "\n".join(output)
 
+    def format_results_json(self, target_spec: TargetSpec, results: List[HeuristicRunResult],
+                            stats: ScanStats = None) -> dict[str, Any]:
+        """Format all heuristic results into a JSON-serializable report"""
+        report = {
+            **self.format_target_json(target_spec),
+            "triggered": [r.heuristic.id() for r in results if r.triggered],
+            "results": [
+                {
+                    "id": r.heuristic.id(),
+                    "name": r.heuristic.friendly_name(),
+                    "triggered": r.triggered,
+                    "skipped": r.skipped,
+                    "errored": r.errored,
+                    "details": r.additional_details or None,
+                }
+                for r in results
+            ],
+        }
+        if stats is not None:
+            report["stats"] = stats.to_json()
+        return report
+
+    def format_target_json(self, target_spec: TargetSpec) -> dict[str, Any]:
+        """Format a target into its JSON representation"""
+        if target_spec.target_type == TargetType.REPOSITORY:
+            target = target_spec.repo_full_name()
+        else:
+            target = target_spec.username
+        return {
+            "target": target,
+            "target_type": target_spec.target_type.value,
+        }
+
     def _create_header(self, target_spec: TargetSpec) -> str:
         """Create formatted header section"""
         title = f"🔍 ghbuster scan results"
@@ -92,6 +145,20 @@ class OutputFormatter:
 
         return "\n".join(lines)
 
+    def _create_errored_section(self, errored_results: List[HeuristicRunResult]) -> str:
+        """Create section for heuristics that failed to run"""
+        lines = []
+
+        # Section header
+        lines.append(f"{Color.BOLD}{Color.YELLOW}Heuristics that could not be run ({len(errored_results)}){Color.END}")
+        lines.append("")
+
+        for result in errored_results:
+            heuristic_name = result.heuristic.friendly_name()
+            lines.append(f"  {Color.YELLOW}⚠️{Color.END} {heuristic_name}: {result.additional_details}")
+
+        return "\n".join(lines)
+
     def _create_passed_section(self, passed_results: List[HeuristicRunResult]) -> str:
         """Create section for passed heuristics"""
         lines = []
@@ -107,6 +174,21 @@ class OutputFormatter:
 
         return "\n".join(lines)
 
+    def _create_skipped_section(self, skipped_results: List[HeuristicRunResult]) -> str:
+        """Create section for heuristics that were not run"""
+        lines = []
+
+        # Section header
+        lines.append(f"{Color.BOLD}{Color.BLUE}Skipped heuristics ({len(skipped_results)}){Color.END}")
+        lines.append("")
+
+        for result in skipped_results:
+            heuristic_name = result.heuristic.friendly_name()
+            details = f": {result.additional_details}" if result.additional_details else ""
+            lines.append(f"  {Color.BLUE}⏭️{Color.END} {heuristic_name}{details}")
+
+        return "\n".join(lines)
+
     def _format_failed_heuristic(self, index: int, result: HeuristicRunResult) -> str:
         """Format a single failed heuristic with details"""
         heuristic_name = result.heuristic.friendly_name()
@@ -123,9 +205,10 @@ class OutputFormatter:
 
         return "\n".join(lines)
 
-    def _create_summary(self, failed_count: int, passed_count: int) -> str:
+    def _create_summary(self, failed_count: int, passed_count: int, errored_count: int = 0,
+                        skipped_count: int = 0) -> str:
         """Create summary section"""
-        total = failed_count + passed_count
+        total = failed_count + passed_count + errored_count
 
         lines = []
         lines.append(f"{Color.BOLD}{Color.CYAN}📊 SCAN SUMMARY{Color.END}")
@@ -133,9 +216,45 @@ class OutputFormatter:
         lines.append(f"Total Heuristics Run: {Color.BOLD}{total}{Color.END}")
         lines.append(
             f"Heuristics triggered:     {Color.BOLD}{Color.RED if failed_count > 0 else Color.GREEN}{failed_count}{Color.END}")
+        if errored_count > 0:
+            lines.append(f"Heuristics errored:       {Color.BOLD}{Color.YELLOW}{errored_count}{Color.END}")
+        if skipped_count > 0:
+            lines.append(f"Heuristics skipped:       {Color.BOLD}{Color.BLUE}{skipped_count}{Color.END}")
 
         return "\n".join(lines)
 
+    def _create_stats_section(self, stats: ScanStats) -> str:
+        """Create section with the GitHub API usage of each heuristic"""
+        lines = []
+        lines.append(f"{Color.BOLD}{Color.CYAN}📈 API USAGE{Color.END}")
+        lines.append("─" * 40)
+        latency_columns = ' '.join(f"{f'p{p}':>7}" for p in PERCENTILES)
+        lines.append(f"{'Heuristic':<60} {'Requests':>8} {'Cached':>7} {'Cost':>6} {latency_columns} {'Time':>8}")
+
+        nested = stats.nested()
+        for label, heuristic_stats in stats.per_heuristic().items():
+            lines.append(self._format_stats_line(label, heuristic_stats))
+            # Requests of nested heuristics are already included in the heuristic they ran in
+            for nested_label, nested_stats in nested.items():
+                parent, _, nested_id = nested_label.rpartition(' > ')
+                if nested_label.startswith(f"{label} > "):
+                    depth = parent.count(' > ') + 1
+                    lines.append(self._format_stats_line(f"{'  ' * depth}↳ {nested_id}", nested_stats))
+        lines.append(self._format_stats_line("Total", stats.total()))
+
+        return "\n".join(lines)
+
+    def _format_stats_line(self, label: str, stats: RequestStats) -> str:
+        """Format the API usage of a single heuristic"""
+        latencies = ' '.join(self._format_latency(stats.percentile(p)) for p in PERCENTILES)
+        cost = sum(stats.rate_limit_cost.values())
+        wall_time = f"{stats.wall_time:.2f}s" if stats.wall_time else "-"
+        return f"{label:<60} {stats.requests:>8} {stats.cache_hits:>7} {cost:>6} {latencies} {wall_time:>8}"
+
+    @staticmethod
+    def _format_latency(seconds: float | None) -> str:
+        return f"{round(seconds * 1000):>5}ms" if seconds is not None else f"{'-':>7}"
+
     def _camel_to_title(self, camel_str: str) -> str:
         """Convert CamelCase to Title Case with spaces"""
         import re
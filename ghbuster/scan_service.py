@@ -0,0 +1,215 @@
+import http.server
+import json
+import logging
+import threading
+import time
+import urllib.parse
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from typing import Any, Callable
+
+import github
+
+from . import TargetSpec
+from .batch_scanner import BatchScanner
+from .cli import parse_target
+from .github_repo_scanner import StopPolicy
+from .heuristics import MetadataHeuristic
+from .service.github_entity_store import GitHubEntityStore
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8080
+DEFAULT_MAX_QUEUE = 100
+# Results of recent scans are returned as is, and entities retrieved by scans are shared for as long
+DEFAULT_RESULT_TTL = 300
+# Time a request waits for its scan before giving up. The scan goes on, and the same request later picks it up
+DEFAULT_SCAN_TIMEOUT = 600
+
+
+class ServiceOverloaded(Exception):
+    pass
+
+
+class ScanService:
+    """
+    Runs scans on behalf of many clients with a single GitHub client, HTTP cache and rate limit budget. Identical scans
+    requested while one is in flight share its result, and results are kept for result_ttl seconds so that targets
+    asked about repeatedly are answered from memory. At most concurrency scans run at the same time, and at most
+    max_queue wait for a worker.
+    """
+
+    def __init__(self, github_client: github.Github, heuristics: list[MetadataHeuristic], concurrency: int = 4,
+                 max_queue: int = DEFAULT_MAX_QUEUE, result_ttl: float = DEFAULT_RESULT_TTL, force: bool = False,
+                 stop_policy: StopPolicy = None, include_stats: bool = False,
+                 create_entity_store: Callable[[], GitHubEntityStore] = None):
+        self.heuristics = {heuristic.id(): heuristic for heuristic in heuristics}
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.result_ttl = result_ttl
+        self.force = force
+        self.stop_policy = stop_policy
+        self.include_stats = include_stats
+        self.create_entity_store = create_entity_store or (lambda: GitHubEntityStore(github_client))
+        self.stats = {'requested': 0, 'coalesced': 0, 'from_recent_results': 0, 'rejected': 0, 'completed': 0}
+        self._entity_store = None
+        self._entity_store_created_at = 0.0
+        self._in_flight: dict[tuple, Future] = {}
+        self._recent_results: dict[tuple, tuple[float, dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='scan')
+
+    def select_heuristics(self, included: set[str] = None, excluded: set[str] = None) -> list[MetadataHeuristic]:
+        """
+        Return the heuristics of the service to run, raising ValueError on unknown heuristics.
+        """
+        unknown = ((included or set()) | (excluded or set())) - set(self.heuristics)
+        if unknown:
+            raise ValueError(f"Unknown heuristics: {', '.join(sorted(unknown))}")
+        return [heuristic for heuristic_id, heuristic in sorted(self.heuristics.items())
+                if (not included or heuristic_id in included) and heuristic_id not in (excluded or set())]
+
+    def submit(self, target_spec: TargetSpec, heuristics: list[MetadataHeuristic], force: bool = None,
+               refresh: bool = False) -> Future:
+        """
+        Return the future result of a scan, reusing an identical scan in flight, or a recent result unless refresh is
+        set. Raises ServiceOverloaded when too many scans are waiting for a worker.
+        """
+        force = self.force if force is None else force
+        key = (target_spec, frozenset(heuristic.id() for heuristic in heuristics), force)
+        with self._lock:
+            self.stats['requested'] += 1
+            if key in self._in_flight:
+                self.stats['coalesced'] += 1
+                return self._in_flight[key]
+            recent = self._recent_results.get(key)
+            if recent is not None and not refresh and time.monotonic() - recent[0] < self.result_ttl:
+                self.stats['from_recent_results'] += 1
+                future = Future()
+                future.set_result(recent[1])
+                return future
+            if len(self._in_flight) >= self.concurrency + self.max_queue:
+                self.stats['rejected'] += 1
+                raise ServiceOverloaded(f"{len(self._in_flight)} scans are in flight, retry later")
+            future = self._executor.submit(self._scan, key, target_spec, heuristics, force)
+            self._in_flight[key] = future
+        return future
+
+    def get_stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {**self.stats, 'in_flight': len(self._in_flight), 'recent_results': len(self._recent_results)}
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _get_entity_store(self) -> GitHubEntityStore:
+        # Scans running close together share the users and repositories they retrieve, e.g. common stargazers, but
+        # entities aren't reused for longer than results are
+        with self._lock:
+            if self._entity_store is None or time.monotonic() - self._entity_store_created_at >= self.result_ttl:
+                self._entity_store = self.create_entity_store()
+                self._entity_store_created_at = time.monotonic()
+            return self._entity_store
+
+    def _scan(self, key: tuple, target_spec: TargetSpec, heuristics: list[MetadataHeuristic],
+              force: bool) -> dict[str, Any]:
+        result = None
+        try:
+            batch_scanner = BatchScanner(self._get_entity_store(), heuristics, force=force,
+                                         stop_policy=self.stop_policy, include_stats=self.include_stats)
+            result = batch_scanner.scan_target(target_spec)
+            return result
+        finally:
+            # Before the future completes, so that requests woken up by it find the result among recent ones
+            self._completed(key, result)
+
+    def _completed(self, key: tuple, result: dict[str, Any] | None):
+        now = time.monotonic()
+        with self._lock:
+            self._in_flight.pop(key, None)
+            self.stats['completed'] += 1
+            # Failed scans aren't kept, the next request tries again
+            if result is not None and result['status'] != 'error':
+                self._recent_results[key] = (now, result)
+            for expired in [k for k, (at, _) in self._recent_results.items() if now - at >= self.result_ttl]:
+                del self._recent_results[expired]
+
+
+class ScanRequestHandler(http.server.BaseHTTPRequestHandler):
+    """
+    GET /scan?target=owner/repo[&include=id,id|&exclude=id,id][&force=true][&refresh=true]
+        Scan a target, answering with the same JSON as 'ghbuster batch' once the scan completed. Identical requests
+        share the same scan.
+    GET /heuristics
+        List the heuristics of the service.
+    GET /stats
+        Counters of the service.
+    """
+    server: 'ScanServer'
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        params = {name: values[-1] for name, values in urllib.parse.parse_qs(url.query).items()}
+        if url.path == '/scan':
+            self._scan(params)
+        elif url.path == '/heuristics':
+            self._reply(200, [{"id": h.id(), "name": h.friendly_name(), "target_type": h.target_type().value}
+                              for h in self.server.service.select_heuristics()])
+        elif url.path == '/stats':
+            self._reply(200, self.server.service.get_stats())
+        else:
+            self._reply(404, {"error": f"Unknown path {url.path}"})
+
+    def _scan(self, params: dict[str, str]):
+        service = self.server.service
+        try:
+            if 'target' not in params:
+                raise ValueError("Missing target parameter")
+            target_spec = parse_target(params['target'])
+            heuristics = service.select_heuristics(_split(params.get('include')), _split(params.get('exclude')))
+            force = _is_true(params['force']) if 'force' in params else None
+            future = service.submit(target_spec, heuristics, force=force, refresh=_is_true(params.get('refresh')))
+        except ValueError as e:
+            self._reply(400, {"error": str(e)})
+            return
+        except ServiceOverloaded as e:
+            self._reply(503, {"error": str(e)}, {'Retry-After': '60'})
+            return
+
+        try:
+            self._reply(200, future.result(timeout=self.server.scan_timeout))
+        except TimeoutError:
+            self._reply(504, {"error": "The scan is still running, retry later to get its result"})
+
+    def _reply(self, status: int, body: Any, headers: dict[str, str] = None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format: str, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+class ScanServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, service: ScanService, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 scan_timeout: float = DEFAULT_SCAN_TIMEOUT):
+        super().__init__((host, port), ScanRequestHandler)
+        self.service = service
+        self.scan_timeout = scan_timeout
+
+
+def _split(value: str | None) -> set[str] | None:
+    if not value:
+        return None
+    return {item.strip() for item in value.split(',') if item.strip()}
+
+
+def _is_true(value: str | None) -> bool:
+    return (value or '').lower() in ('1', 'true', 'yes')
@@ -0,0 +1,116 @@
+import asyncio
+import base64
+import collections
+import logging
+import threading
+import time
+from typing import Iterable
+
+import github
+
+from .async_github import AsyncGitHubClient
+from .github_entity_store import GitHubEntityStore
+from .graphql_profiles import PAGE_SIZE, execute_graphql
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 100_000
+# Accounts are rarely taken down or restored, but a scan shouldn't rely on an outcome older than a day
+DEFAULT_TTL_SECONDS = 24 * 3600
+
+NODES_QUERY = """
+query($ids: [ID!]!) {
+  nodes(ids: $ids) { ... on User { databaseId } }
+}
+"""
+
+
+def user_node_id(user_id: int) -> str:
+    # Legacy global ID of a user, derived from its database ID. The GraphQL API still accepts it as an input
+    return base64.b64encode(f"04:User{user_id}".encode()).decode()
+
+
+class AccountExistenceService:
+    """
+    Tells whether GitHub accounts still exist (e.g. accounts linked to commits that may have been taken down since),
+    checking up to 100 accounts per GraphQL query. Outcomes are kept in a bounded LRU cache, and expire after a TTL.
+    """
+
+    def __init__(self, github_client: github.Github | GitHubEntityStore, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.github_client = github_client
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # User ID to (exists, expiry), least recently used first
+        self._cache: collections.OrderedDict[int, tuple[bool, float]] = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def for_client(github_client: github.Github | GitHubEntityStore) -> 'AccountExistenceService':
+        """
+        Return the service shared by all heuristics of a scan when possible, so that each account is checked once.
+        """
+        if isinstance(github_client, GitHubEntityStore):
+            return github_client.shared_service(AccountExistenceService)
+        return AccountExistenceService(github_client)
+
+    def user_exists(self, user_id: int) -> bool:
+        return self.users_exist([user_id])[user_id]
+
+    def users_exist(self, user_ids: Iterable[int]) -> dict[int, bool]:
+        """
+        Return whether each of the given users still exists, keyed by user ID.
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        result = self._cached(user_ids)
+        missing = [user_id for user_id in user_ids if user_id not in result]
+        for i in range(0, len(missing), PAGE_SIZE):
+            chunk = missing[i:i + PAGE_SIZE]
+            data = execute_graphql(self.github_client, NODES_QUERY, {'ids': [user_node_id(uid) for uid in chunk]})
+            result.update(self._remember(chunk, data))
+        if missing:
+            logger.debug("Checked the existence of %d accounts, %d were cached", len(missing),
+                         len(user_ids) - len(missing))
+        return result
+
+    async def users_exist_async(self, user_ids: Iterable[int], async_client: AsyncGitHubClient) -> dict[int, bool]:
+        """
+        Same as users_exist, sending the queries of all batches concurrently.
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        result = self._cached(user_ids)
+        missing = [user_id for user_id in user_ids if user_id not in result]
+        chunks = [missing[i:i + PAGE_SIZE] for i in range(0, len(missing), PAGE_SIZE)]
+        queries = (async_client.graphql(NODES_QUERY, {'ids': [user_node_id(uid) for uid in chunk]},
+                                        kind=async_client.ACCOUNTS)
+                   for chunk in chunks)
+        pages = await asyncio.gather(*queries)
+        for chunk, data in zip(chunks, pages):
+            result.update(self._remember(chunk, data))
+        if missing:
+            logger.debug("Checked the existence of %d accounts, %d were cached", len(missing),
+                         len(user_ids) - len(missing))
+        return result
+
+    def _cached(self, user_ids: list[int]) -> dict[int, bool]:
+        result = {}
+        now = time.time()
+        with self._lock:
+            for user_id in user_ids:
+                entry = self._cache.get(user_id)
+                if entry is not None and entry[1] > now:
+                    self._cache.move_to_end(user_id)
+                    result[user_id] = entry[0]
+        return result
+
+    def _remember(self, user_ids: list[int], data: dict) -> dict[int, bool]:
+        # Accounts that don't exist (anymore) are returned as null, along with a NOT_FOUND error
+        outcomes = {user_id: node is not None for user_id, node in zip(user_ids, data['nodes'])}
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            for user_id, exists in outcomes.items():
+                self._cache[user_id] = (exists, expires_at)
+                self._cache.move_to_end(user_id)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return outcomes
@@ -0,0 +1,155 @@
+import gzip
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable, Iterator
+
+from .github_archive import GitHubEvent, parse_event
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = 'ghbuster_archive.sqlite'
+INSERT_BATCH_SIZE = 10_000
+
+# Same table and columns as the ClickHouse dataset queried by GitHubArchive, so that simple queries work on both
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS github_events (
+    day TEXT NOT NULL,
+    event_type TEXT NOT NULL,
+    actor_login TEXT NOT NULL,
+    repo_name TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS github_events_partition ON github_events (day, event_type);
+CREATE INDEX IF NOT EXISTS github_events_repo ON github_events (repo_name, event_type, created_at);
+CREATE INDEX IF NOT EXISTS github_events_actor ON github_events (actor_login, event_type, created_at);
+CREATE TABLE IF NOT EXISTS ingested_files (
+    name TEXT PRIMARY KEY,
+    events INTEGER NOT NULL,
+    ingested_at REAL NOT NULL
+);
+"""
+
+
+class ArchiveIndex:
+    """
+    Local index of GH Archive events (https://www.gharchive.org/), built from hourly .json.gz dumps on disk and
+    partitioned by day and event type. It offers the same query interface as GitHubArchive, without network access.
+    Only the fields used by ghbuster are kept, e.g. not the event payloads.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def ingest(self, paths: Iterable[str], event_types: set[str] | None = None) -> int:
+        """
+        Ingest GH Archive dumps, returning the number of new events. Dumps that were already ingested are skipped, so
+        that an interrupted ingestion can be resumed.
+        """
+        return sum(self.ingest_file(path, event_types) for path in paths)
+
+    def ingest_file(self, path: str, event_types: set[str] | None = None) -> int:
+        name = os.path.basename(path)
+        with self._lock:
+            if self._connection.execute("SELECT 1 FROM ingested_files WHERE name = ?", (name,)).fetchone():
+                logger.debug("Skipping %s, already ingested", name)
+                return 0
+
+        count = 0
+        # Events of a dump are committed along with its record, so that a dump is never partially ingested
+        with self._lock, self._connection:
+            batch = []
+            for row in _read_dump(path):
+                if event_types is not None and row[1] not in event_types:
+                    continue
+                batch.append(row)
+                if len(batch) >= INSERT_BATCH_SIZE:
+                    count += self._insert(batch)
+                    batch = []
+            count += self._insert(batch)
+            self._connection.execute("INSERT INTO ingested_files (name, events, ingested_at) VALUES (?, ?, ?)",
+                                     (name, count, time.time()))
+        logger.info("Ingested %d events from %s", count, name)
+        return count
+
+    def query(self, query: str, params: Iterable = (), keep_raw: bool = True) -> Iterable[GitHubEvent]:
+        return list(self.stream(query, params, keep_raw))
+
+    def stream(self, query: str, params: Iterable = (), keep_raw: bool = True) -> Iterator[GitHubEvent]:
+        """
+        Run a SQL query against the github_events table, yielding events as rows are read.
+        """
+        with self._lock:
+            cursor = self._connection.execute(query, tuple(params))
+            columns = [column[0] for column in cursor.description]
+            rows = cursor.fetchmany(INSERT_BATCH_SIZE)
+        while rows:
+            for row in rows:
+                yield parse_event({column: str(value) for column, value in zip(columns, row)}, keep_raw)
+            with self._lock:
+                rows = cursor.fetchmany(INSERT_BATCH_SIZE)
+
+    def repo_events(self, repo_name: str, event_types: Iterable[str] = ()) -> Iterable[GitHubEvent]:
+        """
+        Return the events of a repository (e.g. WatchEvent for stars, ForkEvent), oldest first.
+        """
+        return self._events('repo_name', repo_name, event_types)
+
+    def actor_events(self, actor_login: str, event_types: Iterable[str] = ()) -> Iterable[GitHubEvent]:
+        """
+        Return the events of a user, oldest first.
+        """
+        return self._events('actor_login', actor_login, event_types)
+
+    def ingested_files(self) -> list[str]:
+        with self._lock:
+            return [row[0] for row in self._connection.execute("SELECT name FROM ingested_files ORDER BY name")]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def _events(self, column: str, value: str, event_types: Iterable[str]) -> Iterable[GitHubEvent]:
+        event_types = list(event_types)
+        query = f"SELECT event_type, actor_login, repo_name, created_at FROM github_events WHERE {column} = ?"
+        if event_types:
+            query += f" AND event_type IN ({', '.join('?' * len(event_types))})"
+        return self.query(query + " ORDER BY created_at", [value, *event_types], keep_raw=False)
+
+    def _insert(self, rows: list[tuple[str, str, str, str, str]]) -> int:
+        self._connection.executemany(
+            "INSERT INTO github_events (day, event_type, actor_login, repo_name, created_at) VALUES (?, ?, ?, ?, ?)",
+            rows)
+        return len(rows)
+
+
+def _read_dump(path: str) -> Iterator[tuple[str, str, str, str, str]]:
+    """
+    Stream the events of an hourly GH Archive dump, one JSON object per line.
+    """
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning("Skipping malformed event at %s:%d", path, line_number)
+                continue
+            # Dumps from before 2015 reference the actor by login, and the repository by owner and name
+            actor = event.get('actor') or {}
+            actor_login = actor.get('login', '') if isinstance(actor, dict) else actor
+            repo = event.get('repo') or {}
+            repo_name = repo.get('name')
+            if repo_name is None:
+                repository = event.get('repository') or {}
+                repo_name = f"{repository.get('owner', '')}/{repository.get('name', '')}"
+            # Stored in the same format as the ClickHouse dataset, e.g. '2024-05-01 12:00:00'
+            created_at = event.get('created_at', '').replace('T', ' ').removesuffix('Z')[:19]
+            yield created_at[:10], event.get('type', ''), actor_login, repo_name, created_at
@@ -0,0 +1,143 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Iterable
+
+import aiohttp
+import github
+
+from . import instrumentation, rate_limit_scheduler
+from .github_entity_store import GitHubEntityStore
+from .graphql_profiles import check_graphql_response
+from .rate_limit_scheduler import RateLimitScheduler
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = 'https://api.github.com'
+MAX_CONNECTIONS = 100
+
+MAX_RATE_LIMITED_ATTEMPTS = 5
+
+
+class AsyncGitHubClient:
+    """
+    Asynchronous GraphQL client for the parts of a scan with a high fan-out (stargazer profiles, parents of forks and
+    accounts of commit authors), keeping many queries in flight over a single pooled session instead of one thread per
+    query. Everything else goes through PyGithub.
+
+    Requests share the rate limits of the PyGithub client and are attributed to heuristics like its own ones, but they
+    bypass the HTTP cache: the services calling the client keep their results for the duration of a scan instead.
+    Errors are raised as github.GithubException, so that callers can handle them like PyGithub ones.
+    """
+    # Kinds of fan-out going through the client
+    PROFILES = 'profiles'
+    REPOSITORIES = 'repositories'
+    ACCOUNTS = 'accounts'
+
+    # Maximum number of queries in flight per kind of fan-out, so that one of them can't starve the other ones. GitHub
+    # allows up to 100 concurrent requests per token
+    DEFAULT_LIMITS = {
+        PROFILES: 10,
+        REPOSITORIES: 10,
+        ACCOUNTS: 10,
+    }
+
+    def __init__(self, token: str | None, base_url: str = DEFAULT_BASE_URL, graphql_url: str = None,
+                 scheduler: RateLimitScheduler = None, max_connections: int = MAX_CONNECTIONS,
+                 limits: dict[str, int] = None):
+        self.token = token
+        self.graphql_url = graphql_url or f"{base_url.rstrip('/')}/graphql"
+        self.scheduler = scheduler
+        self.max_connections = max_connections
+        self.limits = {**self.DEFAULT_LIMITS, **(limits or {})}
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+        self._session: aiohttp.ClientSession | None = None
+
+    @staticmethod
+    def for_client(github_client: github.Github | GitHubEntityStore, **kwargs) -> 'AsyncGitHubClient':
+        """
+        Create a client using the same token, API URL and rate limit scheduler as a PyGithub client.
+        """
+        requester = github_client.requester
+        token = getattr(requester.auth, 'token', None)
+        scheduler = getattr(github_client, 'rate_limit_scheduler', None)
+        return AsyncGitHubClient(token, graphql_url=requester.graphql_url, scheduler=scheduler, **kwargs)
+
+    async def __aenter__(self) -> 'AsyncGitHubClient':
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def graphql(self, query: str, variables: dict[str, Any], kind: str) -> dict[str, Any]:
+        data, _ = await self.graphql_with_errors(query, variables, kind)
+        return data
+
+    async def graphql_with_errors(self, query: str, variables: dict[str, Any], kind: str,
+                                  tolerated_error_types: Iterable[str] = ('NOT_FOUND',)) -> tuple[dict[str, Any], list]:
+        """
+        Same as graphql_profiles.execute_graphql_with_errors, bounded by the semaphore of the given kind of fan-out.
+        """
+        async with self._limit(kind):
+            headers, response = await self._request_json('POST', self.graphql_url,
+                                                         body={"query": query, "variables": variables})
+        return check_graphql_response(response, headers, tolerated_error_types)
+
+    def _limit(self, kind: str) -> asyncio.Semaphore:
+        # Semaphores are created lazily, as they must be bound to the running event loop
+        if kind not in self._semaphores:
+            self._semaphores[kind] = asyncio.Semaphore(self.limits[kind])
+        return self._semaphores[kind]
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.max_connections)
+            self._session = aiohttp.ClientSession(connector=connector, headers={
+                'Accept': 'application/vnd.github+json',
+                'User-Agent': 'ghbuster',
+            })
+        return self._session
+
+    async def _request_json(self, method: str, url: str, body: dict[str, Any] = None) -> tuple[dict[str, str], Any]:
+        bucket = rate_limit_scheduler.bucket_for_url(url)
+        attempt = 1
+        while True:
+            token = self.token
+            if self.scheduler is not None:
+                token = await self.scheduler.acquire_async(bucket)
+            headers = {'Authorization': f"token {token}"} if token else {}
+
+            start = time.perf_counter()
+            async with self._get_session().request(method, url, json=body, headers=headers) as response:
+                text = await response.text()
+                status = response.status
+                response_headers = response.headers.copy()
+            instrumentation.record_request(url=url, status=status, latency=time.perf_counter() - start,
+                                           size=len(text.encode()))
+
+            rate_limited = self.scheduler is not None and \
+                self.scheduler.record(token, bucket, status, response_headers, lambda: text)
+            if rate_limited and attempt < MAX_RATE_LIMITED_ATTEMPTS:
+                attempt += 1
+                continue
+            break
+
+        data = _parse_json(text)
+        if status >= 400:
+            message = data.get('message') if isinstance(data, dict) else None
+            exception_class = github.UnknownObjectException if status == 404 else github.GithubException
+            raise exception_class(status, data, dict(response_headers), message)
+        return dict(response_headers), data
+
+
+def _parse_json(text: str) -> Any:
+    try:
+        return json.loads(text) if text else None
+    except json.JSONDecodeError:
+        return {'message': text}
@@ -0,0 +1,413 @@
+import dataclasses
+import itertools
+import logging
+import os
+import re
+import subprocess
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Iterable, Iterator
+
+import github
+
+from .github_entity_store import GitHubEntityStore
+from .graphql_profiles import PAGE_SIZE, execute_graphql
+
+logger = logging.getLogger(__name__)
+
+BRANCHES_QUERY = """
+query($owner: String!, $name: String!, $first: Int!, $after: String) {
+  repository(owner: $owner, name: $name) {
+    defaultBranchRef { name target { oid } }
+    refs(refPrefix: "refs/heads/", first: $first, after: $after) {
+      pageInfo { hasNextPage endCursor }
+      nodes { name target { oid } }
+    }
+  }
+}
+"""
+
+HISTORY_QUERY = """
+query($owner: String!, $name: String!, $ref: String!, $first: Int!, $after: String) {
+  repository(owner: $owner, name: $name) {
+    ref(qualifiedName: $ref) {
+      target {
+        ... on Commit {
+          history(first: $first, after: $after) {
+            pageInfo { hasNextPage endCursor }
+            nodes { oid parents(first: 10) { nodes { oid } } author { name email user { databaseId login } } }
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+
+LINKED_USERS_QUERY = """
+query($owner: String!, $name: String!, {declarations}) {{
+  repository(owner: $owner, name: $name) {{
+{fields}
+  }}
+}}
+"""
+
+DEFAULT_GIT_CACHE_DIR = 'ghbuster_git_cache'
+
+# e.g. 12345+octocat@users.noreply.github.com, which GitHub always links to the user with this ID
+NOREPLY_EMAIL_PATTERN = re.compile(r'^(\d+)\+([a-zA-Z0-9-]+)@users\.noreply\.github\.com$', re.IGNORECASE)
+
+
+@dataclasses.dataclass(frozen=True)
+class CommitRecord:
+    """
+    Authorship of a commit. author_id and author_login identify the GitHub user the author email was linked to when the
+    commit was pushed, and are None for commits from unlinked emails. parents is only filled by the API backends, which
+    need it to walk the history of a branch incrementally.
+    """
+    sha: str
+    author_name: str
+    author_email: str
+    author_id: int | None = None
+    author_login: str | None = None
+    parents: tuple[str, ...] = dataclasses.field(default=(), compare=False)
+
+
+class CommitHistory(ABC):
+    """
+    Retrieves the commits of a repository, each commit being returned once even when it's part of several branches.
+
+    Backends implement list_branches and iter_branch_history, on top of which iter_commits walks the branches of a
+    repository. Branches pointing to a commit that was already seen (e.g. merged branches) are skipped, as their whole
+    history was.
+    """
+    # Whether walking the history is free in terms of API requests, in which case callers don't need to cap the number
+    # of commits they analyze
+    is_local = False
+
+    @staticmethod
+    def for_client(github_client: github.Github | GitHubEntityStore) -> 'CommitHistory':
+        """
+        Return the backend configured for the scan (see GitHubEntityStore), or the GraphQL one.
+        """
+        commit_history = getattr(github_client, 'commit_history', None)
+        if isinstance(commit_history, CommitHistory):
+            return commit_history
+        return GraphQLCommitHistory(github_client)
+
+    def max_commits(self, api_limit: int) -> int | None:
+        """
+        Return the number of commits to analyze, given the limit that applies when commits are retrieved from the API.
+        """
+        return None if self.is_local else api_limit
+
+    @abstractmethod
+    def list_branches(self, repo_full_name: str, all_branches: bool = True) -> list[tuple[str, str | None]]:
+        """
+        Return the name and head commit of the branches of a repository, the default branch first. The head is None
+        for empty branches.
+        """
+        pass
+
+    @abstractmethod
+    def iter_branch_history(self, repo_full_name: str, branch: str,
+                            stop_at: set[str] = frozenset()) -> Iterator[CommitRecord]:
+        """
+        Iterate over the commits of a branch, newest first, leaving out the commits of stop_at (e.g. the heads of the
+        branches when they were last processed) and the commits only reachable through them.
+        """
+        pass
+
+    def iter_commits(self, repo_full_name: str, all_branches: bool = True,
+                     max_commits: int | None = None) -> Iterator[CommitRecord]:
+        """
+        Iterate over the commits of the default branch of a repository, or of all its branches, newest first.
+        """
+        seen = set[str]()
+        for branch, head in self.list_branches(repo_full_name, all_branches):
+            if head is None or head in seen:
+                logger.debug("Skipping branch '%s' of %s, its history was already processed", branch, repo_full_name)
+                continue
+            for commit in self.iter_branch_history(repo_full_name, branch):
+                if commit.sha in seen:
+                    continue
+                seen.add(commit.sha)
+                yield commit
+                if max_commits is not None and len(seen) >= max_commits:
+                    logger.debug("Reached max processing limit of %d commits for %s", max_commits, repo_full_name)
+                    return
+
+
+class GraphQLCommitHistory(CommitHistory):
+    """
+    Retrieves commit authorship through the GraphQL API, in pages of 100 commits including the linked GitHub user,
+    instead of REST pages of 30 commits.
+    """
+
+    def __init__(self, github_client: github.Github | GitHubEntityStore):
+        self.github_client = github_client
+
+    def list_branches(self, repo_full_name: str, all_branches: bool = True) -> list[tuple[str, str | None]]:
+        owner, name = repo_full_name.split('/')
+        branches = []
+        after = None
+        while True:
+            data = execute_graphql(self.github_client, BRANCHES_QUERY,
+                                   {'owner': owner, 'name': name, 'first': PAGE_SIZE, 'after': after})
+            repository = data['repository']
+            if repository is None:
+                raise github.UnknownObjectException(404, data, None, f"Repository {repo_full_name} not found")
+            if not branches:
+                default_ref = repository['defaultBranchRef']
+                if default_ref is None:
+                    # Empty repository
+                    return []
+                # The default branch goes first, so that commits are attributed to it rather than to feature branches
+                branches.append((default_ref['name'], _target_oid(default_ref)))
+                if not all_branches:
+                    return branches
+            branches.extend((ref['name'], _target_oid(ref)) for ref in repository['refs']['nodes']
+                            if ref['name'] != branches[0][0])
+            if not repository['refs']['pageInfo']['hasNextPage']:
+                return branches
+            after = repository['refs']['pageInfo']['endCursor']
+
+    def iter_branch_history(self, repo_full_name: str, branch: str,
+                            stop_at: set[str] = frozenset()) -> Iterator[CommitRecord]:
+        return _exclude_reachable(self._iter_history(repo_full_name, branch), stop_at)
+
+    def _iter_history(self, repo_full_name: str, branch: str) -> Iterator[CommitRecord]:
+        owner, name = repo_full_name.split('/')
+        after = None
+        while True:
+            data = execute_graphql(self.github_client, HISTORY_QUERY, {
+                'owner': owner, 'name': name, 'ref': f"refs/heads/{branch}", 'first': PAGE_SIZE, 'after': after
+            })
+            ref = (data['repository'] or {}).get('ref')
+            if ref is None:
+                # The branch was deleted in the meantime
+                return
+            history = ref['target']['history']
+            for node in history['nodes']:
+                author = node['author'] or {}
+                user = author.get('user') or {}
+                yield CommitRecord(sha=node['oid'], author_name=author.get('name') or '',
+                                   author_email=author.get('email') or '', author_id=user.get('databaseId'),
+                                   author_login=user.get('login'),
+                                   parents=tuple(parent['oid'] for parent in node['parents']['nodes']))
+            if not history['pageInfo']['hasNextPage']:
+                return
+            after = history['pageInfo']['endCursor']
+
+
+class RestCommitHistory(CommitHistory):
+    """
+    Retrieves commit authorship through the REST API.
+    """
+
+    def __init__(self, github_client: github.Github | GitHubEntityStore):
+        self.github_client = github_client
+
+    def list_branches(self, repo_full_name: str, all_branches: bool = True) -> list[tuple[str, str | None]]:
+        repository = self.github_client.get_repo(repo_full_name)
+        if not all_branches:
+            return [(repository.default_branch, repository.get_branch(repository.default_branch).commit.sha)]
+        branches = [(branch.name, branch.commit.sha) for branch in repository.get_branches()]
+        logger.debug("Found %d branches in repository %s", len(branches), repo_full_name)
+        return sorted(branches, key=lambda branch: branch[0] != repository.default_branch)
+
+    def iter_branch_history(self, repo_full_name: str, branch: str,
+                            stop_at: set[str] = frozenset()) -> Iterator[CommitRecord]:
+        return _exclude_reachable(self._iter_history(repo_full_name, branch), stop_at)
+
+    def _iter_history(self, repo_full_name: str, branch: str) -> Iterator[CommitRecord]:
+        for commit in self.github_client.get_repo(repo_full_name).get_commits(sha=branch):
+            yield CommitRecord(sha=commit.sha, author_name=commit.commit.author.name or '',
+                               author_email=commit.commit.author.email or '',
+                               author_id=commit.author.id if commit.author is not None else None,
+                               author_login=commit.author.login if commit.author is not None else None,
+                               parents=tuple(parent.sha for parent in commit.parents))
+
+
+class GitError(Exception):
+    pass
+
+
+class GitCloneCommitHistory(CommitHistory):
+    """
+    Reads commit history from blob-less bare partial clones of repositories, kept in a local cache directory and
+    updated with a fetch on later scans. Git doesn't know which GitHub user an author email is linked to, so it is
+    resolved through the API for a single commit of each email, in batches, except for noreply emails which embed the
+    ID of their user.
+    """
+    is_local = True
+
+    def __init__(self, github_client: github.Github | GitHubEntityStore, cache_dir: str = DEFAULT_GIT_CACHE_DIR,
+                 remote_url: Callable[[str], str] = None):
+        self.github_client = github_client
+        self.cache_dir = cache_dir
+        # URL to clone a repository from, given its full name
+        self.remote_url = remote_url or (lambda full_name: f"https://github.com/{full_name}.git")
+        self._synced = set[str]()
+        # Linked user (ID and login) of each author email, per repository
+        self._linked_users: dict[str, dict[str, tuple[int, str] | None]] = {}
+        self._lock = threading.Lock()
+        self._repo_locks: dict[str, threading.Lock] = {}
+
+    def list_branches(self, repo_full_name: str, all_branches: bool = True) -> list[tuple[str, str | None]]:
+        path = self._sync(repo_full_name)
+        default_branch = (_git(path, 'symbolic-ref', '--quiet', '--short', 'HEAD', check=False) or '').strip()
+        refs = _git(path, 'for-each-ref', '--format=%(refname:short) %(objectname)', 'refs/heads/')
+        branches = [tuple(line.split(' ', 1)) for line in refs.splitlines() if line]
+        branches = [branch for branch in branches if all_branches or branch[0] == default_branch]
+        return sorted(branches, key=lambda branch: branch[0] != default_branch)
+
+    def iter_branch_history(self, repo_full_name: str, branch: str,
+                            stop_at: set[str] = frozenset()) -> Iterator[CommitRecord]:
+        path = self._sync(repo_full_name)
+        # Commits that were garbage collected (e.g. after a force push) are ignored
+        revisions = [f"refs/heads/{branch}"] + (['--ignore-missing', '--not', *sorted(stop_at)] if stop_at else [])
+        yield from self._iter_log(repo_full_name, path, revisions)
+
+    def iter_commits(self, repo_full_name: str, all_branches: bool = True,
+                     max_commits: int | None = None) -> Iterator[CommitRecord]:
+        # A single walk of all branches, rather than one per branch
+        path = self._sync(repo_full_name)
+        if not all_branches and _git(path, 'rev-parse', '--verify', '--quiet', 'HEAD', check=False) is None:
+            # Empty repository
+            return
+        revisions = ['--branches' if all_branches else 'HEAD']
+        if max_commits is not None:
+            revisions.append(f"--max-count={max_commits}")
+        yield from self._iter_log(repo_full_name, path, revisions)
+
+    def _iter_log(self, repo_full_name: str, path: str, revisions: list[str]) -> Iterator[CommitRecord]:
+        lines = _git_lines(path, 'log', '--format=%H%x1f%an%x1f%ae', *revisions)
+        commits = (line.rstrip('\n').split('\x1f') for line in lines)
+        # Authors are linked to GitHub users in batches, while iterating
+        for batch in _batched(commits, PAGE_SIZE):
+            linked_users = self._get_linked_users(repo_full_name, batch)
+            for sha, author_name, author_email in batch:
+                user = linked_users.get(author_email.lower())
+                yield CommitRecord(sha=sha, author_name=author_name, author_email=author_email,
+                                   author_id=user[0] if user else None, author_login=user[1] if user else None)
+
+    def _sync(self, repo_full_name: str) -> str:
+        key = repo_full_name.lower()
+        path = os.path.join(self.cache_dir, f"{key}.git")
+        with self._lock:
+            repo_lock = self._repo_locks.setdefault(key, threading.Lock())
+        with repo_lock:
+            if key in self._synced:
+                return path
+            if os.path.isdir(path):
+                logger.debug("Fetching new commits of %s into %s", repo_full_name, path)
+                _git(path, 'fetch', '--quiet', '--prune', 'origin', '+refs/heads/*:refs/heads/*')
+            else:
+                logger.debug("Cloning %s into %s", repo_full_name, path)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                _git(None, 'clone', '--quiet', '--bare', '--filter=blob:none', self.remote_url(repo_full_name), path)
+            self._synced.add(key)
+        return path
+
+    def _get_linked_users(self, repo_full_name: str,
+                          commits: list[list[str]]) -> dict[str, tuple[int, str] | None]:
+        with self._lock:
+            linked_users = self._linked_users.setdefault(repo_full_name.lower(), {})
+            # One commit per email that wasn't resolved yet
+            to_resolve = {}
+            for sha, _, email in commits:
+                email = email.lower()
+                if email in linked_users or email in to_resolve:
+                    continue
+                noreply_match = NOREPLY_EMAIL_PATTERN.match(email)
+                if noreply_match:
+                    linked_users[email] = (int(noreply_match.group(1)), noreply_match.group(2))
+                else:
+                    to_resolve[email] = sha
+
+        if to_resolve:
+            resolved = self._resolve_linked_users(repo_full_name, list(to_resolve.values()))
+            with self._lock:
+                for email, sha in to_resolve.items():
+                    linked_users[email] = resolved.get(sha)
+        with self._lock:
+            return dict(linked_users)
+
+    def _resolve_linked_users(self, repo_full_name: str, shas: list[str]) -> dict[str, tuple[int, str]]:
+        owner, name = repo_full_name.split('/')
+        variables = {'owner': owner, 'name': name} | {f"c{i}": sha for i, sha in enumerate(shas)}
+        declarations = ', '.join(f"$c{i}: GitObjectID!" for i in range(len(shas)))
+        fields = '\n'.join(f"    c{i}: object(oid: $c{i}) {{ ... on Commit {{ author {{ user {{ databaseId login }} }} }} }}"
+                           for i in range(len(shas)))
+        data = execute_graphql(self.github_client,
+                               LINKED_USERS_QUERY.format(declarations=declarations, fields=fields), variables)
+        repository = data['repository'] or {}
+        linked_users = {}
+        for i, sha in enumerate(shas):
+            user = ((repository.get(f"c{i}") or {}).get('author') or {}).get('user')
+            if user is not None:
+                linked_users[sha] = (user['databaseId'], user['login'])
+        return linked_users
+
+
+def _git(path: str | None, *args: str, check: bool = True) -> str | None:
+    command = ['git'] + (['-C', path] if path else []) + list(args)
+    # Never prompt for credentials, e.g. when a repository doesn't exist anymore
+    env = {**os.environ, 'GIT_TERMINAL_PROMPT': '0'}
+    result = subprocess.run(command, capture_output=True, text=True, env=env)
+    if result.returncode != 0:
+        if check:
+            raise GitError(f"'{' '.join(args[:1])}' failed with exit code {result.returncode}: {result.stderr.strip()}")
+        return None
+    return result.stdout
+
+
+def _git_lines(path: str, *args: str) -> Iterator[str]:
+    """
+    Stream the output of a git command, which can be large for repositories with a deep history.
+    """
+    command = ['git', '-C', path] + list(args)
+    with subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True) as process:
+        yield from process.stdout
+        # Read errors only once the output was consumed, so that the process doesn't block on a full pipe
+        stderr = process.stderr.read()
+    if process.returncode != 0:
+        raise GitError(f"'{args[0]}' failed with exit code {process.returncode}: {stderr.strip()}")
+
+
+def _exclude_reachable(history: Iterator[CommitRecord], stop_at: set[str]) -> Iterator[CommitRecord]:
+    """
+    Filter the history of a branch as listed by the API, which is ordered by date rather than by ancestry: the commits
+    of a merged branch can come after the previous head of the branch, so the walk can't end there. Instead, it
+    follows the parents of the commits it yields, and ends once all of them were reached. The API lists commits
+    before their parents.
+    """
+    if not stop_at:
+        yield from history
+        return
+    pending = None
+    for commit in history:
+        if pending is None:
+            # The head of the branch
+            pending = {commit.sha}
+        elif commit.sha not in pending:
+            # Only reachable through commits of stop_at
+            continue
+        pending.remove(commit.sha)
+        if commit.sha not in stop_at:
+            yield commit
+            pending.update(commit.parents)
+        if not pending:
+            return
+
+
+def _batched(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+def _target_oid(ref: dict[str, Any]) -> str | None:
+    return (ref.get('target') or {}).get('oid')
@@ -0,0 +1,213 @@
+import dataclasses
+import logging
+import sqlite3
+import threading
+import time
+from typing import Iterator
+
+from .commit_history import CommitHistory, CommitRecord
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = 'ghbuster_commits.sqlite'
+
+# Commits of the default branch and of all branches are indexed separately, as callers expect either
+DEFAULT_BRANCH_SCOPE = 'default'
+ALL_BRANCHES_SCOPE = 'all'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS indexed_repositories (
+    repo TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    complete INTEGER NOT NULL,
+    max_position INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (repo, scope)
+);
+CREATE TABLE IF NOT EXISTS branch_heads (
+    repo TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    branch TEXT NOT NULL,
+    head TEXT NOT NULL,
+    PRIMARY KEY (repo, scope, branch)
+);
+CREATE TABLE IF NOT EXISTS commits (
+    repo TEXT NOT NULL,
+    scope TEXT NOT NULL,
+    sha TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    author_name TEXT NOT NULL,
+    author_email TEXT NOT NULL,
+    author_id INTEGER,
+    author_login TEXT,
+    PRIMARY KEY (repo, scope, sha)
+);
+CREATE INDEX IF NOT EXISTS commits_position ON commits (repo, scope, position);
+"""
+
+
+@dataclasses.dataclass
+class IndexState:
+    # Head of each branch when it was last processed
+    heads: dict[str, str]
+    # Whether the whole history was indexed, rather than only the most recent commits
+    complete: bool
+    size: int
+    max_position: int
+
+
+class CommitIndex:
+    """
+    Persistent index of the commits of repositories, along with the head of each branch when it was last processed, so
+    that later scans only need to retrieve new commits. Commits never change once written, so entries don't expire.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def get_state(self, repo: str, scope: str) -> IndexState | None:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT complete, max_position FROM indexed_repositories WHERE repo = ? AND scope = ?",
+                (repo, scope)).fetchone()
+            if row is None:
+                return None
+            heads = dict(self._connection.execute(
+                "SELECT branch, head FROM branch_heads WHERE repo = ? AND scope = ?", (repo, scope)).fetchall())
+            size = self._connection.execute(
+                "SELECT COUNT(*) FROM commits WHERE repo = ? AND scope = ?", (repo, scope)).fetchone()[0]
+        return IndexState(heads=heads, complete=bool(row[0]), size=size, max_position=row[1])
+
+    def iter_commits(self, repo: str, scope: str) -> Iterator[CommitRecord]:
+        """
+        Iterate over the indexed commits of a repository, most recently indexed first.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT sha, author_name, author_email, author_id, author_login FROM commits "
+                "WHERE repo = ? AND scope = ? ORDER BY position DESC", (repo, scope)).fetchall()
+        for row in rows:
+            yield CommitRecord(*row)
+
+    def update(self, repo: str, scope: str, heads: dict[str, str], commits: list[CommitRecord], complete: bool,
+               replace: bool = False):
+        """
+        Record the new commits of a repository (newest first) and the heads of its branches. With replace, previously
+        indexed commits are discarded.
+        """
+        with self._lock, self._connection:
+            if replace:
+                for table in ['indexed_repositories', 'branch_heads', 'commits']:
+                    self._connection.execute(f"DELETE FROM {table} WHERE repo = ? AND scope = ?", (repo, scope))
+            row = self._connection.execute(
+                "SELECT max_position FROM indexed_repositories WHERE repo = ? AND scope = ?", (repo, scope)).fetchone()
+            max_position = (row[0] if row else 0) + len(commits)
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO commits (repo, scope, sha, position, author_name, author_email, author_id, "
+                "author_login) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(repo, scope, commit.sha, max_position - i, commit.author_name, commit.author_email, commit.author_id,
+                  commit.author_login) for i, commit in enumerate(commits)])
+            self._connection.execute("DELETE FROM branch_heads WHERE repo = ? AND scope = ?", (repo, scope))
+            self._connection.executemany(
+                "INSERT INTO branch_heads (repo, scope, branch, head) VALUES (?, ?, ?, ?)",
+                [(repo, scope, branch, head) for branch, head in heads.items()])
+            self._connection.execute(
+                "INSERT OR REPLACE INTO indexed_repositories (repo, scope, complete, max_position, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)", (repo, scope, int(complete), max_position, time.time()))
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+class IndexedCommitHistory(CommitHistory):
+    """
+    Commit history backed by a CommitIndex: only the commits pushed since the previous scan of a repository are
+    retrieved from the wrapped backend, by walking each branch down to its previously processed head.
+    """
+
+    def __init__(self, backend: CommitHistory, index: CommitIndex):
+        self.backend = backend
+        self.index = index
+        self.is_local = backend.is_local
+        self._lock = threading.Lock()
+        self._repo_locks: dict[tuple[str, str], threading.Lock] = {}
+
+    def list_branches(self, repo_full_name: str, all_branches: bool = True) -> list[tuple[str, str | None]]:
+        return self.backend.list_branches(repo_full_name, all_branches)
+
+    def iter_branch_history(self, repo_full_name: str, branch: str,
+                            stop_at: set[str] = frozenset()) -> Iterator[CommitRecord]:
+        return self.backend.iter_branch_history(repo_full_name, branch, stop_at)
+
+    def iter_commits(self, repo_full_name: str, all_branches: bool = True,
+                     max_commits: int | None = None) -> Iterator[CommitRecord]:
+        repo = repo_full_name.lower()
+        scope = ALL_BRANCHES_SCOPE if all_branches else DEFAULT_BRANCH_SCOPE
+        with self._lock:
+            repo_lock = self._repo_locks.setdefault((repo, scope), threading.Lock())
+        # Concurrent scans of the same repository wait for the first one to update the index
+        with repo_lock:
+            new_commits = self._update(repo_full_name, repo, scope, all_branches, max_commits)
+
+        seen = set[str]()
+        for commit in new_commits:
+            seen.add(commit.sha)
+            yield commit
+        for commit in self.index.iter_commits(repo, scope):
+            if max_commits is not None and len(seen) >= max_commits:
+                return
+            if commit.sha not in seen:
+                seen.add(commit.sha)
+                yield commit
+
+    def _update(self, repo_full_name: str, repo: str, scope: str, all_branches: bool,
+                max_commits: int | None) -> list[CommitRecord]:
+        state = self.index.get_state(repo, scope)
+        # Walking down to previous heads is enough if the index holds the whole history, or at least as many commits as
+        # requested
+        incremental = state is not None and (state.complete or (max_commits is not None and state.size >= max_commits))
+        stop_at = set(state.heads.values()) if incremental else set()
+        if incremental and not self.backend.is_local:
+            # API backends list commits by date, and follow parents to leave out the history of previous heads: the
+            # walk needs to end on any indexed commit, e.g. the one a merged branch was created from
+            stop_at.update(commit.sha for commit in self.index.iter_commits(repo, scope))
+        heads = dict(state.heads) if incremental else {}
+
+        new_commits = []
+        seen = set[str]()
+        truncated = False
+        branches = self.backend.list_branches(repo_full_name, all_branches)
+        for branch, head in branches:
+            if truncated:
+                break
+            if head is None:
+                continue
+            if head in seen or head in stop_at:
+                heads[branch] = head
+                continue
+            for commit in self.backend.iter_branch_history(repo_full_name, branch, stop_at=stop_at):
+                if commit.sha in seen:
+                    continue
+                seen.add(commit.sha)
+                new_commits.append(commit)
+                if max_commits is not None and len(new_commits) >= max_commits:
+                    # Older commits of this branch aren't indexed, but they would be older than the ones requested
+                    truncated = True
+                    break
+            heads[branch] = head
+            if incremental and not self.backend.is_local:
+                stop_at.update(seen)
+
+        if not truncated:
+            # Forget deleted branches
+            branch_names = {branch for branch, _ in branches}
+            heads = {branch: head for branch, head in heads.items() if branch in branch_names}
+        complete = not truncated and (state.complete if incremental else True)
+        self.index.update(repo, scope, heads, new_commits, complete, replace=not incremental)
+        logger.debug("Indexed %d new commits of %s (%s)", len(new_commits), repo_full_name,
+                     "incrementally" if incremental else "from scratch")
+        return new_commits
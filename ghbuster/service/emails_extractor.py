@@ -1,11 +1,9 @@
-import functools
 import logging
 
 import github
-from github.Commit import Commit
-from github.NamedUser import NamedUser
-from github.Repository import Repository
 
+from .account_existence import AccountExistenceService
+from .commit_history import CommitHistory, CommitRecord
 from .. import TargetSpec, TargetType
 
 logger = logging.getLogger(__name__)
@@ -31,20 +29,23 @@ class EmailResult:
 class GitHubCommitEmailExtractor:
     def __init__(self, github_client: github.Github, target_spec: TargetSpec, include_forks: bool = False,
                  include_emails_linked_to_other_users: bool = False, include_unlinked_emails: bool = True,
-                 max_commits_to_analyze_per_repo: int = 100):
+                 max_commits_to_analyze_per_repo: int = 100, commit_history: CommitHistory = None):
         self.github_client = github_client
         self.target_spec = target_spec
         self.include_forks = include_forks
         self.include_emails_linked_to_other_users = include_emails_linked_to_other_users
         self.include_unlinked_emails = include_unlinked_emails
-        self.max_commits_to_analyze_per_repo = max_commits_to_analyze_per_repo
+        self.commit_history = commit_history or CommitHistory.for_client(github_client)
+        # The limit only applies when commits are retrieved from the API
+        self.max_commits_to_analyze_per_repo = self.commit_history.max_commits(max_commits_to_analyze_per_repo)
+        self.account_existence = AccountExistenceService.for_client(github_client)
+        self._current_user_id = None
 
     def find_emails(self) -> set[EmailResult]:
         emails = set[EmailResult]()
 
         if self.target_spec.target_type == TargetType.REPOSITORY:
-            repo = self.github_client.get_repo(self.target_spec.repo_full_name())
-            emails = self._find_emails_from_repository(repo)
+            emails = self._find_emails_from_repository(self.target_spec.repo_full_name())
         elif self.target_spec.target_type == TargetType.USER:
             user = self.github_client.get_user(self.target_spec.username)
             repos = user.get_repos(type='owner')
@@ -53,61 +54,44 @@ class GitHubCommitEmailExtractor:
                 if repo.fork and not self.include_forks:
                     logger.debug("Skipping forked repository %s", repo.full_name)
                     continue
-                repo_emails = self._find_emails_from_repository(repo)
+                repo_emails = self._find_emails_from_repository(repo.full_name)
                 emails.update(repo_emails)
 
         return emails
 
-    def _find_emails_from_repository(self, repository: github.Repository) -> set[EmailResult]:
-        logger.debug("Identifying emails from repository %s", repository.full_name)
+    def _find_emails_from_repository(self, repo_full_name: str) -> set[EmailResult]:
+        logger.debug("Identifying emails from repository %s", repo_full_name)
         emails = set[EmailResult]()
-        branches = repository.get_branches()
-        logger.debug("Found %d branches in repository %s", branches.totalCount, repository.full_name)
-        num_commits_processed = 0
-        for branch in branches:
-            commits = repository.get_commits(sha=branch.name)
-            logger.debug("Processing branch '%s' with %d commits", branch.name, commits.totalCount)
-            for commit in commits:
-                if num_commits_processed > self.max_commits_to_analyze_per_repo:
-                    logger.debug("Reached max processing limit of %d commits per repo for %s, going to the next one",
-                                 self.max_commits_to_analyze_per_repo, repository.full_name)
-                    return emails
-                num_commits_processed += 1
-                is_commit_linked_to_user: bool
-                if commit.author is None or self.commit_linked_to_taken_down_user(commit.author):
-                    is_commit_linked_to_user = False
-                    if not self.include_unlinked_emails:
-                        logger.debug("Skipping commit %s (no Git authorship information)", commit.sha[:6])
-                        continue
-                else:
-                    is_commit_linked_to_user = True
-                    if not self.is_commit_by_current_user(commit) and not self.include_emails_linked_to_other_users:
-                        logger.debug("Skipping commit %s by Git author %s (linked to another user %s)", commit.sha[:6],
-                                     commit.commit.author.email, commit.author.login)
-                        continue
-
-                emails.add(
-                    EmailResult(email=commit.commit.author.email.lower(), is_linked_to_user=is_commit_linked_to_user))
+        commits = list(self.commit_history.iter_commits(repo_full_name, all_branches=True,
+                                                        max_commits=self.max_commits_to_analyze_per_repo))
+        # We know these commits are linked to specific GitHub users, i.e. the git metadata email was linked to a specific user at the time of the commit
+        # In some cases, the associated user doesn't exist anymore (e.g. taken down), so we consider the email as "currently unlinked" in this case
+        # (like we'd see in the GitHub UI that the username is not clickable)
+        existing_authors = self.account_existence.users_exist(
+            commit.author_id for commit in commits if commit.author_id is not None)
+        for commit in commits:
+            is_commit_linked_to_user: bool
+            if commit.author_id is None or not existing_authors[commit.author_id]:
+                is_commit_linked_to_user = False
+                if not self.include_unlinked_emails:
+                    logger.debug("Skipping commit %s (no Git authorship information)", commit.sha[:6])
+                    continue
+            else:
+                is_commit_linked_to_user = True
+                if not self.is_commit_by_current_user(commit) and not self.include_emails_linked_to_other_users:
+                    logger.debug("Skipping commit %s by Git author %s (linked to another user %s)", commit.sha[:6],
+                                 commit.author_email, commit.author_login)
+                    continue
+
+            emails.add(EmailResult(email=commit.author_email.lower(), is_linked_to_user=is_commit_linked_to_user))
 
         return emails
 
-    def is_commit_by_current_user(self, commit: Commit) -> bool:
+    def is_commit_by_current_user(self, commit: CommitRecord) -> bool:
         # Note: we need to compare author user ID and not only usernames, because sometimes users get renamed
-        current_user = self.github_client.get_user(self.target_spec.username)
-        return commit.author.id == current_user.id
-
-    @functools.cache
-    def commit_linked_to_taken_down_user(self, author: NamedUser) -> bool:
-        # We know the commit is linked to a specific GitHub user, i.e. the git metadata email was linked to a specific user at the time of the commit
-        # In some cases, the associated user doesn't exist anymore (e.g. taken down), so we consider the email as "currently unlinked" in this case
-        # (like we'd see in the GitHub UI that the username is not clickable)
-        try:
-            self.github_client.get_user_by_id(author.id)
-            return False  # no exception, the user exists
-        except github.GithubException as e:
-            if e.status == 404:
-                return True
-            raise e
+        if self._current_user_id is None:
+            self._current_user_id = self.github_client.get_user(self.target_spec.username).id
+        return commit.author_id == self._current_user_id
 
 
 """
@@ -1,12 +1,15 @@
 import dataclasses
 import datetime
+import json
 import logging
-from typing import Iterable
+from typing import Iterable, Iterator
 
 import requests
 
 logger = logging.getLogger(__name__)
 
+CLICKHOUSE_URL = "https://play.clickhouse.com/"
+
 
 @dataclasses.dataclass
 class GitHubEvent:
@@ -26,28 +29,55 @@ class GitHubEvent:
 
 
 class GitHubArchive:
-    def __init__(self):
+    def __init__(self, url: str = CLICKHOUSE_URL):
+        self.url = url
         self.session = requests.Session()
         self.session.headers['User-Agent'] = 'ghbuster'
 
-    def query(self, query: str) -> Iterable[GitHubEvent]:
-        url = "https://play.clickhouse.com/"
+    def query(self, query: str, keep_raw: bool = True) -> Iterable[GitHubEvent]:
         url_params = {
             'user': 'explorer',
             'default_format': 'JSONStrings',
         }
-        response = self.session.post(url, params=url_params, data=query)
+        response = self.session.post(self.url, params=url_params, data=query)
         response.raise_for_status()
         data = response.json().get('data', [])
         logger.debug("Query executed successfully, received %d rows", len(data))
-        result = []
-        for row in data:
-            result.append(GitHubEvent(
-                event_type=row.get('event_type', None),
-                actor_login=row.get('actor_login', None),
-                repo_name=row.get('repo_name', None),
-                created_at=datetime.datetime.fromisoformat(row.get('created_at', '')),
-                _raw=row
-            ))
-
-        return result
+        return [parse_event(row, keep_raw) for row in data]
+
+    def stream(self, query: str, keep_raw: bool = True) -> Iterator[GitHubEvent]:
+        """
+        Like query, but rows are requested one JSON object per line and parsed as they arrive, so that memory stays
+        bounded regardless of the number of events. Aggregate-only queries can pass keep_raw=False to only keep the
+        event fields.
+        """
+        url_params = {
+            'user': 'explorer',
+            'default_format': 'JSONStringsEachRow',
+        }
+        with self.session.post(self.url, params=url_params, data=query, stream=True) as response:
+            response.raise_for_status()
+            count = 0
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    # ClickHouse reports errors happening after the response started as plain text
+                    raise ValueError(f"Unexpected line in the ClickHouse response: {line[:200]!r}") from None
+                count += 1
+                yield parse_event(row, keep_raw)
+            logger.debug("Query executed successfully, streamed %d rows", count)
+
+
+def parse_event(row: dict[str, str], keep_raw: bool) -> GitHubEvent:
+    created_at = row.get('created_at')
+    return GitHubEvent(
+        event_type=row.get('event_type', None),
+        actor_login=row.get('actor_login', None),
+        repo_name=row.get('repo_name', None),
+        # Aggregate queries don't necessarily select the creation date
+        created_at=datetime.datetime.fromisoformat(created_at) if created_at else None,
+        _raw=row if keep_raw else {}
+    )
@@ -0,0 +1,318 @@
+import collections
+import functools
+import itertools
+import logging
+import threading
+from typing import Any, Callable, Iterable
+
+import github
+
+logger = logging.getLogger(__name__)
+
+# Errors that are a property of the entity itself (e.g. a taken down user or repository) rather than a transient
+# failure, and can therefore be remembered for the duration of a scan
+CACHEABLE_ERROR_STATUSES = {404, 410, 451}
+
+
+def _is_cacheable_error(e: github.GithubException) -> bool:
+    if e.status in CACHEABLE_ERROR_STATUSES:
+        return True
+    # Repository disabled due to a breach of ToS
+    return e.status == 403 and e.message == 'Repository access blocked'
+
+
+class EntityStoreStats:
+    def __init__(self):
+        self.fetched = collections.Counter()
+        self.reused = collections.Counter()
+        # Stats can be shared by several stores (see GitHubEntityStore.renewed)
+        self._lock = threading.Lock()
+
+    def count(self, counter: collections.Counter, kind: str):
+        with self._lock:
+            counter[kind] += 1
+
+    @property
+    def requests_saved(self) -> int:
+        return sum(self.reused.values())
+
+    def __repr__(self):
+        reused = ', '.join(f"{kind}: {count}" for kind, count in sorted(self.reused.items()))
+        return f"{sum(self.fetched.values())} entities fetched, {self.requests_saved} requests saved ({reused or 'none'})"
+
+
+class SharedListing:
+    """
+    Thread-safe view over a PyGithub paginated list, so that heuristics running concurrently can iterate the same
+    listing without fetching its pages twice.
+    """
+
+    def __init__(self, listing: Any):
+        self._listing = listing
+        self._source = None
+        self._elements = []
+        self._exhausted = False
+        self._lock = threading.Lock()
+
+    def __iter__(self):
+        index = 0
+        while True:
+            with self._lock:
+                if index >= len(self._elements):
+                    if self._exhausted:
+                        return
+                    if self._source is None:
+                        self._source = iter(self._listing)
+                    try:
+                        self._elements.append(next(self._source))
+                    except StopIteration:
+                        self._exhausted = True
+                        return
+                element = self._elements[index]
+            yield element
+            index += 1
+
+    def __getitem__(self, index: int | slice):
+        if isinstance(index, slice):
+            return list(itertools.islice(self, index.start, index.stop, index.step))
+        if index < 0:
+            return list(self)[index]
+        try:
+            return next(itertools.islice(self, index, None))
+        except StopIteration:
+            raise IndexError(index)
+
+    @property
+    def totalCount(self) -> int:
+        with self._lock:
+            return self._listing.totalCount
+
+    def __getattr__(self, name: str):
+        return getattr(self._listing, name)
+
+
+class CountedListing:
+    """
+    Listing whose size is already known (e.g. from a profile snapshot), only fetched if it is actually iterated.
+    """
+
+    def __init__(self, total_count: int, fetch: Callable[[], Any]):
+        self.totalCount = total_count
+        self._fetch = fetch
+        self._listing = None
+
+    def _get_listing(self):
+        if self._listing is None:
+            self._listing = self._fetch()
+        return self._listing
+
+    def __iter__(self):
+        return iter(self._get_listing())
+
+    def __getitem__(self, index: int | slice):
+        return self._get_listing()[index]
+
+    def __getattr__(self, name: str):
+        return getattr(self._get_listing(), name)
+
+
+class SnapshotBackedUser:
+    """
+    NamedUser look-alike answering from a profile snapshot (see graphql_profiles.UserProfileSnapshot), and only
+    fetching the full user for attributes the snapshot doesn't have.
+    """
+    COUNTED_LISTINGS = {
+        'get_followers': 'followers',
+        'get_following': 'following',
+        'get_starred': 'starred_repositories',
+    }
+
+    def __init__(self, snapshot: Any, fetch_user: Callable[[], Any]):
+        self._snapshot = snapshot
+        self._fetch_user = fetch_user
+        self._user = None
+        self._lock = threading.Lock()
+
+    def _full_user(self):
+        with self._lock:
+            if self._user is None:
+                self._user = self._fetch_user()
+            return self._user
+
+    def __getattr__(self, name: str):
+        if name in self.COUNTED_LISTINGS:
+            total_count = getattr(self._snapshot, self.COUNTED_LISTINGS[name])
+            return lambda: CountedListing(total_count, lambda: getattr(self._full_user(), name)())
+        if hasattr(self._snapshot, name):
+            return getattr(self._snapshot, name)
+        return getattr(self._full_user(), name)
+
+    def __repr__(self):
+        return f"SnapshotBackedUser(login={self._snapshot.login!r})"
+
+
+class _MemoizingProxy:
+    """
+    Delegates to a PyGithub object, and returns the same listing every time one of MEMOIZED_METHODS is called with the
+    same arguments. Listings keep the pages they already fetched, so iterating them again is free.
+    """
+    MEMOIZED_METHODS: frozenset[str] = frozenset()
+    KIND: str = 'entity'
+
+    def __init__(self, store: 'GitHubEntityStore', wrapped: Any):
+        self._store = store
+        self._wrapped = wrapped
+        self._listings: dict[tuple, Any] = {}
+
+    def __getattr__(self, name: str):
+        if name in self.MEMOIZED_METHODS:
+            return functools.partial(self._memoized_call, name)
+        return getattr(self._wrapped, name)
+
+    def _memoized_call(self, method_name: str, *args, **kwargs):
+        try:
+            key = (method_name, args, tuple(sorted(kwargs.items())))
+            hash(key)
+        except TypeError:
+            return getattr(self._wrapped, method_name)(*args, **kwargs)
+        return self._store._get_or_fetch(self._listings, key, f"{self.KIND}_listing",
+                                         lambda: SharedListing(getattr(self._wrapped, method_name)(*args, **kwargs)))
+
+    def __repr__(self):
+        return repr(self._wrapped)
+
+
+class CachedNamedUser(_MemoizingProxy):
+    MEMOIZED_METHODS = frozenset({'get_repos', 'get_starred', 'get_followers', 'get_following'})
+    KIND = 'user'
+
+
+class CachedRepository(_MemoizingProxy):
+    MEMOIZED_METHODS = frozenset({'get_stargazers', 'get_stargazers_with_dates', 'get_forks', 'get_branches',
+                                  'get_commits'})
+    KIND = 'repo'
+
+
+class GitHubEntityStore:
+    """
+    Scan-scoped wrapper around a GitHub client, fetching each user, repository and listing at most once.
+
+    It exposes the subset of the github.Github interface used by heuristics, so it can be handed to
+    MetadataHeuristic.run in place of the client. Any other attribute is delegated to the wrapped client.
+    It is safe to share between threads: concurrent lookups of the same entity result in a single request.
+    """
+
+    def __init__(self, github_client: github.Github, verdict_store: Any = None, rate_limit_scheduler: Any = None,
+                 commit_history: Any = None):
+        self.github_client = github_client
+        # Persistent store of user heuristic verdicts (see verdict_store.VerdictStore), if any
+        self.verdict_store = verdict_store
+        # Scheduler installed on the client (see rate_limit_scheduler.RateLimitScheduler), if any, so that other HTTP
+        # clients of the scan can share the same rate limits
+        self.rate_limit_scheduler = rate_limit_scheduler
+        # Backend retrieving the commits of repositories (see commit_history.CommitHistory), if not the GraphQL API
+        self.commit_history = commit_history
+        self.stats = EntityStoreStats()
+        self._users_by_login: dict[str, Any] = {}
+        self._users_by_id: dict[int, Any] = {}
+        self._repos: dict[str | int, Any] = {}
+        self._searches: dict[str, Any] = {}
+        self._services: dict[type, Any] = {}
+        self._lock = threading.Lock()
+        self._key_locks: dict[tuple, threading.Lock] = {}
+
+    def __getattr__(self, name: str):
+        return getattr(self.github_client, name)
+
+    def get_user(self, login: str = None):
+        if login is None:
+            # Authenticated user, only used to validate the token
+            return self.github_client.get_user()
+
+        def fetch():
+            user = CachedNamedUser(self, self.github_client.get_user(login))
+            self._index_user_by_id(user)
+            return user
+
+        return self._get_or_fetch(self._users_by_login, login.lower(), 'user', fetch)
+
+    def get_user_by_id(self, user_id: int):
+        def fetch():
+            user = CachedNamedUser(self, self.github_client.get_user_by_id(user_id))
+            self._users_by_login.setdefault(user.login.lower(), user)
+            return user
+
+        return self._get_or_fetch(self._users_by_id, user_id, 'user', fetch)
+
+    def get_repo(self, full_name_or_id: str | int):
+        key = full_name_or_id.lower() if isinstance(full_name_or_id, str) else full_name_or_id
+        return self._get_or_fetch(self._repos, key, 'repo',
+                                  lambda: CachedRepository(self, self.github_client.get_repo(full_name_or_id)))
+
+    def search_issues(self, query: str, *args, **kwargs):
+        if args or kwargs:
+            return self.github_client.search_issues(query, *args, **kwargs)
+        return self._get_or_fetch(self._searches, query, 'search', lambda: self.github_client.search_issues(query))
+
+    def seed_users(self, profiles: Iterable[Any]):
+        """
+        Make user profiles retrieved in bulk (e.g. through the GraphQL API) available to get_user and get_user_by_id.
+        Users that were already fetched are left untouched.
+        """
+        for profile in profiles:
+            fetch_user = functools.partial(self.github_client.get_user, profile.login, lazy=True)
+            user = CachedNamedUser(self, SnapshotBackedUser(profile, fetch_user))
+            with self._lock:
+                self._users_by_login.setdefault(profile.login.lower(), user)
+                self._users_by_id.setdefault(profile.id, user)
+
+    def renewed(self) -> 'GitHubEntityStore':
+        """
+        Return an empty store sharing the client, verdict store, commit history and stats of this one, so that
+        long-running scans can drop the entities they retrieved so far.
+        """
+        store = GitHubEntityStore(self.github_client, verdict_store=self.verdict_store,
+                                  commit_history=self.commit_history)
+        store.stats = self.stats
+        return store
+
+    def shared_service(self, service_class: type):
+        """
+        Return the instance of a service (e.g. GitHubProfileFetcher) shared by all heuristics of the scan.
+        """
+        with self._lock:
+            if service_class not in self._services:
+                self._services[service_class] = service_class(self)
+            return self._services[service_class]
+
+    def _index_user_by_id(self, user: CachedNamedUser):
+        user_id = user.id
+        if isinstance(user_id, int):
+            self._users_by_id.setdefault(user_id, user)
+
+    def _get_or_fetch(self, cache: dict, key, kind: str, fetch: Callable[[], Any]):
+        with self._lock:
+            key_lock = self._key_locks.setdefault((id(cache), key), threading.Lock())
+
+        # Threads looking up the same entity wait for the first one to fetch it
+        with key_lock:
+            if key in cache:
+                self._count(self.stats.reused, kind)
+                cached = cache[key]
+                if isinstance(cached, github.GithubException):
+                    raise cached
+                return cached
+
+            try:
+                value = fetch()
+            except github.GithubException as e:
+                if _is_cacheable_error(e):
+                    cache[key] = e
+                    self._count(self.stats.fetched, kind)
+                raise
+            cache[key] = value
+            self._count(self.stats.fetched, kind)
+            return value
+
+    def _count(self, counter: collections.Counter, kind: str):
+        self.stats.count(counter, kind)
@@ -0,0 +1,349 @@
+import dataclasses
+import datetime
+import logging
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Iterable
+
+import github
+
+from .github_entity_store import GitHubEntityStore
+
+if TYPE_CHECKING:
+    # The asynchronous client relies on the GraphQL helpers of this module
+    from .async_github import AsyncGitHubClient
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 100
+
+# Fields mirroring the attributes of a REST NamedUser that heuristics read
+PROFILE_FIELDS = """
+fragment ProfileFields on User {
+  databaseId
+  id
+  login
+  name
+  company
+  bio
+  location
+  createdAt
+  updatedAt
+  followers { totalCount }
+  following { totalCount }
+  starredRepositories { totalCount }
+  repositories(ownerAffiliations: OWNER, privacy: PUBLIC) { totalCount }
+  forks: repositories(ownerAffiliations: OWNER, privacy: PUBLIC, isFork: true) { totalCount }
+}
+"""
+
+STARGAZERS_QUERY = """
+query($owner: String!, $name: String!, $first: Int!, $after: String) {
+  repository(owner: $owner, name: $name) {
+    stargazers(first: $first, after: $after) {
+      totalCount
+      pageInfo { hasNextPage endCursor }
+      edges { starredAt node { ...ProfileFields } }
+    }
+  }
+}
+""" + PROFILE_FIELDS
+
+# Only the dates of the stars, which is much lighter than retrieving profiles when analyzing all stars of a repository
+STAR_DATES_QUERY = """
+query($owner: String!, $name: String!, $first: Int!, $after: String) {
+  repository(owner: $owner, name: $name) {
+    stargazers(first: $first, after: $after, orderBy: {field: STARRED_AT, direction: DESC}) {
+      totalCount
+      pageInfo { hasNextPage endCursor }
+      edges { starredAt }
+    }
+  }
+}
+"""
+
+FOLLOWERS_QUERY = """
+query($login: String!, $first: Int!, $after: String) {
+  user(login: $login) {
+    followers(first: $first, after: $after) {
+      totalCount
+      pageInfo { hasNextPage endCursor }
+      nodes { ...ProfileFields }
+    }
+  }
+}
+""" + PROFILE_FIELDS
+
+
+def parse_github_datetime(value: str | None) -> datetime.datetime | None:
+    if value is None:
+        return None
+    # Python 3.10 doesn't understand the 'Z' suffix
+    return datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def execute_graphql(github_client: github.Github | GitHubEntityStore, query: str,
+                    variables: dict[str, Any]) -> dict[str, Any]:
+    data, _ = execute_graphql_with_errors(github_client, query, variables)
+    return data
+
+
+def execute_graphql_with_errors(github_client: github.Github | GitHubEntityStore, query: str, variables: dict[str, Any],
+                                tolerated_error_types: Iterable[str] = ('NOT_FOUND',),
+                                request_headers: dict[str, str] = None) -> tuple[dict[str, Any], list]:
+    """
+    Run a GraphQL query, returning its data along with the errors of the tolerated types (e.g. to tell which aliased
+    fields couldn't be resolved). Any other error is raised.
+    """
+    requester = github_client.requester
+    headers, response = requester.requestJsonAndCheck("POST", requester.graphql_url, headers=request_headers,
+                                                      input={"query": query, "variables": variables})
+    return check_graphql_response(response, headers, tolerated_error_types)
+
+
+def check_graphql_response(response: dict[str, Any], headers: dict[str, Any] | None,
+                           tolerated_error_types: Iterable[str] = ('NOT_FOUND',)) -> tuple[dict[str, Any], list]:
+    """
+    Split a GraphQL response into its data and the errors of the tolerated types, raising any other error.
+    """
+    # Users or repositories that don't exist are returned as null along with a NOT_FOUND error, which we tolerate
+    tolerated_errors = [e for e in response.get('errors', []) if e.get('type') in tolerated_error_types]
+    errors = [e for e in response.get('errors', []) if e.get('type') not in tolerated_error_types]
+    if errors:
+        raise github.GithubException(400, response, headers, errors[0].get('message'))
+    return response['data'], tolerated_errors
+
+
+@dataclasses.dataclass(frozen=True)
+class UserProfileSnapshot:
+    """
+    Profile of a GitHub user retrieved through the GraphQL API. Attribute names match the ones of a REST NamedUser.
+    """
+    id: int
+    node_id: str
+    login: str
+    name: str | None
+    company: str | None
+    bio: str | None
+    location: str | None
+    created_at: datetime.datetime
+    updated_at: datetime.datetime
+    followers: int
+    following: int
+    starred_repositories: int
+    public_repos: int
+    public_forks: int
+    # Only set when the snapshot was retrieved as a stargazer
+    starred_at: datetime.datetime | None = None
+
+    @staticmethod
+    def from_graphql(node: dict[str, Any], starred_at: str | None = None) -> 'UserProfileSnapshot':
+        def optional(field: str) -> str | None:
+            # Unset profile fields are returned as empty strings by the GraphQL API, but as null by the REST API
+            return node.get(field) or None
+
+        return UserProfileSnapshot(
+            id=node['databaseId'],
+            node_id=node['id'],
+            login=node['login'],
+            name=optional('name'),
+            company=optional('company'),
+            bio=optional('bio'),
+            location=optional('location'),
+            created_at=parse_github_datetime(node['createdAt']),
+            updated_at=parse_github_datetime(node['updatedAt']),
+            followers=node['followers']['totalCount'],
+            following=node['following']['totalCount'],
+            starred_repositories=node['starredRepositories']['totalCount'],
+            public_repos=node['repositories']['totalCount'],
+            public_forks=node['forks']['totalCount'],
+            starred_at=parse_github_datetime(starred_at),
+        )
+
+
+class ProfileList:
+    """
+    Prefix of a GitHub user connection (e.g. the stargazers of a repository), along with its total size.
+    """
+
+    def __init__(self, total_count: int, profiles: list[UserProfileSnapshot]):
+        self.total_count = total_count
+        self.profiles = profiles
+
+    def __iter__(self):
+        return iter(self.profiles)
+
+    def __len__(self):
+        return len(self.profiles)
+
+
+class _PartialConnection:
+    def __init__(self):
+        self.total_count = None
+        self.profiles: list[UserProfileSnapshot] = []
+        self.cursor = None
+        self.has_next_page = True
+        self.lock = threading.Lock()
+
+
+class GitHubProfileFetcher:
+    """
+    Retrieves user profiles in bulk through the GraphQL API, in pages of 100, instead of one REST call per user.
+    """
+
+    def __init__(self, github_client: github.Github | GitHubEntityStore):
+        self.github_client = github_client
+        self._connections: dict[tuple, _PartialConnection] = {}
+        self._users: dict[str, UserProfileSnapshot | None] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def for_client(github_client: github.Github | GitHubEntityStore) -> 'GitHubProfileFetcher':
+        """
+        Return the fetcher shared by all heuristics of a scan when possible, so that profiles are only fetched once.
+        """
+        if isinstance(github_client, GitHubEntityStore):
+            return github_client.shared_service(GitHubProfileFetcher)
+        return GitHubProfileFetcher(github_client)
+
+    def get_stargazers(self, repo_full_name: str, max_count: int) -> ProfileList:
+        owner, name = repo_full_name.split('/')
+
+        def fetch_page(after: str | None) -> dict:
+            data = self._graphql(STARGAZERS_QUERY, {'owner': owner, 'name': name, 'first': PAGE_SIZE, 'after': after})
+            return _stargazers_page(repo_full_name, data)
+
+        return self._get_connection(('stargazers', repo_full_name.lower()), max_count, fetch_page)
+
+    async def get_stargazers_async(self, repo_full_name: str, max_count: int,
+                                   async_client: 'AsyncGitHubClient') -> ProfileList:
+        """
+        Same as get_stargazers, sharing the pages already retrieved.
+        """
+        owner, name = repo_full_name.split('/')
+        with self._lock:
+            connection = self._connections.setdefault(('stargazers', repo_full_name.lower()), _PartialConnection())
+
+        # The lock of the connection isn't held while waiting for a page, which would block the event loop. A page
+        # retrieved concurrently by another caller is only added once
+        while True:
+            with connection.lock:
+                if not connection.has_next_page or len(connection.profiles) >= max_count:
+                    total_count = connection.total_count if connection.total_count is not None else 0
+                    return ProfileList(total_count, connection.profiles[:max_count])
+                cursor = connection.cursor
+            data = await async_client.graphql(STARGAZERS_QUERY,
+                                              {'owner': owner, 'name': name, 'first': PAGE_SIZE, 'after': cursor},
+                                              kind=async_client.PROFILES)
+            page = _stargazers_page(repo_full_name, data)
+            with connection.lock:
+                if connection.cursor == cursor and connection.has_next_page:
+                    self._add_page(connection, page)
+
+    def get_star_dates(self, repo_full_name: str, max_count: int) -> tuple[int, list[datetime.datetime]]:
+        """
+        Return the total number of stars of a repository, and the date of up to max_count of them. Stars beyond
+        max_count are the oldest ones, the most recent are always retrieved.
+        """
+        with self._lock:
+            stargazers = self._connections.get(('stargazers', repo_full_name.lower()))
+        if stargazers is not None and not stargazers.has_next_page:
+            # All stargazer profiles were already retrieved, along with the dates of their stars
+            with stargazers.lock:
+                return stargazers.total_count, [p.starred_at for p in stargazers.profiles[:max_count]]
+
+        owner, name = repo_full_name.split('/')
+        total_count, dates, after = 0, [], None
+        while len(dates) < max_count:
+            data = self._graphql(STAR_DATES_QUERY, {'owner': owner, 'name': name, 'first': PAGE_SIZE, 'after': after})
+            if data['repository'] is None:
+                raise github.UnknownObjectException(404, data, None, f"Repository {repo_full_name} not found")
+            connection = data['repository']['stargazers']
+            total_count = connection['totalCount']
+            dates.extend(parse_github_datetime(edge['starredAt']) for edge in connection['edges'])
+            if not connection['pageInfo']['hasNextPage']:
+                break
+            after = connection['pageInfo']['endCursor']
+        logger.debug("Retrieved the date of %d out of %d stars of %s", min(len(dates), max_count), total_count,
+                     repo_full_name)
+        return total_count, dates[:max_count]
+
+    def get_followers(self, login: str, max_count: int) -> ProfileList:
+        def fetch_page(after: str | None) -> dict:
+            data = self._graphql(FOLLOWERS_QUERY, {'login': login, 'first': PAGE_SIZE, 'after': after})
+            if data['user'] is None:
+                raise github.UnknownObjectException(404, data, None, f"User {login} not found")
+            connection = data['user']['followers']
+            return {
+                'totalCount': connection['totalCount'],
+                'pageInfo': connection['pageInfo'],
+                'profiles': [UserProfileSnapshot.from_graphql(node) for node in connection['nodes']],
+            }
+
+        return self._get_connection(('followers', login.lower()), max_count, fetch_page)
+
+    def get_users(self, logins: Iterable[str]) -> dict[str, UserProfileSnapshot]:
+        """
+        Retrieve the profiles of the given users, keyed by lowercase login. Users that don't exist are omitted.
+        """
+        logins = list(dict.fromkeys(login.lower() for login in logins))
+        with self._lock:
+            missing = [login for login in logins if login not in self._users]
+
+        for i in range(0, len(missing), PAGE_SIZE):
+            chunk = missing[i:i + PAGE_SIZE]
+            # One aliased field per user, e.g. u0: user(login: $l0) { ...ProfileFields }
+            variables = {f"l{j}": login for j, login in enumerate(chunk)}
+            declarations = ', '.join(f"${name}: String!" for name in variables)
+            fields = '\n'.join(f"  u{j}: user(login: $l{j}) {{ ...ProfileFields }}" for j in range(len(chunk)))
+            data = self._graphql(f"query({declarations}) {{\n{fields}\n}}\n{PROFILE_FIELDS}", variables)
+            with self._lock:
+                for j, login in enumerate(chunk):
+                    node = data.get(f"u{j}")
+                    self._users[login] = UserProfileSnapshot.from_graphql(node) if node else None
+
+        with self._lock:
+            return {login: self._users[login] for login in logins if self._users.get(login) is not None}
+
+    def _get_connection(self, key: tuple, max_count: int,
+                        fetch_page: Callable[[str | None], dict]) -> ProfileList:
+        with self._lock:
+            connection = self._connections.setdefault(key, _PartialConnection())
+
+        # Pages already retrieved are kept, so that a later call with a higher max_count only fetches the next ones
+        with connection.lock:
+            while connection.has_next_page and len(connection.profiles) < max_count:
+                self._add_page(connection, fetch_page(connection.cursor))
+            logger.debug("Retrieved %d out of %d profiles for %s", len(connection.profiles), connection.total_count,
+                         key)
+            total_count = connection.total_count if connection.total_count is not None else 0
+            return ProfileList(total_count, connection.profiles[:max_count])
+
+    def _add_page(self, connection: _PartialConnection, page: dict):
+        connection.total_count = page['totalCount']
+        connection.profiles.extend(page['profiles'])
+        connection.cursor = page['pageInfo']['endCursor']
+        connection.has_next_page = page['pageInfo']['hasNextPage']
+        self._remember_users(page['profiles'])
+
+    def _remember_users(self, profiles: list[UserProfileSnapshot]):
+        with self._lock:
+            for profile in profiles:
+                self._users[profile.login.lower()] = profile
+        # Make the profiles available to heuristics looking up these users through the entity store
+        if isinstance(self.github_client, GitHubEntityStore):
+            self.github_client.seed_users(profiles)
+
+    def _graphql(self, query: str, variables: dict[str, Any]) -> dict[str, Any]:
+        return execute_graphql(self.github_client, query, variables)
+
+
+def _stargazers_page(repo_full_name: str, data: dict[str, Any]) -> dict:
+    if data['repository'] is None:
+        raise github.UnknownObjectException(404, data, None, f"Repository {repo_full_name} not found")
+    connection = data['repository']['stargazers']
+    return {
+        'totalCount': connection['totalCount'],
+        'pageInfo': connection['pageInfo'],
+        'profiles': [UserProfileSnapshot.from_graphql(edge['node'], starred_at=edge['starredAt'])
+                     for edge in connection['edges']],
+    }
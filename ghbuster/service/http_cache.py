@@ -0,0 +1,85 @@
+import logging
+
+import requests_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKEND = 'sqlite'
+DEFAULT_PATH = 'github_cache'
+DEFAULT_EXPIRE_AFTER = 3600
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# Full commit SHA. URL patterns are matched with fnmatch, whose '*' also matches '/' and would match branch names
+COMMIT_SHA_PATTERN = '[0-9a-f]' * 40
+
+# Time to live of cached responses per URL pattern, the first matching pattern wins. Once a response expires, it is
+# revalidated with a conditional request (If-None-Match), which doesn't count against the GitHub rate limit when the
+# data hasn't changed.
+DEFAULT_URLS_EXPIRE_AFTER = {
+    # Commit objects are immutable, unlike the commit a branch name or a short SHA resolves to
+    f'api.github.com/repos/*/*/commits/{COMMIT_SHA_PATTERN}': requests_cache.NEVER_EXPIRE,
+    # Listings that change as repositories get new commits, branches, stars and forks
+    'api.github.com/repos/*/commits': HOUR,
+    'api.github.com/repos/*/branches': HOUR,
+    'api.github.com/repos/*/stargazers': HOUR,
+    'api.github.com/repos/*/forks': HOUR,
+    'api.github.com/search/*': HOUR,
+    'api.github.com/graphql': HOUR,
+    # Listings of a user, which change less often
+    'api.github.com/users/*/repos': 6 * HOUR,
+    'api.github.com/users/*/starred': 6 * HOUR,
+    'api.github.com/users/*/followers': 6 * HOUR,
+    'api.github.com/users/*/following': 6 * HOUR,
+    # Profiles
+    'api.github.com/users/*': DAY,
+    'api.github.com/user/*': DAY,
+    'api.github.com/repos/*': DAY,
+}
+
+# Requests sent with these headers neither read nor write the cache, e.g. conditional requests whose 304 response must
+# reach the caller instead of being answered from the cache
+BYPASS_HEADERS = {'Cache-Control': 'no-store'}
+
+
+def parse_expire_after(value: str) -> int:
+    if value.strip().lower() == 'never':
+        return requests_cache.NEVER_EXPIRE
+    return int(value)
+
+
+class HttpCacheConfig:
+    def __init__(self, enabled: bool = True, backend: str = DEFAULT_BACKEND, path: str = DEFAULT_PATH,
+                 expire_after: int = DEFAULT_EXPIRE_AFTER, urls_expire_after: dict[str, int] = None):
+        self.enabled = enabled
+        self.backend = backend
+        self.path = path
+        self.expire_after = expire_after
+        # Patterns given explicitly take precedence over the default ones
+        self.urls_expire_after = dict(urls_expire_after or {})
+        for pattern, expire_after in DEFAULT_URLS_EXPIRE_AFTER.items():
+            self.urls_expire_after.setdefault(pattern, expire_after)
+
+
+def install_cache(config: HttpCacheConfig):
+    """
+    Transparently cache the responses of all HTTP requests, including the ones sent by PyGithub.
+    """
+    if not config.enabled:
+        logger.info("HTTP cache disabled")
+        return
+
+    requests_cache.install_cache(
+        config.path,
+        backend=config.backend,
+        expire_after=config.expire_after,
+        urls_expire_after=config.urls_expire_after,
+        # GraphQL queries are sent as POST requests, the request body is part of the cache key
+        allowable_methods=('GET', 'HEAD', 'POST'),
+        # Responses are shared between GitHub tokens, as they don't depend on who requests them
+        ignored_parameters=['Authorization'],
+        # If GitHub is unavailable, better use an expired response than fail the scan
+        stale_if_error=True,
+    )
+    logger.debug("Caching HTTP responses in %s (%s backend)", config.path, config.backend)
@@ -0,0 +1,231 @@
+import contextlib
+import contextvars
+import functools
+import math
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Iterator
+
+import github
+
+from .rate_limit_scheduler import bucket_for_url
+
+# Label of requests that aren't sent on behalf of a heuristic, e.g. validating the target of a scan
+SCAN_LABEL = '(scan)'
+PERCENTILES = [50, 90, 99]
+
+
+class RequestStats:
+    """
+    Aggregated GitHub API requests of a heuristic.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        # Responses served by the HTTP cache, including the ones revalidated with a conditional request
+        self.cache_hits = 0
+        self.errors = 0
+        self.bytes = 0
+        self.latencies: list[float] = []
+        # Estimated rate limit consumption per bucket (core, search, graphql...). Responses served from the cache and
+        # conditional requests answered with 304 Not Modified are free
+        self.rate_limit_cost = Counter()
+        self.wall_time = 0.0
+
+    @property
+    def network_requests(self) -> int:
+        return self.requests - self.cache_hits
+
+    def record(self, bucket: str, status: int, latency: float, size: int, from_cache: bool, revalidated: bool):
+        self.requests += 1
+        self.bytes += size
+        self.latencies.append(latency)
+        if from_cache:
+            self.cache_hits += 1
+        if status >= 400:
+            self.errors += 1
+        if not from_cache and not revalidated:
+            self.rate_limit_cost[bucket] += 1
+
+    def merge(self, other: 'RequestStats'):
+        self.requests += other.requests
+        self.cache_hits += other.cache_hits
+        self.errors += other.errors
+        self.bytes += other.bytes
+        self.latencies.extend(other.latencies)
+        self.rate_limit_cost.update(other.rate_limit_cost)
+
+    def percentile(self, p: float) -> float | None:
+        """
+        Return the latency percentile in seconds (nearest-rank method), or None if there was no request.
+        """
+        if not self.latencies:
+            return None
+        latencies = sorted(self.latencies)
+        return latencies[max(math.ceil(p / 100 * len(latencies)) - 1, 0)]
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "cache_hits": self.cache_hits,
+            "errors": self.errors,
+            "bytes": self.bytes,
+            "wall_time_seconds": round(self.wall_time, 3),
+            "latency_seconds": {f"p{p}": _round(self.percentile(p)) for p in PERCENTILES},
+            "rate_limit_cost": dict(sorted(self.rate_limit_cost.items())),
+        }
+
+
+class ScanStats:
+    """
+    GitHub API requests of a scan, attributed to the heuristic that caused them. Requests caused by a heuristic running
+    inside another one (e.g. user heuristics evaluating the stargazers of a repository) are attributed to both, the
+    nested heuristic being identified by its path, e.g. ('repo.starred_by_suspicious_users', 'user.just_joined').
+    """
+
+    def __init__(self):
+        self.by_path: dict[tuple[str, ...], RequestStats] = {}
+        self._lock = threading.Lock()
+
+    def record_request(self, path: tuple[str, ...], **kwargs):
+        with self._lock:
+            self._get(path).record(**kwargs)
+
+    def record_wall_time(self, path: tuple[str, ...], seconds: float):
+        with self._lock:
+            self._get(path).wall_time += seconds
+
+    def total(self) -> RequestStats:
+        total = RequestStats()
+        with self._lock:
+            for stats in self.by_path.values():
+                total.merge(stats)
+        return total
+
+    def per_heuristic(self) -> dict[str, RequestStats]:
+        """
+        Return the stats of each heuristic of the scan, including the requests of the heuristics nested in it.
+        """
+        result = {}
+        with self._lock:
+            for path, stats in sorted(self.by_path.items()):
+                label = path[0] if path else SCAN_LABEL
+                if label not in result:
+                    result[label] = RequestStats()
+                result[label].merge(stats)
+                if len(path) == 1:
+                    result[label].wall_time = stats.wall_time
+        return result
+
+    def nested(self) -> dict[str, RequestStats]:
+        """
+        Return the stats of nested heuristics, keyed by path, e.g. 'repo.starred_by_suspicious_users > user.just_joined'.
+        """
+        with self._lock:
+            return {' > '.join(path): stats for path, stats in sorted(self.by_path.items()) if len(path) > 1}
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "total": self.total().to_json(),
+            "heuristics": {label: stats.to_json() for label, stats in self.per_heuristic().items()},
+            "nested_heuristics": {label: stats.to_json() for label, stats in self.nested().items()},
+        }
+
+    def _get(self, path: tuple[str, ...]) -> RequestStats:
+        if path not in self.by_path:
+            self.by_path[path] = RequestStats()
+        return self.by_path[path]
+
+
+class _Scope:
+    def __init__(self, stats: ScanStats, path: tuple[str, ...]):
+        self.stats = stats
+        self.path = path
+
+
+_current_scope: contextvars.ContextVar[_Scope | None] = contextvars.ContextVar('ghbuster_request_scope', default=None)
+
+
+@contextlib.contextmanager
+def collect(stats: ScanStats) -> Iterator[ScanStats]:
+    """
+    Attribute the requests sent from the current context (including the threads and tasks it spawns with a copy of it)
+    to the given stats.
+    """
+    token = _current_scope.set(_Scope(stats, ()))
+    try:
+        yield stats
+    finally:
+        _current_scope.reset(token)
+
+
+@contextlib.contextmanager
+def heuristic_scope(heuristic_id: str) -> Iterator[None]:
+    """
+    Attribute the requests sent from the current context to a heuristic, nested in the current one if any.
+    """
+    scope = _current_scope.get()
+    if scope is None:
+        yield
+        return
+
+    path = scope.path + (heuristic_id,)
+    token = _current_scope.set(_Scope(scope.stats, path))
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        scope.stats.record_wall_time(path, time.perf_counter() - start)
+        _current_scope.reset(token)
+
+
+def record_request(url: str, status: int, latency: float, size: int, from_cache: bool = False,
+                   revalidated: bool = False):
+    scope = _current_scope.get()
+    if scope is not None:
+        scope.stats.record_request(scope.path, bucket=bucket_for_url(url), status=status, latency=latency, size=size,
+                                   from_cache=from_cache, revalidated=revalidated)
+
+
+def in_current_context(function: Callable) -> Callable:
+    """
+    Wrap a function so that it runs with a copy of the current context, e.g. to submit it to a thread pool while
+    keeping the attribution of its requests.
+    """
+    return functools.partial(contextvars.copy_context().run, function)
+
+
+def install(github_client: github.Github):
+    """
+    Record the requests sent by a GitHub client. Must be called after any other customization of its connections
+    (e.g. rate_limit_scheduler.RateLimitScheduler.install).
+    """
+    requester = github_client.requester
+    # PyGithub doesn't provide a public way to customize its HTTP connections of a single client
+    connection_class = requester._Requester__connectionClass
+
+    def create_connection(*args, **kwargs):
+        connection = connection_class(*args, **kwargs)
+        connection.getresponse = functools.partial(_timed_getresponse, connection, connection.getresponse)
+        return connection
+
+    requester._Requester__connectionClass = create_connection
+    requester._Requester__connection = None
+
+
+def _timed_getresponse(connection: Any, getresponse: Callable[[], Any]) -> Any:
+    start = time.perf_counter()
+    response = getresponse()
+    latency = time.perf_counter() - start
+    # PyGithub wraps the response of the underlying requests session
+    raw_response = getattr(response, 'response', None)
+    record_request(url=f"{connection.protocol}://{connection.host}{connection.url}", status=response.status,
+                   latency=latency, size=len(raw_response.content or b'') if raw_response is not None else 0,
+                   from_cache=getattr(raw_response, 'from_cache', False),
+                   revalidated=getattr(raw_response, 'revalidated', False))
+    return response
+
+
+def _round(value: float | None) -> float | None:
+    return round(value, 4) if value is not None else None
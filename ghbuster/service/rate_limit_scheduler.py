@@ -0,0 +1,272 @@
+import asyncio
+import functools
+import logging
+import threading
+import time
+import urllib.parse
+from typing import Callable, Mapping
+
+import github
+import requests
+import requests.adapters
+from github.Requester import HTTPRequestsConnectionClass, HTTPSRequestsConnectionClass
+from urllib3.util import Retry
+
+logger = logging.getLogger(__name__)
+
+CORE = 'core'
+SEARCH = 'search'
+CODE_SEARCH = 'code_search'
+GRAPHQL = 'graphql'
+
+# Number of requests that can be sent back-to-back on a bucket before pacing kicks in
+DEFAULT_BURST = {
+    CORE: 300,
+    SEARCH: 10,
+    CODE_SEARCH: 5,
+    GRAPHQL: 100,
+}
+
+# Pause applied on a secondary rate limit when GitHub doesn't tell us how long to wait
+DEFAULT_SECONDARY_RATE_LIMIT_PAUSE_SECONDS = 60
+
+# The scheduler handles rate limits itself, so the connection only retries on network errors and transient failures
+CONNECTION_RETRY = Retry(total=10, backoff_factor=1, status_forcelist=[502, 503, 504], allowed_methods=None)
+
+
+def bucket_for_url(url: str) -> str:
+    path = urllib.parse.urlparse(url).path
+    if path.endswith('/graphql'):
+        return GRAPHQL
+    if '/search/code' in path:
+        return CODE_SEARCH
+    if '/search/' in path:
+        return SEARCH
+    return CORE
+
+
+class BucketState:
+    """
+    Rate limit state of a single token for a single bucket (core, search, graphql...), as reported by GitHub in the
+    X-RateLimit-* response headers, along with a token bucket used to pace requests.
+    """
+
+    def __init__(self, burst: int, now: float):
+        self.limit: int | None = None
+        self.remaining: int | None = None
+        self.reset_at = 0.0
+        self.paused_until = 0.0
+        # Token bucket: we don't pace requests until we know the rate limit
+        self.capacity = burst
+        self.level = float(burst)
+        self.refill_rate: float | None = None
+        self.last_refill = now
+
+    def available_at(self, now: float) -> float:
+        """
+        Return the time at which this bucket can be used again.
+        """
+        available_at = self.paused_until
+        if self.remaining is not None and self.remaining <= 0 and self.reset_at > now:
+            available_at = max(available_at, self.reset_at)
+        return available_at
+
+    def reserve(self, now: float) -> float:
+        """
+        Take a token from the token bucket, and return how long to wait before sending the request.
+        """
+        if self.refill_rate is not None:
+            self.level = min(self.capacity, self.level + (now - self.last_refill) * self.refill_rate)
+        self.last_refill = now
+        if self.remaining is not None:
+            self.remaining -= 1
+
+        self.level -= 1
+        if self.level >= 0 or self.refill_rate is None:
+            return 0
+        return -self.level / self.refill_rate
+
+    def update(self, limit: int, remaining: int, reset_at: float, now: float):
+        self.limit = limit
+        self.remaining = remaining
+        self.reset_at = reset_at
+        # Spread the remaining requests over the time left until the bucket resets
+        self.refill_rate = max(remaining, 1) / max(reset_at - now, 1)
+
+
+class RateLimitScheduler:
+    """
+    Schedules requests across a pool of GitHub tokens, keeping track of each rate limit bucket from response headers.
+    When all tokens are exhausted for a bucket, requests on that bucket wait until it resets instead of failing.
+    """
+
+    def __init__(self, tokens: list[str], burst: dict[str, int] = None, clock: Callable[[], float] = time.time,
+                 sleep: Callable[[float], None] = time.sleep):
+        if not tokens:
+            raise ValueError("At least one GitHub token is required")
+        self.tokens = list(dict.fromkeys(tokens))
+        self.burst = {**DEFAULT_BURST, **(burst or {})}
+        self.clock = clock
+        self.sleep = sleep
+        self._states: dict[tuple[str, str], BucketState] = {}
+        self._lock = threading.Lock()
+
+    def install(self, github_client: github.Github):
+        """
+        Route all requests of a GitHub client through this scheduler.
+        """
+        requester = github_client.requester
+        scheme = urllib.parse.urlparse(requester.base_url).scheme
+        connection_class = ScheduledHTTPSConnection if scheme == 'https' else ScheduledHTTPConnection
+        # PyGithub doesn't provide a public way to customize its HTTP connections of a single client
+        requester._Requester__connectionClass = functools.partial(connection_class, scheduler=self)
+        requester._Requester__connection = None
+
+    def acquire(self, bucket: str) -> str:
+        """
+        Pick the token to use for a request on the given bucket, waiting if needed.
+        """
+        while True:
+            token, delay = self._try_acquire(bucket)
+            if token is not None:
+                break
+            self.sleep(delay)
+
+        if delay > 0:
+            logger.debug("Pacing request on the %s bucket, waiting %.2f seconds", bucket, delay)
+            self.sleep(delay)
+        return token
+
+    async def acquire_async(self, bucket: str) -> str:
+        """
+        Same as acquire, but waits without blocking the event loop.
+        """
+        while True:
+            token, delay = self._try_acquire(bucket)
+            if token is not None:
+                break
+            await asyncio.sleep(delay)
+
+        if delay > 0:
+            logger.debug("Pacing request on the %s bucket, waiting %.2f seconds", bucket, delay)
+            await asyncio.sleep(delay)
+        return token
+
+    def _try_acquire(self, bucket: str) -> tuple[str | None, float]:
+        """
+        Reserve a request on the given bucket. Returns the token to use and how long to wait before sending the
+        request, or no token and how long to wait before trying again if all tokens are rate limited.
+        """
+        with self._lock:
+            now = self.clock()
+            states = {token: self._state(token, bucket) for token in self.tokens}
+            available = [token for token, state in states.items() if state.available_at(now) <= now]
+            if available:
+                # Prefer the token with the most requests left, unknown meaning it hasn't been used yet
+                token = max(available, key=lambda t: float('inf') if states[t].remaining is None
+                            else states[t].remaining)
+                return token, states[token].reserve(now)
+            delay = min(state.available_at(now) for state in states.values()) - now
+
+        logger.warning("All %d GitHub tokens are rate limited on the %s bucket, pausing for %d seconds",
+                       len(self.tokens), bucket, round(delay))
+        return None, delay
+
+    def record_response(self, token: str, bucket: str, response: requests.Response) -> bool:
+        """
+        Update the state of the bucket from the response headers. Returns True if the request was rejected because
+        of a rate limit, and should be retried.
+        """
+        return self.record(token, bucket, response.status_code, response.headers, lambda: response.text)
+
+    def record(self, token: str, bucket: str, status_code: int, headers: Mapping[str, str],
+               get_text: Callable[[], str]) -> bool:
+        """
+        Same as record_response, for responses of HTTP clients other than requests (e.g. aiohttp).
+        """
+        bucket = headers.get('X-RateLimit-Resource', bucket)
+        with self._lock:
+            now = self.clock()
+            state = self._state(token, bucket)
+            remaining = headers.get('X-RateLimit-Remaining')
+            if remaining is not None:
+                state.update(limit=int(headers.get('X-RateLimit-Limit', 0)), remaining=int(remaining),
+                             reset_at=float(headers.get('X-RateLimit-Reset', now)), now=now)
+
+            if status_code not in (403, 429):
+                return False
+
+            retry_after = headers.get('Retry-After')
+            if retry_after is not None:
+                state.paused_until = now + float(retry_after)
+            elif remaining is not None and int(remaining) == 0:
+                pass  # primary rate limit, the bucket is unavailable until it resets
+            elif 'rate limit' in get_text().lower():
+                state.paused_until = now + DEFAULT_SECONDARY_RATE_LIMIT_PAUSE_SECONDS
+            else:
+                return False  # e.g. a repository blocked for ToS violation
+
+        logger.info("Token %s hit a rate limit on the %s bucket", _redact(token), bucket)
+        return True
+
+    def summary(self) -> dict[str, dict[str, int | None]]:
+        """
+        Return the number of remaining requests per token and bucket.
+        """
+        with self._lock:
+            result = {}
+            for (token, bucket), state in self._states.items():
+                result.setdefault(_redact(token), {})[bucket] = state.remaining
+            return result
+
+    def _state(self, token: str, bucket: str) -> BucketState:
+        key = (token, bucket)
+        if key not in self._states:
+            self._states[key] = BucketState(self.burst.get(bucket, DEFAULT_BURST[CORE]), self.clock())
+        return self._states[key]
+
+
+class SchedulingAdapter(requests.adapters.HTTPAdapter):
+    MAX_RATE_LIMITED_ATTEMPTS = 5
+
+    def __init__(self, scheduler: RateLimitScheduler, **kwargs):
+        super().__init__(**kwargs)
+        self.scheduler = scheduler
+
+    def send(self, request: requests.PreparedRequest, *args, **kwargs) -> requests.Response:
+        bucket = bucket_for_url(request.url)
+        attempt = 1
+        while True:
+            token = self.scheduler.acquire(bucket)
+            # Only requests authenticated by PyGithub carry a token, others (e.g. redirects to other domains) are left
+            # untouched
+            if 'Authorization' in request.headers:
+                request.headers['Authorization'] = f"token {token}"
+            response = super().send(request, *args, **kwargs)
+            rate_limited = self.scheduler.record_response(token, bucket, response)
+            if not rate_limited or attempt >= self.MAX_RATE_LIMITED_ATTEMPTS:
+                return response
+            attempt += 1
+
+
+class _SchedulingConnectionMixin:
+    def _mount_scheduling_adapter(self, scheduler: RateLimitScheduler):
+        self.adapter = SchedulingAdapter(scheduler, max_retries=self.retry, pool_connections=self.pool_size,
+                                         pool_maxsize=self.pool_size)
+        self.session.mount(f"{self.protocol}://", self.adapter)
+
+
+class ScheduledHTTPSConnection(_SchedulingConnectionMixin, HTTPSRequestsConnectionClass):
+    def __init__(self, *args, scheduler: RateLimitScheduler, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._mount_scheduling_adapter(scheduler)
+
+
+class ScheduledHTTPConnection(_SchedulingConnectionMixin, HTTPRequestsConnectionClass):
+    def __init__(self, *args, scheduler: RateLimitScheduler, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._mount_scheduling_adapter(scheduler)
+
+
+def _redact(token: str) -> str:
+    return f"...{token[-4:]}"
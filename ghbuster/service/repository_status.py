@@ -0,0 +1,164 @@
+import asyncio
+import enum
+import logging
+import threading
+from typing import Any, Iterable
+
+import github
+
+from .async_github import AsyncGitHubClient
+from .github_entity_store import GitHubEntityStore
+from .graphql_profiles import PAGE_SIZE, execute_graphql, execute_graphql_with_errors
+
+logger = logging.getLogger(__name__)
+
+FORKS_QUERY = """
+query($login: String!, $first: Int!, $after: String) {
+  user(login: $login) {
+    repositories(first: $first, after: $after, ownerAffiliations: OWNER, isFork: true) {
+      pageInfo { hasNextPage endCursor }
+      nodes { nameWithOwner isDisabled parent { nameWithOwner } }
+    }
+  }
+}
+"""
+
+BLOCKED_MESSAGE = 'Repository access blocked'
+# Repositories that can't be resolved are returned as null, along with an error telling why
+TOLERATED_ERROR_TYPES = ('NOT_FOUND', 'FORBIDDEN')
+
+
+class RepositoryStatus(enum.Enum):
+    AVAILABLE = 'available'
+    # Taken down, or deleted by its owner (404)
+    TAKEN_DOWN = 'taken_down'
+    # Disabled for violating GitHub's Terms of Service, i.e. a soft takedown (403/451)
+    BLOCKED = 'blocked'
+
+
+class RepositoryStatusService:
+    """
+    Resolves the parents of a user's forks, and whether repositories are still available, with batched GraphQL queries
+    (up to 100 forks or repositories per query). Statuses are cached for the duration of a scan.
+    """
+
+    def __init__(self, github_client: github.Github | GitHubEntityStore):
+        self.github_client = github_client
+        self._statuses: dict[str, RepositoryStatus] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def for_client(github_client: github.Github | GitHubEntityStore) -> 'RepositoryStatusService':
+        """
+        Return the service shared by all heuristics of a scan when possible, so that forks of the same popular
+        repositories only lead to a single check of their parent.
+        """
+        if isinstance(github_client, GitHubEntityStore):
+            return github_client.shared_service(RepositoryStatusService)
+        return RepositoryStatusService(github_client)
+
+    def get_fork_parents(self, login: str) -> dict[str, str | None]:
+        """
+        Return the parent of each fork owned by a user, keyed by fork name. Forks blocked for ToS violations are left
+        out, and forks whose parent can't be resolved are mapped to None.
+        """
+        parents = {}
+        after = None
+        while True:
+            data = execute_graphql(self.github_client, FORKS_QUERY,
+                                   {'login': login, 'first': PAGE_SIZE, 'after': after})
+            repositories = self._add_fork_parents(login, data, parents)
+            if not repositories['pageInfo']['hasNextPage']:
+                return parents
+            after = repositories['pageInfo']['endCursor']
+
+    async def get_fork_parents_async(self, login: str, async_client: AsyncGitHubClient) -> dict[str, str | None]:
+        """
+        Same as get_fork_parents.
+        """
+        parents = {}
+        after = None
+        while True:
+            data = await async_client.graphql(FORKS_QUERY, {'login': login, 'first': PAGE_SIZE, 'after': after},
+                                              kind=async_client.REPOSITORIES)
+            repositories = self._add_fork_parents(login, data, parents)
+            if not repositories['pageInfo']['hasNextPage']:
+                return parents
+            after = repositories['pageInfo']['endCursor']
+
+    @staticmethod
+    def _add_fork_parents(login: str, data: dict[str, Any], parents: dict[str, str | None]) -> dict[str, Any]:
+        if data['user'] is None:
+            raise github.UnknownObjectException(404, {'message': f"User {login} not found"}, None)
+        repositories = data['user']['repositories']
+        for node in repositories['nodes']:
+            if node['isDisabled']:
+                logger.warning("Repository %s owned by user %s is blocked, ignoring", node['nameWithOwner'], login)
+                continue
+            parent = node['parent']
+            parents[node['nameWithOwner']] = parent['nameWithOwner'] if parent else None
+        return repositories
+
+    def get_statuses(self, full_names: Iterable[str]) -> dict[str, RepositoryStatus]:
+        """
+        Return whether each of the given repositories is still available, keyed by repository name.
+        """
+        full_names = list(dict.fromkeys(full_names))
+        result = self._cached(full_names)
+        missing = [name for name in full_names if name not in result]
+        for i in range(0, len(missing), PAGE_SIZE):
+            chunk = missing[i:i + PAGE_SIZE]
+            query, variables = _statuses_query(chunk)
+            data, errors = execute_graphql_with_errors(self.github_client, query, variables,
+                                                       tolerated_error_types=TOLERATED_ERROR_TYPES)
+            result.update(self._remember(chunk, data, errors))
+        return result
+
+    async def get_statuses_async(self, full_names: Iterable[str],
+                                 async_client: AsyncGitHubClient) -> dict[str, RepositoryStatus]:
+        """
+        Same as get_statuses, sending the queries of all batches concurrently.
+        """
+        full_names = list(dict.fromkeys(full_names))
+        result = self._cached(full_names)
+        missing = [name for name in full_names if name not in result]
+        chunks = [missing[i:i + PAGE_SIZE] for i in range(0, len(missing), PAGE_SIZE)]
+        queries = (async_client.graphql_with_errors(*_statuses_query(chunk), kind=async_client.REPOSITORIES,
+                                                    tolerated_error_types=TOLERATED_ERROR_TYPES)
+                   for chunk in chunks)
+        responses = await asyncio.gather(*queries)
+        for chunk, (data, errors) in zip(chunks, responses):
+            result.update(self._remember(chunk, data, errors))
+        return result
+
+    def _cached(self, full_names: list[str]) -> dict[str, RepositoryStatus]:
+        with self._lock:
+            return {name: self._statuses[name.lower()] for name in full_names if name.lower() in self._statuses}
+
+    def _remember(self, full_names: list[str], data: dict[str, Any], errors: list) -> dict[str, RepositoryStatus]:
+        # The error returned along with each repository that can't be resolved tells whether it's blocked
+        blocked_aliases = {(error.get('path') or [None])[0] for error in errors
+                           if error.get('type') == 'FORBIDDEN' or error.get('message') == BLOCKED_MESSAGE}
+        statuses = {}
+        for i, full_name in enumerate(full_names):
+            node = data[f'r{i}']
+            if f'r{i}' in blocked_aliases or (node is not None and node['isDisabled']):
+                statuses[full_name] = RepositoryStatus.BLOCKED
+            elif node is None:
+                statuses[full_name] = RepositoryStatus.TAKEN_DOWN
+            else:
+                statuses[full_name] = RepositoryStatus.AVAILABLE
+        with self._lock:
+            self._statuses.update({name.lower(): status for name, status in statuses.items()})
+        return statuses
+
+
+def _statuses_query(full_names: list[str]) -> tuple[str, dict[str, str]]:
+    # One aliased field per repository, e.g. r0: repository(owner: $o0, name: $n0) { isDisabled }
+    declarations = ', '.join(f"$o{i}: String!, $n{i}: String!" for i in range(len(full_names)))
+    fields = '\n  '.join(f"r{i}: repository(owner: $o{i}, name: $n{i}) {{ isDisabled }}"
+                         for i in range(len(full_names)))
+    variables = {}
+    for i, full_name in enumerate(full_names):
+        variables[f'o{i}'], variables[f'n{i}'] = full_name.split('/', 1)
+    return f"query({declarations}) {{\n  {fields}\n}}", variables
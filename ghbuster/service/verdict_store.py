@@ -0,0 +1,195 @@
+import asyncio
+import datetime
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any
+
+import github
+
+from .. import TargetSpec, TargetType
+from ..heuristics.base import HeuristicRunResult, MetadataHeuristic
+from .async_github import AsyncGitHubClient
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = 'ghbuster_verdicts.sqlite'
+DEFAULT_TTL_SECONDS = 3 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 500_000
+# Number of verdicts written between two evictions, so that long-running batches don't grow the store unbounded
+EVICTION_INTERVAL = 1000
+
+# Profile attributes stored along with each verdict, to know what the verdict was based on
+SNAPSHOT_ATTRIBUTES = ['login', 'name', 'company', 'bio', 'location', 'created_at', 'updated_at', 'followers',
+                       'following', 'public_repos']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS verdicts (
+    user_id INTEGER NOT NULL,
+    heuristic TEXT NOT NULL,
+    login TEXT NOT NULL,
+    user_updated_at TEXT,
+    triggered INTEGER NOT NULL,
+    skipped INTEGER NOT NULL,
+    additional_details TEXT,
+    inputs TEXT,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    last_used_at REAL NOT NULL,
+    PRIMARY KEY (user_id, heuristic)
+);
+CREATE INDEX IF NOT EXISTS verdicts_expires_at ON verdicts (expires_at);
+CREATE INDEX IF NOT EXISTS verdicts_last_used_at ON verdicts (last_used_at);
+"""
+
+
+def heuristic_key(heuristic: MetadataHeuristic) -> str:
+    # Instances of the same heuristic can be configured differently, e.g. with a different number of workers
+    parameters = {name: value for name, value in vars(heuristic).items() if not callable(value)}
+    parameters = json.dumps(parameters, sort_keys=True, default=str)
+    return f"{heuristic.id()}:{parameters}"
+
+
+def _to_json_value(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+class VerdictStore:
+    """
+    Persistent store of user heuristic results, keyed by GitHub user ID. A verdict is reused until it expires, or until
+    the user profile is updated on GitHub.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._writes_since_eviction = 0
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self.evict()
+
+    def run(self, heuristic: MetadataHeuristic, github_client: github.Github,
+            target_spec: TargetSpec) -> HeuristicRunResult:
+        """
+        Return the stored verdict of a user heuristic if there is a valid one, and run the heuristic otherwise.
+        """
+        if heuristic.target_type() != TargetType.USER:
+            return heuristic.run(github_client, target_spec)
+
+        lookup = self._lookup(heuristic, github_client, target_spec)
+        if lookup is None:
+            return heuristic.run(github_client, target_spec)
+        user, key, result = lookup
+        if result is not None:
+            return result
+
+        result = heuristic.run(github_client, target_spec)
+        if not result.errored:
+            self.put(user, key, result)
+        return result
+
+    async def run_async(self, heuristic: MetadataHeuristic, github_client: github.Github, target_spec: TargetSpec,
+                        async_client: AsyncGitHubClient) -> HeuristicRunResult:
+        """
+        Same as run, for heuristics with an asynchronous variant.
+        """
+        if heuristic.target_type() != TargetType.USER:
+            return await heuristic.run_async(github_client, target_spec, async_client)
+
+        lookup = await asyncio.to_thread(self._lookup, heuristic, github_client, target_spec)
+        if lookup is None:
+            return await heuristic.run_async(github_client, target_spec, async_client)
+        user, key, result = lookup
+        if result is not None:
+            return result
+
+        result = await heuristic.run_async(github_client, target_spec, async_client)
+        if not result.errored:
+            self.put(user, key, result)
+        return result
+
+    def _lookup(self, heuristic: MetadataHeuristic, github_client: github.Github,
+                target_spec: TargetSpec) -> tuple[Any, str, HeuristicRunResult | None] | None:
+        """
+        Return the target user, the key of the heuristic and the stored verdict if any, or None if the user can't be
+        retrieved.
+        """
+        try:
+            user = github_client.get_user(login=target_spec.username)
+            user_id = user.id
+            updated_at = _to_json_value(user.updated_at)
+        except github.GithubException:
+            # e.g. the user doesn't exist (anymore), let the heuristic handle it
+            return None
+
+        key = heuristic_key(heuristic)
+        result = self.get(user_id, key, updated_at)
+        if result is not None:
+            logger.debug("Reusing verdict of heuristic %s for user %s", heuristic.id(), target_spec.username)
+        return user, key, result
+
+    def get(self, user_id: int, key: str, updated_at: str | None) -> HeuristicRunResult | None:
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT triggered, skipped, additional_details, user_updated_at FROM verdicts "
+                "WHERE user_id = ? AND heuristic = ? AND expires_at > ?", (user_id, key, now)).fetchone()
+            if row is None or row[3] != updated_at:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._connection.execute("UPDATE verdicts SET last_used_at = ? WHERE user_id = ? AND heuristic = ?",
+                                     (now, user_id, key))
+            self._connection.commit()
+        triggered, skipped, additional_details, _ = row
+        return HeuristicRunResult(triggered=bool(triggered), additional_details=additional_details or "",
+                                  skipped=bool(skipped))
+
+    def put(self, user, key: str, result: HeuristicRunResult):
+        now = time.time()
+        inputs = {attribute: _to_json_value(getattr(user, attribute, None)) for attribute in SNAPSHOT_ATTRIBUTES}
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO verdicts (user_id, heuristic, login, user_updated_at, triggered, skipped, "
+                "additional_details, inputs, created_at, expires_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (user.id, key, user.login, inputs['updated_at'], int(result.triggered), int(result.skipped),
+                 result.additional_details, json.dumps(inputs), now, now + self.ttl_seconds, now))
+            self._connection.commit()
+            self._writes_since_eviction += 1
+            should_evict = self._writes_since_eviction >= EVICTION_INTERVAL
+        if should_evict:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        Remove expired verdicts, and the least recently used ones beyond max_entries. Returns the number removed.
+        """
+        with self._lock:
+            removed = self._connection.execute("DELETE FROM verdicts WHERE expires_at <= ?", (time.time(),)).rowcount
+            count = self._connection.execute("SELECT COUNT(*) FROM verdicts").fetchone()[0]
+            if count > self.max_entries:
+                removed += self._connection.execute(
+                    "DELETE FROM verdicts WHERE rowid IN "
+                    "(SELECT rowid FROM verdicts ORDER BY last_used_at ASC LIMIT ?)",
+                    (count - self.max_entries,)).rowcount
+            self._connection.commit()
+            self._writes_since_eviction = 0
+        if removed:
+            logger.debug("Evicted %d verdicts from %s", removed, self.path)
+        return removed
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
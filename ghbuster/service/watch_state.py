@@ -0,0 +1,128 @@
+import dataclasses
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from .. import TargetSpec, TargetType
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = 'ghbuster_watch.sqlite'
+
+TRIGGERED = 'triggered'
+PASSED = 'passed'
+SKIPPED = 'skipped'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS watched_targets (
+    target TEXT PRIMARY KEY,
+    cursors TEXT NOT NULL,
+    last_full_scan REAL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS watched_verdicts (
+    target TEXT NOT NULL,
+    heuristic TEXT NOT NULL,
+    verdict TEXT,
+    additional_details TEXT,
+    stale INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (target, heuristic)
+);
+"""
+
+
+def target_key(target_spec: TargetSpec) -> str:
+    if target_spec.target_type == TargetType.REPOSITORY:
+        return f"repo:{target_spec.repo_full_name().lower()}"
+    return f"user:{target_spec.username.lower()}"
+
+
+@dataclasses.dataclass
+class TargetCursors:
+    """
+    What was last seen of a watched target, to only retrieve what changed since.
+    """
+    # ETag of the REST representation of the repository or user, sent back in conditional requests
+    etag: str | None = None
+    # Users: ETag of their most recently pushed repository
+    repositories_etag: str | None = None
+    repository_count: int | None = None
+    # Repositories: cursors of the most recent stargazer and fork, in the order they starred or forked the repository
+    stargazers_cursor: str | None = None
+    stargazer_count: int | None = None
+    forks_cursor: str | None = None
+    fork_count: int | None = None
+    # Repositories: head commit of the default branch
+    head_sha: str | None = None
+
+
+@dataclasses.dataclass
+class WatchedVerdict:
+    # TRIGGERED, PASSED or SKIPPED, None until the heuristic completed once
+    verdict: str | None
+    additional_details: str = ""
+    # The last run of the heuristic failed, so it runs again on the next poll. The verdict is the last one it completed
+    # with
+    stale: bool = False
+
+
+class WatchStateStore:
+    """
+    Persistent state of watch mode: the cursors of each watched target, and the last verdict of each heuristic on it,
+    so that a restarted watch carries on where it stopped.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def get_cursors(self, target_spec: TargetSpec) -> tuple[TargetCursors | None, float | None]:
+        """
+        Return the cursors of a target along with the time of its last full scan, or None if it was never polled.
+        """
+        with self._lock:
+            row = self._connection.execute("SELECT cursors, last_full_scan FROM watched_targets WHERE target = ?",
+                                           (target_key(target_spec),)).fetchone()
+        if row is None:
+            return None, None
+        return TargetCursors(**json.loads(row[0])), row[1]
+
+    def get_verdicts(self, target_spec: TargetSpec) -> dict[str, WatchedVerdict]:
+        """
+        Return the verdicts on a target, keyed by heuristic ID.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT heuristic, verdict, additional_details, stale FROM watched_verdicts WHERE target = ?",
+                (target_key(target_spec),)).fetchall()
+        return {heuristic: WatchedVerdict(verdict, additional_details or "", bool(stale))
+                for heuristic, verdict, additional_details, stale in rows}
+
+    def update(self, target_spec: TargetSpec, cursors: TargetCursors, verdicts: dict[str, WatchedVerdict],
+               full_scan: bool = False):
+        """
+        Record the new cursors of a target along with the verdicts of the heuristics that ran, in a single transaction
+        so that an interrupted watch never advances cursors past verdicts it didn't record.
+        """
+        key = target_key(target_spec)
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT INTO watched_targets (target, cursors, last_full_scan, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (target) DO UPDATE SET cursors = excluded.cursors, updated_at = excluded.updated_at, "
+                "last_full_scan = COALESCE(excluded.last_full_scan, watched_targets.last_full_scan)",
+                (key, json.dumps(dataclasses.asdict(cursors)), now if full_scan else None, now))
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO watched_verdicts (target, heuristic, verdict, additional_details, stale, "
+                "updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                [(key, heuristic, verdict.verdict, verdict.additional_details, int(verdict.stale), now)
+                 for heuristic, verdict in verdicts.items()])
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,287 @@
+import dataclasses
+import datetime
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, TextIO
+
+import github
+
+from . import TargetSpec, TargetType
+from .cli import parse_target
+from .github_repo_scanner import GitHubScanner
+from .heuristics import MetadataHeuristic
+from .heuristics.base import HeuristicInput
+from .output_formatter import OutputFormatter
+from .service.github_entity_store import GitHubEntityStore
+from .service.graphql_profiles import PAGE_SIZE, execute_graphql_with_errors
+from .service.http_cache import BYPASS_HEADERS
+from .service.watch_state import PASSED, SKIPPED, TRIGGERED, TargetCursors, WatchStateStore, WatchedVerdict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 3600
+# Some heuristics depend on more than the target itself (e.g. on the profiles of stargazers, or on whether the parents
+# of forks were taken down), so all of them run again periodically
+DEFAULT_FULL_RESCAN_INTERVAL = 24 * 3600
+# Number of new stargazers and forks listed in events
+MAX_REPORTED_CHANGES = 100
+
+# Stargazers and forks in the order they starred or forked the repository, so that new ones come after the last cursor.
+# The first poll of a repository only retrieves the last stargazer and fork (last: 1), to get their cursors
+WATCHED_REPOSITORY_QUERY = """
+query($owner: String!, $name: String!, $first: Int, $last: Int, $stargazersAfter: String, $forksAfter: String) {
+  repository(owner: $owner, name: $name) {
+    stargazers(first: $first, last: $last, after: $stargazersAfter, orderBy: {field: STARRED_AT, direction: ASC}) {
+      totalCount
+      pageInfo { hasNextPage endCursor }
+      edges { node { login } }
+    }
+    forks(first: $first, last: $last, after: $forksAfter, orderBy: {field: CREATED_AT, direction: ASC}) {
+      totalCount
+      pageInfo { hasNextPage endCursor }
+      nodes { nameWithOwner }
+    }
+    defaultBranchRef { target { oid } }
+  }
+}
+"""
+
+
+@dataclasses.dataclass
+class TargetChanges:
+    inputs: set[HeuristicInput]
+    cursors: TargetCursors
+    new_stargazers: list[str] = dataclasses.field(default_factory=list)
+    new_forks: list[str] = dataclasses.field(default_factory=list)
+
+    def to_json(self) -> dict[str, Any]:
+        changes = {"inputs": sorted(i.value for i in self.inputs)}
+        if self.new_stargazers:
+            changes["new_stargazers"] = self.new_stargazers[:MAX_REPORTED_CHANGES]
+        if self.new_forks:
+            changes["new_forks"] = self.new_forks[:MAX_REPORTED_CHANGES]
+        return changes
+
+
+def detect_changes(github_client: github.Github | GitHubEntityStore, target_spec: TargetSpec,
+                   cursors: TargetCursors | None) -> TargetChanges:
+    """
+    Tell what changed on a target since the cursors were recorded, and return the new cursors. When nothing changed, a
+    single conditional request is sent, which GitHub answers with 304 without counting it against the rate limit.
+    """
+    if target_spec.target_type == TargetType.REPOSITORY:
+        changes = _detect_repository_changes(github_client, target_spec, cursors)
+    else:
+        changes = _detect_user_changes(github_client, target_spec, cursors)
+    if cursors is None:
+        # Everything is new on the first poll
+        changes.inputs = set(HeuristicInput)
+    return changes
+
+
+def _conditional_get(github_client: github.Github | GitHubEntityStore, url: str, etag: str | None,
+                     parameters: dict[str, Any] = None) -> tuple[str | None, Any]:
+    """
+    Return the ETag and the content of a REST resource, the content being None if it didn't change since the given
+    ETag. The HTTP cache is bypassed, as it would answer from a possibly outdated copy rather than pass the 304 on.
+    """
+    headers = dict(BYPASS_HEADERS)
+    if etag is not None:
+        headers['If-None-Match'] = etag
+    response_headers, data = github_client.requester.requestJsonAndCheck("GET", url, parameters=parameters,
+                                                                         headers=headers)
+    return response_headers.get('etag', etag), data
+
+
+def _detect_repository_changes(github_client: github.Github | GitHubEntityStore, target_spec: TargetSpec,
+                               cursors: TargetCursors | None) -> TargetChanges:
+    previous = cursors or TargetCursors()
+    etag, repo = _conditional_get(github_client, f"/repos/{target_spec.repo_full_name()}", previous.etag)
+    if repo is None:
+        return TargetChanges(set(), previous)
+
+    # The repository changed, e.g. its number of stars, forks or its last push
+    changes = TargetChanges({HeuristicInput.PROFILE}, dataclasses.replace(previous, etag=etag))
+    new = changes.cursors
+    variables = {'owner': target_spec.username, 'name': target_spec.repo_name,
+                 'first': PAGE_SIZE if cursors is not None else None, 'last': 1 if cursors is None else None,
+                 'stargazersAfter': previous.stargazers_cursor, 'forksAfter': previous.forks_cursor}
+    while True:
+        data, _ = execute_graphql_with_errors(github_client, WATCHED_REPOSITORY_QUERY, variables,
+                                              request_headers=BYPASS_HEADERS)
+        repository = data['repository']
+        if repository is None:
+            raise github.UnknownObjectException(404, data, None, f"Could not resolve {target_spec.repo_full_name()}")
+        stargazers, forks = repository['stargazers'], repository['forks']
+        if cursors is not None:
+            changes.new_stargazers.extend(edge['node']['login'] for edge in stargazers['edges'] if edge['node'])
+            changes.new_forks.extend(node['nameWithOwner'] for node in forks['nodes'])
+        # The cursor of an empty page is null, the last one seen still applies
+        new.stargazers_cursor = stargazers['pageInfo']['endCursor'] or new.stargazers_cursor
+        new.forks_cursor = forks['pageInfo']['endCursor'] or new.forks_cursor
+        if cursors is None or not (stargazers['pageInfo']['hasNextPage'] or forks['pageInfo']['hasNextPage']):
+            break
+        variables.update(stargazersAfter=new.stargazers_cursor, forksAfter=new.forks_cursor)
+
+    head = repository['defaultBranchRef']
+    new.head_sha = head['target']['oid'] if head else None
+    # Stars and forks can also be removed, which only shows in their count
+    if changes.new_stargazers or stargazers['totalCount'] != previous.stargazer_count:
+        changes.inputs.add(HeuristicInput.STARGAZERS)
+    if changes.new_forks or forks['totalCount'] != previous.fork_count:
+        changes.inputs.add(HeuristicInput.FORKS)
+    if new.head_sha != previous.head_sha:
+        changes.inputs.add(HeuristicInput.COMMITS)
+    new.stargazer_count, new.fork_count = stargazers['totalCount'], forks['totalCount']
+    return changes
+
+
+def _detect_user_changes(github_client: github.Github | GitHubEntityStore, target_spec: TargetSpec,
+                         cursors: TargetCursors | None) -> TargetChanges:
+    previous = cursors or TargetCursors()
+    etag, user = _conditional_get(github_client, f"/users/{target_spec.username}", previous.etag)
+    # Pushes don't change the profile of the user, but do change their most recently pushed repository
+    repositories_etag, repositories = _conditional_get(
+        github_client, f"/users/{target_spec.username}/repos", previous.repositories_etag,
+        {'type': 'owner', 'sort': 'pushed', 'per_page': 1})
+
+    changes = TargetChanges(set(), dataclasses.replace(previous, etag=etag, repositories_etag=repositories_etag))
+    if user is not None:
+        changes.inputs.add(HeuristicInput.PROFILE)
+        changes.cursors.repository_count = user.get('public_repos')
+    if repositories is not None or changes.cursors.repository_count != previous.repository_count:
+        changes.inputs |= {HeuristicInput.REPOSITORIES, HeuristicInput.COMMITS}
+    return changes
+
+
+def read_targets(path: str) -> list[TargetSpec]:
+    """
+    Read the targets to watch, one per line. Empty lines and lines starting with '#' are ignored.
+    """
+    targets = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                targets.append(parse_target(line))
+            except ValueError as e:
+                logger.error("Ignoring invalid target '%s': %s", line, e)
+    return list(dict.fromkeys(targets))
+
+
+class Watcher:
+    """
+    Polls targets, only running again the heuristics whose inputs changed since the previous poll (see
+    MetadataHeuristic.inputs), and writes a JSON line event whenever the verdict of a heuristic on a target changes.
+    Cursors and verdicts are persisted, so that a restarted watch carries on where it stopped.
+    """
+
+    def __init__(self, github_client: github.Github, heuristics: list[MetadataHeuristic], state: WatchStateStore,
+                 concurrency: int = 4, full_rescan_interval: float = DEFAULT_FULL_RESCAN_INTERVAL,
+                 create_entity_store: Callable[[], GitHubEntityStore] = None):
+        self.heuristics = heuristics
+        self.state = state
+        self.concurrency = concurrency
+        self.full_rescan_interval = full_rescan_interval
+        # Each poll uses its own entity store, as the entities retrieved by previous polls may be outdated
+        self.create_entity_store = create_entity_store or (lambda: GitHubEntityStore(github_client))
+        self._output_lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def watch(self, targets: Callable[[], Iterable[TargetSpec]], output: TextIO, interval: float = DEFAULT_INTERVAL,
+              max_polls: int = None):
+        """
+        Poll the targets every interval seconds, until stopped or after max_polls polls. The targets are retrieved
+        again before each poll, so that the list can change while watching.
+        """
+        polls = 0
+        while not self._stopped.is_set():
+            started_at = time.monotonic()
+            events = self.poll(targets(), output)
+            polls += 1
+            logger.info("Poll %d completed in %.1fs, %d verdicts changed", polls, time.monotonic() - started_at,
+                        events)
+            if max_polls is not None and polls >= max_polls:
+                break
+            self._stopped.wait(max(interval - (time.monotonic() - started_at), 0))
+
+    def stop(self):
+        self._stopped.set()
+
+    def poll(self, targets: Iterable[TargetSpec], output: TextIO) -> int:
+        """
+        Poll each target once, writing the events to the output. Returns the number of events.
+        """
+
+        def poll_and_write(target_spec: TargetSpec) -> int:
+            try:
+                events = self.poll_target(target_spec)
+            except Exception as e:
+                # e.g. an unexpected response, the other targets are still polled and this one is tried again next time
+                logger.exception("Unexpected error while polling %s", target_spec)
+                events = [{**self._event_header(target_spec, "error"), "error": str(e)}]
+            with self._output_lock:
+                for event in events:
+                    output.write(json.dumps(event) + "\n")
+                output.flush()
+            return len(events)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='watch') as executor:
+            return sum(executor.map(poll_and_write, targets))
+
+    def poll_target(self, target_spec: TargetSpec) -> list[dict[str, Any]]:
+        cursors, last_full_scan = self.state.get_cursors(target_spec)
+        previous = self.state.get_verdicts(target_spec)
+        github_client = self.create_entity_store()
+        try:
+            changes = detect_changes(github_client, target_spec, cursors)
+        except github.GithubException as e:
+            # e.g. the target was taken down, the cursors are kept in case it comes back
+            logger.error("Unable to poll %s: %s", target_spec, e, exc_info=logger.isEnabledFor(logging.DEBUG))
+            return [{**self._event_header(target_spec, "error"), "error": str(e)}]
+
+        full_scan = last_full_scan is None or time.time() - last_full_scan >= self.full_rescan_interval
+        heuristics = [h for h in self.heuristics if h.target_type() == target_spec.target_type and
+                      (full_scan or self._needs_run(h, previous, changes))]
+        results = GitHubScanner(target_spec, github_client, heuristics).scan() if heuristics else []
+        logger.info("Polled %s: %s changed, ran %d heuristics", target_spec,
+                    ', '.join(sorted(i.value for i in changes.inputs)) or 'nothing', len(results))
+
+        events = []
+        verdicts = {}
+        for result in results:
+            heuristic_id = result.heuristic.id()
+            before = previous.get(heuristic_id, WatchedVerdict(None))
+            if result.errored:
+                # An error isn't a verdict, the heuristic runs again on the next poll
+                verdicts[heuristic_id] = dataclasses.replace(before, stale=True)
+                continue
+            verdict = SKIPPED if result.skipped else TRIGGERED if result.triggered else PASSED
+            verdicts[heuristic_id] = WatchedVerdict(verdict, result.additional_details)
+            if verdict != before.verdict:
+                events.append({
+                    **self._event_header(target_spec, "verdict_changed"),
+                    "heuristic": heuristic_id,
+                    "name": result.heuristic.friendly_name(),
+                    "previous": before.verdict,
+                    "verdict": verdict,
+                    "details": result.additional_details or None,
+                    "changes": changes.to_json(),
+                })
+        self.state.update(target_spec, changes.cursors, verdicts, full_scan=full_scan)
+        return events
+
+    @staticmethod
+    def _needs_run(heuristic: MetadataHeuristic, previous: dict[str, WatchedVerdict], changes: TargetChanges) -> bool:
+        verdict = previous.get(heuristic.id())
+        return verdict is None or verdict.stale or bool(heuristic.inputs() & changes.inputs)
+
+    @staticmethod
+    def _event_header(target_spec: TargetSpec, event: str) -> dict[str, Any]:
+        return {"event": event, "time": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                **OutputFormatter().format_target_json(target_spec)}
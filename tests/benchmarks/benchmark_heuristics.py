@@ -0,0 +1,152 @@
+"""
+Benchmark of the heuristics against a local fake GitHub API (see tests/test_utils/fake_github.py), scanning synthetic
+users and repositories of increasing sizes. For each heuristic, reports the wall time, the number of GitHub API
+requests and the peak memory allocated while scanning.
+
+Usage: python -m tests.benchmarks.benchmark_heuristics [--sizes 10 100 1000] [--latency 0.05] [--json results.json]
+"""
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+import tracemalloc
+from typing import Any
+
+from ghbuster import TargetSpec, TargetType
+from ghbuster.github_repo_scanner import GitHubScanner
+from ghbuster.heuristics import ALL_HEURISTICS, MetadataHeuristic
+from ghbuster.service import instrumentation
+from ghbuster.service.github_entity_store import GitHubEntityStore
+from tests.test_utils import fake_github
+from tests.test_utils.fake_github import FakeGitHub, FakeGitHubServer
+
+DEFAULT_SIZES = [10, 100, 1000]
+OWNER = 'bench-owner'
+REPO = 'bench-repo'
+
+
+def build_fixture(size: int) -> FakeGitHub:
+    """
+    Build a suspicious repository with `size` stargazers and commits, owned by a user with forks of taken down
+    repositories.
+    """
+    fake = FakeGitHub()
+    fake.add_user(OWNER, created_at='2024-05-01T00:00:00Z')
+    full_name = fake.add_repo(f"{OWNER}/{REPO}")['full_name']
+
+    for i in range(size):
+        # Half of the stargazers joined on the same day, the others look like regular users
+        if i % 2 == 0:
+            fake.add_user(f"stargazer-{i}", created_at='2024-05-02T00:00:00Z')
+        else:
+            fake.add_user(f"stargazer-{i}", name=f"User {i}", company='ACME', bio='Developer', location='Paris',
+                          created_at=f"{2010 + i % 10}-01-01T00:00:00Z", following=[OWNER])
+        fake.star(full_name, f"stargazer-{i}", starred_at='2024-05-03T00:00:00Z')
+
+    # Commits from a few authors, some of which were taken down, and from unlinked emails
+    authors = [fake.add_user(f"author-{i}")['login'] for i in range(10)]
+    for login in authors[:5]:
+        fake.take_down_user(login)
+    for i in range(size):
+        login = authors[i % len(authors)] if i % 3 else None
+        fake.add_commit(full_name, f"{i:040x}", f"author-{i % 20}@example.com", f"Author {i % 20}",
+                        author_login=login, date='2024-05-01T00:00:00Z')
+
+    for i in range(max(size // 10, 1)):
+        parent = fake.add_repo(f"upstream-{i}/library")['full_name']
+        fake.add_repo(f"{OWNER}/library-{i}", parent=parent)
+        if i % 2:
+            fake.block_repo(parent)
+        else:
+            fake.take_down_repo(parent)
+    return fake
+
+
+def benchmark_heuristic(base_url: str, heuristic: MetadataHeuristic, target_spec: TargetSpec) -> dict[str, Any]:
+    # Each heuristic starts with a fresh client, so that it doesn't benefit from entities retrieved by another one
+    github_client = fake_github.create_client(base_url)
+    instrumentation.install(github_client)
+    scanner = GitHubScanner(target_spec, GitHubEntityStore(github_client), [heuristic])
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = scanner.scan()[0]
+    wall_time = time.perf_counter() - start
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'heuristic': heuristic.id(),
+        'triggered': result.triggered,
+        'errored': result.errored,
+        'wall_time_seconds': round(wall_time, 3),
+        'requests': scanner.request_stats.total().requests,
+        'peak_memory_bytes': peak_memory,
+    }
+
+
+def run_benchmark(sizes: list[int], latency: float = 0) -> list[dict[str, Any]]:
+    results = []
+    for size in sizes:
+        with _ServerProcess(build_fixture(size), latency) as base_url:
+            for target_spec in [TargetSpec(TargetType.REPOSITORY, OWNER, REPO), TargetSpec(TargetType.USER, OWNER)]:
+                heuristics = [h for h in ALL_HEURISTICS if h.target_type() == target_spec.target_type]
+                for heuristic in sorted(heuristics, key=lambda h: h.id()):
+                    result = benchmark_heuristic(base_url, heuristic, target_spec)
+                    results.append({'size': size, **result})
+                    print(_format_row(results[-1]), file=sys.stderr)
+    return results
+
+
+class _ServerProcess:
+    """
+    Runs the fake GitHub API in a separate process, so that its CPU time and memory aren't attributed to heuristics.
+    """
+
+    def __init__(self, fake: FakeGitHub, latency: float):
+        self.fake = fake
+        self.latency = latency
+        self._connection, child_connection = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(target=_serve, args=(fake, latency, child_connection), daemon=True)
+
+    def __enter__(self) -> str:
+        self._process.start()
+        return self._connection.recv()
+
+    def __exit__(self, *args):
+        self._connection.send('stop')
+        self._process.join()
+
+
+def _serve(fake: FakeGitHub, latency: float, connection):
+    with FakeGitHubServer(fake, latency=latency) as server:
+        connection.send(server.base_url)
+        connection.recv()
+
+
+def _format_row(row: dict[str, Any]) -> str:
+    outcome = 'errored' if row['errored'] else 'triggered' if row['triggered'] else 'passed'
+    return (f"{row['size']:>6}  {row['heuristic']:<45} {outcome:<10} {row['wall_time_seconds']:>8.3f}s "
+            f"{row['requests']:>8} {row['peak_memory_bytes'] / 1024 / 1024:>9.2f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark heuristics against a local fake GitHub API")
+    parser.add_argument("--sizes", type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="Number of stargazers and commits of the synthetic repositories")
+    parser.add_argument("--latency", type=float, default=0,
+                        help="Simulated latency of each API request, in seconds")
+    parser.add_argument("--json", dest="json_path", help="Write the results to a JSON file")
+    args = parser.parse_args()
+
+    print(f"{'size':>6}  {'heuristic':<45} {'outcome':<10} {'time':>9} {'requests':>8} {'peak memory':>13}",
+          file=sys.stderr)
+    results = run_benchmark(args.sizes, latency=args.latency)
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
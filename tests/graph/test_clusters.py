@@ -0,0 +1,53 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from ghbuster.graph.clusters import StarMatrix, find_star_clusters
+from ghbuster.graph.store import Edge, GraphStore, Node, REPOSITORY, STARS, USER
+
+
+def star(user: str, repo: str) -> Edge:
+    return Edge(USER, user, STARS, REPOSITORY, repo)
+
+
+class TestStarClusters(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        # Regular users starring random popular repositories
+        self.edges = [star(f'user{i}', f'popular/repo{r}') for i in range(500)
+                      for r in rng.choice(1000, size=4, replace=False)]
+        # A campaign: accounts starring the same repositories, with a little noise
+        for i in range(12):
+            self.edges += [star(f'fake{i}', f'campaign/repo{r}') for r in range(6) if (i + r) % 7]
+            self.edges.append(star(f'fake{i}', f'popular/repo{i}'))
+
+    def test_campaign_is_found(self):
+        clusters = find_star_clusters(StarMatrix(self.edges))
+        self.assertEqual(1, len(clusters))
+        cluster = clusters[0]
+        self.assertEqual(sorted(f'fake{i}' for i in range(12)), cluster.users)
+        self.assertEqual({f'campaign/repo{r}' for r in range(6)}, set(cluster.repos))
+        self.assertGreater(cluster.score, 0.5)
+
+    def test_thresholds(self):
+        self.assertEqual([], find_star_clusters(StarMatrix(self.edges), min_cluster_size=13))
+        self.assertEqual([], find_star_clusters(StarMatrix(self.edges), min_shared_stars=7))
+        self.assertEqual([], find_star_clusters(StarMatrix([])))
+
+    def test_duplicate_edges(self):
+        edges = [star(f'fake{i}', f'campaign/repo{r}') for i in range(5) for r in range(3)]
+        clusters = find_star_clusters(StarMatrix(edges + edges))
+        self.assertEqual(1.0, clusters[0].score)
+
+    def test_from_store(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = GraphStore(os.path.join(directory, 'graph.sqlite'))
+            nodes = {Node(edge.source_kind, edge.source) for edge in self.edges} | \
+                    {Node(edge.target_kind, edge.target) for edge in self.edges}
+            store.add_nodes(list(nodes))
+            store.complete(Node(REPOSITORY, 'campaign/repo0'), 'available', [], self.edges)
+            clusters = find_star_clusters(StarMatrix.from_store(store))
+            store.close()
+        self.assertEqual(12, len(clusters[0].users))
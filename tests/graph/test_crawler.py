@@ -0,0 +1,96 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import github
+
+from ghbuster import TargetSpec, TargetType
+from ghbuster.graph.crawler import GraphCrawler
+from ghbuster.graph.store import GraphStore, Node, REPOSITORY, USER, DONE, PENDING, STARS, FORK_OF, OWNS, FORKS
+from tests.test_utils.fake_github import FakeGitHub, FakeGitHubServer
+
+FIXTURE = os.path.join(os.path.dirname(__file__), '..', 'fixtures', 'suspicious_repo.json')
+TARGET = TargetSpec(TargetType.REPOSITORY, 'malicious', 'awesome-tool')
+
+
+class TestGraphCrawler(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'graph.sqlite')
+        self.store = GraphStore(self.path)
+        self.fake = FakeGitHub.load(FIXTURE)
+
+    def tearDown(self):
+        self.store.close()
+        self.directory.cleanup()
+
+    def crawl(self, server: FakeGitHubServer, **kwargs):
+        return GraphCrawler(server.client(), self.store, **kwargs).crawl([TARGET])
+
+    def edges(self, edge_type: str) -> set[tuple[str, str]]:
+        return {(edge.source, edge.target) for edge in self.store.iter_edges(edge_type)}
+
+    def test_crawl(self):
+        with FakeGitHubServer(self.fake) as server:
+            stats = self.crawl(server, max_depth=2)
+        self.assertEqual(0, stats.failed)
+        self.assertIn(('stargazer0', 'malicious/awesome-tool'), self.edges(STARS))
+        self.assertIn(('malicious', 'malicious/awesome-tool'), self.edges(OWNS))
+        self.assertIn(('malicious/popular-lib', 'victim/popular-lib'), self.edges(FORK_OF))
+        nodes = {(node.kind, node.name): node for node in self.store.iter_nodes()}
+        # The repositories of the owner are at depth 2, and their parents at depth 3, beyond the budget
+        self.assertEqual(DONE, nodes[(REPOSITORY, 'malicious/popular-lib')].state)
+        self.assertEqual(PENDING, nodes[(REPOSITORY, 'victim/popular-lib')].state)
+
+    def test_taken_down_and_blocked_nodes(self):
+        with FakeGitHubServer(self.fake) as server:
+            self.crawl(server, max_depth=3)
+        nodes = {(node.kind, node.name): node for node in self.store.iter_nodes()}
+        self.assertEqual('taken_down', nodes[(REPOSITORY, 'victim/popular-lib')].status)
+        self.assertEqual('blocked', nodes[(REPOSITORY, 'other/blocked-lib')].status)
+        self.assertEqual('available', nodes[(REPOSITORY, 'malicious/awesome-tool')].status)
+
+    def test_node_budget(self):
+        with FakeGitHubServer(self.fake) as server:
+            self.crawl(server, max_nodes=5)
+        self.assertEqual(5, self.store.count_nodes())
+        # Edges only connect nodes that made it into the graph
+        names = {node.name for node in self.store.iter_nodes()}
+        for edge in self.store.iter_edges():
+            self.assertIn(edge.source, names)
+            self.assertIn(edge.target, names)
+
+    def test_interrupted_crawl_resumes(self):
+        with FakeGitHubServer(self.fake) as server:
+            full = GraphStore(os.path.join(self.directory.name, 'full.sqlite'))
+            full_stats = GraphCrawler(server.client(), full, concurrency=1).crawl([TARGET])
+            expected_edges = set(full.iter_edges())
+            full.close()
+
+            # The crawl fails on the first user
+            with patch.object(GraphCrawler, '_expand_user', side_effect=github.GithubException(502, 'Bad gateway')):
+                stats = self.crawl(server, concurrency=1)
+            self.assertGreater(stats.failed, 0)
+
+            # Resuming the crawl only expands the nodes that weren't, e.g. not the target again
+            self.store.close()
+            self.store = GraphStore(self.path)
+            resumed_stats = self.crawl(server, concurrency=1)
+        self.assertEqual(full_stats.expanded, stats.expanded + resumed_stats.expanded)
+        self.assertEqual(expected_edges, set(self.store.iter_edges()))
+        self.assertEqual(0, self.store.count_nodes('failed'))
+
+    def test_frontier_is_deduplicated(self):
+        self.store.add_nodes([Node(USER, 'Foo'), Node(USER, 'foo'), Node(REPOSITORY, 'foo/bar')])
+        self.assertEqual(2, self.store.count_nodes())
+        claimed = self.store.claim_pending(10)
+        self.assertEqual({'foo', 'foo/bar'}, {node.name for node in claimed})
+        self.assertEqual([], self.store.claim_pending(10))
+        self.assertEqual(2, self.store.reset_unfinished())
+
+    def test_forks_are_crawled(self):
+        self.fake.add_repo('stargazer1/awesome-tool', parent='malicious/awesome-tool')
+        with FakeGitHubServer(self.fake) as server:
+            self.crawl(server, max_depth=0)
+        self.assertIn(('stargazer1', 'malicious/awesome-tool'), self.edges(FORKS))
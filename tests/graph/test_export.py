@@ -0,0 +1,121 @@
+import io
+import os
+import tempfile
+import unittest
+import xml.etree.ElementTree as ET
+from unittest.mock import patch
+
+import networkx as nx
+
+from ghbuster.graph.export import export, is_headless, sample_graph, write_edge_list, write_gexf, write_graphml
+from ghbuster.graph.store import Edge, GraphStore, Node, OWNS, REPOSITORY, STARS, USER
+
+
+def star(user: str, repo: str) -> Edge:
+    return Edge(USER, user, STARS, REPOSITORY, repo, '2024-01-01T00:00:00Z')
+
+
+class TestGraphExport(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = GraphStore(os.path.join(self.directory.name, 'graph.sqlite'))
+        # Casual stargazers of the target, and a campaign of accounts starring the same repositories
+        edges = [star(f'user{i}', 'target/repo') for i in range(100)]
+        edges += [star(f'fake{i}', f'campaign/repo{r}') for i in range(12) for r in range(6)]
+        edges += [star(f'fake{i}', 'target/repo') for i in range(12)]
+        edges.append(Edge(USER, 'target', OWNS, REPOSITORY, 'target/repo'))
+        nodes = {Node(edge.source_kind, edge.source, depth=1) for edge in edges} | \
+                {Node(edge.target_kind, edge.target, depth=1) for edge in edges}
+        self.store.add_nodes([Node(REPOSITORY, 'target/repo')])
+        self.store.add_nodes(list(nodes))
+        self.store.complete(Node(REPOSITORY, 'target/repo'), 'available', [], edges)
+        self.edge_count = len(edges)
+        self.node_count = self.store.count_nodes()
+
+    def tearDown(self):
+        self.store.close()
+        self.directory.cleanup()
+
+    def test_edge_list(self):
+        output = io.StringIO()
+        self.assertEqual(self.edge_count, write_edge_list(self.store, output))
+        lines = output.getvalue().splitlines()
+        self.assertEqual(self.edge_count + 1, len(lines))
+        self.assertIn('user:user0\tstars\trepo:target/repo\t2024-01-01T00:00:00Z', lines)
+
+    def test_graphml(self):
+        output = io.StringIO()
+        write_graphml(self.store, output)
+        graph = nx.read_graphml(io.BytesIO(output.getvalue().encode()))
+        self.assertEqual(self.node_count, graph.number_of_nodes())
+        self.assertEqual(self.edge_count, graph.number_of_edges())
+        self.assertEqual('repo', graph.nodes['repo:target/repo']['kind'])
+        self.assertEqual(0, graph.nodes['repo:target/repo']['depth'])
+        self.assertEqual('owns', graph.edges['user:target', 'repo:target/repo']['type'])
+
+    def test_gexf(self):
+        output = io.StringIO()
+        write_gexf(self.store, output)
+        namespace = {'gexf': 'http://gexf.net/1.3'}
+        root = ET.fromstring(output.getvalue())
+        self.assertEqual(self.node_count, len(root.findall('.//gexf:node', namespace)))
+        self.assertEqual(self.edge_count, len(root.findall('.//gexf:edge', namespace)))
+
+    def test_names_are_escaped(self):
+        self.store.add_nodes([Node(USER, 'a"<b>&')])
+        output = io.StringIO()
+        write_graphml(self.store, output)
+        graph = nx.read_graphml(io.BytesIO(output.getvalue().encode()))
+        self.assertEqual('a"<b>&', graph.nodes['user:a"<b>&']['name'])
+
+    def test_sampling(self):
+        for method in ['k-core', 'top-degree', 'clusters']:
+            with self.subTest(method=method):
+                graph = sample_graph(self.store, 20, method)
+                self.assertLessEqual(graph.number_of_nodes(), 20)
+                # The crawl target is always kept
+                self.assertIn('repo:target/repo', graph)
+
+    def test_more_targets_than_max_nodes(self):
+        store = GraphStore(os.path.join(self.directory.name, 'targets.sqlite'))
+        try:
+            targets = [Node(REPOSITORY, f'target/repo{r}') for r in range(3)]
+            edges = [star(f'user{i}', f'target/repo{r}') for i in range(5) for r in range(3)]
+            store.add_nodes(targets)
+            store.add_nodes([Node(USER, f'user{i}', depth=1) for i in range(5)])
+            for target in targets:
+                store.complete(target, 'available', [], [edge for edge in edges if edge.target == target.name])
+            for method in ['k-core', 'top-degree', 'clusters']:
+                with self.subTest(method=method):
+                    graph = sample_graph(store, 2, method)
+                    self.assertEqual(2, graph.number_of_nodes())
+                    self.assertTrue(all(node.startswith('repo:target/') for node in graph))
+        finally:
+            store.close()
+
+    def test_k_core_keeps_the_campaign(self):
+        graph = sample_graph(self.store, 20, 'k-core')
+        expected = {f'user:fake{i}' for i in range(12)} | {f'repo:campaign/repo{r}' for r in range(6)}
+        self.assertEqual(expected | {'repo:target/repo'}, set(graph.nodes))
+        self.assertEqual(12 * 7, graph.number_of_edges())
+
+    def test_cluster_representatives(self):
+        # The target, the repositories of the campaign and a few of its accounts
+        graph = sample_graph(self.store, 17, 'clusters')
+        self.assertEqual(10, len([node for node in graph if node.startswith('user:fake')]))
+        self.assertTrue(all(f'repo:campaign/repo{r}' in graph for r in range(6)))
+
+    def test_unknown_sampling_method(self):
+        with self.assertRaises(ValueError):
+            sample_graph(self.store, 20, 'random')
+
+    def test_html_is_sampled_and_never_opened_headless(self):
+        path = os.path.join(self.directory.name, 'graph.html')
+        with patch.dict(os.environ, {'CI': 'true'}), patch('webbrowser.open') as open_browser:
+            self.assertTrue(is_headless())
+            export(self.store, 'html', path, max_nodes=20, open_browser=True)
+        open_browser.assert_not_called()
+        with open(path) as f:
+            html = f.read()
+        self.assertIn('campaign/repo0', html)
+        self.assertNotIn('user99', html)
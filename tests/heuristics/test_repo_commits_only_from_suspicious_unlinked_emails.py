@@ -0,0 +1,35 @@
+import asyncio
+import unittest
+
+from ghbuster import TargetSpec, TargetType
+from ghbuster.heuristics.repo_commits_only_from_suspicious_unlinked_emails import \
+    RepoCommitsOnlyFromSuspiciousUnlinkedEmails
+from ghbuster.service.async_github import AsyncGitHubClient
+from ghbuster.service.github_entity_store import GitHubEntityStore
+from tests.test_utils.fake_github import FakeGitHub, FakeGitHubServer
+
+
+class TestRepoCommitsOnlyFromSuspiciousUnlinkedEmails(unittest.TestCase):
+    def setUp(self):
+        self.heuristic = RepoCommitsOnlyFromSuspiciousUnlinkedEmails()
+        self.target_spec = TargetSpec(target_type=TargetType.REPOSITORY, username="owner", repo_name="repo")
+        self.fake = FakeGitHub()
+        self.fake.add_user('owner')
+
+    def run_heuristic(self):
+        with FakeGitHubServer(self.fake) as server:
+            result = self.heuristic.run(GitHubEntityStore(server.client()), self.target_spec)
+            async_result = asyncio.run(self.run_heuristic_async(GitHubEntityStore(server.client())))
+        # The asynchronous variant comes to the same outcome
+        self.assertEqual((result.triggered, result.additional_details),
+                         (async_result.triggered, async_result.additional_details))
+        return result
+
+    async def run_heuristic_async(self, github_client: GitHubEntityStore):
+        async with AsyncGitHubClient.for_client(github_client) as async_client:
+            return await self.heuristic.run_async(github_client, self.target_spec, async_client)
+
+    def test_negative_empty_repository(self):
+        self.fake.add_repo('owner/repo', branches={})
+        result = self.run_heuristic()
+        self.assertFalse(result.triggered)
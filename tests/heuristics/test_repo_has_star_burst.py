@@ -0,0 +1,78 @@
+import datetime
+import unittest
+
+import numpy as np
+
+from ghbuster import TargetSpec, TargetType
+from ghbuster.github_repo_scanner import StopPolicy
+from ghbuster.heuristics.repo_has_star_burst import RepoHasStarBurst, find_densest_window
+from ghbuster.service.github_entity_store import GitHubEntityStore
+from tests.test_utils.fake_github import FakeGitHub, FakeGitHubServer
+
+START = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+class TestRepoHasStarBurst(unittest.TestCase):
+    def setUp(self):
+        self.heuristic = RepoHasStarBurst()
+        self.target_spec = TargetSpec(target_type=TargetType.REPOSITORY, username="owner", repo_name="repo")
+        self.fake = FakeGitHub()
+        self.fake.add_repo('owner/repo')
+
+    def star(self, count: int, start: datetime.datetime, interval: datetime.timedelta):
+        for i in range(count):
+            login = f"user{len(self.fake.users)}"
+            self.fake.add_user(login)
+            starred_at = (start + i * interval).strftime('%Y-%m-%dT%H:%M:%SZ')
+            self.fake.star('owner/repo', login, starred_at=starred_at)
+
+    def run_heuristic(self):
+        with FakeGitHubServer(self.fake) as server:
+            return self.heuristic.run(GitHubEntityStore(server.client()), self.target_spec)
+
+    def test_positive_burst(self):
+        # A star a day for 100 days, then 50 more stars within 10 minutes on the 51st day
+        self.star(100, START, datetime.timedelta(days=1))
+        self.star(50, START + datetime.timedelta(days=50), datetime.timedelta(seconds=12))
+        result = self.run_heuristic()
+        self.assertTrue(result.triggered)
+        self.assertIn("received 51 stars (34 % of them) within an hour, starting at 2024-02-20 00:00",
+                      result.additional_details)
+
+    def test_positive_all_stars_in_recent_burst(self):
+        # 200 stars within the last 40 minutes
+        now = datetime.datetime.now(datetime.timezone.utc)
+        self.star(200, now - datetime.timedelta(minutes=40), datetime.timedelta(seconds=10))
+        result = self.run_heuristic()
+        self.assertTrue(result.triggered)
+        self.assertIn("received 200 stars (100 % of them)", result.additional_details)
+
+    def test_positive_recent_burst_beyond_max_stargazers(self):
+        self.heuristic.MAX_STARGAZERS = 100
+        self.star(200, START, datetime.timedelta(days=1))
+        self.star(50, START + datetime.timedelta(days=200), datetime.timedelta(seconds=12))
+        result = self.run_heuristic()
+        self.assertTrue(result.triggered)
+        self.assertIn("received 50 stars (50 % of them)", result.additional_details)
+
+    def test_negative_steady_pace(self):
+        self.star(500, START, datetime.timedelta(hours=2))
+        self.assertFalse(self.run_heuristic().triggered)
+
+    def test_negative_new_repository(self):
+        # All stars within a few hours, but at an even pace
+        self.star(60, START, datetime.timedelta(minutes=5))
+        self.assertFalse(self.run_heuristic().triggered)
+
+    def test_negative_too_few_stars(self):
+        self.star(10, START, datetime.timedelta(seconds=1))
+        self.assertFalse(self.run_heuristic().triggered)
+
+    def test_not_expensive(self):
+        # Star dates of most repositories are retrieved with a few queries, the heuristic isn't deferred as expensive
+        self.assertFalse(StopPolicy().is_expensive(self.heuristic))
+
+    def test_find_densest_window(self):
+        timestamps = np.array([0, 10, 20, 3600, 3601, 3602, 3603, 9000], dtype=np.int64)
+        self.assertEqual((4, 3), find_densest_window(timestamps, 60))
+        self.assertEqual((0, 0), find_densest_window(np.array([], dtype=np.int64), 60))
@@ -0,0 +1,120 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch, Mock
+
+from ghbuster import TargetSpec, TargetType
+from ghbuster.github_repo_scanner import GitHubScanner
+from ghbuster.heuristics.repo_starred_by_suspicious_users import RepoStarredBySuspiciousUsers
+from ghbuster.service.graphql_profiles import ProfileList
+from tests.test_utils.fake_github import FakeGitHub, FakeGitHubServer
+
+
+class TestRepoStarredBySuspiciousUsers(unittest.TestCase):
+    def setUp(self):
+        self.target_spec = TargetSpec(target_type=TargetType.REPOSITORY, username="user", repo_name="repo")
+
+    def mock_stargazers(self, get_stargazers, num_stargazers: int):
+        get_stargazers.return_value = ProfileList(num_stargazers, [
+            Mock(login=f"user{i}") for i in range(num_stargazers)
+        ])
+
+    @patch('ghbuster.heuristics.repo_starred_by_suspicious_users.GitHubProfileFetcher.get_stargazers')
+    @patch('ghbuster.heuristics.repo_starred_by_suspicious_users.github.Github')
+    def test_positive_stops_once_threshold_is_reached(self, gh, get_stargazers):
+        self.mock_stargazers(get_stargazers, 10)
+        heuristic = RepoStarredBySuspiciousUsers(max_workers=1)
+        with patch.object(heuristic, 'evaluate_stargazer', return_value=['user.just_joined']) as evaluate:
+            result = heuristic.run(gh, self.target_spec)
+        self.assertTrue(result.triggered)
+        self.assertEqual(evaluate.call_count, 8)
+        self.assertIn("user0, user1", result.additional_details)
+
+    @patch('ghbuster.heuristics.repo_starred_by_suspicious_users.GitHubProfileFetcher.get_stargazers')
+    @patch('ghbuster.heuristics.repo_starred_by_suspicious_users.github.Github')
+    def test_negative_stops_once_threshold_is_unreachable(self, gh, get_stargazers):
+        self.mock_stargazers(get_stargazers, 10)
+        heuristic = RepoStarredBySuspiciousUsers(max_workers=1)
+        with patch.object(heuristic, 'evaluate_stargazer', return_value=[]) as evaluate:
+            result = heuristic.run(gh, self.target_spec)
+        self.assertFalse(result.triggered)
+        self.assertEqual(evaluate.call_count, 3)
+
+    @patch('ghbuster.heuristics.repo_starred_by_suspicious_users.GitHubProfileFetcher.get_stargazers')
+    @patch('ghbuster.heuristics.repo_starred_by_suspicious_users.github.Github')
+    def test_parallel_evaluation(self, gh, get_stargazers):
+        self.mock_stargazers(get_stargazers, 10)
+        suspicious = {f"user{i}" for i in range(9)}
+        heuristic = RepoStarredBySuspiciousUsers(max_workers=4)
+        with patch.object(heuristic, 'evaluate_stargazer',
+                          side_effect=lambda _, login: ['user.just_joined'] if login in suspicious else []):
+            result = heuristic.run(gh, self.target_spec)
+        self.assertTrue(result.triggered)
+
+    @patch('ghbuster.heuristics.repo_starred_by_suspicious_users.GitHubProfileFetcher.get_stargazers')
+    @patch('ghbuster.heuristics.repo_starred_by_suspicious_users.github.Github')
+    def test_negative_no_stargazers(self, gh, get_stargazers):
+        self.mock_stargazers(get_stargazers, 0)
+        result = RepoStarredBySuspiciousUsers().run(gh, self.target_spec)
+        self.assertFalse(result.triggered)
+
+    @patch('ghbuster.heuristics.repo_starred_by_suspicious_users.GitHubProfileFetcher.get_stargazers')
+    @patch('ghbuster.heuristics.repo_starred_by_suspicious_users.github.Github')
+    def test_negative_too_many_stargazers(self, gh, get_stargazers):
+        get_stargazers.return_value = ProfileList(RepoStarredBySuspiciousUsers.MAX_STARGAZERS + 1, [])
+        heuristic = RepoStarredBySuspiciousUsers()
+        with patch.object(heuristic, 'evaluate_stargazer') as evaluate:
+            result = heuristic.run(gh, self.target_spec)
+        self.assertFalse(result.triggered)
+        evaluate.assert_not_called()
+
+    def test_too_many_stargazers_only_retrieves_first_page(self):
+        fake = FakeGitHub()
+        fake.add_user('user')
+        fake.add_repo('user/repo')
+        for i in range(150):
+            fake.add_user(f'fan{i}')
+            fake.star('user/repo', f'fan{i}')
+        with FakeGitHubServer(fake) as server:
+            result = RepoStarredBySuspiciousUsers().run(server.client(), self.target_spec)
+            self.assertFalse(result.triggered)
+            self.assertEqual([('POST', '/graphql')], server.requests)
+
+    @patch('ghbuster.heuristics.repo_starred_by_suspicious_users.GitHubProfileFetcher.get_stargazers_async',
+           new_callable=AsyncMock)
+    def test_async_variant_stops_once_threshold_is_reached(self, get_stargazers_async):
+        get_stargazers_async.return_value = ProfileList(10, [Mock(login=f"user{i}") for i in range(10)])
+        heuristic = RepoStarredBySuspiciousUsers(max_workers=1)
+
+        async def evaluate_stargazer_async(github_client, stargazer, async_client):
+            await asyncio.sleep(0.01)
+            return ['user.just_joined']
+
+        with patch.object(heuristic, 'evaluate_stargazer_async', side_effect=evaluate_stargazer_async) as evaluate:
+            result = asyncio.run(heuristic.run_async(MagicMock(), self.target_spec, MagicMock()))
+        self.assertTrue(result.triggered)
+        # The evaluation that started when the 8th one completed is cancelled
+        self.assertEqual(evaluate.await_count, 9)
+        self.assertIn("at least 8 stargazers", result.additional_details)
+        self.assertIn("user0, user1", result.additional_details)
+
+    @patch('ghbuster.heuristics.repo_starred_by_suspicious_users.GitHubProfileFetcher.get_stargazers_async',
+           new_callable=AsyncMock)
+    def test_scanner_concurrency_bounds_evaluations(self, get_stargazers_async):
+        get_stargazers_async.return_value = ProfileList(10, [Mock(login=f"user{i}") for i in range(10)])
+        heuristic = RepoStarredBySuspiciousUsers()
+        in_flight = peak_in_flight = 0
+
+        async def evaluate_stargazer_async(github_client, stargazer, async_client):
+            nonlocal in_flight, peak_in_flight
+            in_flight += 1
+            peak_in_flight = max(peak_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return []
+
+        # The scanner awaits the asynchronous variant, bounded by its concurrency
+        with patch.object(heuristic, 'evaluate_stargazer_async', side_effect=evaluate_stargazer_async), \
+                patch.object(heuristic, 'run', side_effect=AssertionError("the asynchronous variant should be used")):
+            results = GitHubScanner(self.target_spec, MagicMock(), heuristics=[heuristic], concurrency=3).scan()
+        self.assertFalse(results[0].errored)
+        self.assertEqual(3, peak_in_flight)
@@ -1,93 +1,81 @@
+import asyncio
 import unittest
-from unittest.mock import patch, Mock
-
-from github import Repository, GithubException
 
 from ghbuster import TargetSpec, TargetType
 from ghbuster.heuristics.user_has_forks_from_taken_down_repos import UserHasForksFromTakenDownRepos
-from tests.test_utils.mock_utils import mock_pygithub_list
+from ghbuster.service.async_github import AsyncGitHubClient
+from ghbuster.service.github_entity_store import GitHubEntityStore
+from tests.test_utils.fake_github import FakeGitHub, FakeGitHubServer
 
 
 class TestUserHasForksFromTakenDownRepos(unittest.TestCase):
     def setUp(self):
         self.heuristic = UserHasForksFromTakenDownRepos()
-
-    @patch('ghbuster.heuristics.user_has_forks_from_taken_down_repos.github.Github')
-    def test_positive(self, gh):
-        target_spec = TargetSpec(target_type=TargetType.USER, username="fork")
-
-        parent_repo1 = Mock(Repository, full_name='foo/repo1')
-        repo1 = Mock(spec=Repository, fork=True, full_name="fork/repo1")
-        repo1.parent = parent_repo1
-
-        parent_repo2 = Mock(Repository, full_name='foo/repo2')  # not existing anymore
-        repo2 = Mock(spec=Repository, fork=True, full_name="fork/repo2")
-        repo2.parent = parent_repo2
-        user_repos = [repo1, repo2]
-
-        other_repos = [
-            parent_repo1
-            # note: parent_repo2 is not included here, simulating that it has been taken down
-        ]
-
-        def side_effect(repo_name):
-            user_repos_by_name = {repo.full_name: repo for repo in user_repos}
-            other_repos_by_name = {repo.full_name: repo for repo in other_repos}
-            if repo_name in user_repos_by_name:
-                return user_repos_by_name[repo_name]
-            elif repo_name in other_repos_by_name:
-                return other_repos_by_name[repo_name]
-            else:
-                raise GithubException(status=404)
-
-        gh.get_repo.side_effect = side_effect
-        gh.get_user.return_value.get_repos = Mock(return_value=mock_pygithub_list(user_repos))
-        result = self.heuristic.run(gh, target_spec)
+        self.target_spec = TargetSpec(target_type=TargetType.USER, username="fork")
+        self.fake = FakeGitHub()
+        self.fake.add_user('fork')
+        self.fake.add_repo('foo/repo1')
+        self.fake.add_repo('foo/repo2')
+        self.fake.add_repo('fork/repo1', parent='foo/repo1')
+        self.fake.add_repo('fork/repo2', parent='foo/repo2')
+
+    def run_heuristic(self):
+        with FakeGitHubServer(self.fake) as server:
+            result = self.heuristic.run(GitHubEntityStore(server.client()), self.target_spec)
+            self.request_count = server.request_count
+
+            # The asynchronous variant sends the same queries, and comes to the same outcome
+            server.reset_requests()
+            async_result = asyncio.run(self.run_heuristic_async(GitHubEntityStore(server.client())))
+            self.assertEqual(self.request_count, server.request_count)
+        self.assertEqual((result.triggered, result.additional_details),
+                         (async_result.triggered, async_result.additional_details))
+        return result
+
+    async def run_heuristic_async(self, github_client: GitHubEntityStore):
+        async with AsyncGitHubClient.for_client(github_client) as async_client:
+            return await self.heuristic.run_async(github_client, self.target_spec, async_client)
+
+    def test_positive(self):
+        self.fake.take_down_repo('foo/repo2')
+        result = self.run_heuristic()
         self.assertTrue(result.triggered)
+        self.assertEqual("The user fork has forks from taken down repositories: foo/repo2.", result.additional_details)
 
-    @patch('ghbuster.heuristics.user_has_forks_from_taken_down_repos.github.Github')
-    def test_negative_no_repo(self, gh):
-        target_spec = TargetSpec(target_type=TargetType.USER, username="fork")
-        gh.get_user.return_value.get_repos = Mock(return_value=mock_pygithub_list([]))
-        result = self.heuristic.run(gh, target_spec)
-        self.assertFalse(result.triggered)
-
-    @patch('ghbuster.heuristics.user_has_forks_from_taken_down_repos.github.Github')
-    def test_negative_forks_with_existing_parents(self, gh):
-        target_spec = TargetSpec(target_type=TargetType.USER, username="fork")
-
-        parent_repo1 = Mock(Repository, full_name='foo/repo1')
-        repo1 = Mock(spec=Repository, fork=True, full_name="fork/repo1")
-        repo1.parent = parent_repo1
-
-        parent_repo2 = Mock(Repository, full_name='foo/repo2')  # not existing anymore
-        repo2 = Mock(spec=Repository, fork=True, full_name="fork/repo2")
-        repo2.parent = parent_repo2
-        user_repos = [repo1, repo2]
-
-        other_repos = [
-            parent_repo1,
-            parent_repo2
-        ]
-        user_repos_by_name = {repo.full_name: repo for repo in user_repos}
-        other_repos_by_name = {repo.full_name: repo for repo in other_repos}
-
-        gh.get_repo.side_effect = lambda repo_name: user_repos_by_name[
-            repo_name] if repo_name in user_repos_by_name else other_repos_by_name[repo_name]
-        gh.get_user.return_value.get_repos = Mock(return_value=mock_pygithub_list(user_repos))
-        result = self.heuristic.run(gh, target_spec)
-        self.assertFalse(result.triggered)
-
-    @patch('ghbuster.heuristics.user_has_forks_from_taken_down_repos.github.Github')
-    def test_negative_no_forks(self, gh):
-        target_spec = TargetSpec(target_type=TargetType.USER, username="fork")
-
-        user_repos = [
-            Mock(spec=Repository, fork=False, full_name="foo/repo1"),
-            Mock(spec=Repository, fork=False, full_name="foo/repo2")
-        ]
-
-        gh.get_repo.return_value = Mock(return_value=mock_pygithub_list(user_repos))
-        gh.get_user.return_value.get_repos = Mock(return_value=mock_pygithub_list(user_repos))
-        result = self.heuristic.run(gh, target_spec)
-        self.assertFalse(result.triggered)
+    def test_positive_blocked_parent(self):
+        self.fake.block_repo('foo/repo1')
+        self.fake.take_down_repo('foo/repo2')
+        result = self.run_heuristic()
+        self.assertTrue(result.triggered)
+        self.assertEqual("The user fork has forks from taken down repositories: foo/repo2 and from repositories "
+                         "blocked for Terms of Service violations: foo/repo1.", result.additional_details)
+
+    def test_negative_no_repo(self):
+        self.fake = FakeGitHub()
+        self.fake.add_user('fork')
+        self.assertFalse(self.run_heuristic().triggered)
+
+    def test_negative_forks_with_existing_parents(self):
+        self.assertFalse(self.run_heuristic().triggered)
+
+    def test_negative_no_forks(self):
+        self.fake = FakeGitHub()
+        self.fake.add_user('fork')
+        self.fake.add_repo('fork/repo1')
+        self.fake.add_repo('fork/repo2')
+        self.assertFalse(self.run_heuristic().triggered)
+
+    def test_blocked_forks_are_ignored(self):
+        self.fake.take_down_repo('foo/repo2')
+        self.fake.block_repo('fork/repo2')
+        self.assertFalse(self.run_heuristic().triggered)
+
+    def test_all_forks_are_analyzed_in_batches(self):
+        for i in range(150):
+            self.fake.add_repo(f'fork/lib{i}', parent=f'upstream{i}/lib')
+            self.fake.take_down_repo(f'upstream{i}/lib')
+        result = self.run_heuristic()
+        self.assertTrue(result.triggered)
+        self.assertIn('upstream149/lib', result.additional_details)
+        # Two pages of forks, then two batches of parents
+        self.assertEqual(4, self.request_count)
@@ -0,0 +1,67 @@
+import asyncio
+import unittest
+
+from ghbuster.service.account_existence import AccountExistenceService
+from ghbuster.service.async_github import AsyncGitHubClient
+from ghbuster.service.github_entity_store import GitHubEntityStore
+from tests.test_utils.fake_github import FakeGitHub, FakeGitHubServer
+
+
+class TestAccountExistenceService(unittest.TestCase):
+    def setUp(self):
+        self.fake = FakeGitHub()
+        for i in range(1, 151):
+            self.fake.add_user(f'user{i}', id=i)
+        self.fake.take_down_user('user2')
+
+    def test_accounts_are_checked_in_batches(self):
+        with FakeGitHubServer(self.fake) as server:
+            service = AccountExistenceService(server.client())
+            result = service.users_exist(list(range(1, 152)))
+            self.assertEqual(2, server.request_count)
+
+            self.assertFalse(result[2])
+            self.assertFalse(result[151])
+            self.assertEqual(149, sum(result.values()))
+            # Outcomes are cached
+            self.assertTrue(service.user_exists(1))
+            self.assertFalse(service.user_exists(2))
+            self.assertEqual(2, server.request_count)
+
+    def test_batches_are_checked_concurrently_through_the_async_client(self):
+        async def users_exist(service: AccountExistenceService, user_ids: list[int]) -> dict[int, bool]:
+            async with AsyncGitHubClient.for_client(service.github_client) as async_client:
+                return await service.users_exist_async(user_ids, async_client)
+
+        with FakeGitHubServer(self.fake) as server:
+            service = AccountExistenceService(server.client())
+            result = asyncio.run(users_exist(service, list(range(1, 152))))
+            self.assertEqual(2, server.request_count)
+            self.assertEqual(149, sum(result.values()))
+            # The cache is shared with the synchronous variant
+            self.assertFalse(service.user_exists(2))
+            self.assertEqual(2, server.request_count)
+
+    def test_cache_is_bounded(self):
+        with FakeGitHubServer(self.fake) as server:
+            service = AccountExistenceService(server.client(), max_entries=2)
+            service.users_exist([1, 2])
+            service.user_exists(1)
+            service.user_exists(3)
+            self.assertEqual(2, server.request_count)
+            # 2 was the least recently used outcome
+            service.users_exist([1, 3])
+            self.assertEqual(2, server.request_count)
+            service.user_exists(2)
+            self.assertEqual(3, server.request_count)
+
+    def test_outcomes_expire(self):
+        with FakeGitHubServer(self.fake) as server:
+            service = AccountExistenceService(server.client(), ttl_seconds=0)
+            service.user_exists(1)
+            service.user_exists(1)
+            self.assertEqual(2, server.request_count)
+
+    def test_shared_by_heuristics_of_a_scan(self):
+        store = GitHubEntityStore(None)
+        self.assertIs(AccountExistenceService.for_client(store), AccountExistenceService.for_client(store))
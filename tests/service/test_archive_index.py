@@ -0,0 +1,60 @@
+import gzip
+import json
+import os
+import tempfile
+import unittest
+
+from ghbuster.service.archive_index import ArchiveIndex
+
+
+def event(event_type: str, actor: str, repo: str, created_at: str) -> dict:
+    return {'id': '1', 'type': event_type, 'actor': {'id': 1, 'login': actor}, 'repo': {'id': 1, 'name': repo},
+            'payload': {'action': 'started'}, 'public': True, 'created_at': created_at}
+
+
+class TestArchiveIndex(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.index = ArchiveIndex(os.path.join(self.directory.name, 'archive.sqlite'))
+        self.dump = self.write_dump('2024-05-01-12.json.gz', [
+            event('WatchEvent', 'alice', 'foo/bar', '2024-05-01T12:05:00Z'),
+            event('ForkEvent', 'bob', 'foo/bar', '2024-05-01T12:01:00Z'),
+            event('PushEvent', 'alice', 'alice/dotfiles', '2024-05-01T12:03:00Z'),
+        ])
+
+    def tearDown(self):
+        self.index.close()
+        self.directory.cleanup()
+
+    def write_dump(self, name: str, events: list[dict]) -> str:
+        path = os.path.join(self.directory.name, name)
+        with gzip.open(path, 'wt') as f:
+            f.write(''.join(json.dumps(e) + '\n' for e in events) + 'not json\n')
+        return path
+
+    def test_ingestion_is_resumable(self):
+        self.assertEqual(3, self.index.ingest([self.dump]))
+        self.assertEqual(0, self.index.ingest([self.dump]))
+        self.assertEqual(['2024-05-01-12.json.gz'], self.index.ingested_files())
+
+    def test_event_types_filter(self):
+        self.assertEqual(2, self.index.ingest([self.dump], event_types={'WatchEvent', 'ForkEvent'}))
+
+    def test_lookups(self):
+        self.index.ingest([self.dump])
+        events = self.index.repo_events('foo/bar')
+        self.assertEqual(['ForkEvent', 'WatchEvent'], [e.event_type for e in events])
+        self.assertEqual(2024, events[0].created_at.year)
+        stars = self.index.actor_events('alice', event_types=['WatchEvent'])
+        self.assertEqual(['foo/bar'], [e.repo_name for e in stars])
+
+    def test_query_is_compatible_with_github_archive(self):
+        self.index.ingest([self.dump])
+        events = self.index.query("SELECT event_type, actor_login, repo_name, created_at FROM github_events "
+                                  "WHERE event_type = 'WatchEvent' AND repo_name = 'foo/bar'")
+        self.assertEqual(1, len(events))
+        self.assertEqual('2024-05-01 12:05:00', events[0]._raw['created_at'])
+        # Aggregate queries
+        counts = self.index.query("SELECT repo_name, count() AS stars FROM github_events GROUP BY repo_name "
+                                  "ORDER BY repo_name", keep_raw=True)
+        self.assertEqual({'alice/dotfiles': '1', 'foo/bar': '2'}, {e.repo_name: e._raw['stars'] for e in counts})
@@ -0,0 +1,120 @@
+import asyncio
+import collections
+import http.server
+import json
+import threading
+import time
+import unittest
+
+import github
+
+from ghbuster.service.async_github import AsyncGitHubClient
+from ghbuster.service.rate_limit_scheduler import RateLimitScheduler
+
+
+class _FakeGraphQLHandler(http.server.BaseHTTPRequestHandler):
+    requests = []
+    # Number of queries in flight per kind, and the highest one seen
+    in_flight = collections.Counter()
+    peak_in_flight = collections.Counter()
+    lock = threading.Lock()
+
+    def do_POST(self):
+        token = self.headers.get('Authorization', '').removeprefix('token ')
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        query, kind = body['query'], body['variables'].get('kind')
+        self.requests.append((query, token))
+        if token == 'exhausted':
+            self._reply(403, {'message': 'API rate limit exceeded'}, {'X-RateLimit-Remaining': '0',
+                                                                      'X-RateLimit-Reset': '9999999999'})
+        elif query == 'missing':
+            self._reply(200, {'data': {'user': None},
+                              'errors': [{'type': 'NOT_FOUND', 'path': ['user'], 'message': 'Could not resolve'}]})
+        elif query == 'forbidden':
+            self._reply(200, {'data': {'repository': None},
+                              'errors': [{'type': 'FORBIDDEN', 'message': 'Repository access blocked'}]})
+        elif query == 'broken':
+            self._reply(500, {'message': 'Server Error'})
+        else:
+            with self.lock:
+                self.in_flight[kind] += 1
+                self.peak_in_flight[kind] = max(self.peak_in_flight[kind], self.in_flight[kind])
+            time.sleep(0.05)
+            with self.lock:
+                self.in_flight[kind] -= 1
+            self._reply(200, {'data': {'viewer': {'login': 'octocat'}}})
+
+    def _reply(self, status: int, body: dict, headers: dict = None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestAsyncGitHubClient(unittest.TestCase):
+    def setUp(self):
+        _FakeGraphQLHandler.requests = []
+        _FakeGraphQLHandler.in_flight = collections.Counter()
+        _FakeGraphQLHandler.peak_in_flight = collections.Counter()
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _FakeGraphQLHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def run_with_client(self, check, token: str = 'secret', scheduler: RateLimitScheduler = None, **kwargs):
+        async def run():
+            async with AsyncGitHubClient(token, base_url=self.base_url, scheduler=scheduler, **kwargs) as client:
+                return await check(client)
+
+        return asyncio.run(run())
+
+    def test_tolerated_errors_are_returned(self):
+        async def check(client: AsyncGitHubClient):
+            data, errors = await client.graphql_with_errors('missing', {}, kind=client.ACCOUNTS)
+            self.assertEqual({'user': None}, data)
+            self.assertEqual([['user']], [error['path'] for error in errors])
+
+            _, errors = await client.graphql_with_errors('forbidden', {}, kind=client.REPOSITORIES,
+                                                         tolerated_error_types=('NOT_FOUND', 'FORBIDDEN'))
+            self.assertEqual(1, len(errors))
+            with self.assertRaises(github.GithubException) as context:
+                await client.graphql('forbidden', {}, kind=client.REPOSITORIES)
+            self.assertEqual('Repository access blocked', context.exception.message)
+
+        self.run_with_client(check)
+
+    def test_server_errors_are_raised(self):
+        async def check(client: AsyncGitHubClient):
+            with self.assertRaises(github.GithubException) as context:
+                await client.graphql('broken', {}, kind=client.PROFILES)
+            self.assertEqual(500, context.exception.status)
+
+        self.run_with_client(check)
+
+    def test_queries_in_flight_are_bounded_per_kind(self):
+        async def check(client: AsyncGitHubClient):
+            await asyncio.gather(*(client.graphql('query', {'kind': kind}, kind=kind)
+                                   for kind in [client.PROFILES] * 6 + [client.ACCOUNTS] * 6))
+
+        self.run_with_client(check, limits={AsyncGitHubClient.PROFILES: 2, AsyncGitHubClient.ACCOUNTS: 3})
+        self.assertEqual(2, _FakeGraphQLHandler.peak_in_flight[AsyncGitHubClient.PROFILES])
+        self.assertEqual(3, _FakeGraphQLHandler.peak_in_flight[AsyncGitHubClient.ACCOUNTS])
+
+    def test_rotates_to_another_token_when_rate_limited(self):
+        scheduler = RateLimitScheduler(['exhausted', 'fresh'])
+
+        async def check(client: AsyncGitHubClient):
+            return await client.graphql('query', {}, kind=client.PROFILES)
+
+        self.assertEqual({'viewer': {'login': 'octocat'}}, self.run_with_client(check, scheduler=scheduler))
+        self.assertEqual([('query', 'exhausted'), ('query', 'fresh')], _FakeGraphQLHandler.requests)
@@ -0,0 +1,110 @@
+import os
+import subprocess
+import tempfile
+import unittest
+
+from ghbuster.service.commit_history import CommitHistory, GitCloneCommitHistory, GraphQLCommitHistory, \
+    RestCommitHistory
+from tests.test_utils.fake_github import FakeGitHub, FakeGitHubServer
+
+
+def create_fake() -> FakeGitHub:
+    fake = FakeGitHub()
+    fake.add_user('alice')
+    fake.add_repo('alice/lib')
+    for i in range(150):
+        fake.add_commit('alice/lib', f'{i:040x}', 'alice@example.com', 'Alice', author_login='alice')
+    # A feature branch on top of main, and a branch that was merged
+    fake.repos['alice/lib']['branches']['feature'] = list(fake.repos['alice/lib']['branches']['main'])
+    fake.add_commit('alice/lib', 'f' * 40, 'bob@example.com', 'Bob', branch='feature')
+    fake.repos['alice/lib']['branches']['merged'] = fake.repos['alice/lib']['branches']['main'][50:]
+    return fake
+
+
+class TestCommitHistory(unittest.TestCase):
+    def test_graphql_history_is_deduplicated_across_branches(self):
+        with FakeGitHubServer(create_fake()) as server:
+            commits = list(GraphQLCommitHistory(server.client()).iter_commits('alice/lib'))
+            # Branches, then two pages of main, and two pages of feature. The merged branch is skipped
+            self.assertEqual(5, server.request_count)
+
+        self.assertEqual(151, len(commits))
+        self.assertEqual(151, len({commit.sha for commit in commits}))
+        self.assertEqual(f'{149:040x}', commits[0].sha)
+        bob = commits[-1]
+        self.assertEqual(('bob@example.com', 'Bob', None, None),
+                         (bob.author_email, bob.author_name, bob.author_id, bob.author_login))
+        self.assertEqual('alice', commits[0].author_login)
+
+    def test_rest_and_graphql_histories_match(self):
+        with FakeGitHubServer(create_fake()) as server:
+            client = server.client()
+            for all_branches in [True, False]:
+                self.assertEqual(
+                    list(RestCommitHistory(client).iter_commits('alice/lib', all_branches=all_branches)),
+                    list(GraphQLCommitHistory(client).iter_commits('alice/lib', all_branches=all_branches)))
+
+    def test_max_commits(self):
+        with FakeGitHubServer(create_fake()) as server:
+            commits = list(GraphQLCommitHistory(server.client()).iter_commits('alice/lib', max_commits=100))
+            self.assertEqual(2, server.request_count)
+        self.assertEqual(100, len(commits))
+
+    def test_backends_must_implement_branch_history(self):
+        class BranchesOnly(CommitHistory):
+            def list_branches(self, repo_full_name, all_branches=True):
+                return []
+
+        with self.assertRaises(TypeError):
+            BranchesOnly()
+
+
+class TestGitCloneCommitHistory(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.directory.name, 'source')
+        self.cache_dir = os.path.join(self.directory.name, 'cache')
+        self.git('init', '--quiet', '--initial-branch=main', self.source)
+        self.fake = FakeGitHub()
+        self.fake.add_user('alice', id=42)
+        self.fake.add_repo('alice/lib', branches={'main': []})
+        self.commit('alice@example.com', 'Alice', author_login='alice')
+        self.commit('alice@example.com', 'Alice', author_login='alice')
+        self.commit('unlinked@example.com', 'Someone')
+        self.commit('7+bob@users.noreply.github.com', 'Bob')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def git(self, *args: str) -> str:
+        return subprocess.run(['git', *args], check=True, capture_output=True, text=True).stdout.strip()
+
+    def commit(self, email: str, name: str, author_login: str = None, branch: str = 'main'):
+        self.git('-C', self.source, 'checkout', '--quiet', '-B', branch)
+        self.git('-C', self.source, '-c', f'user.email={email}', '-c', f'user.name={name}', 'commit', '--quiet',
+                 '--allow-empty', '-m', 'commit')
+        sha = self.git('-C', self.source, 'rev-parse', 'HEAD')
+        self.fake.add_commit('alice/lib', sha, email, name, author_login=author_login, branch=branch)
+
+    def history(self, server: FakeGitHubServer) -> GitCloneCommitHistory:
+        return GitCloneCommitHistory(server.client(), self.cache_dir, remote_url=lambda _: f"file://{self.source}")
+
+    def test_commits_are_read_from_a_partial_clone(self):
+        with FakeGitHubServer(self.fake) as server:
+            commits = list(self.history(server).iter_commits('alice/lib'))
+            # A single batch to link the emails that aren't noreply ones to GitHub users
+            self.assertEqual(1, server.request_count)
+
+        self.assertTrue(os.path.isdir(os.path.join(self.cache_dir, 'alice/lib.git')))
+        self.assertEqual([('7+bob@users.noreply.github.com', 7, 'bob'), ('unlinked@example.com', None, None),
+                          ('alice@example.com', 42, 'alice'), ('alice@example.com', 42, 'alice')],
+                         [(c.author_email, c.author_id, c.author_login) for c in commits])
+
+    def test_new_commits_are_fetched_on_later_scans(self):
+        with FakeGitHubServer(self.fake) as server:
+            self.assertEqual(4, len(list(self.history(server).iter_commits('alice/lib'))))
+            self.commit('alice@example.com', 'Alice', author_login='alice', branch='feature')
+            history = self.history(server)
+            self.assertEqual(5, len(list(history.iter_commits('alice/lib'))))
+            self.assertEqual(4, len(list(history.iter_commits('alice/lib', all_branches=False))))
+            self.assertEqual(2, len(list(history.iter_commits('alice/lib', max_commits=2))))
@@ -0,0 +1,98 @@
+import os
+import tempfile
+import unittest
+
+from ghbuster.service.commit_history import GraphQLCommitHistory
+from ghbuster.service.commit_index import CommitIndex, IndexedCommitHistory
+from tests.test_utils.fake_github import FakeGitHub, FakeGitHubServer
+
+
+class TestIndexedCommitHistory(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.index_path = os.path.join(self.directory.name, 'commits.sqlite')
+        self.fake = FakeGitHub()
+        self.fake.add_user('alice')
+        self.fake.add_repo('alice/lib')
+        self.add_commits(250)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def add_commits(self, count: int, branch: str = 'main'):
+        commits = self.fake.repos['alice/lib']['commits']
+        for i in range(len(commits), len(commits) + count):
+            self.fake.add_commit('alice/lib', f'{i:040x}', 'alice@example.com', 'Alice', author_login='alice',
+                                 branch=branch)
+
+    def scan(self, server: FakeGitHubServer, **kwargs) -> list[str]:
+        index = CommitIndex(self.index_path)
+        try:
+            history = IndexedCommitHistory(GraphQLCommitHistory(server.client()), index)
+            server.reset_requests()
+            return [commit.sha for commit in history.iter_commits('alice/lib', **kwargs)]
+        finally:
+            index.close()
+
+    def test_later_scans_only_retrieve_new_commits(self):
+        with FakeGitHubServer(self.fake) as server:
+            self.assertEqual(250, len(self.scan(server)))
+            # Branches, and 3 pages of history
+            self.assertEqual(4, server.request_count)
+
+            self.assertEqual(250, len(self.scan(server)))
+            self.assertEqual(1, server.request_count)
+
+            self.add_commits(5)
+            self.add_commits(3, branch='feature')
+            shas = self.scan(server)
+            # Branches, and a page of history per updated branch
+            self.assertEqual(3, server.request_count)
+
+        self.assertEqual(258, len(shas))
+        self.assertEqual(258, len(set(shas)))
+        self.assertEqual([f'{i:040x}' for i in [254, 253, 252, 251, 250]], shas[:5])
+        self.assertEqual(f'{249:040x}', shas[8])
+
+    def test_limited_scans(self):
+        with FakeGitHubServer(self.fake) as server:
+            self.assertEqual([f'{i:040x}' for i in range(249, 149, -1)], self.scan(server, max_commits=100))
+            self.assertEqual(2, server.request_count)
+
+            self.add_commits(2)
+            shas = self.scan(server, max_commits=100)
+            self.assertEqual(2, server.request_count)
+            self.assertEqual([f'{i:040x}' for i in range(251, 151, -1)], shas)
+
+            # The index doesn't hold the whole history yet
+            self.assertEqual(252, len(self.scan(server)))
+            self.assertEqual(4, server.request_count)
+
+    def test_merged_commits_older_than_the_previous_head_are_indexed(self):
+        with FakeGitHubServer(self.fake) as server:
+            self.scan(server)
+            self.add_commits(1)
+            # A branch created from an indexed commit and merged after the scan, with commits dated before the
+            # previous head
+            self.fake.add_commit('alice/lib', f'{300:040x}', 'bob@example.com', 'Bob', date='2023-01-01T00:00:00Z',
+                                 branch='feature', parents=[f'{200:040x}'])
+            self.fake.add_commit('alice/lib', f'{301:040x}', 'bob@example.com', 'Bob', date='2023-01-01T00:00:00Z',
+                                 branch='feature')
+            self.fake.add_commit('alice/lib', f'{302:040x}', 'alice@example.com', 'Alice', author_login='alice',
+                                 parents=[f'{250:040x}', f'{301:040x}'])
+            del self.fake.repos['alice/lib']['branches']['feature']
+            # History is listed by date, the merged commits come after the previous head
+            main = self.fake.repos['alice/lib']['branches']['main']
+            main[3:3] = [f'{301:040x}', f'{300:040x}']
+            shas = self.scan(server)
+            # Branches, and a page of history: the walk ends on the commit the merged branch was created from
+            self.assertEqual(2, server.request_count)
+
+        self.assertEqual(254, len(shas))
+        self.assertEqual({f'{i:040x}' for i in [250, 300, 301, 302]}, set(shas[:4]))
+
+    def test_branches_are_indexed_separately_from_the_default_branch(self):
+        self.add_commits(3, branch='feature')
+        with FakeGitHubServer(self.fake) as server:
+            self.assertEqual(253, len(self.scan(server)))
+            self.assertEqual(250, len(self.scan(server, all_branches=False)))
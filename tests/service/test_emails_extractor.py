@@ -0,0 +1,40 @@
+import unittest
+
+from ghbuster import TargetSpec, TargetType
+from ghbuster.service.emails_extractor import EmailResult, GitHubCommitEmailExtractor
+from tests.test_utils.fake_github import FakeGitHub, FakeGitHubServer
+
+
+class TestGitHubCommitEmailExtractor(unittest.TestCase):
+    def setUp(self):
+        self.fake = FakeGitHub()
+        self.fake.add_user('alice')
+        self.fake.add_user('bob')
+        self.fake.add_user('ghost')
+        self.fake.take_down_user('ghost')
+        for repo in ['alice/lib', 'alice/app']:
+            self.fake.add_repo(repo)
+            for i in range(40):
+                self.fake.add_commit(repo, f'{repo}-{i}', 'Alice@example.com', 'Alice', author_login='alice')
+            self.fake.add_commit(repo, f'{repo}-bob', 'bob@example.com', 'Bob', author_login='bob')
+            self.fake.add_commit(repo, f'{repo}-ghost', 'ghost@example.com', 'Ghost', author_login='ghost')
+            self.fake.add_commit(repo, f'{repo}-unlinked', 'unlinked@example.com', 'Someone')
+
+    def test_find_emails(self):
+        with FakeGitHubServer(self.fake) as server:
+            extractor = GitHubCommitEmailExtractor(server.client(), TargetSpec(TargetType.USER, 'alice'))
+            emails = extractor.find_emails()
+            # The user and their repositories, a page of branches and commits per repository, the current user once and
+            # a batched check of the accounts linked to commits
+            self.assertEqual(9, server.request_count)
+
+        self.assertEqual({'alice@example.com': True, 'ghost@example.com': False, 'unlinked@example.com': False},
+                         {email.email: email.is_linked_to_user for email in emails})
+
+    def test_emails_linked_to_other_users(self):
+        with FakeGitHubServer(self.fake) as server:
+            extractor = GitHubCommitEmailExtractor(server.client(), TargetSpec(TargetType.REPOSITORY, 'alice', 'lib'),
+                                                   include_emails_linked_to_other_users=True,
+                                                   include_unlinked_emails=False)
+            self.assertEqual({EmailResult('alice@example.com', True), EmailResult('bob@example.com', True)},
+                             extractor.find_emails())
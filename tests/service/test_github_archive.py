@@ -0,0 +1,58 @@
+import http.server
+import json
+import threading
+import unittest
+import urllib.parse
+
+from ghbuster.service.github_archive import GitHubArchive
+
+ROWS = [
+    {'event_type': 'WatchEvent', 'actor_login': f'user{i}', 'repo_name': 'foo/bar', 'created_at': '2024-05-01 12:00:00'}
+    for i in range(3)
+]
+
+
+class _ClickHouseHandler(http.server.BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        params = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+        if params['default_format'] == ['JSONStringsEachRow']:
+            body = ''.join(json.dumps(row) + '\n' for row in ROWS) + self.server.trailer
+        else:
+            body = json.dumps({'data': ROWS})
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, *args):
+        pass
+
+
+class TestGitHubArchive(unittest.TestCase):
+    def setUp(self):
+        self.server = http.server.HTTPServer(('127.0.0.1', 0), _ClickHouseHandler)
+        self.server.trailer = ''
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.archive = GitHubArchive(url=f"http://127.0.0.1:{self.server.server_address[1]}/")
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_stream_yields_the_same_events_as_query(self):
+        streamed = list(self.archive.stream("SELECT ..."))
+        self.assertEqual(self.archive.query("SELECT ..."), streamed)
+        self.assertEqual(['user0', 'user1', 'user2'], [event.actor_login for event in streamed])
+        self.assertEqual(2024, streamed[0].created_at.year)
+
+    def test_stream_without_raw_rows(self):
+        events = self.archive.stream("SELECT ...", keep_raw=False)
+        self.assertEqual({}, next(events)._raw)
+
+    def test_stream_reports_errors_after_the_first_rows(self):
+        self.server.trailer = 'Code: 241. DB::Exception: Memory limit exceeded\n'
+        events = self.archive.stream("SELECT ...")
+        self.assertEqual(3, len([next(events) for _ in range(3)]))
+        with self.assertRaises(ValueError):
+            next(events)
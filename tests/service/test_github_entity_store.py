@@ -0,0 +1,83 @@
+import threading
+import unittest
+from unittest.mock import MagicMock, Mock
+
+from github import GithubException
+
+from ghbuster.service.github_entity_store import GitHubEntityStore
+from tests.test_utils.mock_utils import mock_pygithub_list
+
+
+class TestGitHubEntityStore(unittest.TestCase):
+    def setUp(self):
+        self.gh = MagicMock()
+        self.store = GitHubEntityStore(self.gh)
+
+    def test_user_fetched_once(self):
+        self.gh.get_user.return_value = Mock(login="foo", id=1)
+        first = self.store.get_user(login="foo")
+        second = self.store.get_user("FOO")
+        self.assertIs(first, second)
+        self.gh.get_user.assert_called_once_with("foo")
+        self.assertEqual(self.store.stats.requests_saved, 1)
+
+    def test_user_by_id_reuses_user_fetched_by_login(self):
+        self.gh.get_user.return_value = Mock(login="foo", id=1)
+        user = self.store.get_user("foo")
+        self.assertIs(self.store.get_user_by_id(1), user)
+        self.gh.get_user_by_id.assert_not_called()
+
+    def test_repo_listing_fetched_once(self):
+        self.gh.get_user.return_value.get_repos = Mock(return_value=mock_pygithub_list([]))
+        self.store.get_user("foo").get_repos(type='owner')
+        self.store.get_user("foo").get_repos(type='owner')
+        self.gh.get_user.return_value.get_repos.assert_called_once_with(type='owner')
+
+    def test_distinct_listing_arguments_are_not_shared(self):
+        repo = self.gh.get_repo.return_value
+        self.store.get_repo("foo/bar").get_commits(sha="main")
+        self.store.get_repo("foo/bar").get_commits(sha="dev")
+        self.assertEqual(repo.get_commits.call_count, 2)
+
+    def test_not_found_is_remembered(self):
+        self.gh.get_repo.side_effect = GithubException(status=404)
+        for _ in range(2):
+            with self.assertRaises(GithubException):
+                self.store.get_repo("foo/taken-down")
+        self.gh.get_repo.assert_called_once()
+
+    def test_transient_errors_are_not_remembered(self):
+        self.gh.get_user.side_effect = GithubException(status=502)
+        for _ in range(2):
+            with self.assertRaises(GithubException):
+                self.store.get_user("foo")
+        self.assertEqual(self.gh.get_user.call_count, 2)
+
+    def test_other_attributes_are_delegated(self):
+        self.store.get_user("foo")
+        self.assertIs(self.store.get_user("foo").name, self.gh.get_user.return_value.name)
+        self.assertIs(self.store.get_rate_limit, self.gh.get_rate_limit)
+
+    def test_concurrent_iterations_share_pages(self):
+        fetched = []
+
+        def pages():
+            for i in range(50):
+                fetched.append(i)
+                yield i
+
+        listing = MagicMock()
+        listing.__iter__.side_effect = lambda: pages()
+        self.gh.get_user.return_value.get_repos = Mock(return_value=listing)
+        repos = self.store.get_user("foo").get_repos()
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(list(repos))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [list(range(50))] * 4)
+        self.assertEqual(fetched, list(range(50)))
+        self.assertEqual(repos[:3], [0, 1, 2])
@@ -0,0 +1,109 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from ghbuster.service.github_entity_store import GitHubEntityStore
+from ghbuster.service.graphql_profiles import GitHubProfileFetcher, UserProfileSnapshot
+
+
+def profile_node(login: str, database_id: int = 1, followers: int = 0) -> dict:
+    return {
+        'databaseId': database_id,
+        'id': f"U_{login}",
+        'login': login,
+        'name': '',
+        'company': None,
+        'bio': 'Hello',
+        'location': None,
+        'createdAt': '2025-08-07T00:00:00Z',
+        'updatedAt': '2025-08-08T00:00:00Z',
+        'followers': {'totalCount': followers},
+        'following': {'totalCount': 2},
+        'starredRepositories': {'totalCount': 3},
+        'repositories': {'totalCount': 4},
+        'forks': {'totalCount': 1},
+    }
+
+
+def stargazers_page(logins: list[str], total_count: int, end_cursor: str, has_next_page: bool) -> dict:
+    return {'data': {'repository': {'stargazers': {
+        'totalCount': total_count,
+        'pageInfo': {'hasNextPage': has_next_page, 'endCursor': end_cursor},
+        'edges': [{'starredAt': '2025-08-09T10:00:00Z', 'node': profile_node(login, i)} for i, login in
+                  enumerate(logins)],
+    }}}}
+
+
+class TestGitHubProfileFetcher(unittest.TestCase):
+    def setUp(self):
+        self.gh = MagicMock()
+        self.requester = self.gh.requester
+
+    def test_snapshot_from_graphql(self):
+        snapshot = UserProfileSnapshot.from_graphql(profile_node("foo", followers=12), starred_at='2025-08-09T10:00:00Z')
+        self.assertEqual(snapshot.login, "foo")
+        self.assertIsNone(snapshot.name)  # empty strings are normalized
+        self.assertEqual(snapshot.bio, "Hello")
+        self.assertEqual(snapshot.followers, 12)
+        self.assertEqual(snapshot.public_repos, 4)
+        self.assertEqual(snapshot.created_at.year, 2025)
+        self.assertEqual(snapshot.starred_at.hour, 10)
+
+    def test_stargazers_are_paginated_and_reused(self):
+        self.requester.requestJsonAndCheck.side_effect = [
+            ({}, stargazers_page(["a", "b"], total_count=3, end_cursor="c1", has_next_page=True)),
+            ({}, stargazers_page(["c"], total_count=3, end_cursor="c2", has_next_page=False)),
+        ]
+        fetcher = GitHubProfileFetcher(self.gh)
+
+        first = fetcher.get_stargazers("foo/bar", max_count=1)
+        self.assertEqual(first.total_count, 3)
+        self.assertEqual([p.login for p in first], ["a"])
+        self.assertEqual(self.requester.requestJsonAndCheck.call_count, 1)
+
+        # Only the missing page is fetched
+        second = fetcher.get_stargazers("foo/bar", max_count=100)
+        self.assertEqual([p.login for p in second], ["a", "b", "c"])
+        self.assertEqual(self.requester.requestJsonAndCheck.call_count, 2)
+        self.assertEqual(self.requester.requestJsonAndCheck.call_args.kwargs['input']['variables']['after'], "c1")
+
+    def test_stargazer_pages_are_shared_with_the_async_variant(self):
+        async_client = AsyncMock()
+        async_client.graphql.return_value = stargazers_page(["a", "b"], total_count=3, end_cursor="c1",
+                                                            has_next_page=True)['data']
+        self.requester.requestJsonAndCheck.return_value = (
+            {}, stargazers_page(["c"], total_count=3, end_cursor="c2", has_next_page=False))
+        fetcher = GitHubProfileFetcher(self.gh)
+
+        first = asyncio.run(fetcher.get_stargazers_async("foo/bar", 1, async_client))
+        self.assertEqual(first.total_count, 3)
+        self.assertEqual([p.login for p in first], ["a"])
+
+        second = fetcher.get_stargazers("foo/bar", max_count=100)
+        self.assertEqual([p.login for p in second], ["a", "b", "c"])
+        self.assertEqual(self.requester.requestJsonAndCheck.call_args.kwargs['input']['variables']['after'], "c1")
+        # All pages were retrieved
+        asyncio.run(fetcher.get_stargazers_async("foo/bar", 100, async_client))
+        self.assertEqual(1, async_client.graphql.call_count)
+
+    def test_get_users_omits_missing_users(self):
+        self.requester.requestJsonAndCheck.return_value = ({}, {
+            'data': {'u0': profile_node("foo"), 'u1': None},
+            'errors': [{'type': 'NOT_FOUND', 'message': "Could not resolve to a User with the login of 'gone'."}],
+        })
+        users = GitHubProfileFetcher(self.gh).get_users(["Foo", "gone"])
+        self.assertEqual(list(users.keys()), ["foo"])
+
+    def test_profiles_are_shared_with_entity_store(self):
+        self.requester.requestJsonAndCheck.return_value = (
+            {}, stargazers_page(["a"], total_count=1, end_cursor="c1", has_next_page=False))
+        store = GitHubEntityStore(self.gh)
+        fetcher = GitHubProfileFetcher.for_client(store)
+        self.assertIs(fetcher, GitHubProfileFetcher.for_client(store))
+
+        fetcher.get_stargazers("foo/bar", max_count=100)
+        user = store.get_user("a")
+        self.assertEqual(user.followers, 0)
+        self.assertEqual(user.get_starred().totalCount, 3)
+        self.assertEqual(user.created_at.year, 2025)
+        self.gh.get_user.assert_not_called()
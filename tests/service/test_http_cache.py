@@ -0,0 +1,96 @@
+import http.server
+import threading
+import unittest
+
+import requests
+import requests_cache
+from requests_cache.policy.expiration import get_url_expiration
+
+from ghbuster.service import http_cache
+from ghbuster.service.http_cache import HttpCacheConfig, parse_expire_after
+
+
+class _ETagHandler(http.server.BaseHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        self.requests.append((self.path, self.headers.get('If-None-Match')))
+        if self.headers.get('If-None-Match') == '"v1"':
+            self.send_response(304)
+            self.send_header('ETag', '"v1"')
+            self.end_headers()
+            return
+        body = b'{"login": "octocat"}'
+        self.send_response(200)
+        self.send_header('ETag', '"v1"')
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestHttpCacheConfig(unittest.TestCase):
+    def test_parse_expire_after(self):
+        self.assertEqual(60, parse_expire_after("60"))
+        self.assertEqual(requests_cache.NEVER_EXPIRE, parse_expire_after("never"))
+        with self.assertRaises(ValueError):
+            parse_expire_after("soon")
+
+    def test_commits_never_expire_by_default(self):
+        config = HttpCacheConfig()
+        sha = '0123456789abcdef0123456789abcdef01234567'
+        self.assertEqual(requests_cache.NEVER_EXPIRE,
+                         get_url_expiration(f'https://api.github.com/repos/foo/bar/commits/{sha}',
+                                            config.urls_expire_after))
+
+    def test_branch_heads_expire(self):
+        config = HttpCacheConfig()
+        for ref in ('main', 'feature/foo', '0123456'):
+            with self.subTest(ref=ref):
+                self.assertEqual(http_cache.HOUR, get_url_expiration(
+                    f'https://api.github.com/repos/foo/bar/commits/{ref}', config.urls_expire_after))
+
+    def test_explicit_patterns_take_precedence(self):
+        config = HttpCacheConfig(urls_expire_after={'api.github.com/users/*': 60})
+        patterns = list(config.urls_expire_after)
+        self.assertEqual('api.github.com/users/*', patterns[0])
+        self.assertEqual(60, config.urls_expire_after['api.github.com/users/*'])
+
+
+class TestInstallCache(unittest.TestCase):
+    def setUp(self):
+        _ETagHandler.requests = []
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _ETagHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        requests_cache.uninstall_cache()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_expired_responses_are_revalidated(self):
+        http_cache.install_cache(HttpCacheConfig(backend='memory', path='test', urls_expire_after={
+            '127.0.0.1:*/users/*': 0,
+            '127.0.0.1:*/commits/*': requests_cache.NEVER_EXPIRE,
+        }))
+
+        for _ in range(2):
+            response = requests.get(f"{self.base_url}/users/octocat")
+            self.assertEqual(200, response.status_code)
+            self.assertEqual({"login": "octocat"}, response.json())
+            requests.get(f"{self.base_url}/commits/abc")
+
+        # The user is revalidated with a conditional request, the commit is served from the cache
+        self.assertEqual([
+            ('/users/octocat', None),
+            ('/commits/abc', None),
+            ('/users/octocat', '"v1"'),
+        ], _ETagHandler.requests)
+
+    def test_disabled_cache_is_not_installed(self):
+        http_cache.install_cache(HttpCacheConfig(enabled=False))
+        self.assertFalse(requests_cache.is_installed())
@@ -0,0 +1,106 @@
+import http.server
+import json
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import github
+import requests_cache
+
+from ghbuster.service import instrumentation
+from ghbuster.service.instrumentation import RequestStats, ScanStats
+
+
+def record(url: str = 'https://api.github.com/users/foo', **kwargs):
+    instrumentation.record_request(url=url, status=kwargs.pop('status', 200), latency=kwargs.pop('latency', 0.1),
+                                   size=kwargs.pop('size', 10), **kwargs)
+
+
+class _FakeGitHubHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        payload = json.dumps({'login': 'foo', 'id': 1}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.send_header('Cache-Control', 'max-age=60')
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestScanStats(unittest.TestCase):
+    def test_requests_are_attributed_to_the_current_heuristic(self):
+        stats = ScanStats()
+        record()  # no scan in progress, ignored
+        with instrumentation.collect(stats):
+            record()
+            with instrumentation.heuristic_scope('repo.a'):
+                record(url='https://api.github.com/graphql')
+                with instrumentation.heuristic_scope('user.b'):
+                    record(from_cache=True)
+                    record(status=404)
+            with instrumentation.heuristic_scope('user.b'):
+                record(url='https://api.github.com/search/issues')
+
+        per_heuristic = stats.per_heuristic()
+        self.assertEqual({'(scan)', 'repo.a', 'user.b'}, set(per_heuristic))
+        self.assertEqual(3, per_heuristic['repo.a'].requests)
+        self.assertEqual(1, per_heuristic['repo.a'].cache_hits)
+        self.assertEqual(1, per_heuristic['repo.a'].errors)
+        self.assertEqual({'graphql': 1, 'core': 1}, dict(per_heuristic['repo.a'].rate_limit_cost))
+        self.assertEqual({'search': 1}, dict(per_heuristic['user.b'].rate_limit_cost))
+        self.assertEqual(['repo.a > user.b'], list(stats.nested()))
+        self.assertEqual(5, stats.total().requests)
+        self.assertGreater(per_heuristic['repo.a'].wall_time, 0)
+
+    def test_attribution_is_kept_in_threads(self):
+        stats = ScanStats()
+        with instrumentation.collect(stats), instrumentation.heuristic_scope('repo.a'):
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                futures = [executor.submit(instrumentation.in_current_context(record)) for _ in range(10)]
+                for future in futures:
+                    future.result()
+        self.assertEqual(10, stats.per_heuristic()['repo.a'].requests)
+
+    def test_percentiles(self):
+        stats = RequestStats()
+        self.assertIsNone(stats.percentile(50))
+        for latency in range(1, 101):
+            stats.record(bucket='core', status=200, latency=latency, size=0, from_cache=False, revalidated=False)
+        self.assertEqual(50, stats.percentile(50))
+        self.assertEqual(99, stats.percentile(99))
+        self.assertEqual({'p50': 50, 'p90': 90, 'p99': 99}, stats.to_json()['latency_seconds'])
+
+    def test_revalidated_responses_are_free(self):
+        stats = RequestStats()
+        stats.record(bucket='core', status=200, latency=0, size=0, from_cache=True, revalidated=True)
+        self.assertEqual(1, stats.cache_hits)
+        self.assertEqual(0, sum(stats.rate_limit_cost.values()))
+
+
+class TestInstall(unittest.TestCase):
+    def setUp(self):
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _FakeGitHubHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        requests_cache.install_cache('test', backend='memory')
+
+    def tearDown(self):
+        requests_cache.uninstall_cache()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_records_pygithub_requests(self):
+        client = github.Github(base_url=f"http://127.0.0.1:{self.server.server_address[1]}")
+        instrumentation.install(client)
+        stats = ScanStats()
+        with instrumentation.collect(stats), instrumentation.heuristic_scope('user.a'):
+            for _ in range(2):
+                self.assertEqual('foo', client.get_user('foo').login)
+
+        user_stats = stats.per_heuristic()['user.a']
+        self.assertEqual(2, user_stats.requests)
+        self.assertEqual(1, user_stats.cache_hits)
+        self.assertEqual({'core': 1}, dict(user_stats.rate_limit_cost))
+        self.assertGreater(user_stats.bytes, 0)
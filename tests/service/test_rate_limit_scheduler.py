@@ -0,0 +1,132 @@
+import http.server
+import json
+import threading
+import unittest
+from unittest.mock import Mock
+
+import github
+import requests
+
+from ghbuster.service.rate_limit_scheduler import RateLimitScheduler, bucket_for_url, CORE, SEARCH, GRAPHQL
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+        self.sleeps = []
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def mock_response(status_code: int = 200, headers: dict = None, text: str = "") -> Mock:
+    response = Mock(requests.Response)
+    response.status_code = status_code
+    response.headers = headers or {}
+    response.text = text
+    return response
+
+
+def rate_limit_headers(remaining: int, reset_in: float, clock: FakeClock, resource: str = CORE) -> dict:
+    return {
+        'X-RateLimit-Limit': '5000',
+        'X-RateLimit-Remaining': str(remaining),
+        'X-RateLimit-Reset': str(int(clock.now + reset_in)),
+        'X-RateLimit-Resource': resource,
+    }
+
+
+class TestRateLimitScheduler(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def scheduler(self, tokens: list[str], **kwargs) -> RateLimitScheduler:
+        return RateLimitScheduler(tokens, clock=self.clock.time, sleep=self.clock.sleep, **kwargs)
+
+    def test_bucket_for_url(self):
+        self.assertEqual(bucket_for_url("https://api.github.com/users/foo"), CORE)
+        self.assertEqual(bucket_for_url("https://api.github.com/search/issues?q=foo"), SEARCH)
+        self.assertEqual(bucket_for_url("https://api.github.com/graphql"), GRAPHQL)
+
+    def test_prefers_token_with_most_remaining_requests(self):
+        scheduler = self.scheduler(["a", "b"])
+        scheduler.record_response("a", CORE, mock_response(headers=rate_limit_headers(10, 3600, self.clock)))
+        scheduler.record_response("b", CORE, mock_response(headers=rate_limit_headers(4000, 3600, self.clock)))
+        self.assertEqual(scheduler.acquire(CORE), "b")
+
+    def test_buckets_are_tracked_separately(self):
+        scheduler = self.scheduler(["a"])
+        scheduler.record_response("a", SEARCH, mock_response(headers=rate_limit_headers(0, 30, self.clock, SEARCH)))
+        self.assertEqual(scheduler.acquire(CORE), "a")
+        self.assertEqual(self.clock.sleeps, [])
+
+    def test_pauses_until_reset_when_all_tokens_are_exhausted(self):
+        scheduler = self.scheduler(["a", "b"])
+        scheduler.record_response("a", CORE, mock_response(headers=rate_limit_headers(0, 100, self.clock)))
+        scheduler.record_response("b", CORE, mock_response(headers=rate_limit_headers(0, 50, self.clock)))
+        self.assertEqual(scheduler.acquire(CORE), "b")
+        self.assertEqual(self.clock.sleeps, [50])
+
+    def test_secondary_rate_limit_pauses_token(self):
+        scheduler = self.scheduler(["a", "b"])
+        response = mock_response(status_code=403, headers={'Retry-After': '30'},
+                                 text='{"message": "You have exceeded a secondary rate limit"}')
+        self.assertTrue(scheduler.record_response("a", CORE, response))
+        self.assertEqual(scheduler.acquire(CORE), "b")
+
+    def test_non_rate_limit_403_is_not_retried(self):
+        scheduler = self.scheduler(["a"])
+        response = mock_response(status_code=403, text='{"message": "Repository access blocked"}')
+        self.assertFalse(scheduler.record_response("a", CORE, response))
+
+    def test_requests_are_paced_once_burst_is_consumed(self):
+        scheduler = self.scheduler(["a"], burst={CORE: 2})
+        # 100 requests left for the next 100 seconds, i.e. one per second
+        scheduler.record_response("a", CORE, mock_response(headers=rate_limit_headers(100, 100, self.clock)))
+        for _ in range(3):
+            scheduler.acquire(CORE)
+        self.assertEqual(len(self.clock.sleeps), 1)
+        self.assertAlmostEqual(self.clock.sleeps[0], 1, places=1)
+
+
+class _FakeGitHubHandler(http.server.BaseHTTPRequestHandler):
+    rate_limited_tokens = {"token-a"}
+    seen_tokens = []
+
+    def do_GET(self):
+        token = self.headers['Authorization'].removeprefix('token ')
+        self.seen_tokens.append(token)
+        if token in self.rate_limited_tokens:
+            self.send_response(403)
+            self.send_header('X-RateLimit-Remaining', '0')
+            self.send_header('X-RateLimit-Reset', '9999999999')
+            body = {"message": "API rate limit exceeded"}
+        else:
+            self.send_response(200)
+            self.send_header('X-RateLimit-Remaining', '4999')
+            self.send_header('X-RateLimit-Reset', '9999999999')
+            body = {"login": "foo", "id": 1, "type": "User", "url": "http://localhost/users/foo"}
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(json.dumps(body).encode())
+
+    def log_message(self, *args):
+        pass
+
+
+class TestSchedulerInstallation(unittest.TestCase):
+    def test_rotates_to_another_token_when_rate_limited(self):
+        server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _FakeGitHubHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            gh = github.Github(auth=github.Auth.Token("token-a"), base_url=f"http://127.0.0.1:{server.server_port}",
+                               retry=None, seconds_between_requests=None)
+            RateLimitScheduler(["token-a", "token-b"]).install(gh)
+            self.assertEqual(gh.get_user("foo").login, "foo")
+            self.assertEqual(_FakeGitHubHandler.seen_tokens, ["token-a", "token-b"])
+        finally:
+            server.shutdown()
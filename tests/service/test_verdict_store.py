@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, Mock, patch
+
+from ghbuster import TargetSpec, TargetType
+from ghbuster.heuristics import HeuristicRunResult, RepoStarredBySuspiciousUsers, UserHasOnlyForkedRepos, \
+    UserJustJoinedHeuristic
+from ghbuster.service.github_entity_store import GitHubEntityStore
+from ghbuster.service.verdict_store import VerdictStore, heuristic_key
+
+
+class TestVerdictStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "verdicts.sqlite")
+        self.verdict_store = VerdictStore(self.path)
+        self.gh = MagicMock()
+        self.user = Mock(login="foo", id=42, updated_at=datetime(2025, 8, 7, tzinfo=timezone.utc),
+                         created_at=datetime.now(timezone.utc))
+        self.user.get_repos.return_value = []
+        self.gh.get_user.return_value = self.user
+        self.target_spec = TargetSpec(target_type=TargetType.USER, username="foo")
+
+    def tearDown(self):
+        self.verdict_store.close()
+        self.directory.cleanup()
+
+    def evaluate(self, heuristic, verdict_store: VerdictStore = None) -> HeuristicRunResult:
+        # A new entity store per scan, as in real usage
+        client = GitHubEntityStore(self.gh, verdict_store=verdict_store or self.verdict_store)
+        return heuristic.evaluate(client, self.target_spec)
+
+    def test_verdict_is_reused_across_scans(self):
+        heuristic = UserJustJoinedHeuristic()
+        with patch.object(heuristic, 'run', wraps=heuristic.run) as run:
+            self.assertTrue(self.evaluate(heuristic).triggered)
+            second = self.evaluate(heuristic)
+        self.assertTrue(second.triggered)
+        self.assertIn("joined GitHub", second.additional_details)
+        self.assertEqual(run.call_count, 1)
+        self.assertEqual(self.verdict_store.hits, 1)
+
+    def test_verdict_is_persisted(self):
+        self.evaluate(UserJustJoinedHeuristic())
+        self.verdict_store.close()
+        self.verdict_store = VerdictStore(self.path)
+        heuristic = UserJustJoinedHeuristic()
+        with patch.object(heuristic, 'run') as run:
+            self.assertTrue(self.evaluate(heuristic).triggered)
+        run.assert_not_called()
+
+    def test_profile_update_invalidates_verdict(self):
+        heuristic = UserJustJoinedHeuristic()
+        with patch.object(heuristic, 'run', wraps=heuristic.run) as run:
+            self.evaluate(heuristic)
+            self.user.updated_at = datetime(2025, 9, 1, tzinfo=timezone.utc)
+            self.evaluate(heuristic)
+        self.assertEqual(run.call_count, 2)
+
+    def test_expired_verdicts_are_evicted(self):
+        verdict_store = VerdictStore(self.path, ttl_seconds=-1)
+        self.evaluate(UserJustJoinedHeuristic(), verdict_store=verdict_store)
+        self.assertEqual(verdict_store.evict(), 1)
+        verdict_store.close()
+
+    def test_least_recently_used_verdicts_are_evicted(self):
+        verdict_store = VerdictStore(self.path, max_entries=1)
+        self.evaluate(UserJustJoinedHeuristic(), verdict_store=verdict_store)
+        heuristic = UserHasOnlyForkedRepos()
+        with patch.object(heuristic, 'run', return_value=HeuristicRunResult.PASSED()):
+            self.evaluate(heuristic, verdict_store=verdict_store)
+        self.assertEqual(verdict_store.evict(), 1)
+        verdict_store.close()
+
+    def test_heuristic_parameters_are_part_of_the_key(self):
+        self.assertNotEqual(heuristic_key(RepoStarredBySuspiciousUsers(max_workers=10)),
+                            heuristic_key(RepoStarredBySuspiciousUsers(max_workers=20)))
+
+    def test_errors_are_not_stored(self):
+        heuristic = UserJustJoinedHeuristic()
+        with patch.object(heuristic, 'run', return_value=HeuristicRunResult.ERRORED("boom")) as run:
+            self.evaluate(heuristic)
+            self.evaluate(heuristic)
+        self.assertEqual(run.call_count, 2)
@@ -0,0 +1,67 @@
+import io
+import json
+import unittest
+from unittest.mock import MagicMock, Mock
+
+from ghbuster import TargetType
+from ghbuster.batch_scanner import BatchScanner
+from ghbuster.heuristics import HeuristicRunResult, MetadataHeuristic
+
+
+def mock_heuristic(heuristic_id: str, target_type: TargetType, triggered: bool) -> Mock:
+    heuristic = Mock(MetadataHeuristic)
+    heuristic.id.return_value = heuristic_id
+    heuristic.friendly_name.return_value = heuristic_id
+    heuristic.target_type.return_value = target_type
+    heuristic.run.side_effect = lambda gh, target_spec: HeuristicRunResult(triggered=triggered)
+    heuristic.evaluate.side_effect = lambda gh, target_spec: heuristic.run(gh, target_spec)
+    return heuristic
+
+
+class TestBatchScanner(unittest.TestCase):
+    def setUp(self):
+        self.heuristic = mock_heuristic("repo.test", TargetType.REPOSITORY, triggered=True)
+        self.scanner = BatchScanner(MagicMock(), [self.heuristic], concurrency=2, force=True)
+
+    def scan(self, lines: list[str]) -> list[dict]:
+        output = io.StringIO()
+        self.scanner.scan(lines, output)
+        return [json.loads(line) for line in output.getvalue().splitlines()]
+
+    def test_one_json_line_per_distinct_target(self):
+        results = self.scan([
+            "foo/bar\n",
+            "# comment\n",
+            "\n",
+            "https://github.com/Foo/Bar\n",
+            "foo/baz\n",
+        ])
+        self.assertEqual(sorted(r["target"] for r in results), ["foo/bar", "foo/baz"])
+        for result in results:
+            self.assertEqual(result["status"], "scanned")
+            self.assertEqual(result["target_type"], "repository")
+            self.assertEqual(result["triggered"], ["repo.test"])
+        self.assertEqual(self.heuristic.run.call_count, 2)
+
+    def test_invalid_target_does_not_abort_batch(self):
+        results = self.scan(["not a valid user\n", "foo/bar\n"])
+        by_target = {r["target"]: r for r in results}
+        self.assertEqual(by_target["not a valid user"]["status"], "error")
+        self.assertEqual(by_target["foo/bar"]["status"], "scanned")
+
+    def test_failed_validation_is_reported(self):
+        self.scanner.github_client.github_client.get_repo.side_effect = ValueError("boom")
+        results = self.scan(["foo/bar\n"])
+        self.assertEqual(results[0]["status"], "error")
+        self.assertIn("boom", results[0]["error"])
+
+    def test_entity_store_is_renewed(self):
+        stores = []
+        self.heuristic.run.side_effect = lambda gh, target_spec: stores.append(gh) or HeuristicRunResult(True)
+        scanner = BatchScanner(MagicMock(), [self.heuristic], concurrency=1, force=True, targets_per_entity_store=2)
+        scanner.scan(["foo/a\n", "foo/b\n", "foo/c\n"], io.StringIO())
+        self.assertIs(stores[0], stores[1])
+        self.assertIsNot(stores[1], stores[2])
+        # The renewed store keeps the client and the stats of the previous one
+        self.assertIs(stores[0].github_client, stores[2].github_client)
+        self.assertIs(stores[0].stats, stores[2].stats)
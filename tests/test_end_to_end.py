@@ -0,0 +1,89 @@
+import os
+import unittest
+
+import github
+
+from ghbuster import TargetSpec, TargetType
+from ghbuster.github_repo_scanner import GitHubScanner
+from ghbuster.heuristics import ALL_HEURISTICS, RepoHasStargazersWhoJoinedOnTheSameDay
+from ghbuster.service.github_entity_store import GitHubEntityStore
+from tests.test_utils.fake_github import FakeGitHub, FakeGitHubServer
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'suspicious_repo.json')
+
+
+class TestFakeGitHubServer(unittest.TestCase):
+    def setUp(self):
+        self.fake = FakeGitHub.load(FIXTURE)
+
+    def test_paginated_lists(self):
+        with FakeGitHubServer(self.fake) as server:
+            stargazers = server.client(per_page=5).get_repo('malicious/awesome-tool').get_stargazers()
+            self.assertEqual(12, stargazers.totalCount)
+            self.assertEqual([f'stargazer{i}' for i in range(12)], [user.login for user in stargazers])
+
+    def test_taken_down_and_blocked_entities(self):
+        with FakeGitHubServer(self.fake) as server:
+            client = server.client()
+            with self.assertRaises(github.UnknownObjectException):
+                client.get_user('burner')
+            with self.assertRaises(github.UnknownObjectException):
+                client.get_repo('victim/popular-lib')
+            with self.assertRaises(github.GithubException) as context:
+                client.get_repo('other/blocked-lib')
+            self.assertEqual(451, context.exception.status)
+            # Forks still reference their parent, and commits the account of their author
+            self.assertEqual('victim/popular-lib', client.get_repo('malicious/popular-lib').parent.full_name)
+            commit = next(iter(client.get_repo('malicious/awesome-tool').get_commits()))
+            self.assertEqual('burner', commit.author.login)
+
+    def test_rate_limits(self):
+        with FakeGitHubServer(self.fake, rate_limits={'core': 2}) as server:
+            client = server.client(retry=None)
+            client.get_user('malicious')
+            self.assertEqual((1, 2), client.rate_limiting)
+            client.get_user('malicious')
+            with self.assertRaises(github.RateLimitExceededException):
+                client.get_user('malicious')
+            # Each token has its own rate limit
+            server.client(token='other', retry=None).get_user('malicious')
+
+
+class TestEndToEnd(unittest.TestCase):
+    def scan(self, server: FakeGitHubServer, target_spec: TargetSpec) -> dict[str, bool]:
+        heuristics = [h for h in ALL_HEURISTICS if h.target_type() == target_spec.target_type]
+        scanner = GitHubScanner(target_spec, GitHubEntityStore(server.client()), heuristics)
+        results = scanner.scan()
+        self.assertFalse([result.additional_details for result in results if result.errored])
+        return {result.heuristic.id(): result.triggered for result in results}
+
+    def test_suspicious_repository(self):
+        with FakeGitHubServer(FakeGitHub.load(FIXTURE)) as server:
+            results = self.scan(server, TargetSpec(TargetType.REPOSITORY, 'malicious', 'awesome-tool'))
+        self.assertEqual({
+            'repo.stargazers_joined_same_day': True,
+            'repo.commits_suspicious_unlinked_emails': True,
+            'repo.starred_by_suspicious_users': True,
+            'repo.star_burst': False,
+        }, results)
+
+    def test_suspicious_user(self):
+        with FakeGitHubServer(FakeGitHub.load(FIXTURE)) as server:
+            results = self.scan(server, TargetSpec(TargetType.USER, 'malicious'))
+        self.assertTrue(results['user.forks_from_taken_down_repos'])
+        self.assertTrue(results['user.commits_unlinked_emails'])
+        self.assertTrue(results['user.low_community_activity'])
+        self.assertTrue(results['user.missing_common_fields'])
+
+    def test_legitimate_user(self):
+        with FakeGitHubServer(FakeGitHub.load(FIXTURE)) as server:
+            results = self.scan(server, TargetSpec(TargetType.USER, 'maintainer'))
+        self.assertEqual([], [heuristic for heuristic, triggered in results.items() if triggered])
+
+    def test_request_count(self):
+        with FakeGitHubServer(FakeGitHub.load(FIXTURE)) as server:
+            target_spec = TargetSpec(TargetType.REPOSITORY, 'malicious', 'awesome-tool')
+            GitHubScanner(target_spec, GitHubEntityStore(server.client()),
+                          [RepoHasStargazersWhoJoinedOnTheSameDay()]).scan()
+            # A single page of stargazer profiles
+            self.assertEqual([('POST', '/graphql')], server.requests)
@@ -0,0 +1,178 @@
+import asyncio
+import threading
+import unittest
+from unittest.mock import MagicMock, Mock
+
+from ghbuster import TargetSpec, TargetType
+from ghbuster.github_repo_scanner import GitHubScanner, StopPolicy
+from ghbuster.heuristics import HeuristicRunResult, MetadataHeuristic
+from ghbuster.output_formatter import OutputFormatter
+from ghbuster.service import instrumentation
+
+
+def mock_heuristic(heuristic_id: str, run, cost: int = 1) -> Mock:
+    heuristic = Mock(MetadataHeuristic)
+    heuristic.id.return_value = heuristic_id
+    heuristic.target_type.return_value = TargetType.USER
+    heuristic.estimated_cost.return_value = cost
+    heuristic.run.side_effect = run
+    heuristic.evaluate.side_effect = lambda gh, target_spec: heuristic.run(gh, target_spec)
+
+    async def evaluate_async(gh, target_spec, async_client):
+        return await asyncio.to_thread(heuristic.run, gh, target_spec)
+
+    heuristic.evaluate_async.side_effect = evaluate_async
+    return heuristic
+
+
+class TestGitHubScanner(unittest.TestCase):
+    def setUp(self):
+        self.target_spec = TargetSpec(target_type=TargetType.USER, username="foo")
+
+    def test_results_keep_heuristics_order(self):
+        # The first heuristic only completes once the last one has started, so completion order differs from the order
+        # of the heuristics
+        last_started = threading.Event()
+
+        def slow(gh, target_spec):
+            last_started.wait(timeout=5)
+            return HeuristicRunResult.TRIGGERED()
+
+        def fast(gh, target_spec):
+            last_started.set()
+            return HeuristicRunResult.PASSED()
+
+        heuristics = [mock_heuristic("slow", slow), mock_heuristic("fast", fast)]
+        results = GitHubScanner(self.target_spec, MagicMock(), heuristics, concurrency=2).scan()
+        self.assertEqual([r.heuristic.id() for r in results], ["slow", "fast"])
+        self.assertTrue(results[0].triggered)
+        self.assertFalse(results[1].triggered)
+
+    def test_failing_heuristic_becomes_error_result(self):
+        def failing(gh, target_spec):
+            raise RuntimeError("boom")
+
+        heuristics = [
+            mock_heuristic("failing", failing),
+            mock_heuristic("ok", lambda gh, target_spec: HeuristicRunResult.TRIGGERED()),
+        ]
+        for concurrency in [1, 4]:
+            results = GitHubScanner(self.target_spec, MagicMock(), heuristics, concurrency=concurrency).scan()
+            self.assertEqual(len(results), 2)
+            self.assertTrue(results[0].errored)
+            self.assertIn("boom", results[0].additional_details)
+            self.assertTrue(results[1].triggered)
+
+    def test_skips_heuristics_for_other_target_types(self):
+        heuristic = mock_heuristic("repo", lambda gh, target_spec: HeuristicRunResult.TRIGGERED())
+        heuristic.target_type.return_value = TargetType.REPOSITORY
+        self.assertEqual(GitHubScanner(self.target_spec, MagicMock(), [heuristic], concurrency=2).scan(), [])
+        heuristic.run.assert_not_called()
+
+    def test_awaits_async_variant_when_available(self):
+        class AsyncHeuristic(MetadataHeuristic):
+            def id(self):
+                return "async"
+
+            def friendly_name(self):
+                return "Async"
+
+            def description(self):
+                return "Async"
+
+            def target_type(self):
+                return TargetType.USER
+
+            def run(self, github_client, target_spec):
+                raise AssertionError("the asynchronous variant should be used")
+
+            async def run_async(self, github_client, target_spec, async_client):
+                return HeuristicRunResult.TRIGGERED(additional_details=type(async_client).__name__)
+
+        heuristics = [
+            AsyncHeuristic(),
+            mock_heuristic("sync", lambda gh, target_spec: HeuristicRunResult.PASSED()),
+        ]
+        results = GitHubScanner(self.target_spec, MagicMock(), heuristics, concurrency=2).scan()
+        self.assertEqual([r.heuristic.id() for r in results], ["async", "sync"])
+        self.assertTrue(results[0].triggered)
+        self.assertEqual("AsyncGitHubClient", results[0].additional_details)
+        self.assertFalse(results[1].triggered)
+
+
+class TestScanPlanning(unittest.TestCase):
+    def setUp(self):
+        self.target_spec = TargetSpec(target_type=TargetType.USER, username="foo")
+        self.passed = lambda gh, target_spec: HeuristicRunResult.PASSED()
+        self.triggered = lambda gh, target_spec: HeuristicRunResult.TRIGGERED()
+
+    def test_runs_cheapest_first(self):
+        heuristics = [
+            mock_heuristic("expensive", self.passed, cost=100),
+            mock_heuristic("cheap", self.passed, cost=1),
+            mock_heuristic("medium", self.passed, cost=10),
+        ]
+        results = GitHubScanner(self.target_spec, MagicMock(), heuristics).scan()
+        self.assertEqual([r.heuristic.id() for r in results], ["cheap", "medium", "expensive"])
+
+    def test_stops_after_max_triggered(self):
+        heuristics = [mock_heuristic(f"h{i}", self.triggered, cost=i) for i in range(5)]
+        for concurrency in [1, 2]:
+            results = GitHubScanner(self.target_spec, MagicMock(), heuristics, concurrency=concurrency,
+                                    stop_policy=StopPolicy(max_triggered=2)).scan()
+            self.assertEqual(5, len(results))
+            self.assertEqual([True, True, False, False, False], [r.triggered for r in results])
+            self.assertEqual([False, False, True, True, True], [r.skipped for r in results])
+            self.assertIn("2 heuristics triggered", results[2].additional_details)
+
+    def test_skips_expensive_heuristics_if_cheap_ones_passed(self):
+        heuristics = [
+            mock_heuristic("cheap1", self.passed, cost=1),
+            mock_heuristic("cheap2", self.passed, cost=2),
+            mock_heuristic("expensive", self.triggered, cost=100),
+        ]
+        policy = StopPolicy(skip_expensive_if_cheap_pass=True)
+        results = GitHubScanner(self.target_spec, MagicMock(), heuristics, concurrency=4, stop_policy=policy).scan()
+        self.assertEqual([False, False, True], [r.skipped for r in results])
+        heuristics[2].run.assert_not_called()
+
+        # As soon as a cheap heuristic triggers, the expensive ones run to confirm it
+        heuristics[1].run.side_effect = self.triggered
+        results = GitHubScanner(self.target_spec, MagicMock(), heuristics, concurrency=4, stop_policy=policy).scan()
+        self.assertEqual([False, True, True], [r.triggered for r in results])
+
+    def test_requests_are_attributed_to_heuristics(self):
+        class RequestingHeuristic(MetadataHeuristic):
+            def __init__(self, heuristic_id: str, num_requests: int):
+                self.heuristic_id = heuristic_id
+                self.num_requests = num_requests
+
+            def id(self):
+                return self.heuristic_id
+
+            def friendly_name(self):
+                return self.heuristic_id
+
+            def description(self):
+                return self.heuristic_id
+
+            def target_type(self):
+                return TargetType.USER
+
+            def run(self, github_client, target_spec):
+                for _ in range(self.num_requests):
+                    instrumentation.record_request(url='https://api.github.com/users/foo', status=200, latency=0.01,
+                                                   size=100)
+                return HeuristicRunResult.PASSED()
+
+        heuristics = [RequestingHeuristic("one", 1), RequestingHeuristic("three", 3)]
+        scanner = GitHubScanner(self.target_spec, MagicMock(), heuristics, concurrency=2)
+        results = scanner.scan()
+        per_heuristic = scanner.request_stats.per_heuristic()
+        self.assertEqual(1, per_heuristic["one"].requests)
+        self.assertEqual(3, per_heuristic["three"].requests)
+
+        report = OutputFormatter().format_results_json(self.target_spec, results, stats=scanner.request_stats)
+        self.assertEqual(4, report["stats"]["total"]["requests"])
+        self.assertEqual(3, report["stats"]["heuristics"]["three"]["rate_limit_cost"]["core"])
+        self.assertIn("three", OutputFormatter().format_results(self.target_spec, results, stats=scanner.request_stats))
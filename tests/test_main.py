@@ -0,0 +1,14 @@
+import unittest
+from types import SimpleNamespace
+
+from ghbuster.__main__ import create_rate_limited_client
+
+
+class TestCreateRateLimitedClient(unittest.TestCase):
+    def test_requests_are_only_paced_by_the_scheduler(self):
+        args = SimpleNamespace(github_token='token-a', github_tokens=['token-a', 'token-b'], concurrency=4)
+        github_client, scheduler = create_rate_limited_client(args)
+        kwargs = github_client.requester.kwargs
+        self.assertIsNone(kwargs['seconds_between_requests'])
+        self.assertIsNone(kwargs['seconds_between_writes'])
+        self.assertEqual(10, kwargs['pool_size'])
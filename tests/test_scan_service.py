@@ -0,0 +1,135 @@
+import json
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from unittest.mock import MagicMock, Mock
+
+from ghbuster import TargetSpec, TargetType
+from ghbuster.heuristics import HeuristicRunResult, MetadataHeuristic
+from ghbuster.scan_service import ScanServer, ScanService, ServiceOverloaded
+
+REPO = TargetSpec(TargetType.REPOSITORY, 'foo', 'bar')
+OTHER_REPO = TargetSpec(TargetType.REPOSITORY, 'foo', 'baz')
+
+
+def mock_heuristic(heuristic_id: str, target_type: TargetType, release: threading.Event) -> Mock:
+    heuristic = Mock(MetadataHeuristic)
+    heuristic.id.return_value = heuristic_id
+    heuristic.friendly_name.return_value = heuristic_id
+    heuristic.target_type.return_value = target_type
+    heuristic.estimated_cost.return_value = 1
+
+    def run(gh, target_spec):
+        release.wait(5)
+        return HeuristicRunResult(triggered=True)
+
+    heuristic.run.side_effect = run
+    heuristic.evaluate.side_effect = lambda gh, target_spec: heuristic.run(gh, target_spec)
+    return heuristic
+
+
+class TestScanService(unittest.TestCase):
+    def setUp(self):
+        # Scans block until released, so that they stay in flight
+        self.release = threading.Event()
+        self.heuristic = mock_heuristic('repo.test', TargetType.REPOSITORY, self.release)
+        self.other_heuristic = mock_heuristic('repo.other', TargetType.REPOSITORY, self.release)
+        self.service = ScanService(MagicMock(), [self.heuristic, self.other_heuristic], concurrency=1, max_queue=1,
+                                   force=True)
+
+    def tearDown(self):
+        self.release.set()
+        self.service.close()
+
+    def test_identical_scans_are_coalesced(self):
+        heuristics = self.service.select_heuristics()
+        first = self.service.submit(REPO, heuristics)
+        second = self.service.submit(TargetSpec(TargetType.REPOSITORY, 'foo', 'bar'), list(reversed(heuristics)))
+        self.assertIs(first, second)
+        self.release.set()
+        result = first.result(timeout=5)
+        self.assertEqual('scanned', result['status'])
+        self.assertEqual(['repo.other', 'repo.test'], sorted(result['triggered']))
+        self.assertEqual(1, self.heuristic.run.call_count)
+        self.assertEqual(1, self.service.get_stats()['coalesced'])
+
+    def test_different_heuristics_are_not_coalesced(self):
+        first = self.service.submit(REPO, self.service.select_heuristics(included={'repo.test'}))
+        second = self.service.submit(REPO, self.service.select_heuristics(excluded={'repo.test'}))
+        self.assertIsNot(first, second)
+        self.release.set()
+        self.assertEqual(['repo.test'], first.result(timeout=5)['triggered'])
+        self.assertEqual(['repo.other'], second.result(timeout=5)['triggered'])
+
+    def test_recent_results_are_reused(self):
+        self.release.set()
+        heuristics = self.service.select_heuristics()
+        self.service.submit(REPO, heuristics).result(timeout=5)
+        self.assertEqual('scanned', self.service.submit(REPO, heuristics).result(timeout=5)['status'])
+        self.assertEqual(1, self.heuristic.run.call_count)
+
+        self.service.submit(REPO, heuristics, refresh=True).result(timeout=5)
+        self.assertEqual(2, self.heuristic.run.call_count)
+
+    def test_queue_limit(self):
+        heuristics = self.service.select_heuristics()
+        self.service.submit(REPO, heuristics)
+        self.service.submit(OTHER_REPO, heuristics)
+        with self.assertRaises(ServiceOverloaded):
+            self.service.submit(TargetSpec(TargetType.USER, 'foo'), heuristics)
+        # Identical scans still join the ones in flight
+        self.service.submit(REPO, heuristics)
+        self.assertEqual(1, self.service.get_stats()['rejected'])
+
+    def test_unknown_heuristics(self):
+        with self.assertRaises(ValueError):
+            self.service.select_heuristics(included={'repo.unknown'})
+
+
+class TestScanServer(unittest.TestCase):
+    def setUp(self):
+        self.release = threading.Event()
+        self.release.set()
+        self.heuristic = mock_heuristic('repo.test', TargetType.REPOSITORY, self.release)
+        self.service = ScanService(MagicMock(), [self.heuristic], concurrency=1, max_queue=0, force=True)
+        self.server = ScanServer(self.service, port=0, scan_timeout=5)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.release.set()
+        self.server.shutdown()
+        self.server.server_close()
+        self.service.close()
+
+    def get(self, path: str) -> tuple[int, dict]:
+        host, port = self.server.server_address[:2]
+        try:
+            with urllib.request.urlopen(f"http://{host}:{port}{path}") as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    def test_scan(self):
+        status, result = self.get('/scan?target=https://github.com/Foo/Bar')
+        self.assertEqual(200, status)
+        self.assertEqual(('foo/bar', 'scanned', ['repo.test']),
+                         (result['target'], result['status'], result['triggered']))
+
+    def test_invalid_requests(self):
+        self.assertEqual(400, self.get('/scan')[0])
+        self.assertEqual(400, self.get('/scan?target=not%20valid')[0])
+        self.assertEqual(400, self.get('/scan?target=foo/bar&include=repo.unknown')[0])
+        self.assertEqual(404, self.get('/unknown')[0])
+
+    def test_overloaded(self):
+        self.release.clear()
+        self.service.submit(REPO, self.service.select_heuristics())
+        self.assertEqual(503, self.get('/scan?target=foo/baz')[0])
+
+    def test_heuristics_and_stats(self):
+        self.assertEqual(['repo.test'], [h['id'] for h in self.get('/heuristics')[1]])
+        self.get('/scan?target=foo/bar')
+        self.get('/scan?target=foo/bar')
+        stats = self.get('/stats')[1]
+        self.assertEqual((2, 1), (stats['requested'], stats['from_recent_results']))
@@ -0,0 +1,717 @@
+"""
+Local stand-in for the GitHub REST and GraphQL APIs, serving users, repositories, stargazers and commits from
+fixtures. It implements the endpoints used by the heuristics, including pagination (Link headers), rate limit
+headers, conditional requests (ETag), taken down users and repositories (404) and repositories blocked for ToS
+violations (451), so that heuristics can be tested and benchmarked end-to-end, counting the requests they send.
+
+Fixtures are plain JSON, see FakeGitHub.load and the files under tests/fixtures.
+"""
+import base64
+import copy
+import hashlib
+import http.server
+import json
+import re
+import threading
+import time
+import urllib.parse
+from collections import Counter
+from typing import Any, Callable
+
+import github
+
+# Rate limits per token and bucket. They are high enough not to get in the way by default, tests exercising rate
+# limiting pass lower ones (GitHub allows 5000 core, 30 search and 5000 GraphQL requests per window)
+DEFAULT_RATE_LIMITS = {
+    'core': 1_000_000,
+    'search': 1_000_000,
+    'graphql': 1_000_000,
+}
+RATE_LIMIT_WINDOW = 3600
+DEFAULT_PER_PAGE = 30
+MAX_PER_PAGE = 100
+DEFAULT_BRANCH = 'main'
+
+
+class FakeGitHub:
+    """
+    In-memory GitHub data, keyed by lowercase login and full name.
+
+    Users are dicts with the REST profile fields (login, id, name, company, bio, location, created_at, updated_at)
+    and the logins they follow. Repositories are dicts with full_name, id, fork, parent (full name), stargazers
+    (list of {login, starred_at}), branches (name to list of commit SHAs, newest first) and commits (SHA to
+    {author_name, author_email, author_login, date, parents}).
+    """
+
+    def __init__(self, fixtures: dict[str, Any] = None):
+        fixtures = copy.deepcopy(fixtures or {})
+        self.users: dict[str, dict[str, Any]] = {}
+        self.repos: dict[str, dict[str, Any]] = {}
+        # Users and repositories that existed, but return 404 now
+        self.taken_down_users: set[str] = set(login.lower() for login in fixtures.get('taken_down_users', []))
+        self.taken_down_repos: set[str] = set(name.lower() for name in fixtures.get('taken_down_repos', []))
+        # Repositories disabled for a ToS violation, returning 451
+        self.blocked_repos: set[str] = set(name.lower() for name in fixtures.get('blocked_repos', []))
+        # Number of issues and pull requests authored by each user, returned by the search API
+        self.issue_counts: dict[str, int] = {k.lower(): v for k, v in fixtures.get('issue_counts', {}).items()}
+        self._next_id = 1
+        for user in fixtures.get('users', []):
+            self.add_user(**user)
+        for repo in fixtures.get('repos', []):
+            self.add_repo(**repo)
+
+    @staticmethod
+    def load(path: str) -> 'FakeGitHub':
+        with open(path) as f:
+            return FakeGitHub(json.load(f))
+
+    def dump(self, path: str):
+        with open(path, 'w') as f:
+            json.dump({
+                'users': list(self.users.values()),
+                'repos': list(self.repos.values()),
+                'taken_down_users': sorted(self.taken_down_users),
+                'taken_down_repos': sorted(self.taken_down_repos),
+                'blocked_repos': sorted(self.blocked_repos),
+                'issue_counts': self.issue_counts,
+            }, f, indent=2)
+
+    def add_user(self, login: str, id: int = None, name: str = None, company: str = None, bio: str = None,
+                 location: str = None, created_at: str = '2020-01-01T00:00:00Z', updated_at: str = None,
+                 following: list[str] = None) -> dict[str, Any]:
+        user = {
+            'login': login,
+            'id': id if id is not None else self._new_id(),
+            'name': name,
+            'company': company,
+            'bio': bio,
+            'location': location,
+            'created_at': created_at,
+            'updated_at': updated_at or created_at,
+            'following': list(following or []),
+        }
+        self._next_id = max(self._next_id, user['id'] + 1)
+        self.users[login.lower()] = user
+        return user
+
+    def add_repo(self, full_name: str, id: int = None, fork: bool = False, parent: str = None,
+                 stargazers: list[dict[str, str]] = None, branches: dict[str, list[str]] = None,
+                 commits: dict[str, dict[str, Any]] = None) -> dict[str, Any]:
+        repo = {
+            'full_name': full_name,
+            'id': id if id is not None else self._new_id(),
+            'fork': fork or parent is not None,
+            'parent': parent,
+            'stargazers': list(stargazers or []),
+            'branches': dict(branches or {DEFAULT_BRANCH: []}),
+            'commits': dict(commits or {}),
+        }
+        self._next_id = max(self._next_id, repo['id'] + 1)
+        self.repos[full_name.lower()] = repo
+        return repo
+
+    def star(self, full_name: str, login: str, starred_at: str = '2024-01-01T00:00:00Z'):
+        self.repos[full_name.lower()]['stargazers'].append({'login': login, 'starred_at': starred_at})
+
+    def add_commit(self, full_name: str, sha: str, author_email: str, author_name: str, author_login: str = None,
+                   date: str = '2024-01-01T00:00:00Z', branch: str = DEFAULT_BRANCH, parents: list[str] = None):
+        """
+        Add a commit on top of a branch. author_login links the commit to a GitHub user, as GitHub does when the
+        author email is one of the user's verified emails. parents defaults to the previous head of the branch.
+        """
+        repo = self.repos[full_name.lower()]
+        shas = repo['branches'].setdefault(branch, [])
+        repo['commits'][sha] = {'author_name': author_name, 'author_email': author_email,
+                                'author_login': author_login, 'date': date,
+                                'parents': shas[:1] if parents is None else parents}
+        shas.insert(0, sha)
+
+    def take_down_user(self, login: str):
+        self.taken_down_users.add(login.lower())
+
+    def take_down_repo(self, full_name: str):
+        self.taken_down_repos.add(full_name.lower())
+
+    def block_repo(self, full_name: str):
+        self.blocked_repos.add(full_name.lower())
+
+    def get_user(self, login: str) -> dict[str, Any] | None:
+        if login.lower() in self.taken_down_users:
+            return None
+        return self.users.get(login.lower())
+
+    def get_user_by_id(self, user_id: int) -> dict[str, Any] | None:
+        for user in self.users.values():
+            if user['id'] == user_id:
+                return self.get_user(user['login'])
+        return None
+
+    def owned_repos(self, login: str) -> list[dict[str, Any]]:
+        prefix = f"{login.lower()}/"
+        return [repo for name, repo in self.repos.items()
+                if name.startswith(prefix) and name not in self.taken_down_repos]
+
+    def followers(self, login: str) -> list[dict[str, Any]]:
+        return [user for user in self.users.values()
+                if login.lower() in (f.lower() for f in user['following']) and self.get_user(user['login'])]
+
+    def starred(self, login: str) -> list[dict[str, Any]]:
+        return [repo for repo in self.repos.values()
+                if any(s['login'].lower() == login.lower() for s in repo['stargazers'])]
+
+    def _new_id(self) -> int:
+        self._next_id += 1
+        return self._next_id - 1
+
+
+def _default_branch(repo: dict[str, Any]) -> str:
+    return DEFAULT_BRANCH if DEFAULT_BRANCH in repo['branches'] else next(iter(repo['branches']), DEFAULT_BRANCH)
+
+
+def create_client(base_url: str, token: str = 'fake-token', **kwargs) -> github.Github:
+    """
+    Create a PyGithub client for a fake GitHub API, e.g. one running in another process.
+    """
+    # PyGithub waits between consecutive requests by default, which would dominate the duration of local scans
+    kwargs = {'seconds_between_requests': None, 'seconds_between_writes': None, **kwargs}
+    return github.Github(base_url=base_url, auth=github.Auth.Token(token), **kwargs)
+
+
+class _ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        self.status = status
+        self.message = message
+
+
+class FakeGitHubServer:
+    """
+    HTTP server exposing a FakeGitHub instance, to be used as a context manager:
+
+        with FakeGitHubServer(fake) as server:
+            client = server.client()
+    """
+
+    def __init__(self, fake: FakeGitHub, rate_limits: dict[str, int] = None,
+                 rate_limit_window: float = RATE_LIMIT_WINDOW, latency: float = 0):
+        self.fake = fake
+        self.rate_limits = {**DEFAULT_RATE_LIMITS, **(rate_limits or {})}
+        self.rate_limit_window = rate_limit_window
+        self._window_start = time.time()
+        # Artificial latency added to every response, in seconds
+        self.latency = latency
+        self.requests: list[tuple[str, str]] = []
+        self._used: Counter = Counter()
+        self._lock = threading.Lock()
+        self._server: http.server.ThreadingHTTPServer | None = None
+        # GraphQL queries are recognized by a pattern, and answered by a resolver receiving the query variables
+        self.graphql_resolvers: list[tuple[re.Pattern, Callable[[re.Match, dict[str, Any]], tuple[dict, list]]]] = [
+            (re.compile(r'stargazers\(first: \$first, last: \$last, after: \$stargazersAfter'),
+             self._resolve_watched_repository),
+            (re.compile(r'repository\(owner: \$owner, name: \$name\) \{\s*stargazers\(([^)]*)\)'),
+             self._resolve_stargazers),
+            (re.compile(r'user\(login: \$login\) \{\s*followers\('), self._resolve_followers),
+            (re.compile(r'u\d+: user\(login: \$l\d+\)'), self._resolve_users),
+            (re.compile(r'refs\(refPrefix: "refs/heads/"'), self._resolve_branches),
+            (re.compile(r'ref\(qualifiedName: \$ref\)'), self._resolve_history),
+            (re.compile(r'c\d+: object\(oid: \$c\d+\)'), self._resolve_commit_authors),
+            (re.compile(r'nodes\(ids: \$ids\)'), self._resolve_nodes),
+            (re.compile(r'repositories\(first: \$first, after: \$after, ownerAffiliations: OWNER, isFork: true\)'),
+             self._resolve_forks),
+            (re.compile(r'r\d+: repository\(owner: \$o\d+, name: \$n\d+\)'), self._resolve_repositories),
+            (re.compile(r'forks\(first: \$first, after: \$after\)'), self._resolve_repository_forks),
+            (re.compile(r'repositoryOwner\(login: \$login\)'), self._resolve_owned_repositories),
+        ]
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    @property
+    def request_count(self) -> int:
+        with self._lock:
+            return len(self.requests)
+
+    def reset_requests(self):
+        with self._lock:
+            self.requests.clear()
+
+    def client(self, token: str = 'fake-token', **kwargs) -> github.Github:
+        return create_client(self.base_url, token, **kwargs)
+
+    def start(self):
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                server._handle(self, 'GET')
+
+            def do_POST(self):
+                server._handle(self, 'POST')
+
+            def log_message(self, *args):
+                pass
+
+        self._server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'FakeGitHubServer':
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    # Request handling
+
+    def _handle(self, handler: http.server.BaseHTTPRequestHandler, method: str):
+        url = urllib.parse.urlparse(handler.path)
+        params = {k: v[0] for k, v in urllib.parse.parse_qs(url.query).items()}
+        body = None
+        if method == 'POST':
+            length = int(handler.headers.get('Content-Length', 0))
+            body = json.loads(handler.rfile.read(length) or b'null')
+        with self._lock:
+            self.requests.append((method, handler.path))
+        if self.latency:
+            time.sleep(self.latency)
+
+        bucket = 'graphql' if url.path == '/graphql' else 'search' if url.path.startswith('/search/') else 'core'
+        token = handler.headers.get('Authorization', '')
+        headers = {}
+        try:
+            if method == 'POST' and url.path == '/graphql':
+                data = self._graphql(body)
+            elif method == 'GET':
+                data, headers = self._rest(url.path, params)
+            else:
+                raise _ApiError(404, 'Not Found')
+            status = 200
+        except _ApiError as e:
+            status, data = e.status, {'message': e.message}
+
+        payload = json.dumps(data).encode()
+        etag = f'"{hashlib.sha1(payload).hexdigest()}"'
+        if status == 200 and handler.headers.get('If-None-Match') == etag:
+            # Conditional requests answered with 304 don't count against the rate limit
+            self._reply(handler, 304, b'', {'ETag': etag, **self._rate_limit_headers(token, bucket, consume=False)})
+            return
+
+        rate_limit_headers = self._rate_limit_headers(token, bucket, consume=True)
+        if int(rate_limit_headers['X-RateLimit-Used']) > self.rate_limits[bucket]:
+            payload = json.dumps({'message': 'API rate limit exceeded'}).encode()
+            self._reply(handler, 403, payload, rate_limit_headers)
+            return
+        self._reply(handler, status, payload, {'ETag': etag, **headers, **rate_limit_headers})
+
+    def _reply(self, handler: http.server.BaseHTTPRequestHandler, status: int, payload: bytes, headers: dict):
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json; charset=utf-8')
+        handler.send_header('Content-Length', str(len(payload)))
+        for name, value in headers.items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(payload)
+
+    def _rate_limit_headers(self, token: str, bucket: str, consume: bool) -> dict[str, str]:
+        with self._lock:
+            if time.time() >= self._window_start + self.rate_limit_window:
+                self._window_start = time.time()
+                self._used.clear()
+            if consume:
+                self._used[(token, bucket)] += 1
+            used = self._used[(token, bucket)]
+            reset = self._window_start + self.rate_limit_window
+        limit = self.rate_limits[bucket]
+        return {
+            'X-RateLimit-Limit': str(limit),
+            'X-RateLimit-Remaining': str(max(limit - used, 0)),
+            'X-RateLimit-Reset': str(int(reset) + 1),
+            'X-RateLimit-Used': str(used),
+            'X-RateLimit-Resource': bucket,
+        }
+
+    # REST API
+
+    def _rest(self, path: str, params: dict[str, str]) -> tuple[Any, dict[str, str]]:
+        fake = self.fake
+        parts = [urllib.parse.unquote(p) for p in path.strip('/').split('/')]
+        match parts:
+            case ['user']:
+                return self._user_payload(next(iter(fake.users.values()))), {}
+            case ['user', user_id]:
+                return self._user_payload(self._require(fake.get_user_by_id(int(user_id)))), {}
+            case ['users', login]:
+                return self._user_payload(self._require(fake.get_user(login))), {}
+            case ['users', login, 'repos']:
+                self._require(fake.get_user(login))
+                repos = [self._repo_payload(r) for r in fake.owned_repos(login)]
+                if params.get('sort') == 'pushed':
+                    repos.sort(key=lambda r: r['pushed_at'] or '', reverse=True)
+                return self._paginate(path, params, repos)
+            case ['users', login, 'followers']:
+                self._require(fake.get_user(login))
+                return self._paginate(path, params, [self._user_payload(u, simple=True) for u in fake.followers(login)])
+            case ['users', login, 'following']:
+                user = self._require(fake.get_user(login))
+                following = [fake.get_user(f) for f in user['following']]
+                return self._paginate(path, params, [self._user_payload(u, simple=True) for u in following if u])
+            case ['users', login, 'starred']:
+                self._require(fake.get_user(login))
+                return self._paginate(path, params, [self._repo_payload(r) for r in fake.starred(login)])
+            case ['repos', owner, name]:
+                return self._repo_payload(self._get_repo(owner, name)), {}
+            case ['repos', owner, name, 'stargazers']:
+                repo = self._get_repo(owner, name)
+                stargazers = [fake.get_user(s['login']) for s in repo['stargazers']]
+                return self._paginate(path, params, [self._user_payload(u, simple=True) for u in stargazers if u])
+            case ['repos', owner, name, 'forks']:
+                repo = self._get_repo(owner, name)
+                forks = [r for r in fake.repos.values() if (r['parent'] or '').lower() == repo['full_name'].lower()]
+                return self._paginate(path, params, [self._repo_payload(r) for r in forks])
+            case ['repos', owner, name, 'branches']:
+                repo = self._get_repo(owner, name)
+                branches = [{'name': b, 'commit': {'sha': shas[0] if shas else None}, 'protected': False}
+                            for b, shas in repo['branches'].items()]
+                return self._paginate(path, params, branches)
+            case ['repos', owner, name, 'branches', branch]:
+                repo = self._get_repo(owner, name)
+                if branch not in repo['branches']:
+                    raise _ApiError(404, 'Branch not found')
+                shas = repo['branches'][branch]
+                return {'name': branch, 'commit': {'sha': shas[0] if shas else None}, 'protected': False}, {}
+            case ['repos', owner, name, 'commits']:
+                repo = self._get_repo(owner, name)
+                branch = params.get('sha', _default_branch(repo))
+                if branch not in repo['branches']:
+                    raise _ApiError(404, 'No commit found for SHA: ' + branch)
+                commits = [self._commit_payload(repo, sha) for sha in repo['branches'][branch]]
+                return self._paginate(path, params, commits)
+            case ['repos', owner, name, 'commits', sha]:
+                repo = self._get_repo(owner, name)
+                if sha not in repo['commits']:
+                    raise _ApiError(404, 'No commit found for SHA: ' + sha)
+                return self._commit_payload(repo, sha), {}
+            case ['search', 'issues']:
+                author = re.search(r'author:(\S+)', params.get('q', ''))
+                count = fake.issue_counts.get(author.group(1).lower(), 0) if author else 0
+                return {'total_count': count, 'incomplete_results': False, 'items': []}, {}
+        raise _ApiError(404, 'Not Found')
+
+    def _paginate(self, path: str, params: dict[str, str], items: list) -> tuple[list, dict[str, str]]:
+        per_page = min(int(params.get('per_page', DEFAULT_PER_PAGE)), MAX_PER_PAGE)
+        page = int(params.get('page', 1))
+        last_page = max((len(items) + per_page - 1) // per_page, 1)
+        links = []
+
+        def link(target_page: int, rel: str):
+            query = urllib.parse.urlencode({**params, 'per_page': per_page, 'page': target_page})
+            links.append(f'<{self.base_url}{path}?{query}>; rel="{rel}"')
+
+        if page < last_page:
+            link(page + 1, 'next')
+            link(last_page, 'last')
+        if page > 1:
+            link(page - 1, 'prev')
+            link(1, 'first')
+        headers = {'Link': ', '.join(links)} if links else {}
+        return items[(page - 1) * per_page:page * per_page], headers
+
+    def _get_repo(self, owner: str, name: str) -> dict[str, Any]:
+        full_name = f"{owner}/{name}".lower()
+        if full_name in self.fake.blocked_repos:
+            raise _ApiError(451, 'Repository access blocked')
+        if full_name in self.fake.taken_down_repos:
+            raise _ApiError(404, 'Not Found')
+        return self._require(self.fake.repos.get(full_name))
+
+    @staticmethod
+    def _require(entity: dict[str, Any] | None) -> dict[str, Any]:
+        if entity is None:
+            raise _ApiError(404, 'Not Found')
+        return entity
+
+    def _user_payload(self, user: dict[str, Any], simple: bool = False) -> dict[str, Any]:
+        payload = {
+            'login': user['login'],
+            'id': user['id'],
+            'node_id': f"U_{user['id']}",
+            'type': 'User',
+            'url': f"{self.base_url}/users/{user['login']}",
+        }
+        if simple:
+            return payload
+        owned_repos = self.fake.owned_repos(user['login'])
+        return {
+            **payload,
+            'name': user['name'],
+            'company': user['company'],
+            'bio': user['bio'],
+            'location': user['location'],
+            'created_at': user['created_at'],
+            'updated_at': user['updated_at'],
+            'followers': len(self.fake.followers(user['login'])),
+            'following': len(user['following']),
+            'public_repos': len(owned_repos),
+        }
+
+    def _repo_payload(self, repo: dict[str, Any], with_parent: bool = True) -> dict[str, Any]:
+        owner, name = repo['full_name'].split('/')
+        owner_user = self.fake.users.get(owner.lower())
+        payload = {
+            'id': repo['id'],
+            'node_id': f"R_{repo['id']}",
+            'name': name,
+            'full_name': repo['full_name'],
+            'owner': {'login': owner, 'id': owner_user['id'] if owner_user else 0, 'type': 'User'},
+            'fork': repo['fork'],
+            'url': f"{self.base_url}/repos/{repo['full_name']}",
+            'stargazers_count': len(repo['stargazers']),
+            'forks_count': len(self._forks(repo)),
+            'default_branch': _default_branch(repo),
+            'pushed_at': max((c['date'] for c in repo['commits'].values()), default=None),
+        }
+        if with_parent and repo['parent']:
+            # The parent is still referenced by the fork after being taken down
+            parent = self.fake.repos.get(repo['parent'].lower()) or self.fake.add_repo(repo['parent'])
+            payload['parent'] = self._repo_payload(parent, with_parent=False)
+        return payload
+
+    def _commit_payload(self, repo: dict[str, Any], sha: str) -> dict[str, Any]:
+        commit = repo['commits'][sha]
+        author = self.fake.users.get((commit['author_login'] or '').lower())
+        git_author = {'name': commit['author_name'], 'email': commit['author_email'], 'date': commit['date']}
+        return {
+            'sha': sha,
+            'url': f"{self.base_url}/repos/{repo['full_name']}/commits/{sha}",
+            'commit': {'author': git_author, 'committer': git_author, 'message': f"Commit {sha}"},
+            # Commits stay linked to the account of their author after it is taken down
+            'author': self._user_payload(author, simple=True) if author else None,
+            'committer': self._user_payload(author, simple=True) if author else None,
+            'parents': [{'sha': parent, 'url': f"{self.base_url}/repos/{repo['full_name']}/commits/{parent}"}
+                        for parent in commit.get('parents', [])],
+        }
+
+    # GraphQL API
+
+    def _graphql(self, body: dict[str, Any]) -> dict[str, Any]:
+        query = body.get('query', '')
+        variables = body.get('variables') or {}
+        for pattern, resolver in self.graphql_resolvers:
+            match = pattern.search(query)
+            if match:
+                data, errors = resolver(match, variables)
+                return {'data': data, 'errors': errors} if errors else {'data': data}
+        return {'errors': [{'message': 'Query not supported by the fake GitHub server'}]}
+
+    def _profile_node(self, user: dict[str, Any]) -> dict[str, Any]:
+        owned_repos = self.fake.owned_repos(user['login'])
+        return {
+            'databaseId': user['id'],
+            'id': f"U_{user['id']}",
+            'login': user['login'],
+            # Unset fields are returned as empty strings by the GraphQL API
+            'name': user['name'] or '',
+            'company': user['company'] or '',
+            'bio': user['bio'] or '',
+            'location': user['location'] or '',
+            'createdAt': user['created_at'],
+            'updatedAt': user['updated_at'],
+            'followers': {'totalCount': len(self.fake.followers(user['login']))},
+            'following': {'totalCount': len(user['following'])},
+            'starredRepositories': {'totalCount': len(self.fake.starred(user['login']))},
+            'repositories': {'totalCount': len(owned_repos)},
+            'forks': {'totalCount': sum(1 for r in owned_repos if r['fork'])},
+        }
+
+    def _forks(self, repo: dict[str, Any]) -> list[dict[str, Any]]:
+        return [fork for name, fork in self.fake.repos.items()
+                if (fork['parent'] or '').lower() == repo['full_name'].lower() and name not in self.fake.taken_down_repos]
+
+    @staticmethod
+    def _connection(items: list, variables: dict[str, Any], to_edge: Callable[[Any], dict]) -> dict[str, Any]:
+        if variables.get('last') and not variables.get('first'):
+            end = len(items)
+            start = max(end - min(variables['last'], MAX_PER_PAGE), 0)
+        else:
+            start = int(variables.get('after') or 0)
+            end = start + min(variables.get('first') or MAX_PER_PAGE, MAX_PER_PAGE)
+        return {
+            'totalCount': len(items),
+            'pageInfo': {'hasNextPage': end < len(items), 'endCursor': str(min(end, len(items)))},
+            'edges': [to_edge(item) for item in items[start:end]],
+        }
+
+    def _resolve_stargazers(self, match: re.Match, variables: dict[str, Any]) -> tuple[dict, list]:
+        full_name = f"{variables['owner']}/{variables['name']}".lower()
+        repo = self.fake.repos.get(full_name)
+        if repo is None or full_name in self.fake.taken_down_repos or full_name in self.fake.blocked_repos:
+            return {'repository': None}, [{'type': 'NOT_FOUND', 'message': f"Could not resolve {full_name}"}]
+        stargazers = [(s, self.fake.get_user(s['login'])) for s in repo['stargazers']]
+        stargazers = [(s, user) for s, user in stargazers if user is not None]
+        if 'direction: DESC' in match.group(1):
+            stargazers.reverse()
+        connection = self._connection(stargazers, variables, lambda s: {'starredAt': s[0]['starred_at'],
+                                                                        'node': self._profile_node(s[1])})
+        return {'repository': {'stargazers': connection}}, []
+
+    def _resolve_followers(self, match: re.Match, variables: dict[str, Any]) -> tuple[dict, list]:
+        user = self.fake.get_user(variables['login'])
+        if user is None:
+            return {'user': None}, [{'type': 'NOT_FOUND', 'message': f"Could not resolve {variables['login']}"}]
+        connection = self._connection(self.fake.followers(user['login']), variables, self._profile_node)
+        connection['nodes'] = connection.pop('edges')
+        return {'user': {'followers': connection}}, []
+
+    def _graphql_repo(self, variables: dict[str, Any]) -> dict[str, Any] | None:
+        full_name = f"{variables['owner']}/{variables['name']}".lower()
+        if full_name in self.fake.taken_down_repos or full_name in self.fake.blocked_repos:
+            return None
+        return self.fake.repos.get(full_name)
+
+    def _resolve_branches(self, match: re.Match, variables: dict[str, Any]) -> tuple[dict, list]:
+        repo = self._graphql_repo(variables)
+        if repo is None:
+            return {'repository': None}, [{'type': 'NOT_FOUND', 'message': 'Could not resolve to a Repository'}]
+        branches = [{'name': name, 'target': {'oid': shas[0]} if shas else None}
+                    for name, shas in repo['branches'].items()]
+        default_branch = next((b for b in branches if b['name'] == _default_branch(repo)), None)
+        connection = self._connection(branches, variables, lambda branch: branch)
+        connection['nodes'] = connection.pop('edges')
+        return {'repository': {'defaultBranchRef': default_branch, 'refs': connection}}, []
+
+    def _resolve_history(self, match: re.Match, variables: dict[str, Any]) -> tuple[dict, list]:
+        repo = self._graphql_repo(variables)
+        if repo is None:
+            return {'repository': None}, [{'type': 'NOT_FOUND', 'message': 'Could not resolve to a Repository'}]
+        shas = repo['branches'].get(variables['ref'].removeprefix('refs/heads/'))
+        if shas is None:
+            return {'repository': {'ref': None}}, []
+
+        def to_node(sha: str) -> dict[str, Any]:
+            commit = repo['commits'][sha]
+            user = self.fake.users.get((commit['author_login'] or '').lower())
+            return {'oid': sha, 'parents': {'nodes': [{'oid': parent} for parent in commit.get('parents', [])]},
+                    'author': {
+                        'name': commit['author_name'],
+                        'email': commit['author_email'],
+                        'user': {'databaseId': user['id'], 'login': user['login']} if user else None,
+                    }}
+
+        connection = self._connection(shas, variables, to_node)
+        history = {'pageInfo': connection['pageInfo'], 'nodes': connection['edges']}
+        return {'repository': {'ref': {'target': {'history': history}}}}, []
+
+    def _resolve_commit_authors(self, match: re.Match, variables: dict[str, Any]) -> tuple[dict, list]:
+        repo = self._graphql_repo(variables)
+        if repo is None:
+            return {'repository': None}, [{'type': 'NOT_FOUND', 'message': 'Could not resolve to a Repository'}]
+        data = {}
+        for name, sha in variables.items():
+            if not re.fullmatch(r'c\d+', name):
+                continue
+            commit = repo['commits'].get(sha)
+            user = self.fake.users.get(((commit or {}).get('author_login') or '').lower())
+            data[name] = {'author': {'user': {'databaseId': user['id'], 'login': user['login']} if user else None}} \
+                if commit else None
+        return {'repository': data}, []
+
+    def _resolve_nodes(self, match: re.Match, variables: dict[str, Any]) -> tuple[dict, list]:
+        nodes, errors = [], []
+        for i, node_id in enumerate(variables['ids']):
+            # Legacy global IDs of users, e.g. base64('04:User123')
+            decoded = re.fullmatch(r'04:User(\d+)', base64.b64decode(node_id).decode(errors='replace'))
+            user = self.fake.get_user_by_id(int(decoded.group(1))) if decoded else None
+            nodes.append({'databaseId': user['id']} if user else None)
+            if user is None:
+                errors.append({'type': 'NOT_FOUND', 'path': ['nodes', i], 'message': f"Could not resolve {node_id}"})
+        return {'nodes': nodes}, errors
+
+    def _resolve_users(self, match: re.Match, variables: dict[str, Any]) -> tuple[dict, list]:
+        data, errors = {}, []
+        for name, login in variables.items():
+            alias = f"u{name[1:]}"
+            user = self.fake.get_user(login)
+            data[alias] = self._profile_node(user) if user else None
+            if user is None:
+                errors.append({'type': 'NOT_FOUND', 'path': [alias], 'message': f"Could not resolve {login}"})
+        return data, errors
+
+    def _resolve_forks(self, match: re.Match, variables: dict[str, Any]) -> tuple[dict, list]:
+        user = self.fake.get_user(variables['login'])
+        if user is None:
+            return {'user': None}, [{'type': 'NOT_FOUND', 'message': f"Could not resolve {variables['login']}"}]
+        forks = [repo for repo in self.fake.owned_repos(user['login']) if repo['fork']]
+        connection = self._connection(forks, variables, lambda repo: {
+            'nameWithOwner': repo['full_name'],
+            'isDisabled': repo['full_name'].lower() in self.fake.blocked_repos,
+            # The parent is still referenced by the fork after being taken down
+            'parent': {'nameWithOwner': repo['parent']} if repo['parent'] else None,
+        })
+        return {'user': {'repositories': {'pageInfo': connection['pageInfo'], 'nodes': connection['edges']}}}, []
+
+    def _resolve_repositories(self, match: re.Match, variables: dict[str, Any]) -> tuple[dict, list]:
+        data, errors = {}, []
+        for name, owner in variables.items():
+            if not re.fullmatch(r'o\d+', name):
+                continue
+            alias = f"r{name[1:]}"
+            full_name = f"{owner}/{variables[f'n{name[1:]}']}".lower()
+            data[alias] = None
+            if full_name in self.fake.blocked_repos:
+                errors.append({'type': 'FORBIDDEN', 'path': [alias], 'message': 'Repository access blocked'})
+            elif full_name in self.fake.taken_down_repos or full_name not in self.fake.repos:
+                errors.append({'type': 'NOT_FOUND', 'path': [alias], 'message': f"Could not resolve {full_name}"})
+            else:
+                data[alias] = {'isDisabled': False}
+        return data, errors
+
+    def _resolve_repository_forks(self, match: re.Match, variables: dict[str, Any]) -> tuple[dict, list]:
+        full_name = f"{variables['owner']}/{variables['name']}".lower()
+        if full_name in self.fake.blocked_repos:
+            return {'repository': None}, [{'type': 'FORBIDDEN', 'message': 'Repository access blocked'}]
+        repo = self._graphql_repo(variables)
+        if repo is None:
+            return {'repository': None}, [{'type': 'NOT_FOUND', 'message': f"Could not resolve {full_name}"}]
+        forks = [fork for name, fork in self.fake.repos.items()
+                 if (fork['parent'] or '').lower() == full_name and name not in self.fake.taken_down_repos]
+        connection = self._connection(forks, variables, lambda fork: {
+            'nameWithOwner': fork['full_name'], 'owner': {'login': fork['full_name'].split('/')[0]}})
+        return {'repository': {
+            'owner': {'login': repo['full_name'].split('/')[0]},
+            'parent': {'nameWithOwner': repo['parent']} if repo['parent'] else None,
+            'forks': {'pageInfo': connection['pageInfo'], 'nodes': connection['edges']},
+        }}, []
+
+    def _resolve_owned_repositories(self, match: re.Match, variables: dict[str, Any]) -> tuple[dict, list]:
+        user = self.fake.get_user(variables['login'])
+        if user is None:
+            return {'repositoryOwner': None}, [{'type': 'NOT_FOUND',
+                                                'message': f"Could not resolve {variables['login']}"}]
+        connection = self._connection(self.fake.owned_repos(user['login']), variables,
+                                      lambda repo: {'nameWithOwner': repo['full_name']})
+        return {'repositoryOwner': {'repositories': {'pageInfo': connection['pageInfo'],
+                                                     'nodes': connection['edges']}}}, []
+
+    def _resolve_watched_repository(self, match: re.Match, variables: dict[str, Any]) -> tuple[dict, list]:
+        repo = self._graphql_repo(variables)
+        if repo is None:
+            return {'repository': None}, [{'type': 'NOT_FOUND', 'message': 'Could not resolve to a Repository'}]
+        page = {'first': variables.get('first'), 'last': variables.get('last')}
+        stargazers = self._connection(repo['stargazers'], {**page, 'after': variables.get('stargazersAfter')},
+                                      lambda s: {'node': {'login': s['login']}})
+        forks = self._connection(self._forks(repo), {**page, 'after': variables.get('forksAfter')},
+                                 lambda fork: {'nameWithOwner': fork['full_name']})
+        forks['nodes'] = forks.pop('edges')
+        shas = repo['branches'].get(_default_branch(repo))
+        return {'repository': {
+            'stargazers': stargazers,
+            'forks': forks,
+            'defaultBranchRef': {'target': {'oid': shas[0]}} if shas else None,
+        }}, []
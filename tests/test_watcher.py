@@ -0,0 +1,197 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from typing import Callable
+from unittest.mock import patch
+
+import github
+import requests_cache
+
+from ghbuster import TargetSpec, TargetType
+from ghbuster.heuristics import HeuristicRunResult, MetadataHeuristic
+from ghbuster.heuristics.base import HeuristicInput
+from ghbuster.service import http_cache
+from ghbuster.service.watch_state import WatchStateStore
+from ghbuster import watcher
+from ghbuster.watcher import Watcher, read_targets
+from tests.test_utils.fake_github import FakeGitHub, FakeGitHubServer
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'suspicious_repo.json')
+REPO = TargetSpec(TargetType.REPOSITORY, 'malicious', 'awesome-tool')
+USER = TargetSpec(TargetType.USER, 'malicious')
+
+
+class RecordingHeuristic(MetadataHeuristic):
+    def __init__(self, heuristic_id: str, target_type: TargetType, inputs: set[HeuristicInput],
+                 decide: Callable[[], bool] = lambda: False):
+        self._id = heuristic_id
+        self._target_type = target_type
+        self._inputs = inputs
+        self.decide = decide
+        self.runs = 0
+
+    def id(self) -> str:
+        return self._id
+
+    def friendly_name(self) -> str:
+        return self._id
+
+    def description(self) -> str:
+        return self._id
+
+    def target_type(self) -> TargetType:
+        return self._target_type
+
+    def inputs(self) -> set[HeuristicInput]:
+        return self._inputs
+
+    def run(self, github_client: github.Github, target_spec: TargetSpec) -> HeuristicRunResult:
+        self.runs += 1
+        if self.decide():
+            return HeuristicRunResult.TRIGGERED("triggered")
+        return HeuristicRunResult.PASSED()
+
+
+class TestWatcher(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.state_path = os.path.join(self.directory.name, 'watch.sqlite')
+        self.fake = FakeGitHub.load(FIXTURE)
+        self.server = FakeGitHubServer(self.fake).__enter__()
+        repo = self.fake.repos['malicious/awesome-tool']
+        self.stars = RecordingHeuristic('repo.stars', TargetType.REPOSITORY, {HeuristicInput.STARGAZERS},
+                                        decide=lambda: len(repo['stargazers']) > 12)
+        self.commits = RecordingHeuristic('repo.commits', TargetType.REPOSITORY, {HeuristicInput.COMMITS})
+        self.profile = RecordingHeuristic('user.profile', TargetType.USER, {HeuristicInput.PROFILE})
+        self.repositories = RecordingHeuristic('user.repositories', TargetType.USER, {HeuristicInput.REPOSITORIES})
+        self.heuristics = [self.stars, self.commits, self.profile, self.repositories]
+
+    def tearDown(self):
+        self.server.__exit__()
+        self.directory.cleanup()
+
+    def poll(self, targets: list[TargetSpec] = (REPO,), **kwargs) -> list[dict]:
+        output = io.StringIO()
+        # A new watcher for each poll, as after a restart
+        state = WatchStateStore(self.state_path)
+        try:
+            Watcher(self.server.client(), self.heuristics, state, **kwargs).poll(targets, output)
+        finally:
+            state.close()
+        return [json.loads(line) for line in output.getvalue().splitlines()]
+
+    def test_first_poll_runs_all_heuristics(self):
+        events = self.poll([REPO, USER])
+        self.assertEqual([1, 1, 1, 1], [h.runs for h in self.heuristics])
+        self.assertEqual({('malicious/awesome-tool', 'repo.stars'), ('malicious/awesome-tool', 'repo.commits'),
+                          ('malicious', 'user.profile'), ('malicious', 'user.repositories')},
+                         {(e['target'], e['heuristic']) for e in events})
+        for event in events:
+            self.assertEqual('verdict_changed', event['event'])
+            self.assertIsNone(event['previous'])
+            self.assertEqual('passed', event['verdict'])
+
+    def test_unchanged_target_costs_a_single_free_request(self):
+        self.poll()
+        self.server.reset_requests()
+        self.assertEqual([], self.poll())
+        self.assertEqual([1, 1], [self.stars.runs, self.commits.runs])
+        # A conditional request, answered with 304
+        self.assertEqual([('GET', '/repos/malicious/awesome-tool')], self.server.requests)
+
+    def test_new_stars_rerun_stargazer_heuristics(self):
+        self.poll()
+        self.fake.star('malicious/awesome-tool', 'maintainer')
+        events = self.poll()
+        self.assertEqual([2, 1], [self.stars.runs, self.commits.runs])
+        self.assertEqual(1, len(events))
+        event = events[0]
+        self.assertEqual('repo.stars', event['heuristic'])
+        self.assertEqual(('passed', 'triggered'), (event['previous'], event['verdict']))
+        self.assertEqual(['maintainer'], event['changes']['new_stargazers'])
+        self.assertIn('stargazers', event['changes']['inputs'])
+
+        # The triggered verdict doesn't change with more stars, so no event is emitted
+        self.fake.star('malicious/awesome-tool', 'burner')
+        self.assertEqual([], self.poll())
+        self.assertEqual(3, self.stars.runs)
+
+    def test_new_commits_and_forks(self):
+        self.poll()
+        self.fake.add_commit('malicious/awesome-tool', 'f00', 'dev@example.com', 'Dev', date='2024-06-01T00:00:00Z')
+        self.poll()
+        self.assertEqual([1, 2], [self.stars.runs, self.commits.runs])
+
+        self.fake.add_repo('burner/awesome-tool', parent='malicious/awesome-tool')
+        self.poll()
+        # No heuristic depends on forks
+        self.assertEqual([1, 2], [self.stars.runs, self.commits.runs])
+
+    def test_user_changes(self):
+        self.poll([USER])
+        self.fake.users['malicious']['bio'] = 'Changed'
+        self.poll([USER])
+        self.assertEqual([2, 1], [self.profile.runs, self.repositories.runs])
+
+        self.fake.add_commit('malicious/awesome-tool', 'f00', 'dev@example.com', 'Dev', date='2030-01-01T00:00:00Z')
+        self.poll([USER])
+        self.assertEqual([2, 2], [self.profile.runs, self.repositories.runs])
+
+    def test_errored_heuristic_keeps_its_verdict_and_runs_again(self):
+        self.fake.star('malicious/awesome-tool', 'maintainer')
+        self.poll()
+        decide = self.stars.decide
+
+        def fail():
+            raise github.GithubException(502, {'message': 'Bad gateway'}, None)
+
+        self.stars.decide = fail
+        self.fake.star('malicious/awesome-tool', 'burner')
+        self.assertEqual([], self.poll())
+        # Nothing changed, but the heuristic failed last time
+        self.stars.decide = decide
+        self.assertEqual([], self.poll())
+        self.assertEqual(3, self.stars.runs)
+        self.assertEqual(1, self.commits.runs)
+
+    def test_full_rescan(self):
+        self.poll()
+        self.poll(full_rescan_interval=0)
+        self.assertEqual([2, 2], [self.stars.runs, self.commits.runs])
+
+    def test_taken_down_target(self):
+        self.poll()
+        self.fake.take_down_repo('malicious/awesome-tool')
+        events = self.poll()
+        self.assertEqual('error', events[0]['event'])
+
+    def test_unexpected_error_doesnt_stop_other_targets(self):
+        def detect_changes(github_client, target_spec, cursors):
+            if target_spec == REPO:
+                raise KeyError('repository')
+            return detect(github_client, target_spec, cursors)
+
+        detect = watcher.detect_changes
+        with patch('ghbuster.watcher.detect_changes', side_effect=detect_changes):
+            events = self.poll([REPO, USER])
+        self.assertEqual([('malicious/awesome-tool', 'error')],
+                         [(e['target'], e['event']) for e in events if e['event'] == 'error'])
+        self.assertEqual([1, 1], [self.profile.runs, self.repositories.runs])
+
+    def test_http_cache_is_bypassed(self):
+        http_cache.install_cache(http_cache.HttpCacheConfig(backend='memory', path='watch-test'))
+        try:
+            self.poll()
+            self.fake.star('malicious/awesome-tool', 'maintainer')
+            events = self.poll()
+        finally:
+            requests_cache.uninstall_cache()
+        self.assertEqual(['maintainer'], events[0]['changes']['new_stargazers'])
+
+    def test_read_targets(self):
+        path = os.path.join(self.directory.name, 'targets.txt')
+        with open(path, 'w') as f:
+            f.write("# watched\nmalicious/awesome-tool\n\nhttps://github.com/Malicious/Awesome-Tool\nmalicious\nnot valid\n")
+        self.assertEqual([REPO, USER], read_targets(path))